@@ -0,0 +1,47 @@
+"""AvailabilityAudit 資料可用性稽核效能測試 (探測以記憶體中的假 Ticker 代替網路請求)"""
+
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from data_availability_audit import AvailabilityAudit
+
+
+class _FrameTicker:
+    """只提供 info 與財報屬性的 Ticker，所有股票共用同一組財報"""
+
+    def __init__(self, symbol, annual, quarterly):
+        self.info = {f'field_{i}': i for i in range(20)}
+        self.info['longName'] = symbol
+        self.income_stmt = self.balance_sheet = self.cashflow = annual
+        self.quarterly_income_stmt = self.quarterly_balance_sheet = self.quarterly_cashflow = quarterly
+
+
+def _statement(periods, freq):
+    columns = pd.date_range('2020-12-31', periods=periods, freq=freq)[::-1]
+    return pd.DataFrame(np.random.default_rng(0).normal(size=(30, periods)), columns=columns)
+
+
+class AuditRun:
+    """全市場稽核: 首次探測全部股票、重新執行時只讀取快取"""
+
+    params = [1700]
+    param_names = ['n_symbols']
+
+    def setup(self, n_symbols):
+        self.root = tempfile.mkdtemp(prefix='bench_audit_')
+        self.symbols = [f'{1000 + i}.TW' for i in range(n_symbols)]
+        annual, quarterly = _statement(4, 'YE'), _statement(8, 'QE')
+        self.factory = lambda symbol: _FrameTicker(symbol, annual, quarterly)
+        AvailabilityAudit(f'{self.root}/cached', ticker_factory=self.factory).run(self.symbols)
+
+    def teardown(self, n_symbols):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def time_full_probe(self, n_symbols):
+        AvailabilityAudit(f'{self.root}/full', max_age_days=0, ticker_factory=self.factory).run(self.symbols)
+
+    def time_cached_rerun(self, n_symbols):
+        AvailabilityAudit(f'{self.root}/cached', ticker_factory=self.factory).run(self.symbols)
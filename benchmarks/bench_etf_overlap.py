@@ -0,0 +1,29 @@
+"""ETF成份股重疊度效能測試"""
+
+import itertools
+
+from etf_similarity import ETFSimilarityClusterer
+from fixtures import make_etf_data
+
+
+class ETFOverlap:
+    """所有ETF兩兩重疊比例"""
+
+    params = [50, 250]
+    param_names = ['n_etfs']
+
+    def setup(self, n_etfs):
+        _, self.etf_constituents = make_etf_data(n_etfs)
+        self.stock_sets = {
+            code: {c['stock_code'] for c in data['constituents']}
+            for code, data in self.etf_constituents.items()
+        }
+
+    def time_overlap_pairwise_sets(self, n_etfs):
+        # 與 ETFAnalyzer.get_etf_overlap 相同的集合運算，逐對計算
+        for a, b in itertools.combinations(self.stock_sets, 2):
+            union = self.stock_sets[a] | self.stock_sets[b]
+            len(self.stock_sets[a] & self.stock_sets[b]) / len(union)
+
+    def time_overlap_matrix(self, n_etfs):
+        ETFSimilarityClusterer(self.etf_constituents).overlap_matrix()
@@ -0,0 +1,54 @@
+"""TaiwanETFScraper 儲存、載入與摘要統計效能測試"""
+
+import contextlib
+import io
+import shutil
+import tempfile
+
+from fixtures import make_etf_data
+from taiwan_etf_scraper import TaiwanETFScraper
+
+
+class ScraperCSV:
+    """save_to_csv / load_from_csv"""
+
+    params = [50, 250]
+    param_names = ['n_etfs']
+    repeat = 3
+
+    def setup(self, n_etfs):
+        self.data_dir = tempfile.mkdtemp(prefix='bench_etf_')
+        self.scraper = TaiwanETFScraper(data_dir=self.data_dir)
+        self.scraper.etf_list, self.scraper.etf_constituents = make_etf_data(n_etfs)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.scraper.save_to_csv()
+        self.loader = TaiwanETFScraper(data_dir=self.data_dir)
+
+    def teardown(self, n_etfs):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def time_save_to_csv(self, n_etfs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.scraper.save_to_csv()
+
+    def time_load_from_csv(self, n_etfs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.loader.load_from_csv()
+
+
+class ScraperSummary:
+    """get_summary_statistics"""
+
+    params = [50, 250, 1000]
+    param_names = ['n_etfs']
+
+    def setup(self, n_etfs):
+        self.data_dir = tempfile.mkdtemp(prefix='bench_etf_')
+        self.scraper = TaiwanETFScraper(data_dir=self.data_dir)
+        self.scraper.etf_list, self.scraper.etf_constituents = make_etf_data(n_etfs)
+
+    def teardown(self, n_etfs):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def time_get_summary_statistics(self, n_etfs):
+        self.scraper.get_summary_statistics()
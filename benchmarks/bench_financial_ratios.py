@@ -0,0 +1,20 @@
+"""get_comprehensive_financial_data 財務比率計算效能測試 (不連網，使用錄製或產生的報表)"""
+
+from fixtures import make_statements
+from yfinance_complete_analysis import calculate_financial_ratios, calculate_growth_rates
+
+
+class FinancialRatios:
+    """逐家公司計算財務比率與成長率"""
+
+    params = [100, 1800]
+    param_names = ['n_companies']
+
+    def setup(self, n_companies):
+        self.statements = make_statements(n_companies)
+
+    def time_financial_ratios(self, n_companies):
+        for income_stmt, balance_sheet in self.statements:
+            calculate_financial_ratios(income_stmt, balance_sheet)
+            if income_stmt.shape[1] >= 2:
+                calculate_growth_rates(income_stmt)
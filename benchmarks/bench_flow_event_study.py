@@ -0,0 +1,51 @@
+"""FlowEventStudy 法人籌碼事件研究效能測試 (全市場六年的參數網格)"""
+
+import shutil
+import tempfile
+
+import numpy as np
+
+from fixtures import SEED
+from flow_event_study import FlowEventStudy
+from market_matrix import FLOW_FIELDS, FlowMatrix
+from synthetic_universe import SyntheticUniverse
+from twse_daily_quotes import QuoteStore
+
+
+class FlowSignalGrid:
+    """1700 檔證券、六年交易日，z 分數與連續買賣超共 12 個訊號 × 4 個天期"""
+
+    params = [1700]
+    param_names = ['n_codes']
+
+    def setup(self, n_codes):
+        universe = SyntheticUniverse(n_etfs=10, n_stocks=n_codes, start_date='2019-01-02', end_date='2024-12-31',
+                                     seed=SEED)
+        dates = [day.strftime('%Y-%m-%d') for day in universe.trading_days]
+        close = universe.price_panel().to_numpy()
+        returns = np.nan_to_num(np.diff(np.log(close), axis=0, prepend=np.log(close[:1])))
+        rng = np.random.default_rng(SEED)
+
+        self.root = tempfile.mkdtemp(prefix='bench_event_study_')
+        self.quotes = QuoteStore(f'{self.root}/quotes')
+        self.quotes.write_arrays(dates, universe.stock_codes, {'close': close})
+        # 買賣超與當日報酬正相關，並有約四分之一的證券-日沒有法人進出
+        flows = {}
+        for field in FLOW_FIELDS:
+            values = rng.normal(0, 1, close.shape) + 20 * returns
+            values[rng.random(close.shape) < 0.25] = 0
+            flows[field] = np.round(values * 10 ** 5).astype(np.int64)
+        self.flows = FlowMatrix(f'{self.root}/flows')
+        self.flows.write_arrays(dates, universe.stock_codes, flows)
+        self.study = FlowEventStudy(self.quotes, self.flows)
+
+    def teardown(self, n_codes):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def time_load(self, n_codes):
+        FlowEventStudy(self.quotes, self.flows)
+
+    def time_signal_grid(self, n_codes):
+        signals = self.study.signals(z_windows=(20, 60), z_thresholds=(1.5, 2.0), streak_lengths=(3, 5),
+                                     directions=(1, -1))
+        self.study.run(signals)
@@ -0,0 +1,54 @@
+"""CLI 啟動與模組匯入時間效能測試 (每次以新的 Python 程序量測)"""
+
+import os
+import subprocess
+import sys
+
+from fixtures import REPO_ROOT
+
+STOCK_EXPERIMENT_DIR = os.path.join(REPO_ROOT, 'stock_experiment')
+
+# 這些模組在匯入時不可載入的重量級套件，出現時測試直接失敗而不只是變慢
+HEAVY_MODULES = ('pandas', 'numpy', 'requests', 'bs4', 'yfinance', 'scipy')
+
+
+def _run_python(*args):
+    env = dict(os.environ, PYTHONPATH=STOCK_EXPERIMENT_DIR)
+    subprocess.run([sys.executable, *args], cwd=STOCK_EXPERIMENT_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+
+
+class ModuleImport:
+    """匯入模組並確認沒有連帶載入重量級套件"""
+
+    params = ['tw_stock_cli', 'taiwan_etf_scraper', 'company_health_analysis', 'instrumentation']
+    param_names = ['module']
+    repeat = 7
+
+    def time_import(self, module):
+        _run_python('-c', (
+            f"import sys, {module}\n"
+            f"loaded = [name for name in {HEAVY_MODULES!r} if name in sys.modules]\n"
+            f"assert not loaded, f'{module} 匯入時載入了 {{loaded}}'"
+        ))
+
+
+class CLIStartup:
+    """不需外部資料的短指令從啟動到結束的時間"""
+
+    repeat = 7
+
+    def time_help(self):
+        _run_python('tw_stock_cli.py', '--help')
+
+    def time_industries(self):
+        _run_python('tw_stock_cli.py', 'industries')
+
+
+class InterpreterStartup:
+    """空白直譯器啟動時間，作為上面兩項的比較基準"""
+
+    repeat = 7
+
+    def time_bare_interpreter(self):
+        _run_python('-c', 'pass')
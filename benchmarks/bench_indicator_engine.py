@@ -0,0 +1,51 @@
+"""IndicatorEngine 增量指標效能測試 (新增一個交易日、由第一個交易日重算)"""
+
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+from fixtures import make_universe
+from indicator_engine import IndicatorEngine
+from twse_daily_quotes import QuoteStore
+
+N_DAYS = 500
+
+
+class IncrementalIndicators:
+    """1700 檔證券、兩年交易日的累計成長率與移動平均"""
+
+    params = [1700]
+    param_names = ['n_codes']
+
+    def setup(self, n_codes):
+        universe = make_universe(n_stocks=n_codes)
+        days = [day.strftime('%Y-%m-%d') for day in universe.trading_days[:N_DAYS + 1]]
+        codes = pd.Index(universe.stock_codes, name='code')
+        close = universe.price_panel(days[0], days[-1]).to_numpy()
+
+        self.root = tempfile.mkdtemp(prefix='bench_indicators_')
+        self.quotes = QuoteStore(f'{self.root}/quotes')
+        self.quotes.write_days({day: pd.DataFrame({'close': close[i]}, index=codes) for i, day in enumerate(days[:-1])})
+        engine = IndicatorEngine(self.quotes)
+        engine.update()
+        self.state_copy = f'{self.root}/state.npz'
+        shutil.copy(engine.state_path, self.state_copy)
+        self.quotes.write_days({days[-1]: pd.DataFrame({'close': close[-1]}, index=codes)})
+
+    def teardown(self, n_codes):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def time_update_day(self, n_codes):
+        engine = IndicatorEngine(self.quotes)
+        engine.update()
+        # 還原到新增前的狀態，重複執行時量測的都是增量路徑
+        engine.matrix.dates.pop()
+        engine.matrix._save_meta()
+        shutil.copy(self.state_copy, engine.state_path)
+
+    def time_rebuild(self, n_codes):
+        engine = IndicatorEngine(self.quotes, root=os.path.join(self.root, 'rebuild'))
+        engine.reset()
+        engine.update()
@@ -0,0 +1,25 @@
+"""TaiwanIndustryScorer 評分效能測試"""
+
+import os
+
+from fixtures import REPO_ROOT, make_company_metrics
+from taiwan_industry_scorer import TaiwanIndustryScorer
+
+STANDARDS_PATH = os.path.join(
+    REPO_ROOT, 'stock_experiment', 'company_health_analysis', 'taiwan_industry_scoring_standards.json'
+)
+
+
+class IndustryScore:
+    """逐家公司呼叫 calculate_industry_score"""
+
+    params = [100, 1800]
+    param_names = ['n_companies']
+
+    def setup(self, n_companies):
+        self.scorer = TaiwanIndustryScorer(STANDARDS_PATH)
+        self.companies = make_company_metrics(n_companies)
+
+    def time_calculate_industry_score(self, n_companies):
+        for metrics, sector in self.companies:
+            self.scorer.calculate_industry_score(metrics, sector)
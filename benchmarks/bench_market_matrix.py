@@ -0,0 +1,47 @@
+"""MarketMatrix 記憶體映射矩陣效能測試 (全市場法人買賣超相關係數、開啟後切片)"""
+
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from fixtures import SEED, make_universe
+from market_matrix import FLOW_FIELDS, FlowMatrix, flow_price_correlations
+from twse_daily_quotes import QuoteStore
+
+N_DAYS = 500
+
+
+class FlowCorrelation:
+    """1700 檔證券、兩年交易日的行情與買賣超矩陣"""
+
+    params = [1700]
+    param_names = ['n_codes']
+
+    def setup(self, n_codes):
+        universe = make_universe(n_stocks=n_codes)
+        days = [day.strftime('%Y-%m-%d') for day in universe.trading_days[:N_DAYS]]
+        codes = pd.Index(universe.stock_codes, name='code')
+        close = universe.price_panel(days[0], days[-1]).to_numpy()
+        rng = np.random.default_rng(SEED)
+
+        self.root = tempfile.mkdtemp(prefix='bench_matrix_')
+        self.quotes = QuoteStore(f'{self.root}/quotes')
+        self.quotes.write_days({day: pd.DataFrame({'close': close[i]}, index=codes) for i, day in enumerate(days)})
+        self.flows = FlowMatrix(f'{self.root}/flows')
+        self.flows.write_days({
+            day: pd.DataFrame({field: rng.integers(-10 ** 6, 10 ** 6, n_codes) for field in FLOW_FIELDS}, index=codes)
+            for day in days
+        })
+        self.codes = list(rng.choice(universe.stock_codes, 50, replace=False))
+
+    def teardown(self, n_codes):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def time_flow_correlations(self, n_codes):
+        flow_price_correlations(self.quotes, self.flows)
+
+    def time_open_slice(self, n_codes):
+        store = QuoteStore(self.quotes.root)
+        np.asarray(store.open('returns')[-250:, store.positions(self.codes)])
@@ -0,0 +1,70 @@
+"""SentimentIndex 新聞情緒指數效能測試 (新標註的增量彙總、由第一個交易日重算)"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from fixtures import SEED, make_universe
+from news_sentiment import SentimentIndex, record_labels
+from twse_daily_quotes import QuoteStore
+
+N_DAYS = 500
+N_ARTICLES = 50000
+N_NEW_ARTICLES = 300
+
+
+def _write_labels(path, rng, codes, dates, n_articles, prefix):
+    lines = []
+    for i in range(n_articles):
+        n_chunks = int(rng.integers(1, 4))
+        labels = [{'label': rng.choice(['Positive', 'Negative', 'Neutral']), 'score': rng.uniform(0.5, 1.0)}
+                  for _ in range(n_chunks)]
+        lines.append((codes[rng.integers(len(codes))], dates[rng.integers(len(dates))], f'{prefix}{i}', labels,
+                      rng.integers(50, 512, n_chunks)))
+    for code, date, article, labels, lengths in lines:
+        record_labels(code, date, article, labels, lengths=lengths, path=path)
+
+
+class DailySentiment:
+    """1700 檔證券、兩年交易日、五萬篇文章的情緒矩陣"""
+
+    params = [1700]
+    param_names = ['n_codes']
+
+    def setup(self, n_codes):
+        universe = make_universe(n_stocks=n_codes)
+        days = [day.strftime('%Y-%m-%d') for day in universe.trading_days[:N_DAYS]]
+        close = universe.price_panel(days[0], days[-1]).to_numpy()
+        rng = np.random.default_rng(SEED)
+
+        self.root = tempfile.mkdtemp(prefix='bench_sentiment_')
+        self.quotes = QuoteStore(f'{self.root}/quotes')
+        self.quotes.write_arrays(days, universe.stock_codes, {'close': close})
+        self.labels = f'{self.root}/labels.jsonl'
+        calendar = list(pd.date_range(days[0], days[-1]).strftime('%Y-%m-%d'))
+        _write_labels(self.labels, rng, universe.stock_codes, calendar, N_ARTICLES, 'history')
+        index = SentimentIndex(f'{self.root}/index', self.labels)
+        index.update(self.quotes)
+        self.saved = {path: f'{path}.saved' for path in (index.state_path, index.articles_path)}
+        for path, copy in self.saved.items():
+            shutil.copy(path, copy)
+        # 新標註集中在最近一週
+        _write_labels(self.labels, rng, universe.stock_codes, calendar[-7:], N_NEW_ARTICLES, 'new')
+
+    def teardown(self, n_codes):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def time_update_new_articles(self, n_codes):
+        SentimentIndex(f'{self.root}/index', self.labels).update(self.quotes)
+        # 還原到讀取新標註之前，重複執行時量測的都是增量路徑
+        for path, copy in self.saved.items():
+            shutil.copy(copy, path)
+
+    def time_rebuild(self, n_codes):
+        root = f'{self.root}/rebuild'
+        shutil.rmtree(root, ignore_errors=True)
+        SentimentIndex(root, self.labels).update(self.quotes)
+        os.remove(os.path.join(root, 'state.json'))
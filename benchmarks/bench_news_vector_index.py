@@ -0,0 +1,69 @@
+"""NewsVectorIndex 新聞向量索引效能測試 (IVF 搜尋、證券與日期預先篩選、精確搜尋、向量化)"""
+
+import shutil
+import tempfile
+
+import numpy as np
+
+from fixtures import SEED
+from news_vector_index import EMBED_BATCH, HashingEmbedder, NewsVectorIndex
+
+TEMPLATES = [
+    "公司{code}今日公佈{y}年{m}月營收報告，{y}年{m}月合併營收約為新台幣{a}億元，較上月增加了{p}%，較去年同期增加了{q}%。",
+    "公司{code}董事會決議通過資本支出預算，擴建{city}新廠產能，預計投資新台幣{a}億元，新廠預計於{y}年量產。",
+    "公司{code}董事會決議配發現金股利每股{p}元，除息交易日為{y}年{m}月{q}日，發放日另行公告。",
+    "公司{code}受邀參加{city}證券舉辦之法人說明會，說明公司營運概況及未來展望，簡報內容請詳公開資訊觀測站。",
+    "公司{code}代子公司公告取得{city}機器設備，交易總金額新台幣{a}億元，交易相對人為非關係人。",
+]
+CITIES = ['台南', '高雄', '新竹', '台中', '桃園', '嘉義']
+QUERY = "公佈十一月營收報告，合併營收較上月減少"
+
+
+def make_articles(n_articles, n_codes, rng):
+    """以公告範本產生的新聞 (日期分散在 2020 ~ 2024 年)"""
+    articles = []
+    for i in range(n_articles):
+        code = str(1000 + rng.integers(n_codes))
+        content = TEMPLATES[rng.integers(len(TEMPLATES))].format(
+            code=code, y=rng.integers(2019, 2025), m=rng.integers(1, 13), a=rng.integers(1, 5000),
+            p=rng.integers(1, 50), q=rng.integers(1, 28), city=CITIES[rng.integers(len(CITIES))])
+        date = f'{rng.integers(2020, 2025)}-{rng.integers(1, 13):02d}-{rng.integers(1, 29):02d}'
+        articles.append({'link': f'news-{i}', 'date': date, 'content': content, 'code': code, 'supplier': '公告訊息'})
+    return articles
+
+
+class NewsSearch:
+    """1700 檔證券的新聞 chunk 向量索引"""
+
+    params = [300000]
+    param_names = ['n_chunks']
+
+    def setup(self, n_chunks):
+        rng = np.random.default_rng(SEED)
+        self.root = tempfile.mkdtemp(prefix='bench_news_index_')
+        self.index = NewsVectorIndex(self.root)
+        self.index.add_articles(make_articles(n_chunks, 1700, rng))
+        self.index.build_ivf()
+        self.query = self.index.embedder([QUERY])[0]
+        self.texts = [article['content'] for article in make_articles(EMBED_BATCH, 1700, rng)]
+        self.embedder = HashingEmbedder()
+        # 第一次查詢載入 posting lists
+        self.index.search_vector(self.query, k=10)
+
+    def teardown(self, n_chunks):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def time_search_ivf(self, n_chunks):
+        self.index.search_vector(self.query, k=10, exact=False)
+
+    def time_search_codes(self, n_chunks):
+        self.index.search_vector(self.query, k=10, codes=['1005', '1006'])
+
+    def time_search_recent_ivf(self, n_chunks):
+        self.index.search_vector(self.query, k=10, start='2024-10-01', exact=False)
+
+    def time_search_exact(self, n_chunks):
+        self.index.search_vector(self.query, k=10, exact=True)
+
+    def time_embed_batch(self, n_chunks):
+        self.embedder(self.texts)
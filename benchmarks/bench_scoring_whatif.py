@@ -0,0 +1,30 @@
+"""ScoringWhatIf 情境重新評分效能測試"""
+
+from bench_industry_scorer import STANDARDS_PATH
+from fixtures import make_company_metrics
+from scoring_whatif import ScenarioGrid, ScoringWhatIf
+from taiwan_industry_scorer import TaiwanIndustryScorer
+
+
+def make_grid():
+    """300 個情境: 毛利率門檻位移 × ROE門檻倍數 × 科技業盈利能力權重"""
+    grid = ScenarioGrid()
+    grid.shift_thresholds(None, 'gross_margin', [-5, -2.5, 0, 2.5, 5])
+    grid.scale_thresholds(None, 'roe', [0.8, 0.9, 1.0, 1.1, 1.2, 1.3])
+    grid.set_weight('科技業', 'profitability', [0.3, 0.35, 0.4, 0.45, 0.5, 0.55, 0.6, 0.65, 0.7, 0.75])
+    return grid
+
+
+class WhatIf:
+    """以向量化方式重新評分整個股票池的所有情境"""
+
+    params = [100, 1800]
+    param_names = ['n_companies']
+
+    def setup(self, n_companies):
+        scorer = TaiwanIndustryScorer(STANDARDS_PATH)
+        self.engine = ScoringWhatIf(scorer, make_company_metrics(n_companies))
+        self.grid = make_grid()
+
+    def time_evaluate_300_scenarios(self, n_companies):
+        self.engine.evaluate(self.grid).migration_matrices()
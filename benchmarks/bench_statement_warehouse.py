@@ -0,0 +1,49 @@
+"""StatementWarehouse 財報倉儲查詢效能測試 (需要 pyarrow)"""
+
+import shutil
+import tempfile
+
+import pandas as pd
+
+from fixtures import make_universe
+from statement_warehouse import StatementWarehouse
+
+STATEMENTS = ('income_stmt', 'balance_sheet', 'cashflow')
+
+
+def make_long_statements(n_companies, quarters=12, years=3):
+    """合成資料集的年報與季報轉為倉儲長表"""
+    universe = make_universe(n_stocks=n_companies)
+    parts = []
+    for statement in STATEMENTS:
+        for frequency in ('annual', 'quarterly'):
+            panel = universe.statement_panel(statement, frequency == 'quarterly', years=years, quarters=quarters)
+            long = panel.rename_axis(columns='period_end').stack().rename('value').reset_index()
+            parts.append(long.rename(columns={'stock_code': 'symbol'}).assign(statement=statement, frequency=frequency))
+    companies = universe.stocks[['stock_code', 'stock_name', 'sector']].set_axis(['symbol', 'name', 'sector'], axis=1)
+    return pd.concat(parts, ignore_index=True), companies.assign(industry=companies['sector'])
+
+
+class WarehouseQuery:
+    """全市場橫斷面查詢: 單一產業的毛利最近8季、所有公司的營收與淨利"""
+
+    params = [100, 1700]
+    param_names = ['n_companies']
+
+    def setup(self, n_companies):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise NotImplementedError("需要 pyarrow") from None
+        self.root = tempfile.mkdtemp(prefix='bench_warehouse_')
+        self.warehouse = StatementWarehouse(self.root)
+        self.warehouse.write(*make_long_statements(n_companies))
+
+    def teardown(self, n_companies):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def time_query_industry_item(self, n_companies):
+        self.warehouse.query('Gross Profit', sector='Technology', periods=8)
+
+    def time_query_all_companies(self, n_companies):
+        self.warehouse.query(['Total Revenue', 'Net Income'], periods=8, pivot=True)
@@ -0,0 +1,41 @@
+"""ThresholdCalibrator 串流分位數校準效能測試"""
+
+import numpy as np
+
+from bench_industry_scorer import STANDARDS_PATH
+from fixtures import make_company_metrics
+from taiwan_industry_scorer import TaiwanIndustryScorer
+from threshold_calibration import TDigest, ThresholdCalibrator
+
+
+class Calibration:
+    """分 10 批加入股票池指標後校準所有行業指標的門檻"""
+
+    params = [100, 1800]
+    param_names = ['n_companies']
+
+    def setup(self, n_companies):
+        self.scorer = TaiwanIndustryScorer(STANDARDS_PATH)
+        self.batches = [make_company_metrics(n_companies, seed=seed) for seed in range(10)]
+
+    def time_calibrate(self, n_companies):
+        calibrator = ThresholdCalibrator(self.scorer)
+        for companies in self.batches:
+            calibrator.add_companies(companies)
+        calibrator.calibrate()
+
+
+class Digest:
+    """單一 t-digest 加入大量資料"""
+
+    params = [100000, 1000000]
+    param_names = ['n_values']
+
+    def setup(self, n_values):
+        self.chunks = np.array_split(np.random.default_rng(0).normal(size=n_values), 100)
+
+    def time_update_and_quantile(self, n_values):
+        digest = TDigest()
+        for chunk in self.chunks:
+            digest.update(chunk)
+        digest.quantile([0.2, 0.4, 0.6, 0.8])
@@ -0,0 +1,22 @@
+"""TTMPanel 近四季指標效能測試 (20季季報堆疊後一次計算所有股票與季度)"""
+
+from fixtures import make_universe
+from ttm_metrics import TTMPanel
+
+STATEMENTS = ('income_stmt', 'balance_sheet', 'cashflow')
+
+
+class TTMMetrics:
+    """由堆疊季報計算所有股票、所有季度的 TTM 指標與最新一季指標"""
+
+    params = [100, 1800]
+    param_names = ['n_companies']
+
+    def setup(self, n_companies):
+        universe = make_universe(n_stocks=n_companies)
+        self.panels = [universe.statement_panel(name, quarterly=True, quarters=20) for name in STATEMENTS]
+
+    def time_ttm_panel(self, n_companies):
+        panel = TTMPanel.from_statement_panels(*self.panels)
+        panel.metrics()
+        panel.latest_metrics()
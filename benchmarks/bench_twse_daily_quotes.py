@@ -0,0 +1,48 @@
+"""QuoteStore 全市場每日行情效能測試 (解析單日回應、附加一個交易日、切片讀取)"""
+
+import shutil
+import tempfile
+
+import numpy as np
+
+from fixtures import make_universe
+from twse_daily_quotes import QuoteStore, parse_mi_index
+
+
+class DailyQuotes:
+    """1700 檔證券、兩年交易日的行情儲存"""
+
+    params = [1700]
+    param_names = ['n_codes']
+
+    def setup(self, n_codes):
+        universe = make_universe(n_stocks=n_codes)
+        days = universe.trading_days[:501]
+        self.response = universe.mi_index_response(days[-1])
+        self.root = tempfile.mkdtemp(prefix='bench_quotes_')
+        store = QuoteStore(self.root)
+        day_quotes = parse_mi_index(universe.mi_index_response(days[0]))
+        # 以同一日的行情填滿歷史，只量測儲存與讀取
+        store.write_days({day.strftime('%Y-%m-%d'): day_quotes for day in days[:-1]})
+        self.store = store
+        self.next_day = {days[-1].strftime('%Y-%m-%d'): parse_mi_index(self.response)}
+        self.codes = list(np.random.default_rng(0).choice(store.codes, 50, replace=False))
+
+    def teardown(self, n_codes):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def time_parse_day(self, n_codes):
+        parse_mi_index(self.response)
+
+    def time_append_day(self, n_codes):
+        store = QuoteStore(self.root)
+        store.write_days(self.next_day)
+        # 還原到附加前的狀態，重複執行時量測的都是附加路徑
+        store.dates.pop()
+        store._save_meta()
+
+    def time_frame_codes(self, n_codes):
+        QuoteStore(self.root).frame('close', codes=self.codes, start='2020-06-01')
+
+    def time_history(self, n_codes):
+        QuoteStore(self.root).history(self.codes[0])
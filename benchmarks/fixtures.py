@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+效能測試共用資料
+Benchmark Fixtures
+
+用途: 設定模組搜尋路徑，並以 synthetic_universe 與固定亂數種子產生真實規模的ETF成份股、財務報表與財務指標資料
+"""
+
+import functools
+import os
+import sys
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 研究程式以腳本方式執行並使用同目錄匯入，效能測試比照加入搜尋路徑
+for _path in (
+    os.path.join(REPO_ROOT, 'stock_experiment'),
+    os.path.join(REPO_ROOT, 'stock_experiment', 'company_health_analysis'),
+    os.path.join(REPO_ROOT, 'research_preprocessing', 'yfinance_data_preprocessing'),
+):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+SEED = 20250111
+
+# 環境變數指定 record_ticker 錄製目錄時，財務比率測試改用錄製的報表
+STATEMENTS_DIR_ENV = 'TW_STOCK_BENCH_STATEMENTS_DIR'
+
+YFINANCE_SECTORS = (
+    'Technology', 'Financial Services', 'Basic Materials', 'Industrials',
+    'Consumer Cyclical', 'Consumer Defensive', 'Healthcare', 'Utilities',
+    'Communication Services', 'Energy', 'Real Estate',
+)
+
+
+@functools.lru_cache(maxsize=None)
+def make_universe(n_etfs=250, n_stocks=2000):
+    """
+    建立合成台股資料集 (同規模共用同一個實例)
+
+    Returns:
+        SyntheticUniverse: 合成資料集
+    """
+    from synthetic_universe import SyntheticUniverse
+
+    return SyntheticUniverse(n_etfs=n_etfs, n_stocks=n_stocks, seed=SEED)
+
+
+@functools.lru_cache(maxsize=None)
+def make_etf_data(n_etfs, n_stocks=2000):
+    """
+    產生 TaiwanETFScraper 格式的ETF清單與成份股資料
+
+    結果會被快取重複使用，呼叫端不可修改回傳的資料
+
+    Args:
+        n_etfs (int): ETF數量
+        n_stocks (int): 股票池大小
+
+    Returns:
+        tuple: (etf_list, etf_constituents)
+    """
+    universe = make_universe(n_etfs, n_stocks)
+    return universe.etf_list(), universe.etf_constituents()
+
+
+@functools.lru_cache(maxsize=None)
+def make_company_metrics(n_companies, seed=SEED):
+    """
+    產生 TaiwanIndustryScorer.calculate_industry_score 的輸入
+
+    Returns:
+        list: [(metrics, yfinance_sector), ...]
+    """
+    rng = np.random.default_rng(seed)
+    sectors = rng.choice(YFINANCE_SECTORS, size=n_companies)
+    columns = {
+        'revenue_growth_rate': rng.normal(8, 15, n_companies),
+        'gross_margin': rng.normal(25, 12, n_companies),
+        'net_margin': rng.normal(8, 8, n_companies),
+        'operating_margin': rng.normal(10, 9, n_companies),
+        'roa': rng.normal(5, 4, n_companies),
+        'roe': rng.normal(11, 8, n_companies),
+        'eps_growth': rng.normal(6, 25, n_companies),
+        'eps': rng.gamma(2.0, 2.0, n_companies),
+        'ocf_to_net_income': rng.normal(1.1, 0.5, n_companies),
+        'debt_ratio': rng.uniform(15, 85, n_companies),
+        'current_ratio': rng.uniform(0.6, 3.5, n_companies),
+    }
+    return [
+        ({name: float(values[i]) for name, values in columns.items()}, str(sectors[i]))
+        for i in range(n_companies)
+    ]
+
+
+@functools.lru_cache(maxsize=None)
+def make_statements(n_companies, years=4):
+    """
+    產生 yfinance 年度損益表與資產負債表 (列名與 yfinance 相同，欄位為年度由新到舊)
+
+    設定 TW_STOCK_BENCH_STATEMENTS_DIR 時改為讀取 replay_harness.record_ticker 錄製的報表
+
+    Returns:
+        list: [(income_stmt, balance_sheet), ...]
+    """
+    recorded_dir = os.environ.get(STATEMENTS_DIR_ENV)
+    if recorded_dir:
+        return load_recorded_statements(recorded_dir, n_companies)
+
+    universe = make_universe(n_stocks=n_companies)
+    income = universe.statement_panel('income_stmt', years=years)
+    balance = universe.statement_panel('balance_sheet', years=years)
+    return [
+        (income.xs(code, level='stock_code').dropna(how='all'), balance.xs(code, level='stock_code').dropna(how='all'))
+        for code in universe.stock_codes
+    ]
+
+
+def load_recorded_statements(recorded_dir, n_companies):
+    """讀取錄製的報表，數量不足時循環使用"""
+    from replay_harness import ReplayTicker
+
+    symbols = sorted(
+        name for name in os.listdir(recorded_dir)
+        if os.path.exists(os.path.join(recorded_dir, name, 'income_stmt.csv'))
+    )
+    if not symbols:
+        raise FileNotFoundError(f"{recorded_dir} 中沒有錄製的財務報表")
+
+    recorded = []
+    for symbol in symbols:
+        ticker = ReplayTicker(symbol, recorded_dir)
+        recorded.append((ticker.income_stmt, ticker.balance_sheet))
+    return [recorded[i % len(recorded)] for i in range(n_companies)]
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+效能測試執行程式
+Benchmark Runner
+
+用途: 執行 benchmarks/bench_*.py 中的效能測試 (asv 風格: 類別提供 params、setup、time_* 方法)，
+      將結果附加到 JSON 歷史紀錄，並與儲存的基準比較標示效能退步
+
+使用方式:
+    python benchmarks/run_benchmarks.py                  # 執行全部並與基準比較
+    python benchmarks/run_benchmarks.py -k overlap       # 只執行名稱包含 overlap 的測試
+    python benchmarks/run_benchmarks.py --save-baseline  # 將本次結果存為新基準
+    python benchmarks/run_benchmarks.py --fail-on-regression --tolerance 0.3
+    python benchmarks/run_benchmarks.py --scale 10 --quick --no-history  # 10倍規模壓力測試
+"""
+
+import argparse
+import datetime
+import gc
+import glob
+import importlib
+import inspect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+HISTORY_PATH = os.path.join(RESULTS_DIR, 'history.jsonl')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 0.25
+
+
+def discover(pattern=None, quick=False, scale=1):
+    """
+    搜尋所有效能測試
+
+    Args:
+        pattern (str): 只保留名稱包含此字串的測試
+        quick (bool): 每個測試只使用最小的參數
+        scale (int): 整數參數 (資料規模) 的放大倍數，用於 10~100 倍規模的壓力測試
+
+    Returns:
+        list: [(名稱, 類別, 方法名稱, 參數), ...]
+    """
+    if BENCH_DIR not in sys.path:
+        sys.path.insert(0, BENCH_DIR)
+    # fixtures 負責設定研究程式的模組搜尋路徑，需先於各測試模組載入
+    importlib.import_module('fixtures')
+
+    cases = []
+    for path in sorted(glob.glob(os.path.join(BENCH_DIR, 'bench_*.py'))):
+        module_name = os.path.splitext(os.path.basename(path))[0]
+        module = importlib.import_module(module_name)
+        for class_name, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module_name:
+                continue
+            params = list(getattr(cls, 'params', [None]))
+            if quick:
+                params = params[:1]
+            if scale != 1:
+                params = [param * scale if isinstance(param, int) else param for param in params]
+            for method_name in sorted(name for name in dir(cls) if name.startswith('time_')):
+                for param in params:
+                    name = f"{module_name}.{class_name}.{method_name}"
+                    if param is not None:
+                        name += f"[{param}]"
+                    if pattern and pattern not in name:
+                        continue
+                    cases.append((name, cls, method_name, param))
+    return cases
+
+
+def run_case(cls, method_name, param, repeat=None):
+    """
+    執行單一效能測試
+
+    每次計時前呼叫 setup，計時只涵蓋 time_* 方法本身；setup 拋出 NotImplementedError 時略過此測試
+
+    Returns:
+        dict: min、median、mean、stdev (秒) 與執行次數
+    """
+    repeat = repeat or getattr(cls, 'repeat', DEFAULT_REPEAT)
+    args = () if param is None else (param,)
+    timings = []
+
+    for _ in range(repeat):
+        instance = cls()
+        if hasattr(instance, 'setup'):
+            instance.setup(*args)
+        method = getattr(instance, method_name)
+        gc.collect()
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            method(*args)
+            timings.append(time.perf_counter() - start)
+        finally:
+            if gc_enabled:
+                gc.enable()
+            if hasattr(instance, 'teardown'):
+                instance.teardown(*args)
+
+    return {
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.fmean(timings),
+        'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        'repeat': len(timings),
+    }
+
+
+def compare_to_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    與基準比較中位數時間
+
+    Args:
+        results (dict): 本次結果
+        baseline (dict): 基準結果
+        tolerance (float): 容許的變慢比例，0.25表示慢超過25%視為退步
+
+    Returns:
+        dict: 測試名稱對應 {'ratio', 'status'}，status 為 regression / improved / ok / new
+    """
+    comparison = {}
+    for name, stats in results.items():
+        reference = baseline.get(name)
+        if not reference or not reference.get('median'):
+            comparison[name] = {'ratio': None, 'status': 'new'}
+            continue
+        ratio = stats['median'] / reference['median']
+        if ratio > 1 + tolerance:
+            status = 'regression'
+        elif ratio < 1 / (1 + tolerance):
+            status = 'improved'
+        else:
+            status = 'ok'
+        comparison[name] = {'ratio': ratio, 'status': status}
+    return comparison
+
+
+def load_baseline(path=BASELINE_PATH):
+    """載入基準結果，不存在時回傳空字典"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('results', {})
+
+
+def environment_info():
+    """記錄執行環境，方便比對不同機器的結果"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+    }
+
+
+def append_history(record, path=HISTORY_PATH):
+    """將本次結果附加到 JSON Lines 歷史紀錄"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def save_baseline(record, path=BASELINE_PATH):
+    """將本次結果存為基準"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(record, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def format_seconds(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:8.1f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:8.2f} ms"
+    return f"{seconds:8.3f} s "
+
+
+def main():
+    parser = argparse.ArgumentParser(description='tw-stock 效能測試')
+    parser.add_argument('-k', dest='pattern', help='只執行名稱包含此字串的測試')
+    parser.add_argument('--quick', action='store_true', help='每個測試只使用最小參數')
+    parser.add_argument('--repeat', type=int, help='覆寫每個測試的執行次數')
+    parser.add_argument('--scale', type=int, default=1, help='資料規模放大倍數 (合成資料)')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='視為退步的變慢比例')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='基準檔案路徑')
+    parser.add_argument('--save-baseline', action='store_true', help='將本次結果存為基準')
+    parser.add_argument('--no-history', action='store_true', help='不寫入歷史紀錄')
+    parser.add_argument('--fail-on-regression', action='store_true', help='有退步時以非零狀態結束')
+    args = parser.parse_args()
+
+    cases = discover(args.pattern, args.quick, args.scale)
+    if not cases:
+        print("沒有符合條件的效能測試")
+        return 1
+
+    baseline = load_baseline(args.baseline)
+    results = {}
+    print(f"執行 {len(cases)} 項效能測試\n")
+    for name, cls, method_name, param in cases:
+        try:
+            stats = run_case(cls, method_name, param, args.repeat)
+        except NotImplementedError as e:
+            # 與 asv 相同: setup 拋出 NotImplementedError 表示此環境不支援 (如缺少選用套件)
+            print(f"  {'略過':>11}  {'':>11}  {name} ({e})")
+            continue
+        results[name] = stats
+        print(f"  {format_seconds(stats['median'])}  ±{format_seconds(stats['stdev']).strip():>10}  {name}")
+
+    comparison = compare_to_baseline(results, baseline, args.tolerance)
+    record = dict(environment_info(), results=results)
+    if not args.no_history:
+        append_history(dict(record, comparison=comparison))
+
+    regressions = {name: item for name, item in comparison.items() if item['status'] == 'regression'}
+    if baseline:
+        print(f"\n與基準比較 (容許 {args.tolerance:.0%}):")
+        for name, item in comparison.items():
+            if item['status'] in ('regression', 'improved'):
+                marker = '⚠️ 退步' if item['status'] == 'regression' else '✓ 改善'
+                print(f"  {marker} {item['ratio']:.2f}x  {name}")
+        if not any(item['status'] in ('regression', 'improved') for item in comparison.values()):
+            print("  無明顯差異")
+    else:
+        print("\n尚無基準，可使用 --save-baseline 建立")
+
+    if args.save_baseline:
+        save_baseline(record, args.baseline)
+        print(f"\n基準已儲存至: {args.baseline}")
+
+    if regressions and args.fail_on_regression:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
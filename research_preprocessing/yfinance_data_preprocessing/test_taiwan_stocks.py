@@ -27,8 +27,10 @@ for symbol, name in taiwan_stocks.items():
         info = stock.info
         has_basic_info = len(info) > 10
         
-        # 檢查財務報表
-        has_income_stmt = not stock.income_stmt.empty
+        # 檢查財務報表 (每個屬性都是一次網路請求，只讀取一次)
+        # 全市場稽核請使用 stock_experiment/data_availability_audit.py (tw-stock audit run)
+        income_stmt = stock.income_stmt
+        has_income_stmt = not income_stmt.empty
         has_balance_sheet = not stock.balance_sheet.empty
         has_cashflow = not stock.cashflow.empty
         has_quarterly = not stock.quarterly_income_stmt.empty
@@ -78,7 +80,7 @@ for symbol, name in taiwan_stocks.items():
         
         # 如果有財務報表數據，顯示數據年份範圍
         if has_income_stmt:
-            years = stock.income_stmt.columns
+            years = income_stmt.columns
             print(f'財務數據年份: {years[-1].year}-{years[0].year} ({len(years)}年)')
         
     except Exception as e:
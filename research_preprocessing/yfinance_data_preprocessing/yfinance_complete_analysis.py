@@ -1,10 +1,31 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from instrumentation import span, timed
+except ImportError:
+    # 計時工具位於 stock_experiment/，不在搜尋路徑時不計時
+    from contextlib import nullcontext
+
+    def span(name):
+        return nullcontext()
+
+    def timed(name):
+        return lambda func: func
+
+# 依序抓取的 yfinance 財務報表屬性
+STATEMENT_PROPERTIES = (
+    'income_stmt',
+    'balance_sheet',
+    'cashflow',
+    'quarterly_income_stmt',
+    'quarterly_balance_sheet',
+    'quarterly_cashflow',
+)
+
 def get_comprehensive_financial_data(symbol):
     """
     獲取指定股票的完整財務數據和分析
@@ -16,6 +37,9 @@ def get_comprehensive_financial_data(symbol):
     dict: 包含所有財務數據和計算指標的字典
     """
     
+    # yfinance 只在實際抓取時載入，比率計算函數可單獨用於已錄製的報表
+    import yfinance as yf
+    
     try:
         # 創建股票對象
         stock = yf.Ticker(symbol)
@@ -25,6 +49,7 @@ def get_comprehensive_financial_data(symbol):
             'symbol': symbol,
             'basic_info': {},
             'financial_ratios': {},
+            'ttm_ratios': {},
             'growth_rates': {},
             'cashflow_analysis': {},
             'raw_data': {},
@@ -33,7 +58,8 @@ def get_comprehensive_financial_data(symbol):
         }
         
         # 1. 獲取基本信息
-        info = stock.info
+        with span('yfinance.info'):
+            info = stock.info
         basic_metrics = {
             'company_name': info.get('longName', 'N/A'),
             'sector': info.get('sector', 'N/A'),
@@ -55,13 +81,17 @@ def get_comprehensive_financial_data(symbol):
         }
         result['basic_info'] = basic_metrics
         
-        # 2. 獲取財務報表
-        income_stmt = stock.income_stmt
-        balance_sheet = stock.balance_sheet
-        cashflow = stock.cashflow
-        quarterly_income = stock.quarterly_income_stmt
-        quarterly_balance = stock.quarterly_balance_sheet
-        quarterly_cashflow = stock.quarterly_cashflow
+        # 2. 獲取財務報表 (每個屬性都會觸發一次網路請求，分別計時)
+        statements = {}
+        for name in STATEMENT_PROPERTIES:
+            with span(f'yfinance.{name}'):
+                statements[name] = getattr(stock, name)
+        income_stmt = statements['income_stmt']
+        balance_sheet = statements['balance_sheet']
+        cashflow = statements['cashflow']
+        quarterly_income = statements['quarterly_income_stmt']
+        quarterly_balance = statements['quarterly_balance_sheet']
+        quarterly_cashflow = statements['quarterly_cashflow']
         
         result['raw_data'] = {
             'income_statement_annual': income_stmt,
@@ -88,92 +118,22 @@ def get_comprehensive_financial_data(symbol):
         # 4. 計算財務比率（如果數據可用）
         if not income_stmt.empty:
             try:
-                latest_year = income_stmt.columns[0]
-                
-                # 基本財務數據
-                revenue = income_stmt.loc['Total Revenue', latest_year] if 'Total Revenue' in income_stmt.index else None
-                gross_profit = income_stmt.loc['Gross Profit', latest_year] if 'Gross Profit' in income_stmt.index else None
-                operating_income = income_stmt.loc['Operating Income', latest_year] if 'Operating Income' in income_stmt.index else None
-                net_income = income_stmt.loc['Net Income', latest_year] if 'Net Income' in income_stmt.index else None
-                basic_eps = income_stmt.loc['Basic EPS', latest_year] if 'Basic EPS' in income_stmt.index else None
-                
-                # 計算比率
-                financial_ratios = {
-                    'latest_year': latest_year.strftime('%Y'),
-                    'revenue_ntd': revenue,
-                    'gross_profit_ntd': gross_profit,
-                    'operating_income_ntd': operating_income,
-                    'net_income_ntd': net_income,
-                    'basic_eps': basic_eps
-                }
-                
-                if revenue and revenue != 0:
-                    if gross_profit:
-                        financial_ratios['gross_margin_calculated'] = (gross_profit / revenue) * 100
-                    if operating_income:
-                        financial_ratios['operating_margin_calculated'] = (operating_income / revenue) * 100
-                    if net_income:
-                        financial_ratios['net_margin_calculated'] = (net_income / revenue) * 100
-                
-                # 資產負債表相關比率
-                if not balance_sheet.empty and net_income:
-                    if 'Total Assets' in balance_sheet.index:
-                        total_assets = balance_sheet.loc['Total Assets', latest_year]
-                        if total_assets and total_assets != 0:
-                            financial_ratios['roa_calculated'] = (net_income / total_assets) * 100
-                            financial_ratios['total_assets_ntd'] = total_assets
-                    
-                    if 'Stockholders Equity' in balance_sheet.index:
-                        equity = balance_sheet.loc['Stockholders Equity', latest_year]
-                        if equity and equity != 0:
-                            financial_ratios['roe_calculated'] = (net_income / equity) * 100
-                            financial_ratios['stockholders_equity_ntd'] = equity
-                    
-                    if 'Total Debt' in balance_sheet.index and 'Total Assets' in balance_sheet.index:
-                        total_debt = balance_sheet.loc['Total Debt', latest_year]
-                        total_assets = balance_sheet.loc['Total Assets', latest_year]
-                        if total_assets and total_assets != 0:
-                            financial_ratios['debt_ratio_calculated'] = (total_debt / total_assets) * 100
-                            financial_ratios['total_debt_ntd'] = total_debt
-                
-                result['financial_ratios'] = financial_ratios
+                result['financial_ratios'] = calculate_financial_ratios(income_stmt, balance_sheet)
                 
                 # 5. 計算成長率
                 if income_stmt.shape[1] >= 2:
-                    growth_rates = {}
-                    
-                    # 營收成長率
-                    if 'Total Revenue' in income_stmt.index:
-                        current_revenue = income_stmt.loc['Total Revenue'].iloc[0]
-                        previous_revenue = income_stmt.loc['Total Revenue'].iloc[1]
-                        if previous_revenue != 0:
-                            growth_rates['revenue_growth_calculated'] = ((current_revenue - previous_revenue) / previous_revenue) * 100
-                            growth_rates['current_revenue'] = current_revenue
-                            growth_rates['previous_revenue'] = previous_revenue
-                    
-                    # EPS成長率
-                    if 'Basic EPS' in income_stmt.index:
-                        current_eps = income_stmt.loc['Basic EPS'].iloc[0]
-                        previous_eps = income_stmt.loc['Basic EPS'].iloc[1]
-                        if previous_eps != 0:
-                            growth_rates['eps_growth_calculated'] = ((current_eps - previous_eps) / previous_eps) * 100
-                            growth_rates['current_eps'] = current_eps
-                            growth_rates['previous_eps'] = previous_eps
-                    
-                    # 淨利成長率
-                    if 'Net Income' in income_stmt.index:
-                        current_ni = income_stmt.loc['Net Income'].iloc[0]
-                        previous_ni = income_stmt.loc['Net Income'].iloc[1]
-                        if previous_ni != 0:
-                            growth_rates['net_income_growth_calculated'] = ((current_ni - previous_ni) / previous_ni) * 100
-                            growth_rates['current_net_income'] = current_ni
-                            growth_rates['previous_net_income'] = previous_ni
-                    
-                    result['growth_rates'] = growth_rates
+                    result['growth_rates'] = calculate_growth_rates(income_stmt)
             
             except Exception as e:
                 result['calculation_error'] = str(e)
         
+        # 5b. 近四季 (TTM) 比率，每季更新而不必等年報
+        if not quarterly_income.empty:
+            try:
+                result['ttm_ratios'] = calculate_ttm_ratios(quarterly_income, quarterly_balance, quarterly_cashflow)
+            except Exception as e:
+                result['ttm_error'] = str(e)
+        
         # 6. 現金流分析
         if not cashflow.empty:
             try:
@@ -224,6 +184,132 @@ def get_comprehensive_financial_data(symbol):
     except Exception as e:
         return {'error': str(e), 'symbol': symbol}
 
+@timed('ratios.financial_ratios')
+def calculate_financial_ratios(income_stmt, balance_sheet):
+    """
+    由年度損益表與資產負債表計算最新年度財務比率
+    
+    Parameters:
+    income_stmt (pd.DataFrame): yfinance 年度損益表 (欄位為年度，由新到舊)
+    balance_sheet (pd.DataFrame): yfinance 年度資產負債表
+    
+    Returns:
+    dict: 最新年度的財務數據與計算比率
+    """
+    latest_year = income_stmt.columns[0]
+    
+    # 基本財務數據
+    revenue = income_stmt.loc['Total Revenue', latest_year] if 'Total Revenue' in income_stmt.index else None
+    gross_profit = income_stmt.loc['Gross Profit', latest_year] if 'Gross Profit' in income_stmt.index else None
+    operating_income = income_stmt.loc['Operating Income', latest_year] if 'Operating Income' in income_stmt.index else None
+    net_income = income_stmt.loc['Net Income', latest_year] if 'Net Income' in income_stmt.index else None
+    basic_eps = income_stmt.loc['Basic EPS', latest_year] if 'Basic EPS' in income_stmt.index else None
+    
+    # 計算比率
+    financial_ratios = {
+        'latest_year': latest_year.strftime('%Y'),
+        'revenue_ntd': revenue,
+        'gross_profit_ntd': gross_profit,
+        'operating_income_ntd': operating_income,
+        'net_income_ntd': net_income,
+        'basic_eps': basic_eps
+    }
+    
+    if revenue and revenue != 0:
+        if gross_profit:
+            financial_ratios['gross_margin_calculated'] = (gross_profit / revenue) * 100
+        if operating_income:
+            financial_ratios['operating_margin_calculated'] = (operating_income / revenue) * 100
+        if net_income:
+            financial_ratios['net_margin_calculated'] = (net_income / revenue) * 100
+    
+    # 資產負債表相關比率
+    if not balance_sheet.empty and net_income:
+        if 'Total Assets' in balance_sheet.index:
+            total_assets = balance_sheet.loc['Total Assets', latest_year]
+            if total_assets and total_assets != 0:
+                financial_ratios['roa_calculated'] = (net_income / total_assets) * 100
+                financial_ratios['total_assets_ntd'] = total_assets
+        
+        if 'Stockholders Equity' in balance_sheet.index:
+            equity = balance_sheet.loc['Stockholders Equity', latest_year]
+            if equity and equity != 0:
+                financial_ratios['roe_calculated'] = (net_income / equity) * 100
+                financial_ratios['stockholders_equity_ntd'] = equity
+        
+        if 'Total Debt' in balance_sheet.index and 'Total Assets' in balance_sheet.index:
+            total_debt = balance_sheet.loc['Total Debt', latest_year]
+            total_assets = balance_sheet.loc['Total Assets', latest_year]
+            if total_assets and total_assets != 0:
+                financial_ratios['debt_ratio_calculated'] = (total_debt / total_assets) * 100
+                financial_ratios['total_debt_ntd'] = total_debt
+    
+    return financial_ratios
+
+@timed('ratios.ttm_ratios')
+def calculate_ttm_ratios(quarterly_income, quarterly_balance, quarterly_cashflow):
+    """
+    由季報計算最新一季的近四季 (TTM) 比率
+    
+    Parameters:
+    quarterly_income (pd.DataFrame): yfinance 季度損益表 (欄位為季度，由新到舊)
+    quarterly_balance (pd.DataFrame): yfinance 季度資產負債表
+    quarterly_cashflow (pd.DataFrame): yfinance 季度現金流量表
+    
+    Returns:
+    dict: 與 TaiwanIndustryScorer 輸入同名的 TTM 指標 (含 ttm_quarter)，季報不足四季時為空字典
+    """
+    from company_health_analysis.ttm_metrics import latest_ttm_metrics
+    
+    return latest_ttm_metrics({
+        'stock_code': 'ttm',
+        'quarterly_income': quarterly_income,
+        'quarterly_balance': quarterly_balance,
+        'quarterly_cashflow': quarterly_cashflow,
+    })
+
+@timed('ratios.growth_rates')
+def calculate_growth_rates(income_stmt):
+    """
+    由年度損益表計算最新兩年的成長率
+    
+    Parameters:
+    income_stmt (pd.DataFrame): yfinance 年度損益表，至少需兩個年度
+    
+    Returns:
+    dict: 營收、EPS、淨利成長率
+    """
+    growth_rates = {}
+    
+    # 營收成長率
+    if 'Total Revenue' in income_stmt.index:
+        current_revenue = income_stmt.loc['Total Revenue'].iloc[0]
+        previous_revenue = income_stmt.loc['Total Revenue'].iloc[1]
+        if previous_revenue != 0:
+            growth_rates['revenue_growth_calculated'] = ((current_revenue - previous_revenue) / previous_revenue) * 100
+            growth_rates['current_revenue'] = current_revenue
+            growth_rates['previous_revenue'] = previous_revenue
+    
+    # EPS成長率
+    if 'Basic EPS' in income_stmt.index:
+        current_eps = income_stmt.loc['Basic EPS'].iloc[0]
+        previous_eps = income_stmt.loc['Basic EPS'].iloc[1]
+        if previous_eps != 0:
+            growth_rates['eps_growth_calculated'] = ((current_eps - previous_eps) / previous_eps) * 100
+            growth_rates['current_eps'] = current_eps
+            growth_rates['previous_eps'] = previous_eps
+    
+    # 淨利成長率
+    if 'Net Income' in income_stmt.index:
+        current_ni = income_stmt.loc['Net Income'].iloc[0]
+        previous_ni = income_stmt.loc['Net Income'].iloc[1]
+        if previous_ni != 0:
+            growth_rates['net_income_growth_calculated'] = ((current_ni - previous_ni) / previous_ni) * 100
+            growth_rates['current_net_income'] = current_ni
+            growth_rates['previous_net_income'] = previous_ni
+    
+    return growth_rates
+
 def print_financial_summary(data):
     """
     打印財務數據摘要
@@ -276,6 +362,18 @@ def print_financial_summary(data):
         if 'debt_ratio_calculated' in ratios:
             print(f"負債比: {ratios['debt_ratio_calculated']:.2f}%")
     
+    # 近四季比率
+    if data.get('ttm_ratios'):
+        ttm = data['ttm_ratios']
+        print(f"\n--- 近四季比率 (TTM, 截至 {ttm['ttm_quarter']}) ---")
+        labels = [('gross_margin', '毛利率', '%'), ('operating_margin', '營業利益率', '%'),
+                  ('net_margin', '淨利率', '%'), ('roa', 'ROA', '%'), ('roe', 'ROE', '%'),
+                  ('debt_ratio', '負債比', '%'), ('revenue_growth_rate', '營收成長率', '%'),
+                  ('eps', 'EPS', ''), ('ocf_to_net_income', '營業現金流/淨利比率', '')]
+        for key, label, unit in labels:
+            if ttm.get(key) is not None:
+                print(f"{label}: {ttm[key]:.2f}{unit}")
+    
     # 成長率
     if data['growth_rates']:
         print(f"\n--- 成長率分析 ---")
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+可續跑的批次作業紀錄
+Checkpoint Journal for Resumable Bulk Runs
+
+用途: 批次作業 (ETF成份股收集、多檔股票財報錄製與評分) 每完成一個單位就附加一行 JSON 到本機紀錄檔，
+      程式中斷後重新執行時略過已完成的單位，失敗的單位在上限次數內重試
+
+紀錄格式 (JSON Lines，每行一筆，同一單位以最後一筆為準):
+    {"unit": "0050", "status": "done", "attempt": 1, "payload": {...}, "time": "..."}
+    {"unit": "0056", "status": "failed", "attempt": 2, "error": "ConnectionError: ...", "time": "..."}
+
+使用方式:
+    journal = CheckpointJournal('../data/etf_data/collect_journal.jsonl', max_attempts=3)
+    results = journal.run(['2330.TW', '2317.TW'], fetch_one)
+    journal.clear()  # 整批完成並輸出後清除，下次重新開始
+"""
+
+import json
+import os
+from datetime import datetime
+
+
+class CheckpointJournal:
+    """以 JSON Lines 記錄每個單位完成狀態的檢查點"""
+
+    def __init__(self, path, max_attempts=3, fsync=True):
+        """
+        初始化並載入既有紀錄
+
+        Args:
+            path (str): 紀錄檔路徑
+            max_attempts (int): 每個單位最多嘗試次數 (含先前執行)
+            fsync (bool): 每筆紀錄寫入後同步到磁碟，確保當機時不遺失
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts 必須至少為 1")
+        self.path = path
+        self.max_attempts = max_attempts
+        self.fsync = fsync
+        self.entries = {}
+        self.attempt_counts = {}
+        self.load()
+
+    def load(self):
+        """
+        重新讀取紀錄檔
+
+        寫到一半的最後一行 (程式在寫入時中斷) 會被截掉，之後附加的紀錄才不會接在同一行
+
+        Returns:
+            int: 讀取的紀錄數
+        """
+        self.entries = {}
+        self.attempt_counts = {}
+        if not os.path.exists(self.path):
+            return 0
+
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        complete = data.rfind(b'\n') + 1
+        lines = data[:complete].decode('utf-8', errors='replace').splitlines()
+        tail = data[complete:]
+        if tail.strip():
+            lines.append(tail.decode('utf-8', errors='replace'))
+
+        loaded = 0
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            unit = entry['unit']
+            self.entries[unit] = entry
+            # 同一單位以最後一筆為準 (reset 後嘗試次數會重新起算)
+            self.attempt_counts[unit] = entry.get('attempt', 1)
+            loaded += 1
+
+        if tail:
+            self._repair_tail(complete, tail)
+        return loaded
+
+    def _repair_tail(self, complete, tail):
+        """沒有換行結尾的最後一行: 完整的紀錄補上換行，寫到一半的截掉"""
+        try:
+            json.loads(tail)
+        except ValueError:
+            with open(self.path, 'r+b') as f:
+                f.truncate(complete)
+        else:
+            with open(self.path, 'ab') as f:
+                f.write(b'\n')
+
+    def _append(self, entry):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        line = json.dumps(entry, ensure_ascii=False, default=_json_default)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        self.entries[entry['unit']] = entry
+        self.attempt_counts[entry['unit']] = entry['attempt']
+
+    def is_done(self, unit):
+        """單位是否已完成"""
+        entry = self.entries.get(unit)
+        return entry is not None and entry['status'] == 'done'
+
+    def attempts(self, unit):
+        """單位已嘗試的次數"""
+        return self.attempt_counts.get(unit, 0)
+
+    def should_attempt(self, unit):
+        """單位尚未完成且未超過嘗試上限"""
+        return not self.is_done(unit) and self.attempts(unit) < self.max_attempts
+
+    def record_success(self, unit, payload=None):
+        """
+        記錄單位完成
+
+        Args:
+            unit (str): 單位識別 (ETF代碼、股票代碼)
+            payload: 可 JSON 序列化的結果，續跑時由 completed() 取回
+        """
+        self._append({
+            'unit': unit,
+            'status': 'done',
+            'attempt': self.attempts(unit) + 1,
+            'payload': payload,
+            'time': datetime.now().isoformat(timespec='seconds'),
+        })
+
+    def record_failure(self, unit, error):
+        """
+        記錄單位失敗
+
+        Args:
+            unit (str): 單位識別
+            error (Exception | str): 錯誤
+        """
+        message = f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error)
+        self._append({
+            'unit': unit,
+            'status': 'failed',
+            'attempt': self.attempts(unit) + 1,
+            'error': message,
+            'time': datetime.now().isoformat(timespec='seconds'),
+        })
+
+    def reset_attempts(self, unit):
+        """
+        重新計算單位的嘗試次數 (如快取過期需要重新執行已完成的單位)
+
+        下一筆紀錄的 attempt 由 1 起算，既有結果在新紀錄寫入前仍然有效
+        """
+        self.attempt_counts[unit] = 0
+
+    def completed(self):
+        """
+        已完成單位的結果
+
+        Returns:
+            dict: 單位對應 payload
+        """
+        return {unit: entry.get('payload') for unit, entry in self.entries.items() if entry['status'] == 'done'}
+
+    def exhausted(self):
+        """已達嘗試上限仍失敗的單位與最後錯誤"""
+        return {
+            unit: entry.get('error') for unit, entry in self.entries.items()
+            if entry['status'] != 'done' and self.attempts(unit) >= self.max_attempts
+        }
+
+    def pending(self, units):
+        """
+        篩選需要執行的單位
+
+        Args:
+            units (iterable): 全部單位
+
+        Returns:
+            list: 尚未完成且未超過嘗試上限的單位 (維持原順序)
+        """
+        return [unit for unit in units if self.should_attempt(unit)]
+
+    def run(self, units, func, retry_in_run=False):
+        """
+        依紀錄執行批次作業
+
+        Args:
+            units (iterable): 全部單位
+            func (callable): func(unit) 回傳可 JSON 序列化的結果，拋出例外表示失敗
+            retry_in_run (bool): 同一次執行內重試失敗單位直到嘗試上限，False 表示留到下次執行
+
+        Returns:
+            dict: 所有已完成單位 (含先前執行) 的結果
+        """
+        units = list(units)
+        skipped = sum(1 for unit in units if self.is_done(unit))
+        if skipped:
+            print(f"續跑: 略過 {skipped} 個已完成的單位")
+
+        while True:
+            todo = self.pending(units)
+            if not todo:
+                break
+            for unit in todo:
+                try:
+                    result = func(unit)
+                except Exception as e:
+                    self.record_failure(unit, e)
+                    print(f"  ✗ {unit} 失敗 (第 {self.attempts(unit)}/{self.max_attempts} 次): {e}")
+                else:
+                    self.record_success(unit, result)
+            if not retry_in_run:
+                break
+
+        exhausted = {unit: error for unit, error in self.exhausted().items() if unit in units}
+        if exhausted:
+            print(f"⚠️ {len(exhausted)} 個單位已達嘗試上限: {', '.join(sorted(exhausted))}")
+        return self.completed()
+
+    def compact(self):
+        """以每個單位的最後狀態改寫紀錄檔，移除重複的歷史紀錄"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False, default=_json_default) + '\n')
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """刪除紀錄檔 (整批作業完成後呼叫)"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.entries = {}
+        self.attempt_counts = {}
+
+
+def _json_default(value):
+    """numpy 數值等非原生型別轉為 Python 型別"""
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
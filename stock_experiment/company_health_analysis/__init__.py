@@ -1,14 +1,36 @@
 # Company Health Analysis Package
 # 公司財務健康度分析套件
+#
+# 子模組在第一次存取屬性時才載入，`import company_health_analysis` 不會連帶匯入評分器與 pandas
 
-from .industry_financial_analysis import IndustryFinancialAnalyzer
-from .industry_scoring_recommendations import IndustryScoringRecommendations
+import importlib
 
 __version__ = "1.0.0"
 __author__ = "Claude Code"
 __description__ = "台灣股市公司財務健康度分析工具"
 
-__all__ = [
-    'IndustryFinancialAnalyzer',
-    'IndustryScoringRecommendations'
-]
\ No newline at end of file
+# 公開名稱 → 所在子模組
+_LAZY_ATTRIBUTES = {
+    'TaiwanIndustryScorer': 'taiwan_industry_scorer',
+    'get_company_financial_data': 'health_metrics',
+    'calculate_health_metrics': 'health_metrics',
+    'ScoringWhatIf': 'scoring_whatif',
+    'ScenarioGrid': 'scoring_whatif',
+    'ThresholdCalibrator': 'threshold_calibration',
+    'TTMPanel': 'ttm_metrics',
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
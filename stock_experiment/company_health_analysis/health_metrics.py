@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+公司財務健康度指標
+
+由 company_health_analysis.ipynb 移出的財務資料取得與指標計算，
+產生的指標名稱與 TaiwanIndustryScorer.calculate_industry_score 的輸入一致，供 CLI 與批次評分共用
+"""
+
+from typing import Any, Dict, Optional
+
+# 以近四季財報取代年報與 info 的評分指標
+TTM_SCORING_METRICS = (
+    'revenue_growth_rate', 'gross_margin', 'net_margin', 'operating_margin', 'roa', 'roe',
+    'eps', 'eps_growth', 'operating_cash_flow', 'free_cash_flow', 'ocf_to_net_income',
+    'debt_ratio', 'current_ratio',
+)
+
+
+def get_company_financial_data(stock_code: str, period: Optional[str] = "5y", ticker=None) -> Optional[Dict[str, Any]]:
+    """
+    獲取公司完整財務數據
+
+    Parameters:
+    stock_code (str): 股票代碼，例如 "2330.TW"
+    period (str): 股價數據期間，預設為 "5y"，None表示不取得股價
+    ticker: 已建立的 Ticker 物件 (如 replay_harness.ReplayTicker)，None表示建立 yf.Ticker
+
+    Returns:
+    dict: 包含各種財務數據的字典，失敗時為 None
+    """
+    try:
+        if ticker is None:
+            import yfinance as yf
+
+            ticker = yf.Ticker(stock_code)
+        return {
+            'info': ticker.info,
+            'income_statement': ticker.financials,
+            'balance_sheet': ticker.balance_sheet,
+            'cash_flow': ticker.cashflow,
+            'quarterly_income': ticker.quarterly_financials,
+            'quarterly_balance': ticker.quarterly_balance_sheet,
+            'quarterly_cashflow': ticker.quarterly_cashflow,
+            'stock_history': ticker.history(period=period) if period else None,
+            'stock_code': stock_code
+        }
+    except Exception as e:
+        print(f"獲取 {stock_code} 數據時發生錯誤: {e}")
+        return None
+
+
+def _first_value(frame, item, min_columns=1):
+    """取得報表某列最新一期的值，列不存在或期數不足時回傳 None"""
+    if frame is None or len(frame.columns) < min_columns or item not in frame.index:
+        return None
+    return frame.loc[item].iloc[0]
+
+
+def _percent(value):
+    return value * 100 if value else None
+
+
+def calculate_health_metrics(financial_data: Dict[str, Any], ttm: bool = False) -> Dict[str, Any]:
+    """
+    計算公司財務健康度指標
+
+    Parameters:
+    financial_data (dict): get_company_financial_data 返回的數據
+    ttm (bool): 以近四季季報 (TTM) 計算的指標取代年報指標，季報不足時保留年報結果
+
+    Returns:
+    dict: 包含各項健康度指標的字典，計算失敗時為空字典
+    """
+    metrics = {}
+    info = financial_data['info']
+    income_stmt = financial_data['income_statement']
+    balance_sheet = financial_data['balance_sheet']
+    cash_flow = financial_data['cash_flow']
+
+    try:
+        # === 盈利能力指標 ===
+
+        # 營收成長率 (最近一年 vs 前一年)
+        if len(income_stmt.columns) >= 2 and 'Total Revenue' in income_stmt.index:
+            current_revenue = income_stmt.loc['Total Revenue'].iloc[0]
+            previous_revenue = income_stmt.loc['Total Revenue'].iloc[1]
+            metrics['revenue_growth_rate'] = ((current_revenue - previous_revenue) / previous_revenue) * 100
+        else:
+            metrics['revenue_growth_rate'] = None
+
+        # 毛利率 (優先使用 info，缺少時由損益表計算)
+        gross_margin = info.get('grossMargins', None)
+        if gross_margin is None:
+            total_revenue = _first_value(income_stmt, 'Total Revenue')
+            cost_of_revenue = _first_value(income_stmt, 'Cost Of Revenue')
+            if total_revenue and cost_of_revenue is not None:
+                metrics['gross_margin'] = ((total_revenue - cost_of_revenue) / total_revenue) * 100
+            else:
+                metrics['gross_margin'] = None
+        else:
+            metrics['gross_margin'] = _percent(gross_margin)
+
+        metrics['net_margin'] = _percent(info.get('profitMargins', None))
+        metrics['operating_margin'] = _percent(info.get('operatingMargins', None))
+        metrics['roa'] = _percent(info.get('returnOnAssets', None))
+        metrics['roe'] = _percent(info.get('returnOnEquity', None))
+
+        # === 每股指標 ===
+        metrics['eps'] = info.get('trailingEps', None)
+        metrics['eps_growth'] = _percent(info.get('earningsGrowth', None))
+        metrics['book_value_per_share'] = info.get('bookValue', None)
+
+        # === 現金流指標 ===
+        metrics['operating_cash_flow'] = _first_value(cash_flow, 'Operating Cash Flow')
+        metrics['free_cash_flow'] = _first_value(cash_flow, 'Free Cash Flow')
+
+        net_income = _first_value(income_stmt, 'Net Income')
+        if metrics['operating_cash_flow'] and net_income:
+            metrics['ocf_to_net_income'] = metrics['operating_cash_flow'] / net_income
+        else:
+            metrics['ocf_to_net_income'] = None
+
+        # === 財務結構指標 ===
+        total_debt = _first_value(balance_sheet, 'Total Debt')
+        total_assets = _first_value(balance_sheet, 'Total Assets')
+        if total_debt is not None and total_assets:
+            metrics['debt_ratio'] = (total_debt / total_assets) * 100
+        else:
+            metrics['debt_ratio'] = None
+
+        metrics['current_ratio'] = info.get('currentRatio', None)
+
+        # 利息保障倍數 (EBIT / Interest Expense)，無利息支出時為無限大
+        ebit = _first_value(income_stmt, 'EBIT')
+        interest_expense = _first_value(income_stmt, 'Interest Expense')
+        if ebit is None or interest_expense is None:
+            metrics['interest_coverage'] = None
+        elif interest_expense != 0:
+            metrics['interest_coverage'] = ebit / abs(interest_expense)
+        else:
+            metrics['interest_coverage'] = float('inf')
+
+        # 公司基本資訊
+        metrics['company_name'] = info.get('longName', financial_data['stock_code'])
+        metrics['stock_code'] = financial_data['stock_code']
+        metrics['sector'] = info.get('sector', 'Unknown')
+        metrics['industry'] = info.get('industry', 'Unknown')
+
+        if ttm:
+            try:
+                from .ttm_metrics import latest_ttm_metrics
+            except ImportError:
+                from ttm_metrics import latest_ttm_metrics
+
+            ttm_metrics = latest_ttm_metrics(financial_data)
+            for name in TTM_SCORING_METRICS:
+                if ttm_metrics.get(name) is not None:
+                    metrics[name] = ttm_metrics[name]
+            metrics['ttm_quarter'] = ttm_metrics.get('ttm_quarter')
+
+        return metrics
+
+    except Exception as e:
+        print(f"計算指標時發生錯誤: {e}")
+        return {}
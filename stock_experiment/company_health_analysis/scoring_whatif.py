@@ -0,0 +1,552 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+評分標準敏感度與情境分析
+
+調整 taiwan_industry_scoring_standards.json 的門檻或權重時，一次以向量化計算
+重新評分整個股票池的所有候選情境 (情境 × 公司 陣列)，並輸出健康度等級的轉移矩陣
+
+計算規則與 TaiwanIndustryScorer.calculate_industry_score 完全相同:
+- 指標鍵存在且行業標準有該指標才計入維度平均，值為 None 時得 0 分
+- 門檻依 excellent → good → average → poor 順序判斷，reverse 指標改用 <=
+- EPS 以 min(100, max(0, eps * 20)) 計入每股指標
+- 維度沒有任何指標時，盈利能力與每股指標為 0 分，現金流與財務結構為 50 分
+
+使用方式:
+    engine = ScoringWhatIf(scorer, companies)            # companies: [(metrics, yfinance_sector), ...]
+    grid = ScenarioGrid()
+    grid.shift_thresholds('科技業', 'gross_margin', [-5, -2.5, 0, 2.5, 5])
+    grid.set_weight('科技業', 'profitability', [0.35, 0.45, 0.55])
+    result = engine.evaluate(grid)
+    result.summary()
+    result.migration_matrix(3)
+"""
+
+import copy
+import itertools
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 與 calculate_industry_score 相同的維度、指標順序與預設值
+DIMENSIONS = ('profitability', 'per_share', 'cash_flow', 'financial_structure')
+DIMENSION_METRICS = {
+    'profitability': ('revenue_growth_rate', 'gross_margin', 'net_margin', 'operating_margin', 'roa', 'roe'),
+    'per_share': ('eps_growth',),
+    'cash_flow': ('ocf_to_net_income',),
+    'financial_structure': ('debt_ratio', 'current_ratio'),
+}
+SCORED_METRICS = tuple(metric for dimension in DIMENSIONS for metric in DIMENSION_METRICS[dimension])
+EMPTY_DIMENSION_SCORES = {'profitability': 0.0, 'per_share': 0.0, 'cash_flow': 50.0, 'financial_structure': 50.0}
+DEFAULT_WEIGHTS = {'profitability': 0.4, 'per_share': 0.25, 'cash_flow': 0.2, 'financial_structure': 0.15}
+
+LEVELS = ('excellent', 'good', 'average', 'poor')
+LEVEL_SCORES = (100.0, 80.0, 60.0, 40.0)
+BELOW_POOR_SCORE = 20.0
+NONE_SCORE = 0.0
+
+# 健康度等級 (代碼由低到高) 與總分門檻
+GRADE_LABELS = ('警示 (Warning)', '普通 (Average)', '良好 (Good)', '優秀 (Excellent)')
+GRADE_CUTOFFS = np.array([40.0, 60.0, 80.0])
+
+
+def grade_codes(total_scores: np.ndarray) -> np.ndarray:
+    """
+    總分轉為健康度等級代碼
+
+    Parameters:
+    total_scores (np.ndarray): 任意形狀的總分
+
+    Returns:
+    np.ndarray: 0=警示、1=普通、2=良好、3=優秀
+    """
+    return np.searchsorted(GRADE_CUTOFFS, total_scores, side='right').astype(np.int8)
+
+
+class StandardsTensor:
+    """評分標準轉為陣列: 門檻 (來源行業 × 指標 × 等級) 與權重 (來源行業 × 維度)"""
+
+    def __init__(self, standards: Dict[str, Any]):
+        """
+        Parameters:
+        standards (dict): taiwan_industry_scoring_standards.json 的內容
+        """
+        self.standards = standards
+        criteria = standards.get('scoring_criteria', {})
+        weights = standards.get('industry_weights', {})
+
+        self.criteria_sources = list(criteria)
+        self.weight_sources = list(weights)
+        self.thresholds = np.full((len(self.criteria_sources), len(SCORED_METRICS), len(LEVELS)), np.nan)
+        self.has_metric = np.zeros((len(self.criteria_sources), len(SCORED_METRICS)), dtype=bool)
+        self.reverse = np.zeros((len(self.criteria_sources), len(SCORED_METRICS)), dtype=bool)
+        for i, source in enumerate(self.criteria_sources):
+            for j, metric in enumerate(SCORED_METRICS):
+                metric_criteria = criteria[source].get(metric)
+                if metric_criteria is None:
+                    continue
+                self.has_metric[i, j] = True
+                self.reverse[i, j] = bool(metric_criteria.get('reverse', False))
+                self.thresholds[i, j] = [metric_criteria[level] for level in LEVELS]
+
+        self.weights = np.array([
+            [weights[source].get(dimension, DEFAULT_WEIGHTS[dimension]) for dimension in DIMENSIONS]
+            for source in self.weight_sources
+        ], dtype=float).reshape(len(self.weight_sources), len(DIMENSIONS))
+
+    def criteria_index(self, taiwan_industry: str) -> int:
+        """與 get_scoring_criteria 相同的回退規則 (找不到時使用通用)"""
+        source = taiwan_industry if taiwan_industry in self.criteria_sources else '通用'
+        return self.criteria_sources.index(source) if source in self.criteria_sources else -1
+
+    def weight_index(self, taiwan_industry: str) -> int:
+        """與 get_industry_weights 相同的回退規則 (找不到時使用通用)"""
+        source = taiwan_industry if taiwan_industry in self.weight_sources else '通用'
+        return self.weight_sources.index(source) if source in self.weight_sources else -1
+
+    def to_standards(self, thresholds: np.ndarray, weights: np.ndarray) -> Dict[str, Any]:
+        """
+        以陣列內容產生相同格式的評分標準
+
+        Parameters:
+        thresholds (np.ndarray): (來源行業, 指標, 等級) 門檻
+        weights (np.ndarray): (來源行業, 維度) 權重
+
+        Returns:
+        dict: 可直接寫成 JSON 的評分標準
+        """
+        standards = copy.deepcopy(self.standards)
+        for i, source in enumerate(self.criteria_sources):
+            for j, metric in enumerate(SCORED_METRICS):
+                if self.has_metric[i, j]:
+                    for k, level in enumerate(LEVELS):
+                        standards['scoring_criteria'][source][metric][level] = _plain_number(thresholds[i, j, k])
+        for i, source in enumerate(self.weight_sources):
+            for d, dimension in enumerate(DIMENSIONS):
+                if dimension in standards['industry_weights'][source]:
+                    standards['industry_weights'][source][dimension] = _plain_number(weights[i, d])
+        return standards
+
+
+class MetricPanel:
+    """股票池的指標陣列 (公司 × 指標)，區分缺少鍵、值為 None 與一般數值"""
+
+    def __init__(self, scorer, companies: Sequence[Tuple[Dict[str, Any], str]], tensor: StandardsTensor):
+        """
+        Parameters:
+        scorer (TaiwanIndustryScorer): 提供產業對應
+        companies (list): [(metrics, yfinance_sector), ...]
+        tensor (StandardsTensor): 評分標準陣列
+        """
+        n = len(companies)
+        self.values = np.full((n, len(SCORED_METRICS)), np.nan)
+        self.present = np.zeros((n, len(SCORED_METRICS)), dtype=bool)
+        self.is_none = np.zeros((n, len(SCORED_METRICS)), dtype=bool)
+        self.eps_score = np.zeros(n)
+        self.eps_present = np.zeros(n, dtype=bool)
+        self.industries = []
+        self.criteria_idx = np.empty(n, dtype=np.intp)
+        self.weight_idx = np.empty(n, dtype=np.intp)
+
+        for row, (metrics, sector) in enumerate(companies):
+            industry = scorer.get_industry_mapping(sector)
+            self.industries.append(industry)
+            self.criteria_idx[row] = tensor.criteria_index(industry)
+            self.weight_idx[row] = tensor.weight_index(industry)
+            if self.criteria_idx[row] < 0 or self.weight_idx[row] < 0:
+                raise ValueError(f"找不到行業 '{industry}' 的評分標準")
+
+            for j, metric in enumerate(SCORED_METRICS):
+                if metric not in metrics:
+                    continue
+                self.present[row, j] = True
+                value = metrics[metric]
+                if value is None:
+                    self.is_none[row, j] = True
+                else:
+                    self.values[row, j] = value
+
+            eps = metrics.get('eps')
+            if 'eps' in metrics and eps is not None:
+                self.eps_present[row] = True
+                # 與 min(100, max(0, eps * 20)) 相同，NaN 經 max(0, nan) 得 0
+                eps_value = eps * 20
+                self.eps_score[row] = min(100, max(0, eps_value))
+
+        self.industries = np.array(self.industries, dtype=object)
+
+    def __len__(self):
+        return len(self.values)
+
+
+class ScenarioGrid:
+    """門檻與權重調整的網格，情境為各調整軸的笛卡兒積"""
+
+    def __init__(self):
+        self.axes = []
+
+    def shift_thresholds(self, industry: Optional[str], metric: str, shifts: Sequence[float]) -> 'ScenarioGrid':
+        """
+        四個等級門檻同時加上位移
+
+        Parameters:
+        industry (str): 評分標準的行業鍵 (如 '科技業'、'通用')，None表示所有行業
+        metric (str): 指標名稱
+        shifts (list): 位移量候選值
+        """
+        return self._add_axis('shift', industry, metric, shifts)
+
+    def scale_thresholds(self, industry: Optional[str], metric: str, factors: Sequence[float]) -> 'ScenarioGrid':
+        """四個等級門檻同時乘上倍數，參數同 shift_thresholds"""
+        return self._add_axis('scale', industry, metric, factors)
+
+    def set_threshold(self, industry: Optional[str], metric: str, level: str, values: Sequence[float]) -> 'ScenarioGrid':
+        """
+        設定單一等級門檻
+
+        Parameters:
+        level (str): 'excellent'、'good'、'average' 或 'poor'
+        """
+        if level not in LEVELS:
+            raise ValueError(f"不支援的等級: {level}")
+        return self._add_axis('set', industry, (metric, level), values)
+
+    def set_weight(self, industry: Optional[str], dimension: str, values: Sequence[float],
+                   renormalize: bool = True) -> 'ScenarioGrid':
+        """
+        設定維度權重
+
+        Parameters:
+        industry (str): 權重的行業鍵，None表示所有行業
+        dimension (str): 'profitability'、'per_share'、'cash_flow' 或 'financial_structure'
+        values (list): 權重候選值
+        renormalize (bool): 等比例調整其他維度，使權重總和不變
+        """
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"不支援的維度: {dimension}")
+        return self._add_axis('weight' if renormalize else 'weight_raw', industry, dimension, values)
+
+    def _add_axis(self, kind, industry, target, values):
+        if kind in ('shift', 'scale') and target not in SCORED_METRICS:
+            raise ValueError(f"不支援的指標: {target}")
+        if kind == 'set' and target[0] not in SCORED_METRICS:
+            raise ValueError(f"不支援的指標: {target[0]}")
+        values = list(values)
+        if not values:
+            raise ValueError("候選值不可為空")
+        self.axes.append((kind, industry, target, values))
+        return self
+
+    @property
+    def size(self) -> int:
+        """情境數 (不含基準)"""
+        size = 1
+        for axis in self.axes:
+            size *= len(axis[3])
+        return size
+
+    def axis_names(self) -> List[str]:
+        names = []
+        for kind, industry, target, _ in self.axes:
+            target_name = '.'.join(target) if isinstance(target, tuple) else target
+            names.append(f"{industry or '*'}:{target_name}:{kind}")
+        return names
+
+    def scenarios(self) -> List[Tuple]:
+        """所有情境的各軸取值"""
+        return list(itertools.product(*(axis[3] for axis in self.axes)))
+
+
+class WhatIfResult:
+    """情境評分結果"""
+
+    def __init__(self, engine: 'ScoringWhatIf', labels: List[Dict[str, Any]], thresholds: np.ndarray,
+                 weights: np.ndarray, total_scores: np.ndarray):
+        self.engine = engine
+        self.labels = labels
+        self.thresholds = thresholds
+        self.weights = weights
+        # 第 0 列為基準 (未調整的評分標準)
+        self.total_scores = total_scores
+        self.grades = grade_codes(total_scores)
+
+    @property
+    def baseline_scores(self) -> np.ndarray:
+        return self.total_scores[0]
+
+    @property
+    def baseline_grades(self) -> np.ndarray:
+        return self.grades[0]
+
+    def __len__(self):
+        return len(self.labels)
+
+    def migration_matrices(self) -> np.ndarray:
+        """
+        所有情境相對基準的等級轉移矩陣
+
+        Returns:
+        np.ndarray: (情境, 基準等級, 情境等級) 的公司數
+        """
+        n_grades = len(GRADE_LABELS)
+        n_scenarios, n_companies = self.grades.shape
+        cells = self.baseline_grades[None, :].astype(np.intp) * n_grades + self.grades
+        cells = cells + np.arange(n_scenarios, dtype=np.intp)[:, None] * n_grades * n_grades
+        counts = np.bincount(cells.ravel(), minlength=n_scenarios * n_grades * n_grades)
+        return counts.reshape(n_scenarios, n_grades, n_grades)
+
+    def migration_matrix(self, scenario: int):
+        """
+        單一情境的等級轉移矩陣
+
+        Parameters:
+        scenario (int): 情境編號 (0 為基準)
+
+        Returns:
+        pd.DataFrame: 列為基準等級、欄為情境等級
+        """
+        import pandas as pd
+
+        matrix = self.migration_matrices()[scenario]
+        return pd.DataFrame(matrix, index=pd.Index(GRADE_LABELS, name='基準'),
+                            columns=pd.Index(GRADE_LABELS, name='情境'))
+
+    def summary(self):
+        """
+        各情境的摘要
+
+        Returns:
+        pd.DataFrame: 每列一個情境，含各軸取值、等級變動家數、升降級家數、平均分數變化與各等級家數
+        """
+        import pandas as pd
+
+        baseline = self.baseline_grades
+        frame = pd.DataFrame(self.labels)
+        frame['changed'] = (self.grades != baseline).sum(axis=1)
+        frame['upgraded'] = (self.grades > baseline).sum(axis=1)
+        frame['downgraded'] = (self.grades < baseline).sum(axis=1)
+        frame['mean_score_delta'] = (self.total_scores - self.baseline_scores).mean(axis=1)
+        for code, label in enumerate(GRADE_LABELS):
+            frame[label] = (self.grades == code).sum(axis=1)
+        frame.index.name = 'scenario'
+        return frame
+
+    def by_industry(self, scenario: int):
+        """
+        單一情境各行業的等級變動
+
+        Returns:
+        pd.DataFrame: 行業、公司數、變動家數、平均分數變化
+        """
+        import pandas as pd
+
+        frame = pd.DataFrame({
+            'industry': self.engine.panel.industries,
+            'changed': self.grades[scenario] != self.baseline_grades,
+            'score_delta': self.total_scores[scenario] - self.baseline_scores,
+        })
+        return frame.groupby('industry').agg(
+            companies=('changed', 'size'), changed=('changed', 'sum'), mean_score_delta=('score_delta', 'mean'),
+        )
+
+    def to_standards(self, scenario: int) -> Dict[str, Any]:
+        """情境對應的評分標準 (與 JSON 相同格式)"""
+        return self.engine.tensor.to_standards(self.thresholds[scenario], self.weights[scenario])
+
+    def print_report(self, top: int = 10) -> None:
+        """列印等級變動最多的情境"""
+        summary = self.summary()
+        print("=" * 80)
+        print(f"📊 評分標準情境分析: {len(self) - 1} 個情境 × {self.grades.shape[1]} 家公司")
+        print("=" * 80)
+        baseline_counts = ', '.join(
+            f"{label} {int((self.baseline_grades == code).sum())}" for code, label in enumerate(GRADE_LABELS)
+        )
+        print(f"基準等級分布: {baseline_counts}")
+        print(f"\n等級變動最多的 {top} 個情境:")
+        print(summary.iloc[1:].sort_values('changed', ascending=False).head(top).to_string())
+
+
+class ScoringWhatIf:
+    """以向量化方式對多個評分標準情境重新評分整個股票池"""
+
+    def __init__(self, scorer, companies: Sequence[Tuple[Dict[str, Any], str]]):
+        """
+        初始化
+
+        Parameters:
+        scorer (TaiwanIndustryScorer): 基準評分器 (使用其評分標準與產業對應)
+        companies (list): [(metrics, yfinance_sector), ...]，與 calculate_industry_score 的輸入相同
+        """
+        self.scorer = scorer
+        self.tensor = StandardsTensor(scorer.standards)
+        self.panel = MetricPanel(scorer, companies, self.tensor)
+
+    def build(self, grid: Optional[ScenarioGrid] = None) -> Tuple[List[Dict[str, Any]], np.ndarray, np.ndarray]:
+        """
+        產生各情境的門檻與權重陣列 (第 0 個情境為基準)
+
+        Returns:
+        tuple: (情境標籤, 門檻 (情境, 來源行業, 指標, 等級), 權重 (情境, 來源行業, 維度))
+        """
+        grid = grid or ScenarioGrid()
+        combos = grid.scenarios() if grid.axes else []
+        n_scenarios = len(combos) + 1
+        thresholds = np.repeat(self.tensor.thresholds[None], n_scenarios, axis=0)
+        weights = np.repeat(self.tensor.weights[None], n_scenarios, axis=0)
+        names = grid.axis_names()
+        labels = [{'label': 'baseline', **{name: None for name in names}}]
+
+        for s, combo in enumerate(combos, start=1):
+            labels.append({'label': f"scenario_{s}", **dict(zip(names, combo))})
+            for (kind, industry, target, _), value in zip(grid.axes, combo):
+                if kind in ('weight', 'weight_raw'):
+                    rows = self._rows(self.tensor.weight_sources, industry)
+                    d = DIMENSIONS.index(target)
+                    for row in rows:
+                        current = weights[s, row]
+                        if kind == 'weight':
+                            total, old = current.sum(), current[d]
+                            others = np.arange(len(DIMENSIONS)) != d
+                            if total - old > 0:
+                                current[others] *= (total - value) / (total - old)
+                        current[d] = value
+                else:
+                    rows = self._rows(self.tensor.criteria_sources, industry)
+                    metric, level = target if kind == 'set' else (target, None)
+                    j = SCORED_METRICS.index(metric)
+                    if kind == 'shift':
+                        thresholds[s, rows, j, :] += value
+                    elif kind == 'scale':
+                        thresholds[s, rows, j, :] *= value
+                    else:
+                        thresholds[s, rows, j, LEVELS.index(level)] = value
+        return labels, thresholds, weights
+
+    @staticmethod
+    def _rows(sources, industry):
+        if industry is None:
+            return list(range(len(sources)))
+        if industry not in sources:
+            raise ValueError(f"評分標準中沒有行業: {industry}")
+        return [sources.index(industry)]
+
+    def score(self, thresholds: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """
+        計算所有情境的總分
+
+        Parameters:
+        thresholds (np.ndarray): (情境, 來源行業, 指標, 等級)
+        weights (np.ndarray): (情境, 來源行業, 維度)
+
+        Returns:
+        np.ndarray: (情境, 公司) 總分
+        """
+        panel, tensor = self.panel, self.tensor
+        n_scenarios = thresholds.shape[0]
+        crit = panel.criteria_idx
+        dimension_scores = []
+
+        for dimension in DIMENSIONS:
+            total = np.zeros((n_scenarios, len(panel)))
+            count = np.zeros(len(panel))
+            for metric in DIMENSION_METRICS[dimension]:
+                j = SCORED_METRICS.index(metric)
+                included = panel.present[:, j] & tensor.has_metric[crit, j]
+                if not included.any():
+                    continue
+                metric_scores = self._metric_scores(thresholds[:, crit, j, :], panel.values[:, j],
+                                                    tensor.reverse[crit, j], panel.is_none[:, j])
+                total += np.where(included, metric_scores, 0.0)
+                count += included
+            if dimension == 'per_share':
+                total += np.where(panel.eps_present, panel.eps_score, 0.0)
+                count += panel.eps_present
+            with np.errstate(invalid='ignore', divide='ignore'):
+                average = total / count
+            dimension_scores.append(np.where(count > 0, average, EMPTY_DIMENSION_SCORES[dimension]))
+
+        company_weights = weights[:, panel.weight_idx, :]
+        # 與 calculate_industry_score 相同的加總順序，確保浮點數結果一致
+        total_scores = dimension_scores[0] * company_weights[..., 0]
+        for d in range(1, len(DIMENSIONS)):
+            total_scores = total_scores + dimension_scores[d] * company_weights[..., d]
+        return total_scores
+
+    @staticmethod
+    def _metric_scores(thresholds, values, reverse, is_none):
+        """單一指標的分數 (情境, 公司)，依 excellent → poor 順序取第一個符合的等級"""
+        values = values[None, :]
+        reverse = reverse[None, :]
+        with np.errstate(invalid='ignore'):
+            passed = [
+                np.where(reverse, values <= thresholds[..., k], values >= thresholds[..., k])
+                for k in range(len(LEVELS))
+            ]
+        scores = np.select(passed, LEVEL_SCORES, default=BELOW_POOR_SCORE)
+        return np.where(is_none[None, :], NONE_SCORE, scores)
+
+    def evaluate(self, grid: Optional[ScenarioGrid] = None) -> WhatIfResult:
+        """
+        評分所有情境
+
+        Parameters:
+        grid (ScenarioGrid): 調整網格，None表示只計算基準
+
+        Returns:
+        WhatIfResult: 情境 × 公司 的總分與等級 (第 0 列為基準)
+        """
+        labels, thresholds, weights = self.build(grid)
+        total_scores = self.score(thresholds, weights)
+        return WhatIfResult(self, labels, thresholds, weights, total_scores)
+
+    def evaluate_standards(self, candidates: Sequence[Dict[str, Any]]) -> WhatIfResult:
+        """
+        評分多份完整的候選評分標準 (如 threshold_calibration 產生的 JSON)
+
+        Parameters:
+        candidates (list): 與 taiwan_industry_scoring_standards.json 相同格式的評分標準
+
+        Returns:
+        WhatIfResult: 第 0 列為基準，其後依序為各候選標準
+        """
+        thresholds = [self.tensor.thresholds]
+        weights = [self.tensor.weights]
+        labels = [{'label': 'baseline'}]
+        for i, standards in enumerate(candidates, start=1):
+            candidate = StandardsTensor(standards)
+            if (candidate.criteria_sources != self.tensor.criteria_sources
+                    or candidate.weight_sources != self.tensor.weight_sources
+                    or not np.array_equal(candidate.has_metric, self.tensor.has_metric)
+                    or not np.array_equal(candidate.reverse, self.tensor.reverse)):
+                raise ValueError(f"候選標準 {i} 的行業或指標結構與基準不同")
+            thresholds.append(candidate.thresholds)
+            weights.append(candidate.weights)
+            labels.append({'label': f"candidate_{i}"})
+        thresholds = np.stack(thresholds)
+        weights = np.stack(weights)
+        return WhatIfResult(self, labels, thresholds, weights, self.score(thresholds, weights))
+
+    def verify_baseline(self, companies: Sequence[Tuple[Dict[str, Any], str]]) -> float:
+        """
+        與逐家呼叫 calculate_industry_score 的結果比對
+
+        Parameters:
+        companies (list): 建立引擎時使用的同一份資料
+
+        Returns:
+        float: 基準總分的最大絕對差 (應為 0)
+        """
+        vectorized = self.score(self.tensor.thresholds[None], self.tensor.weights[None])[0]
+        reference = np.array([
+            self.scorer.calculate_industry_score(metrics, sector)['total_score'] for metrics, sector in companies
+        ])
+        return float(np.max(np.abs(vectorized - reference))) if len(reference) else 0.0
+
+
+def _plain_number(value):
+    """JSON 輸出用: 整數值保留為 int，其餘保留完整精度以便重新評分結果一致"""
+    value = float(value)
+    if value.is_integer():
+        return int(value)
+    return value
@@ -14,6 +14,13 @@ import json
 import os
 from typing import Dict, Any, Optional, Tuple
 
+try:
+    from instrumentation import timed
+except ImportError:
+    # stock_experiment/ 不在搜尋路徑時 (單獨使用本模組) 不計時
+    def timed(name):
+        return lambda func: func
+
 
 class TaiwanIndustryScorer:
     """台灣行業別財務健康度評分器"""
@@ -166,6 +173,7 @@ class TaiwanIndustryScorer:
             else:
                 return 20, 'Very Poor'
     
+    @timed('score.industry_score')
     def calculate_industry_score(self, metrics: Dict[str, float], yfinance_sector: str) -> Dict[str, Any]:
         """
         計算行業別財務健康度總分
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+以股票池分布校準評分門檻
+
+依 calculate_industry_score 使用的每個指標，以各行業公司的分位數取代手寫的
+excellent / good / average / poor 門檻，輸出與 taiwan_industry_scoring_standards.json 相同格式的評分標準
+
+分位數以 t-digest 串流計算，每批資料處理完即丟棄，只保留每個 (行業, 指標) 約數百個中心點，
+多年 × 全市場的指標也不需要全部載入記憶體；摘要狀態可儲存，每季財報公布後只需加入新資料重新校準
+
+預設分位數 (reverse 指標如負債比率取 1 - q):
+    excellent = P80、good = P60、average = P40、poor = P20
+
+使用方式:
+    calibrator = ThresholdCalibrator(scorer)
+    calibrator.add_companies(companies)                 # [(metrics, yfinance_sector), ...]，可分批多次加入
+    calibrator.add_statements_dir('../data/statements') # 或讀取 replay_harness 錄製的財報
+    standards = calibrator.calibrate()
+    calibrator.save_standards('calibrated_standards.json')
+
+新標準對股票池等級的影響可用 scoring_whatif.ScoringWhatIf.evaluate_standards 比較
+"""
+
+import copy
+import json
+import math
+import os
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 以 company_health_analysis 套件或直接以模組名稱匯入 (本目錄在搜尋路徑上) 都可使用
+try:
+    from .scoring_whatif import LEVELS, SCORED_METRICS
+except ImportError:
+    from scoring_whatif import LEVELS, SCORED_METRICS
+
+DEFAULT_QUANTILES = {'excellent': 0.8, 'good': 0.6, 'average': 0.4, 'poor': 0.2}
+GENERAL_INDUSTRY = '通用'
+
+
+class TDigest:
+    """以 numpy 實作的合併式 t-digest，用於串流近似分位數"""
+
+    def __init__(self, compression: float = 200, buffer_size: Optional[int] = None):
+        """
+        Parameters:
+        compression (float): 壓縮參數，中心點數約為 compression / 2，越大越精確
+        buffer_size (int): 累積多少筆新資料後壓縮一次，預設為 compression 的 10 倍
+        """
+        self.compression = float(compression)
+        self.buffer_size = buffer_size or int(compression * 10)
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer_means = []
+        self._buffer_weights = []
+        self._buffered = 0
+
+    @property
+    def count(self) -> float:
+        """已加入的資料筆數"""
+        return float(self.weights.sum()) + sum(float(w.sum()) for w in self._buffer_weights)
+
+    def update(self, values, weights=None) -> 'TDigest':
+        """
+        加入一批資料 (NaN 與無限值會被略過)
+
+        Parameters:
+        values (array-like): 數值
+        weights (array-like): 權重，預設每筆為 1
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        weights = np.ones_like(values) if weights is None else np.asarray(weights, dtype=float).ravel()
+        valid = np.isfinite(values)
+        values, weights = values[valid], weights[valid]
+        if not len(values):
+            return self
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._buffer_means.append(values)
+        self._buffer_weights.append(weights)
+        self._buffered += len(values)
+        if self._buffered >= self.buffer_size:
+            self._compress()
+        return self
+
+    def merge(self, other: 'TDigest') -> 'TDigest':
+        """合併另一個摘要 (如不同年度或分片的結果)"""
+        other._compress()
+        if len(other.means):
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._buffer_means.append(other.means)
+            self._buffer_weights.append(other.weights)
+            self._buffered += len(other.means)
+            self._compress()
+        return self
+
+    def _compress(self):
+        if not self._buffer_means:
+            return
+        means = np.concatenate([self.means, *self._buffer_means])
+        weights = np.concatenate([self.weights, *self._buffer_weights])
+        self._buffer_means, self._buffer_weights, self._buffered = [], [], 0
+
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        # k1 尺度函數: 兩端的中心點較小，中間較大；同一個 k 整數區間的點合併為一個中心點
+        q_mid = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * math.pi) * np.arcsin(2 * q_mid - 1)
+        cluster = np.floor(k - k[0]).astype(np.intp)
+        cluster = np.unique(cluster, return_inverse=True)[1]
+        merged_weights = np.bincount(cluster, weights=weights)
+        self.means = np.bincount(cluster, weights=means * weights) / merged_weights
+        self.weights = merged_weights
+
+    def quantile(self, q):
+        """
+        近似分位數
+
+        Parameters:
+        q (float | array-like): 0 ~ 1
+
+        Returns:
+        float | np.ndarray: 分位數，沒有資料時為 NaN
+        """
+        self._compress()
+        q = np.asarray(q, dtype=float)
+        if not len(self.means):
+            return np.full(q.shape, np.nan) if q.ndim else math.nan
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        # 以最小值、各中心點、最大值做線性內插
+        xs = np.concatenate([[0.0], centers, [total]])
+        ys = np.concatenate([[self.min], self.means, [self.max]])
+        result = np.interp(q * total, xs, ys)
+        return result if q.ndim else float(result)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """可 JSON 序列化的狀態"""
+        self._compress()
+        return {
+            'compression': self.compression,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'means': self.means.tolist(),
+            'weights': self.weights.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> 'TDigest':
+        digest = cls(state['compression'])
+        digest.means = np.asarray(state['means'], dtype=float)
+        digest.weights = np.asarray(state['weights'], dtype=float)
+        if len(digest.means):
+            digest.min, digest.max = state['min'], state['max']
+        return digest
+
+
+class ThresholdCalibrator:
+    """依各行業指標分布計算評分門檻"""
+
+    def __init__(self, scorer=None, quantiles: Optional[Dict[str, float]] = None, compression: float = 200,
+                 min_samples: int = 30, general_from_universe: bool = True):
+        """
+        初始化
+
+        Parameters:
+        scorer (TaiwanIndustryScorer): 提供產業對應與原始評分標準，預設使用內建標準
+        quantiles (dict): 各等級對應的分位數，預設 DEFAULT_QUANTILES
+        compression (float): t-digest 壓縮參數
+        min_samples (int): 行業樣本數少於此值時保留原門檻
+        general_from_universe (bool): 通用 (未對應行業時的預設標準) 以整個股票池的分布校準
+        """
+        if scorer is None:
+            try:
+                from .taiwan_industry_scorer import TaiwanIndustryScorer
+            except ImportError:
+                from taiwan_industry_scorer import TaiwanIndustryScorer
+
+            scorer = TaiwanIndustryScorer()
+        self.scorer = scorer
+        self.quantiles = dict(quantiles or DEFAULT_QUANTILES)
+        if set(self.quantiles) != set(LEVELS):
+            raise ValueError(f"quantiles 必須包含: {', '.join(LEVELS)}")
+        self.compression = compression
+        self.min_samples = min_samples
+        self.general_from_universe = general_from_universe
+        self.digests: Dict[Tuple[str, str], TDigest] = {}
+        self.companies_seen = 0
+
+    def _digest(self, industry: str, metric: str) -> TDigest:
+        key = (industry, metric)
+        if key not in self.digests:
+            self.digests[key] = TDigest(self.compression)
+        return self.digests[key]
+
+    def add_companies(self, companies: Iterable[Tuple[Dict[str, Any], str]]) -> int:
+        """
+        加入一批公司的指標
+
+        Parameters:
+        companies (iterable): [(metrics, yfinance_sector), ...]，與 calculate_industry_score 的輸入相同
+
+        Returns:
+        int: 本批公司數
+        """
+        batch = defaultdict(list)
+        added = 0
+        for metrics, sector in companies:
+            industry = self.scorer.get_industry_mapping(sector)
+            for metric in SCORED_METRICS:
+                value = metrics.get(metric)
+                if value is None:
+                    continue
+                batch[(industry, metric)].append(value)
+                if self.general_from_universe and industry != GENERAL_INDUSTRY:
+                    batch[(GENERAL_INDUSTRY, metric)].append(value)
+            added += 1
+
+        for (industry, metric), values in batch.items():
+            self._digest(industry, metric).update(values)
+        self.companies_seen += added
+        return added
+
+    def add_statements_dir(self, statements_dir: str, symbols: Optional[Sequence[str]] = None) -> int:
+        """
+        加入 replay_harness.record_ticker 錄製的財報
+
+        Parameters:
+        statements_dir (str): 錄製目錄
+        symbols (list): 股票代碼，None表示目錄中所有已錄製的股票
+
+        Returns:
+        int: 成功計算指標的公司數
+        """
+        try:
+            from .health_metrics import calculate_health_metrics, get_company_financial_data
+        except ImportError:
+            from health_metrics import calculate_health_metrics, get_company_financial_data
+        from replay_harness import ReplayTicker
+
+        if symbols is None:
+            symbols = sorted(
+                name for name in os.listdir(statements_dir)
+                if os.path.exists(os.path.join(statements_dir, name, 'income_stmt.csv'))
+            )
+
+        def iter_companies():
+            for symbol in symbols:
+                financial_data = get_company_financial_data(symbol, period=None,
+                                                            ticker=ReplayTicker(symbol, statements_dir))
+                metrics = calculate_health_metrics(financial_data) if financial_data else {}
+                if metrics:
+                    yield metrics, metrics.get('sector', 'Unknown')
+
+        return self.add_companies(iter_companies())
+
+    def sample_count(self, industry: str, metric: str) -> int:
+        digest = self.digests.get((industry, metric))
+        return int(digest.count) if digest else 0
+
+    def thresholds(self, industry: str, metric: str, reverse: bool = False) -> Optional[Dict[str, float]]:
+        """
+        單一行業指標的校準門檻
+
+        Parameters:
+        industry (str): 台灣行業名稱
+        metric (str): 指標名稱
+        reverse (bool): 數值越低越好的指標
+
+        Returns:
+        dict: {'excellent': ..., 'good': ..., 'average': ..., 'poor': ...}，樣本不足時為 None
+        """
+        if self.sample_count(industry, metric) < self.min_samples:
+            return None
+        q = np.array([self.quantiles[level] for level in LEVELS])
+        values = self.digests[(industry, metric)].quantile(1 - q if reverse else q)
+        return dict(zip(LEVELS, values.tolist()))
+
+    def calibrate(self, decimals: int = 2) -> Dict[str, Any]:
+        """
+        產生校準後的評分標準
+
+        Parameters:
+        decimals (int): 門檻四捨五入的小數位數
+
+        Returns:
+        dict: 與 taiwan_industry_scoring_standards.json 相同格式 (樣本不足的行業指標保留原門檻)
+        """
+        standards = copy.deepcopy(self.scorer.standards)
+        samples = {}
+        for industry, criteria in standards.get('scoring_criteria', {}).items():
+            for metric in SCORED_METRICS:
+                if metric not in criteria:
+                    continue
+                new = self.thresholds(industry, metric, criteria[metric].get('reverse', False))
+                if new is None:
+                    continue
+                for level, value in new.items():
+                    criteria[metric][level] = round(value, decimals)
+                samples.setdefault(industry, {})[metric] = self.sample_count(industry, metric)
+
+        metadata = standards.setdefault('metadata', {})
+        metadata['calibration'] = {
+            'calibrated_date': date.today().isoformat(),
+            'method': 't-digest',
+            'quantiles': self.quantiles,
+            'min_samples': self.min_samples,
+            'companies': self.companies_seen,
+            'samples': samples,
+        }
+        return standards
+
+    def save_standards(self, path: str, decimals: int = 2) -> Dict[str, Any]:
+        """校準並儲存評分標準JSON"""
+        standards = self.calibrate(decimals)
+        _atomic_write_json(path, standards)
+        print(f"校準後的評分標準已儲存至: {path}")
+        return standards
+
+    def print_report(self, standards: Optional[Dict[str, Any]] = None) -> None:
+        """列印原門檻與校準門檻的比較"""
+        standards = standards or self.calibrate()
+        original = self.scorer.standards.get('scoring_criteria', {})
+        print("=" * 80)
+        print(f"📊 門檻校準: {self.companies_seen} 家公司")
+        print("=" * 80)
+        for industry, criteria in standards.get('scoring_criteria', {}).items():
+            lines = []
+            for metric in SCORED_METRICS:
+                if metric not in criteria:
+                    continue
+                n = self.sample_count(industry, metric)
+                old = '/'.join(f"{original[industry][metric][level]:g}" for level in LEVELS)
+                new = '/'.join(f"{criteria[metric][level]:g}" for level in LEVELS)
+                status = '✓' if n >= self.min_samples else '⚠️ 樣本不足'
+                lines.append(f"  {metric:22s} n={n:<6d} {old:>24s} → {new:<24s} {status}")
+            print(f"\n{industry}")
+            print('\n'.join(lines))
+
+    def save_state(self, path: str) -> None:
+        """儲存 t-digest 狀態，下次可載入後只加入新一季資料"""
+        _atomic_write_json(path, {
+            'companies_seen': self.companies_seen,
+            'digests': [
+                {'industry': industry, 'metric': metric, **digest.to_dict()}
+                for (industry, metric), digest in sorted(self.digests.items())
+            ],
+        })
+
+    def load_state(self, path: str) -> None:
+        """載入 save_state 儲存的狀態並合併到目前的摘要"""
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        for entry in state.get('digests', []):
+            self._digest(entry['industry'], entry['metric']).merge(TDigest.from_dict(entry))
+        self.companies_seen += state.get('companies_seen', 0)
+
+
+def _atomic_write_json(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近四季 (TTM) 財務指標
+
+將多檔股票的季報堆疊成 (股票, 項目, 季度) 陣列，一次向量化計算所有股票、所有季度的 TTM 指標:
+- 流量項目 (損益表、現金流量表): 連續四季加總，任一季缺漏時為 NaN
+- 存量項目 (資產負債表): 該季季末數值
+
+指標名稱與 TaiwanIndustryScorer.calculate_industry_score 的輸入一致，每季財報公布後即可更新評分，
+不必等年報；年報指標最多落後一年
+
+使用方式:
+    panel = TTMPanel.from_ticker_frames({'2330.TW': {'quarterly_income_stmt': ..., ...}, ...})
+    panel.metrics_frame()          # (股票, 季度) × 指標
+    panel.latest_metrics()         # {股票: 最新一季的指標字典}
+"""
+
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# 近四季加總的流量項目
+FLOW_ITEMS = (
+    'Total Revenue',
+    'Cost Of Revenue',
+    'Gross Profit',
+    'Operating Income',
+    'Net Income',
+    'Basic EPS',
+    'Operating Cash Flow',
+    'Free Cash Flow',
+)
+
+# 取季末數值的存量項目
+BALANCE_ITEMS = (
+    'Total Assets',
+    'Stockholders Equity',
+    'Total Debt',
+    'Current Assets',
+    'Current Liabilities',
+)
+
+# Ticker 季報屬性 (get_company_financial_data 的鍵名)
+QUARTERLY_FRAMES = {
+    'quarterly_income_stmt': 'quarterly_income',
+    'quarterly_balance_sheet': 'quarterly_balance',
+    'quarterly_cashflow': 'quarterly_cashflow',
+}
+
+TTM_WINDOW = 4
+
+
+def rolling_sum(values: np.ndarray, window: int = TTM_WINDOW) -> np.ndarray:
+    """
+    沿最後一軸 (季度) 的連續 window 期加總
+
+    Parameters:
+    values (np.ndarray): (..., 季度)，季度由舊到新
+
+    Returns:
+    np.ndarray: 同形狀，前 window-1 季與視窗內有缺漏的季度為 NaN
+    """
+    result = np.full(values.shape, np.nan)
+    if values.shape[-1] >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=-1)
+        result[..., window - 1:] = windows.sum(axis=-1)
+    return result
+
+
+def lag(values: np.ndarray, periods: int = TTM_WINDOW) -> np.ndarray:
+    """沿季度軸落後 periods 季 (前 periods 季為 NaN)"""
+    result = np.full(values.shape, np.nan)
+    if values.shape[-1] > periods:
+        result[..., periods:] = values[..., :-periods]
+    return result
+
+
+def _ratio(numerator, denominator, scale=1.0):
+    """分母為 0 或缺漏時為 NaN"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator != 0, numerator / denominator * scale, np.nan)
+
+
+def _growth(current, previous):
+    """成長率 (%)，以前期絕對值為基準，前期為負時方向仍正確"""
+    return _ratio(current - previous, np.abs(previous), 100.0)
+
+
+class TTMPanel:
+    """多檔股票的季報陣列與 TTM 指標"""
+
+    def __init__(self, symbols: Sequence[str], quarters: pd.PeriodIndex, items: Sequence[str], values: np.ndarray):
+        """
+        Parameters:
+        symbols (list): 股票代碼
+        quarters (pd.PeriodIndex): 季度 (由舊到新)
+        items (list): 報表項目
+        values (np.ndarray): (股票, 項目, 季度)
+        """
+        self.symbols = list(symbols)
+        self.quarters = quarters
+        self.items = list(items)
+        self.values = values
+        self._item_index = {item: i for i, item in enumerate(self.items)}
+        self._metrics = None
+
+    @classmethod
+    def from_statement_panels(cls, *panels: pd.DataFrame) -> 'TTMPanel':
+        """
+        由堆疊的季報建立
+
+        Parameters:
+        panels (pd.DataFrame): (股票, 項目) 為列、季末日為欄的季報 (如 SyntheticUniverse.statement_panel)，
+            可傳入損益表、資產負債表、現金流量表各一份
+
+        Returns:
+        TTMPanel: 季度對齊到日曆季，缺漏的季度為 NaN
+        """
+        frame = pd.concat([panel for panel in panels if panel is not None and not panel.empty])
+        frame = frame[~frame.index.duplicated(keep='first')]
+        # 季末日對齊到日曆季，同一季有多個日期時取第一個非空值
+        periods = pd.PeriodIndex(pd.to_datetime(frame.columns), freq='Q')
+        frame = frame.T.groupby(periods).first().T.sort_index(axis=1)
+        # 補齊缺漏的季度 (yfinance 常缺第四季)，讓近四季加總與去年同季比較不會跨過缺漏的季度
+        if len(frame.columns):
+            frame = frame.reindex(columns=pd.period_range(frame.columns.min(), frame.columns.max(), freq='Q'))
+
+        symbols = list(dict.fromkeys(frame.index.get_level_values(0)))
+        items = list(FLOW_ITEMS + BALANCE_ITEMS)
+        full_index = pd.MultiIndex.from_product([symbols, items])
+        values = frame.reindex(full_index).to_numpy(dtype=float)
+        return cls(symbols, frame.columns, items, values.reshape(len(symbols), len(items), len(frame.columns)))
+
+    @classmethod
+    def from_ticker_frames(cls, frames_by_symbol: Dict[str, Dict[str, pd.DataFrame]]) -> 'TTMPanel':
+        """
+        由各股票的季報 DataFrame 建立
+
+        Parameters:
+        frames_by_symbol (dict): {股票代碼: {'quarterly_income_stmt': df, 'quarterly_balance_sheet': df,
+            'quarterly_cashflow': df}}，也接受 get_company_financial_data 的鍵名 (quarterly_income 等)
+
+        Returns:
+        TTMPanel
+        """
+        panels = []
+        for attribute, alias in QUARTERLY_FRAMES.items():
+            statements = {}
+            for symbol, frames in frames_by_symbol.items():
+                frame = frames.get(attribute, frames.get(alias))
+                if frame is not None and not frame.empty:
+                    statements[symbol] = frame
+            if statements:
+                panels.append(pd.concat(statements))
+        if not panels:
+            return cls(list(frames_by_symbol), pd.PeriodIndex([], freq='Q'), list(FLOW_ITEMS + BALANCE_ITEMS),
+                       np.empty((len(frames_by_symbol), len(FLOW_ITEMS + BALANCE_ITEMS), 0)))
+        panel = cls.from_statement_panels(*panels)
+        # 沒有任何季報的股票也保留，指標全為 NaN
+        missing = [symbol for symbol in frames_by_symbol if symbol not in panel.symbols]
+        if missing:
+            values = np.concatenate([panel.values, np.full((len(missing),) + panel.values.shape[1:], np.nan)])
+            panel = cls(panel.symbols + missing, panel.quarters, panel.items, values)
+        return panel
+
+    @classmethod
+    def from_statements_dir(cls, statements_dir: str, symbols: Iterable[str]) -> 'TTMPanel':
+        """由 replay_harness.record_ticker 錄製的季報建立"""
+        from replay_harness import ReplayTicker
+
+        frames = {}
+        for symbol in symbols:
+            ticker = ReplayTicker(symbol, statements_dir)
+            frames[symbol] = {attribute: getattr(ticker, attribute) for attribute in QUARTERLY_FRAMES}
+        return cls.from_ticker_frames(frames)
+
+    def point(self, item: str) -> np.ndarray:
+        """存量項目的季末數值 (股票, 季度)，項目不存在時全為 NaN"""
+        return self.values[:, self._item_index[item], :]
+
+    def ttm(self, item: str) -> np.ndarray:
+        """流量項目的近四季加總 (股票, 季度)"""
+        return rolling_sum(self.point(item))
+
+    def metrics(self) -> Dict[str, np.ndarray]:
+        """
+        所有股票、所有季度的 TTM 指標
+
+        Returns:
+        dict: 指標名稱 → (股票, 季度) 陣列，比率與成長率為百分比
+        """
+        if self._metrics is not None:
+            return self._metrics
+
+        flow = {item: rolling_sum(self.values[:, self._item_index[item], :]) for item in FLOW_ITEMS}
+        revenue = flow['Total Revenue']
+        quarter_revenue = self.point('Total Revenue')
+        quarter_eps = self.point('Basic EPS')
+        gross_profit = np.where(np.isnan(flow['Gross Profit']), revenue - flow['Cost Of Revenue'], flow['Gross Profit'])
+
+        # 成長率: 近四季對前四季，季報不足八季時改用最新一季對去年同季
+        revenue_growth = _growth(revenue, lag(revenue))
+        revenue_growth = np.where(np.isnan(revenue_growth), _growth(quarter_revenue, lag(quarter_revenue)), revenue_growth)
+        eps_growth = _growth(flow['Basic EPS'], lag(flow['Basic EPS']))
+        eps_growth = np.where(np.isnan(eps_growth), _growth(quarter_eps, lag(quarter_eps)), eps_growth)
+
+        self._metrics = {
+            'revenue_growth_rate': revenue_growth,
+            'gross_margin': _ratio(gross_profit, revenue, 100.0),
+            'net_margin': _ratio(flow['Net Income'], revenue, 100.0),
+            'operating_margin': _ratio(flow['Operating Income'], revenue, 100.0),
+            'roa': _ratio(flow['Net Income'], self.point('Total Assets'), 100.0),
+            'roe': _ratio(flow['Net Income'], self.point('Stockholders Equity'), 100.0),
+            'eps': flow['Basic EPS'],
+            'eps_growth': eps_growth,
+            'operating_cash_flow': flow['Operating Cash Flow'],
+            'free_cash_flow': flow['Free Cash Flow'],
+            'ocf_to_net_income': _ratio(flow['Operating Cash Flow'], flow['Net Income']),
+            'debt_ratio': _ratio(self.point('Total Debt'), self.point('Total Assets'), 100.0),
+            'current_ratio': _ratio(self.point('Current Assets'), self.point('Current Liabilities')),
+        }
+        return self._metrics
+
+    def metrics_frame(self) -> pd.DataFrame:
+        """
+        TTM 指標表
+
+        Returns:
+        pd.DataFrame: (symbol, quarter) 為索引、指標為欄位，只保留有近四季營收或淨利的列
+        """
+        metrics = self.metrics()
+        index = pd.MultiIndex.from_product([self.symbols, self.quarters], names=['symbol', 'quarter'])
+        frame = pd.DataFrame({name: values.ravel() for name, values in metrics.items()}, index=index)
+        return frame[self._available().ravel()]
+
+    def _available(self) -> np.ndarray:
+        """(股票, 季度) 是否有可用的近四季資料"""
+        metrics = self.metrics()
+        return np.isfinite(metrics['net_margin']) | np.isfinite(metrics['eps']) | np.isfinite(metrics['roe'])
+
+    def latest_quarter_index(self) -> np.ndarray:
+        """各股票最新一個有近四季資料的季度位置，沒有時為 -1"""
+        available = self._available()
+        if not available.shape[1]:
+            return np.full(len(self.symbols), -1)
+        last = available.shape[1] - 1 - np.argmax(available[:, ::-1], axis=1)
+        return np.where(available.any(axis=1), last, -1)
+
+    def latest_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        各股票最新一季的 TTM 指標
+
+        Returns:
+        dict: {股票代碼: 指標字典}，缺漏值為 None (與 calculate_health_metrics 相同)，
+            另含 ttm_quarter (如 '2024Q3')；沒有足夠季報的股票為空字典
+        """
+        metrics = self.metrics()
+        positions = self.latest_quarter_index()
+        rows = np.arange(len(self.symbols))
+        latest = {name: values[rows, np.maximum(positions, 0)] for name, values in metrics.items()} if len(
+            self.quarters) else {}
+
+        result = {}
+        for row, symbol in enumerate(self.symbols):
+            if positions[row] < 0:
+                result[symbol] = {}
+                continue
+            company = {name: _to_optional(values[row]) for name, values in latest.items()}
+            company['ttm_quarter'] = str(self.quarters[positions[row]])
+            result[symbol] = company
+        return result
+
+
+def _to_optional(value) -> Optional[float]:
+    """NaN 轉為 None，避免評分器把缺漏值當成數值比較"""
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def latest_ttm_metrics(financial_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    單一公司最新一季的 TTM 指標
+
+    Parameters:
+    financial_data (dict): get_company_financial_data 返回的數據
+
+    Returns:
+    dict: 指標字典，季報不足四季時為空字典
+    """
+    symbol = financial_data.get('stock_code', '')
+    return TTMPanel.from_ticker_frames({symbol: financial_data}).latest_metrics()[symbol]
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+全市場資料可用性稽核
+yfinance Data Availability Audit
+
+用途: 由 research_preprocessing/yfinance_data_preprocessing/test_taiwan_stocks.py 擴充而來，
+      以多執行緒對所有上市股票探測 yfinance 各類資料 (info、年報、季報) 的可用期數，
+      每檔股票的每種資料只讀取一次，結果以檢查點紀錄快取；重新執行時只探測新增、過期或失敗的股票
+
+輸出:
+    data/availability_audit/probe_cache.jsonl   # 每檔股票的探測結果 (CheckpointJournal 格式)
+    data/availability_audit/availability.csv    # 股票 × 資料種類 的可用期數矩陣
+    data/availability_audit/coverage.json       # 各資料種類涵蓋率與可評分股票數
+
+可評分的股票 (scoreable_symbols) 供 `tw-stock score --from-audit` 使用
+
+使用方式:
+    tw-stock audit run                      # 以最近交易日的T86清單為全市場股票
+    tw-stock audit run --symbols 2330.TW 2317.TW --max-age-days 0
+    tw-stock audit summary
+"""
+
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from checkpoint_journal import CheckpointJournal
+from instrumentation import count, span
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AUDIT_DIR = os.path.join(REPO_ROOT, 'data', 'availability_audit')
+
+# 資料種類 → yf.Ticker 屬性；info 的期數為欄位數，財報為有資料的期間數
+DATA_KINDS = (
+    'info',
+    'income_stmt',
+    'balance_sheet',
+    'cashflow',
+    'quarterly_income_stmt',
+    'quarterly_balance_sheet',
+    'quarterly_cashflow',
+)
+
+# info 欄位少於此數量視為沒有基本資料 (與 test_taiwan_stocks.py 相同)
+MIN_INFO_FIELDS = 10
+
+# 進入評分的條件: 有基本資料，年度損益表至少兩期 (營收成長率需要兩期)，資產負債表與現金流量表至少一期
+# (health_metrics 只使用最近一期)
+SCORING_REQUIREMENTS = {
+    'info': MIN_INFO_FIELDS + 1,
+    'income_stmt': 2,
+    'balance_sheet': 1,
+    'cashflow': 1,
+}
+
+# 上市普通股代號 (排除 ETF 00xx、權證等)
+COMMON_STOCK_CODE = re.compile(r'^[1-9]\d{3}$')
+
+
+def listed_symbols(date=None, http=None, lookback_days=10):
+    """
+    上市普通股清單
+
+    以最近交易日的T86三大法人日報 (涵蓋全部上市證券) 取得代號，不另外抓取證交所清單
+
+    Args:
+        date (datetime): 基準日，None表示今天
+        http (HTTPClient): HTTP客戶端
+        lookback_days (int): 往前尋找交易日的天數
+
+    Returns:
+        list: yfinance 代碼 (如 '2330.TW')，依代號排序
+    """
+    from t86_flows import CODE_COLUMN, fetch_t86_day
+
+    day = date or datetime.now()
+    for _ in range(lookback_days):
+        if day.weekday() < 5:
+            table = fetch_t86_day(day, http)
+            if table is not None and not table.empty:
+                codes = sorted(code for code in table[CODE_COLUMN] if COMMON_STOCK_CODE.match(code))
+                print(f"上市普通股清單: {len(codes)} 檔 ({day:%Y-%m-%d} T86)")
+                return [f"{code}.TW" for code in codes]
+        day -= timedelta(days=1)
+    raise RuntimeError(f"最近 {lookback_days} 天沒有可用的T86資料，無法取得上市股票清單")
+
+
+def probe_symbol(symbol, ticker=None):
+    """
+    探測單一股票各類資料的可用期數
+
+    每種資料只讀取一次 (yf.Ticker 每個屬性都會發出網路請求)
+
+    Args:
+        symbol (str): yfinance 代碼
+        ticker: 已建立的 Ticker 物件 (如 replay_harness.ReplayTicker)，None表示建立 yf.Ticker
+
+    Returns:
+        dict: {'kinds': {資料種類: 期數}, 'latest': {財報: 最新期末日}, 'name', 'sector'}
+    """
+    if ticker is None:
+        import yfinance as yf
+
+        ticker = yf.Ticker(symbol)
+
+    kinds, latest = {}, {}
+    with span('audit.info'):
+        info = ticker.info or {}
+    kinds['info'] = len(info)
+
+    for kind in DATA_KINDS[1:]:
+        with span(f'audit.{kind}'):
+            frame = getattr(ticker, kind)
+        if frame is None or frame.empty:
+            kinds[kind] = 0
+            continue
+        periods = [column for column in frame.columns if frame[column].notna().any()]
+        kinds[kind] = len(periods)
+        if periods:
+            latest[kind] = str(max(periods))[:10]
+
+    return {
+        'kinds': kinds,
+        'latest': latest,
+        'name': info.get('longName', symbol),
+        'sector': info.get('sector', 'Unknown'),
+    }
+
+
+class AvailabilityAudit:
+    """以檢查點紀錄快取探測結果的資料可用性稽核"""
+
+    def __init__(self, audit_dir=AUDIT_DIR, max_age_days=7, max_attempts=3, ticker_factory=None):
+        """
+        初始化稽核
+
+        Args:
+            audit_dir (str): 輸出目錄
+            max_age_days (float): 探測結果的有效天數，超過時重新探測 (0 表示全部重新探測)
+            max_attempts (int): 失敗股票最多嘗試次數 (含先前執行)
+            ticker_factory (callable): ticker_factory(symbol) 回傳 Ticker 物件，None表示使用 yfinance
+        """
+        self.audit_dir = audit_dir
+        self.max_age = timedelta(days=max_age_days)
+        self.ticker_factory = ticker_factory
+        # 探測結果當機遺失時重新探測即可，不必每筆同步到磁碟
+        self.journal = CheckpointJournal(os.path.join(audit_dir, 'probe_cache.jsonl'), max_attempts=max_attempts,
+                                         fsync=False)
+        self.matrix_path = os.path.join(audit_dir, 'availability.csv')
+        self.coverage_path = os.path.join(audit_dir, 'coverage.json')
+
+    def _is_recent(self, symbol, now=None):
+        """股票最後一筆紀錄 (成功或失敗) 是否仍在有效期內"""
+        entry = self.journal.entries.get(symbol)
+        if entry is None:
+            return False
+        return (now or datetime.now()) - datetime.fromisoformat(entry['time']) < self.max_age
+
+    def is_fresh(self, symbol, now=None):
+        """股票的探測結果是否仍在有效期內"""
+        return self.journal.is_done(symbol) and self._is_recent(symbol, now)
+
+    def pending(self, symbols):
+        """
+        需要探測的股票: 未探測、結果過期、失敗但未達嘗試上限，或已達上限但最後一次失敗已超過有效期
+
+        Returns:
+            list: 維持原順序的股票代碼
+        """
+        now = datetime.now()
+        todo = []
+        for symbol in symbols:
+            if self.is_fresh(symbol, now):
+                continue
+            if self.journal.is_done(symbol) or self.journal.should_attempt(symbol) \
+                    or not self._is_recent(symbol, now):
+                todo.append(symbol)
+        return todo
+
+    def _probe(self, symbol):
+        ticker = self.ticker_factory(symbol) if self.ticker_factory else None
+        return probe_symbol(symbol, ticker)
+
+    def run(self, symbols, max_workers=16):
+        """
+        探測股票並更新可用性矩陣與涵蓋率
+
+        Args:
+            symbols (list): yfinance 代碼
+            max_workers (int): 同時探測的股票數
+
+        Returns:
+            pd.DataFrame: 可用性矩陣
+        """
+        symbols = list(dict.fromkeys(symbols))
+        todo = self.pending(symbols)
+        print(f"資料可用性稽核: {len(symbols)} 檔股票，需探測 {len(todo)} 檔 (其餘使用快取)")
+
+        start = time.perf_counter()
+        done = 0
+        for symbol in todo:
+            if not self.journal.is_done(symbol) and not self.journal.should_attempt(symbol):
+                # 已達嘗試上限的失敗超過有效期後重新起算嘗試次數
+                self.journal.reset_attempts(symbol)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self._probe, symbol): symbol for symbol in todo}
+            # 檢查點只在主執行緒寫入，不需要另外加鎖
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    count('audit.probe_failed')
+                    if self.journal.is_done(symbol):
+                        # 過期結果重新探測失敗時保留上次成功的結果，下次執行再重新探測
+                        count('audit.refresh_failed')
+                    else:
+                        self.journal.record_failure(symbol, e)
+                else:
+                    self.journal.record_success(symbol, result)
+                done += 1
+                if done % 100 == 0:
+                    print(f"  已探測 {done}/{len(todo)} 檔 ({time.perf_counter() - start:.0f} 秒)")
+
+        self.journal.compact()
+        matrix = self.matrix(symbols)
+        self.save(matrix)
+        return matrix
+
+    def matrix(self, symbols=None):
+        """
+        可用性矩陣
+
+        Args:
+            symbols (list): 股票代碼，None表示快取中全部
+
+        Returns:
+            pd.DataFrame: 股票 × 資料種類 的可用期數 (探測失敗為 -1)，另含 name、sector、probed_at
+        """
+        import pandas as pd
+
+        symbols = list(self.journal.entries) if symbols is None else symbols
+        rows = []
+        for symbol in symbols:
+            entry = self.journal.entries.get(symbol)
+            if entry is None:
+                continue
+            if entry['status'] == 'done':
+                payload = entry['payload']
+                row = {kind: payload['kinds'].get(kind, 0) for kind in DATA_KINDS}
+                row.update(name=payload.get('name'), sector=payload.get('sector'))
+            else:
+                row = {kind: -1 for kind in DATA_KINDS}
+                row.update(name=None, sector=None)
+            row.update(symbol=symbol, probed_at=entry['time'])
+            rows.append(row)
+
+        columns = ['symbol', *DATA_KINDS, 'name', 'sector', 'probed_at']
+        matrix = pd.DataFrame(rows, columns=columns).set_index('symbol').sort_index()
+        matrix[list(DATA_KINDS)] = matrix[list(DATA_KINDS)].astype('int16')
+        return matrix
+
+    def save(self, matrix):
+        """儲存可用性矩陣與涵蓋率"""
+        os.makedirs(self.audit_dir, exist_ok=True)
+        matrix.to_csv(self.matrix_path, encoding='utf-8-sig')
+        coverage = coverage_summary(matrix)
+        with open(self.coverage_path, 'w', encoding='utf-8') as f:
+            json.dump(coverage, f, ensure_ascii=False, indent=2)
+        print(f"可用性矩陣已儲存至: {self.matrix_path}")
+        return coverage
+
+
+def coverage_summary(matrix):
+    """
+    各資料種類的涵蓋率
+
+    Args:
+        matrix (pd.DataFrame): AvailabilityAudit.matrix 的結果
+
+    Returns:
+        dict: 股票數、探測失敗數、各資料種類的涵蓋家數與比例、期數中位數、可評分股票數
+    """
+    probed = matrix[matrix['info'] >= 0]
+    total = len(probed)
+    kinds = {}
+    for kind in DATA_KINDS:
+        available = probed[kind] > (MIN_INFO_FIELDS if kind == 'info' else 0)
+        kinds[kind] = {
+            'available': int(available.sum()),
+            'coverage': round(float(available.mean()), 4) if total else 0.0,
+            'median_periods': float(probed.loc[available, kind].median()) if available.any() else 0.0,
+        }
+    return {
+        'symbols': int(len(matrix)),
+        'failed': int((matrix['info'] < 0).sum()),
+        'kinds': kinds,
+        'scoreable': len(scoreable_symbols(matrix)),
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def scoreable_symbols(matrix, requirements=None):
+    """
+    資料足以計算財務健康度評分的股票
+
+    Args:
+        matrix (pd.DataFrame): 可用性矩陣
+        requirements (dict): 資料種類 → 最少期數，預設 SCORING_REQUIREMENTS
+
+    Returns:
+        list: 股票代碼
+    """
+    mask = matrix['info'] >= 0
+    for kind, minimum in (requirements or SCORING_REQUIREMENTS).items():
+        mask &= matrix[kind] >= minimum
+    return matrix.index[mask].tolist()
+
+
+def load_matrix(audit_dir=AUDIT_DIR):
+    """讀取已儲存的可用性矩陣"""
+    import pandas as pd
+
+    path = os.path.join(audit_dir, 'availability.csv')
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"找不到可用性矩陣: {path} (請先執行 tw-stock audit run)")
+    return pd.read_csv(path, index_col='symbol', encoding='utf-8-sig')
+
+
+def print_coverage(coverage):
+    """列印涵蓋率摘要"""
+    print("=" * 60)
+    print(f"📊 資料可用性: {coverage['symbols']} 檔股票 (探測失敗 {coverage['failed']} 檔)")
+    print("=" * 60)
+    for kind, stats in coverage['kinds'].items():
+        print(f"{kind:25s} {stats['available']:5d} 檔 ({stats['coverage']:6.1%})  期數中位數 {stats['median_periods']:g}")
+    print(f"\n可評分股票: {coverage['scoreable']} 檔")
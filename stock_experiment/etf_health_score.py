@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+ETF財務健康度評分
+ETF-level Health Score from Constituent Scores
+
+用途: 以成份股權重加權 TaiwanIndustryScorer 的個股評分，一次計算所有ETF的健康度並排名
+"""
+
+import numpy as np
+import pandas as pd
+
+from etf_holdings_matrix import ETFHoldingsMatrix
+
+# calculate_industry_score 回傳的總分與各維度分數欄位
+SCORE_COLUMNS = [
+    'total_score',
+    'profitability_score',
+    'per_share_score',
+    'cashflow_score',
+    'financial_structure_score',
+]
+
+
+class ETFHealthScorer:
+    """ETF加權健康度評分器"""
+
+    def __init__(self, etf_constituents=None, holdings=None):
+        """
+        初始化ETF健康度評分器
+
+        Args:
+            etf_constituents (dict): TaiwanETFScraper.etf_constituents 格式的資料
+            holdings (ETFHoldingsMatrix): 已建立的持股矩陣，提供時忽略 etf_constituents
+        """
+        if holdings is None:
+            if etf_constituents is None:
+                raise ValueError("需提供 etf_constituents 或 holdings")
+            holdings = ETFHoldingsMatrix.from_constituents(etf_constituents)
+        self.holdings = holdings
+
+    def company_score_matrix(self, company_scores):
+        """
+        將個股評分對齊為 股票 × 評分欄位 矩陣，缺值為 NaN
+
+        Args:
+            company_scores (dict | pd.DataFrame): 股票代碼對應 calculate_industry_score 結果，
+                或以股票代碼為索引、含 SCORE_COLUMNS 欄位的 DataFrame
+
+        Returns:
+            np.ndarray: 依 holdings.stock_codes 排列的評分矩陣
+        """
+        if isinstance(company_scores, pd.DataFrame):
+            df = company_scores.copy()
+        else:
+            df = pd.DataFrame.from_dict(
+                {code: {col: scores.get(col) for col in SCORE_COLUMNS}
+                 for code, scores in company_scores.items() if scores},
+                orient='index'
+            )
+
+        # yfinance 代碼 (2330.TW) 與ETF成份股代碼 (2330) 對齊
+        df.index = [str(code).split('.')[0] for code in df.index]
+        df = df[~df.index.duplicated(keep='last')]
+        df = df.reindex(index=self.holdings.stock_codes, columns=SCORE_COLUMNS)
+        return df.to_numpy(dtype=np.float64)
+
+    def score_etfs(self, company_scores):
+        """
+        計算所有ETF的加權健康度
+
+        每檔ETF的分數為有評分成份股的權重正規化加權平均；缺少評分的成份股
+        其權重會被排除並重新正規化，coverage 欄位表示有評分的權重佔已揭露權重比例
+
+        Args:
+            company_scores (dict | pd.DataFrame): 個股評分，格式同 company_score_matrix
+
+        Returns:
+            pd.DataFrame: 以ETF代碼為索引的評分表，依 total_score 由高至低排列
+        """
+        scores = self.company_score_matrix(company_scores)
+        available = ~np.isnan(scores)
+        filled = np.where(available, scores, 0.0)
+
+        matrix = self.holdings.matrix
+        weighted_sum = matrix @ filled
+        covered_weight = matrix @ available.astype(np.float64)
+        etf_scores = np.divide(
+            weighted_sum, covered_weight,
+            out=np.full_like(weighted_sum, np.nan), where=covered_weight > 0
+        )
+
+        disclosed = self.holdings.row_sums()
+        total_covered = covered_weight[:, 0]
+        coverage = np.divide(total_covered, disclosed, out=np.zeros_like(disclosed), where=disclosed > 0)
+
+        df = pd.DataFrame(etf_scores, index=self.holdings.etf_codes, columns=SCORE_COLUMNS)
+        df.index.name = 'etf_code'
+        df.insert(0, 'etf_name', [self.holdings.etf_names.get(code, '') for code in self.holdings.etf_codes])
+        df['coverage'] = coverage
+        df['health_grade'] = [_health_grade(score) for score in df['total_score']]
+        df['rank'] = df['total_score'].rank(ascending=False, method='min')
+
+        return df.sort_values('total_score', ascending=False, na_position='last')
+
+
+def score_companies(scorer, company_metrics):
+    """
+    以 TaiwanIndustryScorer 批次計算個股評分
+
+    Args:
+        scorer (TaiwanIndustryScorer): 行業評分器
+        company_metrics (dict): 股票代碼對應 (財務指標字典, yfinance產業分類)
+
+    Returns:
+        dict: 股票代碼對應 calculate_industry_score 結果，評分失敗的股票不列入
+    """
+    results = {}
+    for stock_code, (metrics, sector) in company_metrics.items():
+        try:
+            results[stock_code] = scorer.calculate_industry_score(metrics, sector)
+        except ValueError as e:
+            print(f"  ✗ {stock_code} 評分失敗: {e}")
+    return results
+
+
+def _health_grade(total_score):
+    """與 TaiwanIndustryScorer 相同的健康度等級門檻"""
+    if total_score is None or np.isnan(total_score):
+        return 'N/A'
+    if total_score >= 80:
+        return '優秀 (Excellent)'
+    elif total_score >= 60:
+        return '良好 (Good)'
+    elif total_score >= 40:
+        return '普通 (Average)'
+    return '警示 (Warning)'
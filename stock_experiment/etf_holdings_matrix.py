@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+ETF持股稀疏矩陣
+Sparse ETF Holdings Matrix
+
+用途: 將 TaiwanETFScraper.etf_constituents 轉換為 ETF × 個股 的稀疏權重矩陣，
+      供穿透曝險、ETF健康度、報酬複製等向量化分析共用
+"""
+
+import hashlib
+import json
+
+import numpy as np
+from scipy import sparse
+
+
+class ETFHoldingsMatrix:
+    """ETF × 個股 持股權重稀疏矩陣"""
+
+    def __init__(self, matrix, etf_codes, stock_codes, stock_names=None, etf_names=None):
+        """
+        初始化持股矩陣
+
+        Args:
+            matrix (scipy.sparse.csr_matrix): ETF × 個股 權重矩陣 (小數，0.4752 代表 47.52%)
+            etf_codes (list): 矩陣列對應的ETF代碼
+            stock_codes (list): 矩陣欄對應的股票代碼
+            stock_names (dict): 股票代碼對應名稱
+            etf_names (dict): ETF代碼對應名稱
+        """
+        self.matrix = sparse.csr_matrix(matrix, dtype=np.float64)
+        self.etf_codes = list(etf_codes)
+        self.stock_codes = list(stock_codes)
+        self.stock_names = stock_names or {}
+        self.etf_names = etf_names or {}
+        self.etf_index = {code: i for i, code in enumerate(self.etf_codes)}
+        self.stock_index = {code: j for j, code in enumerate(self.stock_codes)}
+        self._snapshot_version = None
+
+    @classmethod
+    def from_constituents(cls, etf_constituents):
+        """
+        由 etf_constituents 字典建立持股矩陣
+
+        Args:
+            etf_constituents (dict): TaiwanETFScraper.etf_constituents 格式的資料
+
+        Returns:
+            ETFHoldingsMatrix: 持股矩陣
+        """
+        items = sorted(((str(code), data) for code, data in etf_constituents.items()), key=lambda item: item[0])
+        etf_codes = [code for code, _ in items]
+        stock_names = {}
+        etf_names = {}
+        rows, cols, values = [], [], []
+        stock_index = {}
+
+        for i, (etf_code, data) in enumerate(items):
+            etf_names[etf_code] = data.get('name', '')
+            for constituent in data.get('constituents', []):
+                stock_code = str(constituent['stock_code'])
+                if stock_code not in stock_index:
+                    stock_index[stock_code] = len(stock_index)
+                    stock_names[stock_code] = constituent.get('stock_name', '')
+                rows.append(i)
+                cols.append(stock_index[stock_code])
+                values.append(float(constituent['weight']) / 100.0)
+
+        # 依股票代碼排序欄位，讓不同快照的欄位順序一致
+        stock_codes = sorted(stock_index)
+        remap = np.empty(len(stock_index), dtype=np.int64)
+        for j, code in enumerate(stock_codes):
+            remap[stock_index[code]] = j
+        cols = remap[np.asarray(cols, dtype=np.int64)] if cols else np.asarray(cols, dtype=np.int64)
+
+        # 重複的 (ETF, 股票) 紀錄會在 csr 轉換時加總
+        matrix = sparse.coo_matrix(
+            (np.asarray(values, dtype=np.float64), (np.asarray(rows, dtype=np.int64), cols)),
+            shape=(len(etf_codes), len(stock_codes))
+        ).tocsr()
+
+        return cls(matrix, etf_codes, stock_codes, stock_names, etf_names)
+
+    @classmethod
+    def from_scraper(cls, scraper):
+        """
+        由 TaiwanETFScraper 實例建立持股矩陣
+
+        Args:
+            scraper (TaiwanETFScraper): 已收集或載入成份股資料的爬蟲
+
+        Returns:
+            ETFHoldingsMatrix: 持股矩陣
+        """
+        return cls.from_constituents(scraper.etf_constituents)
+
+    @property
+    def shape(self):
+        """矩陣維度 (ETF數, 股票數)"""
+        return self.matrix.shape
+
+    @property
+    def snapshot_version(self):
+        """
+        持股快照版本
+
+        以ETF代碼、股票代碼與權重內容計算的雜湊值，持股內容不變時版本相同，
+        可作為快取鍵值
+        """
+        if self._snapshot_version is None:
+            csr = self.matrix
+            digest = hashlib.sha1()
+            digest.update(json.dumps([self.etf_codes, self.stock_codes], ensure_ascii=False).encode('utf-8'))
+            digest.update(csr.indptr.astype(np.int64).tobytes())
+            digest.update(csr.indices.astype(np.int64).tobytes())
+            digest.update(np.round(csr.data, 10).tobytes())
+            self._snapshot_version = digest.hexdigest()[:16]
+        return self._snapshot_version
+
+    def row_sums(self):
+        """
+        各ETF已揭露成份股權重合計
+
+        Returns:
+            np.ndarray: 長度為ETF數的權重合計 (小數)
+        """
+        return np.asarray(self.matrix.sum(axis=1)).ravel()
+
+    def normalized(self):
+        """
+        回傳每列權重合計為1的矩陣 (未揭露部分按比例分攤)
+
+        Returns:
+            scipy.sparse.csr_matrix: 正規化後的權重矩陣
+        """
+        totals = self.row_sums()
+        scale = np.divide(1.0, totals, out=np.zeros_like(totals), where=totals > 0)
+        return (sparse.diags(scale) @ self.matrix).tocsr()
+
+    def etf_vector(self, values, fill_value=0.0):
+        """
+        將ETF對應數值轉為依 etf_codes 排列的向量
+
+        Args:
+            values (dict | pd.Series | array-like): ETF代碼對應數值，或已依 etf_codes 排列的陣列
+            fill_value (float): 未提供的ETF填入值
+
+        Returns:
+            np.ndarray: 長度為ETF數的向量
+        """
+        return _align_vector(values, self.etf_codes, self.etf_index, fill_value)
+
+    def stock_vector(self, values, fill_value=0.0):
+        """
+        將股票對應數值轉為依 stock_codes 排列的向量
+
+        Args:
+            values (dict | pd.Series | array-like): 股票代碼對應數值，或已依 stock_codes 排列的陣列
+            fill_value (float): 未提供的股票填入值
+
+        Returns:
+            np.ndarray: 長度為股票數的向量
+        """
+        return _align_vector(values, self.stock_codes, self.stock_index, fill_value)
+
+
+def _align_vector(values, codes, index, fill_value):
+    """依代碼順序對齊向量"""
+    if hasattr(values, 'items'):
+        vector = np.full(len(codes), fill_value, dtype=np.float64)
+        for code, value in values.items():
+            position = index.get(str(code))
+            if position is not None:
+                vector[position] = value
+        return vector
+
+    vector = np.asarray(values, dtype=np.float64)
+    if vector.shape != (len(codes),):
+        raise ValueError(f"向量長度 {vector.shape} 與代碼數量 {len(codes)} 不符")
+    return vector
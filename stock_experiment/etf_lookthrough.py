@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+ETF穿透持股曝險計算
+ETF Look-through Exposure Calculator
+
+用途: 依ETF部位金額與成份股權重，計算實際持有的個股曝險 (例如透過 0050、0056、00878 持有多少台積電)
+"""
+
+import numpy as np
+import pandas as pd
+
+from etf_holdings_matrix import ETFHoldingsMatrix
+
+
+class ETFLookThrough:
+    """ETF穿透曝險計算器"""
+
+    def __init__(self, etf_constituents=None, holdings=None):
+        """
+        初始化穿透曝險計算器
+
+        Args:
+            etf_constituents (dict): TaiwanETFScraper.etf_constituents 格式的資料
+            holdings (ETFHoldingsMatrix): 已建立的持股矩陣，提供時忽略 etf_constituents
+        """
+        if holdings is None:
+            if etf_constituents is None:
+                raise ValueError("需提供 etf_constituents 或 holdings")
+            holdings = ETFHoldingsMatrix.from_constituents(etf_constituents)
+        self.holdings = holdings
+        # 預先轉置，避免每次計算重建 csc/csr
+        self._transposed = holdings.matrix.T.tocsr()
+
+    @classmethod
+    def from_scraper(cls, scraper):
+        """
+        由 TaiwanETFScraper 實例建立計算器
+
+        Args:
+            scraper (TaiwanETFScraper): 已收集或載入成份股資料的爬蟲
+
+        Returns:
+            ETFLookThrough: 穿透曝險計算器
+        """
+        return cls(holdings=ETFHoldingsMatrix.from_scraper(scraper))
+
+    def exposure_vector(self, positions):
+        """
+        計算單一投資組合的個股曝險向量
+
+        Args:
+            positions (dict | pd.Series | array-like): ETF代碼對應部位金額，或依 holdings.etf_codes 排列的向量
+
+        Returns:
+            np.ndarray: 依 holdings.stock_codes 排列的個股曝險金額
+        """
+        vector = self.holdings.etf_vector(positions)
+        return self._transposed @ vector
+
+    def compute_exposure(self, positions, top_n=None):
+        """
+        計算單一投資組合的個股穿透曝險
+
+        Args:
+            positions (dict | pd.Series | array-like): ETF代碼對應部位金額
+            top_n (int): 只回傳曝險最高的前N檔，None表示全部
+
+        Returns:
+            pd.DataFrame: 個股曝險表，包含曝險金額與佔總部位比例
+        """
+        vector = self.holdings.etf_vector(positions)
+        exposure = self._transposed @ vector
+        total_position = vector.sum()
+
+        df = pd.DataFrame({
+            'stock_code': self.holdings.stock_codes,
+            'stock_name': [self.holdings.stock_names.get(code, '') for code in self.holdings.stock_codes],
+            'exposure': exposure,
+        })
+        df['exposure_pct'] = df['exposure'] / total_position * 100 if total_position else 0.0
+        df = df[df['exposure'] != 0].sort_values('exposure', ascending=False).reset_index(drop=True)
+
+        return df.head(top_n) if top_n else df
+
+    def unallocated_exposure(self, positions):
+        """
+        計算未揭露成份股 (現金、期貨或未列出持股) 的部位金額
+
+        Args:
+            positions (dict | pd.Series | array-like): ETF代碼對應部位金額
+
+        Returns:
+            float: 未能穿透至個股的部位金額
+        """
+        vector = self.holdings.etf_vector(positions)
+        return float(vector @ (1.0 - self.holdings.row_sums()))
+
+    def compute_batch_exposure(self, portfolios):
+        """
+        批次計算多個投資組合的個股曝險 (單次稀疏矩陣乘法)
+
+        Args:
+            portfolios (pd.DataFrame | np.ndarray | scipy.sparse matrix):
+                投資組合 × ETF 的部位矩陣；DataFrame 欄位為ETF代碼，陣列需依 holdings.etf_codes 排列
+
+        Returns:
+            pd.DataFrame | np.ndarray: 投資組合 × 個股 的曝險矩陣，輸入為 DataFrame 時回傳 DataFrame
+        """
+        if isinstance(portfolios, pd.DataFrame):
+            aligned = portfolios.rename(columns=str).reindex(columns=self.holdings.etf_codes, fill_value=0.0)
+            exposure = self._batch_product(aligned.to_numpy(dtype=np.float64))
+            return pd.DataFrame(exposure, index=portfolios.index, columns=self.holdings.stock_codes)
+
+        if hasattr(portfolios, 'tocsr'):
+            if portfolios.shape[1] != len(self.holdings.etf_codes):
+                raise ValueError(f"部位矩陣欄數 {portfolios.shape[1]} 與ETF數量 {len(self.holdings.etf_codes)} 不符")
+            return (portfolios.tocsr() @ self.holdings.matrix).toarray()
+
+        matrix = np.asarray(portfolios, dtype=np.float64)
+        if matrix.ndim != 2 or matrix.shape[1] != len(self.holdings.etf_codes):
+            raise ValueError(f"部位矩陣維度 {matrix.shape} 與ETF數量 {len(self.holdings.etf_codes)} 不符")
+        return self._batch_product(matrix)
+
+    def _batch_product(self, matrix):
+        """(投資組合 × ETF) @ (ETF × 個股)，以 (H^T @ P^T)^T 計算以利用 csr 列存取"""
+        return np.asarray(self._transposed @ matrix.T).T
+
+
+def main():
+    """示範用法"""
+    import json
+    import os
+
+    data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'etf_data', 'etf_constituents.json')
+    with open(data_path, 'r', encoding='utf-8') as f:
+        etf_constituents = json.load(f)
+
+    lookthrough = ETFLookThrough(etf_constituents)
+    positions = {'0050': 1_000_000, '0056': 500_000, '00878': 300_000}
+
+    print("ETF穿透持股曝險")
+    print("=" * 40)
+    print(f"部位: {positions}")
+    print(lookthrough.compute_exposure(positions).to_string(index=False))
+    print(f"未穿透部位: {lookthrough.unallocated_exposure(positions):,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# ETF PCF Parsers Package
+# 投信PCF (每日申購買回清單) 解析器套件
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .base import PCFParser, SUPPORTED_FORMATS, detect_format
+from .cathay import CathayPCFParser
+from .fubon import FubonPCFParser
+from .yuanta import YuantaPCFParser
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+_PARSERS = {}
+
+
+def register_parser(parser_class):
+    """
+    註冊投信PCF解析器，可作為類別裝飾器使用
+
+    Args:
+        parser_class (type): PCFParser 子類別，需定義 issuer
+
+    Returns:
+        type: 原類別
+    """
+    if not parser_class.issuer:
+        raise ValueError(f"{parser_class.__name__} 未定義 issuer")
+    _PARSERS[parser_class.issuer] = parser_class()
+    return parser_class
+
+
+def get_parser(issuer):
+    """
+    取得指定投信的解析器
+
+    Args:
+        issuer (str): 投信識別名稱 (如 'yuanta')
+
+    Returns:
+        PCFParser: 解析器實例，未註冊的投信回傳通用解析器
+    """
+    return _PARSERS.get(issuer, _GENERIC_PARSER)
+
+
+def detect_issuer(etf_name):
+    """
+    由ETF名稱判斷投信
+
+    Args:
+        etf_name (str): ETF名稱 (如 '元大台灣50')
+
+    Returns:
+        str: 投信識別名稱，無法判斷時回傳 None
+    """
+    for issuer, parser in _PARSERS.items():
+        if any(str(etf_name).startswith(prefix) for prefix in parser.name_prefixes):
+            return issuer
+    return None
+
+
+def find_pcf_file(pcf_dir, etf_code):
+    """
+    在PCF目錄中尋找ETF對應檔案 ({etf_code}.html / .csv / .xlsx)
+
+    Args:
+        pcf_dir (str): PCF檔案目錄
+        etf_code (str): ETF代碼
+
+    Returns:
+        str: 檔案路徑，找不到時回傳 None
+    """
+    for extension in ('html', 'htm', 'csv', 'xlsx'):
+        path = os.path.join(pcf_dir, f"{etf_code}.{extension}")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def parse_pcf_file(path, issuer=None, etf_name=None):
+    """
+    解析單一PCF檔案
+
+    Args:
+        path (str): 檔案路徑
+        issuer (str): 投信識別名稱，None表示由 etf_name 判斷，仍無法判斷時逐一嘗試已註冊的解析器
+        etf_name (str): ETF名稱
+
+    Returns:
+        list: 成份股清單
+    """
+    if issuer is None and etf_name:
+        issuer = detect_issuer(etf_name)
+    if issuer is not None:
+        return get_parser(issuer).parse(path)
+
+    # 無法判斷投信時依序嘗試各解析器，採用第一個解析出成份股的結果
+    for parser in list(_PARSERS.values()) + [_GENERIC_PARSER]:
+        constituents = parser.parse(path)
+        if constituents:
+            return constituents
+    return []
+
+
+def parse_pcf_directory(pcf_dir, etf_names=None, max_workers=8):
+    """
+    批次解析PCF目錄下所有檔案
+
+    lxml、pandas C parser 與 openpyxl 解析時大多釋放 GIL 或以 I/O 為主，以執行緒池平行處理
+
+    Args:
+        pcf_dir (str): PCF檔案目錄，檔名為 {etf_code}.{html|csv|xlsx}
+        etf_names (dict): ETF代碼對應名稱，用於判斷投信
+        max_workers (int): 平行解析的執行緒數
+
+    Returns:
+        dict: ETF代碼對應成份股清單，解析失敗的檔案不列入
+    """
+    etf_names = etf_names or {}
+    files = {}
+    for filename in sorted(os.listdir(pcf_dir)):
+        etf_code, extension = os.path.splitext(filename)
+        if extension.lower().lstrip('.') in ('html', 'htm', 'csv', 'xlsx'):
+            files.setdefault(etf_code, os.path.join(pcf_dir, filename))
+
+    def _parse(item):
+        etf_code, path = item
+        try:
+            return etf_code, parse_pcf_file(path, etf_name=etf_names.get(etf_code))
+        except Exception as e:
+            print(f"  ✗ 解析 {path} 時發生錯誤: {str(e)}")
+            return etf_code, []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = dict(executor.map(_parse, files.items()))
+
+    return {code: constituents for code, constituents in results.items() if constituents}
+
+
+_GENERIC_PARSER = PCFParser()
+
+for _parser_class in (YuantaPCFParser, CathayPCFParser, FubonPCFParser):
+    register_parser(_parser_class)
+
+__all__ = [
+    'PCFParser',
+    'YuantaPCFParser',
+    'CathayPCFParser',
+    'FubonPCFParser',
+    'SUPPORTED_FORMATS',
+    'FIXTURE_DIR',
+    'register_parser',
+    'get_parser',
+    'detect_issuer',
+    'detect_format',
+    'find_pcf_file',
+    'parse_pcf_file',
+    'parse_pcf_directory',
+]
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+以本地 fixtures 離線驗證PCF解析器
+
+用法: python -m etf_pcf_parsers [PCF目錄]
+"""
+
+import sys
+
+from . import FIXTURE_DIR, parse_pcf_directory
+
+FIXTURE_ETF_NAMES = {
+    '0050': '元大台灣50',
+    '0056': '元大高股息',
+    '00878': '國泰永續高股息',
+    '006208': '富邦台50',
+}
+
+
+def main():
+    """解析PCF目錄並列印各ETF成份股摘要"""
+    pcf_dir = sys.argv[1] if len(sys.argv) > 1 else FIXTURE_DIR
+    print(f"解析PCF目錄: {pcf_dir}")
+    print("=" * 40)
+
+    results = parse_pcf_directory(pcf_dir, FIXTURE_ETF_NAMES)
+    for etf_code, constituents in sorted(results.items()):
+        total_weight = sum(c['weight'] for c in constituents)
+        top = constituents[0]
+        print(f"  {etf_code}: {len(constituents)} 檔成份股, 權重合計 {total_weight:.2f}%, "
+              f"最大持股 {top['stock_code']} {top['stock_name']} {top['weight']:.2f}%")
+
+    print(f"\n✅ 成功解析 {len(results)} 檔ETF")
+
+
+if __name__ == "__main__":
+    main()
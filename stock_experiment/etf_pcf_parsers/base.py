@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+投信PCF (每日申購買回清單) 解析器基底類別
+Issuer PCF/Holdings File Parser Base
+
+用途: 定義各投信PCF解析器的共同介面，以 lxml / pandas C parser / openpyxl read-only
+      串流解析 HTML、CSV、XLSX 檔案，並正規化為 TaiwanETFScraper 成份股格式
+"""
+
+import io
+import os
+import re
+
+import pandas as pd
+
+# 台股證券代號: 4~6碼，可能帶有英文字尾 (如 00631L)
+STOCK_CODE_PATTERN = re.compile(r'^\d{4,6}[A-Z]?$')
+
+SUPPORTED_FORMATS = ('html', 'csv', 'xlsx')
+
+
+class PCFParser:
+    """投信PCF檔案解析器基底類別"""
+
+    # 投信識別名稱 (registry 鍵值)
+    issuer = None
+    # ETF名稱前綴，用於由ETF名稱判斷投信 (如 元大台灣50 → 元大)
+    name_prefixes = ()
+    # 各欄位可能的表頭名稱
+    column_aliases = {
+        'stock_code': ('股票代號', '證券代號', '股票代碼', '代碼', '代號'),
+        'stock_name': ('股票名稱', '證券名稱', '名稱'),
+        'shares': ('股數', '持股股數', '數量', '股數(股)'),
+        'weight': ('持股權重', '權重', '持股比例', '比例', '權重(%)', '持股比例(%)'),
+    }
+    # CSV 可能的編碼，依序嘗試
+    encodings = ('utf-8-sig', 'cp950')
+
+    def parse(self, source, fmt=None):
+        """
+        解析PCF檔案
+
+        Args:
+            source (str | bytes): 檔案路徑或檔案內容
+            fmt (str): 檔案格式 ('html'、'csv'、'xlsx')，None表示由副檔名判斷
+
+        Returns:
+            list: 成份股清單，每筆包含 stock_code、stock_name、weight、shares
+        """
+        if fmt is None:
+            if not isinstance(source, str):
+                raise ValueError("傳入檔案內容時需指定 fmt")
+            fmt = detect_format(source)
+
+        if fmt == 'html':
+            rows = self.iter_html_rows(source)
+        elif fmt == 'csv':
+            rows = self.iter_csv_rows(source)
+        elif fmt == 'xlsx':
+            rows = self.iter_xlsx_rows(source)
+        else:
+            raise ValueError(f"不支援的PCF檔案格式: {fmt}")
+
+        return self.normalize_rows(rows)
+
+    def iter_html_rows(self, source):
+        """以 lxml iterparse 串流讀取HTML表格列，處理完即釋放節點"""
+        from lxml import etree
+
+        stream = _open_binary(source)
+        try:
+            for _, element in etree.iterparse(stream, events=('end',), tag='tr', html=True, recover=True):
+                cells = [''.join(cell.itertext()).strip() for cell in element if cell.tag in ('td', 'th')]
+                element.clear()
+                if cells:
+                    yield cells
+        finally:
+            stream.close()
+
+    def iter_csv_rows(self, source):
+        """定位表頭後以 pandas C parser 讀取CSV資料列"""
+        raw = source if isinstance(source, bytes) else _read_bytes(source)
+        text = self._decode(raw)
+
+        # 跳過投信檔案前段的基金資訊，找到成份股表頭
+        lines = text.splitlines()
+        header_index = None
+        for i, line in enumerate(lines):
+            cells = [cell.strip().strip('"') for cell in line.split(',')]
+            if self._match_header(cells):
+                header_index = i
+                break
+        if header_index is None:
+            return
+
+        df = pd.read_csv(io.StringIO(text), skiprows=header_index, dtype=str, engine='c',
+                         skip_blank_lines=True, keep_default_na=False, on_bad_lines='skip')
+        yield [str(col).strip() for col in df.columns]
+        yield from df.itertuples(index=False, name=None)
+
+    def iter_xlsx_rows(self, source):
+        """以 openpyxl read-only 模式串流讀取XLSX工作表"""
+        from openpyxl import load_workbook
+
+        stream = _open_binary(source)
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+        try:
+            for sheet in workbook.worksheets:
+                for row in sheet.iter_rows(values_only=True):
+                    cells = ['' if value is None else str(value).strip() for value in row]
+                    if any(cells):
+                        yield cells
+        finally:
+            workbook.close()
+            stream.close()
+
+    def normalize_rows(self, rows):
+        """
+        將表格列正規化為成份股清單
+
+        Args:
+            rows (iterable): 表格列 (含表頭)，表頭之前的列會被略過
+
+        Returns:
+            list: 成份股清單
+        """
+        columns = None
+        constituents = []
+
+        for cells in rows:
+            cells = ['' if cell is None else str(cell).strip() for cell in cells]
+            if columns is None:
+                columns = self._match_header(cells)
+                continue
+
+            # 遇到新的表頭 (同一檔案內多個表格) 時重新對應欄位
+            header = self._match_header(cells)
+            if header:
+                columns = header
+                continue
+
+            record = self._parse_record(cells, columns)
+            if record:
+                constituents.append(record)
+
+        return constituents
+
+    def normalize_code(self, text):
+        """正規化證券代號，投信有不同寫法時由子類別覆寫"""
+        return text.replace(' ', '')
+
+    def _match_header(self, cells):
+        """判斷是否為成份股表頭，回傳欄位名稱對應索引"""
+        columns = {}
+        for field, aliases in self.column_aliases.items():
+            for i, cell in enumerate(cells):
+                if cell in aliases:
+                    columns[field] = i
+                    break
+        if 'stock_code' in columns and 'weight' in columns:
+            return columns
+        return None
+
+    def _parse_record(self, cells, columns):
+        """解析單一資料列，非個股列 (合計、現金、期貨) 回傳 None"""
+        code_index = columns['stock_code']
+        if code_index >= len(cells):
+            return None
+        stock_code = self.normalize_code(cells[code_index])
+        if not STOCK_CODE_PATTERN.match(stock_code):
+            return None
+
+        weight = _parse_number(cells[columns['weight']]) if columns['weight'] < len(cells) else None
+        if weight is None:
+            return None
+
+        name_index = columns.get('stock_name')
+        shares_index = columns.get('shares')
+        shares = _parse_number(cells[shares_index]) if shares_index is not None and shares_index < len(cells) else None
+
+        return {
+            'stock_code': stock_code,
+            'stock_name': cells[name_index] if name_index is not None and name_index < len(cells) else '',
+            'weight': round(weight, 4),
+            'shares': int(shares) if shares is not None else 0,
+        }
+
+    def _decode(self, raw):
+        """依序嘗試投信常用編碼"""
+        for encoding in self.encodings:
+            try:
+                return raw.decode(encoding)
+            except UnicodeDecodeError:
+                continue
+        return raw.decode('utf-8', errors='replace')
+
+
+def detect_format(path):
+    """
+    由副檔名判斷PCF檔案格式
+
+    Args:
+        path (str): 檔案路徑
+
+    Returns:
+        str: 'html'、'csv' 或 'xlsx'
+    """
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension in ('htm', 'html'):
+        return 'html'
+    if extension in ('xlsx', 'xlsm'):
+        return 'xlsx'
+    if extension in ('csv', 'txt'):
+        return 'csv'
+    raise ValueError(f"無法判斷PCF檔案格式: {path}")
+
+
+def _parse_number(text):
+    """解析 '47.52%'、'1,000,000' 等數字格式"""
+    cleaned = str(text).replace(',', '').replace('%', '').strip()
+    if not cleaned or cleaned in ('-', '--'):
+        return None
+    try:
+        return float(cleaned)
+    except ValueError:
+        return None
+
+
+def _read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _open_binary(source):
+    """路徑或位元組內容統一轉為二進位串流"""
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return open(source, 'rb')
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+國泰投信PCF解析器
+Cathay PCF Parser
+
+國泰投信提供 Big5 (cp950) 編碼的CSV，前段為基金資訊，成份股表頭為 證券代號 / 證券名稱 / 股數 / 持股比例(%)
+"""
+
+from .base import PCFParser
+
+
+class CathayPCFParser(PCFParser):
+    """國泰投信PCF解析器"""
+
+    issuer = 'cathay'
+    name_prefixes = ('國泰',)
+    column_aliases = {
+        'stock_code': ('證券代號', '股票代號'),
+        'stock_name': ('證券名稱', '股票名稱'),
+        'shares': ('股數', '持股股數'),
+        'weight': ('持股比例(%)', '持股比例'),
+    }
+    encodings = ('cp950', 'utf-8-sig')
+
+    def _decode(self, raw):
+        # UTF-8 BOM 開頭的檔案 (手動轉存) 優先以 UTF-8 解碼
+        if raw.startswith(b'\xef\xbb\xbf'):
+            return raw.decode('utf-8-sig')
+        return super()._decode(raw)
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+富邦投信PCF解析器
+Fubon PCF Parser
+
+富邦投信提供XLSX檔，證券代號帶有交易所後綴 (如 2330 TT、2330.TW)，欄位為 股票代號 / 股票名稱 / 股數 / 權重(%)
+"""
+
+import re
+
+from .base import PCFParser
+
+EXCHANGE_SUFFIX = re.compile(r'(\s*TT|\.TWO?|\s+TW)$', re.IGNORECASE)
+
+
+class FubonPCFParser(PCFParser):
+    """富邦投信PCF解析器"""
+
+    issuer = 'fubon'
+    name_prefixes = ('富邦',)
+    column_aliases = {
+        'stock_code': ('股票代號', '證券代號'),
+        'stock_name': ('股票名稱', '證券名稱'),
+        'shares': ('股數', '數量'),
+        'weight': ('權重(%)', '權重'),
+    }
+
+    def normalize_code(self, text):
+        return EXCHANGE_SUFFIX.sub('', text.strip()).replace(' ', '')
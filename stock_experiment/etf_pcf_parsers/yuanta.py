@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+元大投信PCF解析器
+Yuanta PCF Parser
+
+元大投信網站的申購買回清單為HTML頁面，成份股表格欄位為 商品代碼 / 商品名稱 / 商品數量 / 商品權重
+"""
+
+from .base import PCFParser
+
+
+class YuantaPCFParser(PCFParser):
+    """元大投信PCF解析器"""
+
+    issuer = 'yuanta'
+    name_prefixes = ('元大',)
+    column_aliases = {
+        'stock_code': ('商品代碼', '股票代號'),
+        'stock_name': ('商品名稱', '股票名稱'),
+        'shares': ('商品數量', '股數'),
+        'weight': ('商品權重', '權重'),
+    }
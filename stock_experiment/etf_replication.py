@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+ETF成份股報酬複製與追蹤誤差分析
+Constituent-based ETF Return Replication and Tracking Error
+
+用途: 以ETF揭露的成份股權重與個股日報酬矩陣，一次計算所有ETF的複製報酬、追蹤誤差與滾動主動報酬
+"""
+
+import numpy as np
+import pandas as pd
+
+from etf_holdings_matrix import ETFHoldingsMatrix
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+class ETFReplicationEngine:
+    """ETF成份股報酬複製引擎"""
+
+    def __init__(self, etf_constituents=None, holdings=None):
+        """
+        初始化報酬複製引擎
+
+        Args:
+            etf_constituents (dict): TaiwanETFScraper.etf_constituents 格式的資料
+            holdings (ETFHoldingsMatrix): 已建立的持股矩陣，提供時忽略 etf_constituents
+        """
+        if holdings is None:
+            if etf_constituents is None:
+                raise ValueError("需提供 etf_constituents 或 holdings")
+            holdings = ETFHoldingsMatrix.from_constituents(etf_constituents)
+        self.holdings = holdings
+
+    def replicate(self, stock_returns):
+        """
+        計算所有ETF的成份股複製報酬
+
+        某日缺少報酬的成份股會被排除，當日其餘成份股權重重新正規化
+
+        Args:
+            stock_returns (pd.DataFrame): 日期 × 股票代碼 的日報酬矩陣
+
+        Returns:
+            pd.DataFrame: 日期 × ETF代碼 的複製日報酬
+        """
+        returns = _align_columns(stock_returns, self.holdings.stock_codes)
+        available = ~np.isnan(returns)
+        filled = np.where(available, returns, 0.0)
+
+        # (ETF × 股票) @ (股票 × 日期)，一次完成所有ETF與所有日期
+        weights = self.holdings.matrix
+        weighted = weights @ filled.T
+        covered = weights @ available.T.astype(np.float64)
+        replicated = np.divide(weighted, covered, out=np.full_like(weighted, np.nan), where=covered > 0)
+
+        return pd.DataFrame(replicated.T, index=stock_returns.index, columns=self.holdings.etf_codes)
+
+    def run(self, stock_returns, etf_returns, window=20, annualization=TRADING_DAYS_PER_YEAR):
+        """
+        執行複製報酬、追蹤誤差與滾動主動報酬分析
+
+        Args:
+            stock_returns (pd.DataFrame): 日期 × 股票代碼 的日報酬矩陣
+            etf_returns (pd.DataFrame): 日期 × ETF代碼 的實際日報酬矩陣
+            window (int): 滾動主動報酬的視窗天數
+            annualization (int): 年化使用的每年交易日數
+
+        Returns:
+            dict: 包含 replicated、active、rolling_active_return 與 summary 的結果字典
+        """
+        replicated = self.replicate(stock_returns)
+        actual = etf_returns.rename(columns=lambda code: str(code).split('.')[0])
+        actual = actual.reindex(index=replicated.index, columns=replicated.columns)
+
+        active = actual - replicated
+        rolling_active = active.rolling(window, min_periods=window).sum()
+
+        active_values = active.to_numpy(dtype=np.float64)
+        observations = np.sum(~np.isnan(active_values), axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            tracking_error = np.nanstd(active_values, axis=0, ddof=1) * np.sqrt(annualization)
+            mean_active = np.nanmean(active_values, axis=0) * annualization
+            correlation = _nan_column_correlation(actual.to_numpy(dtype=np.float64), replicated.to_numpy(dtype=np.float64))
+        tracking_error[observations < 2] = np.nan
+
+        summary = pd.DataFrame({
+            'etf_name': [self.holdings.etf_names.get(code, '') for code in replicated.columns],
+            'observations': observations,
+            'tracking_error': tracking_error,
+            'annualized_active_return': mean_active,
+            'correlation': correlation,
+            'r_squared': correlation ** 2,
+            'disclosed_weight': self.holdings.row_sums(),
+        }, index=replicated.columns)
+        summary.index.name = 'etf_code'
+
+        return {
+            'replicated': replicated,
+            'active': active,
+            'rolling_active_return': rolling_active,
+            'summary': summary.sort_values('tracking_error'),
+        }
+
+
+def build_return_matrix(price_frames, price_column='Close'):
+    """
+    將 get_stock_from_yf 取得的個股價格資料合併為日報酬矩陣
+
+    Args:
+        price_frames (dict): 股票代碼對應 yfinance 價格 DataFrame
+        price_column (str): 使用的價格欄位
+
+    Returns:
+        pd.DataFrame: 日期 × 股票代碼 (去除 .TW 後綴) 的日報酬矩陣
+    """
+    closes = {}
+    for code, frame in price_frames.items():
+        if frame is None or frame.empty:
+            continue
+        close = frame[price_column]
+        # 新版 yf.download 即使只下載一檔也會回傳多層欄位
+        if isinstance(close, pd.DataFrame):
+            close = close.iloc[:, 0]
+        closes[str(code).split('.')[0]] = close
+
+    prices = pd.DataFrame(closes).sort_index()
+    return prices.pct_change(fill_method=None).iloc[1:]
+
+
+def _align_columns(frame, codes):
+    """依代碼順序對齊欄位並轉為 float 陣列"""
+    aligned = frame.rename(columns=lambda code: str(code).split('.')[0])
+    aligned = aligned.loc[:, ~aligned.columns.duplicated()]
+    return aligned.reindex(columns=codes).to_numpy(dtype=np.float64)
+
+
+def _nan_column_correlation(a, b):
+    """逐欄計算兩矩陣的相關係數，只使用兩者皆有值的日期"""
+    mask = ~(np.isnan(a) | np.isnan(b))
+    count = mask.sum(axis=0)
+    a0 = np.where(mask, a, 0.0)
+    b0 = np.where(mask, b, 0.0)
+    mean_a = a0.sum(axis=0) / np.maximum(count, 1)
+    mean_b = b0.sum(axis=0) / np.maximum(count, 1)
+    da = np.where(mask, a0 - mean_a, 0.0)
+    db = np.where(mask, b0 - mean_b, 0.0)
+    covariance = (da * db).sum(axis=0)
+    denominator = np.sqrt((da ** 2).sum(axis=0) * (db ** 2).sum(axis=0))
+    correlation = np.divide(covariance, denominator, out=np.full_like(covariance, np.nan), where=denominator > 0)
+    correlation[count < 2] = np.nan
+    return correlation
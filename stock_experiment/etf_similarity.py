@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+ETF相似度分群
+ETF Similarity Clustering
+
+用途: 以成份股權重計算所有ETF之間的加權餘弦相似度，透過階層式分群找出近似重複的ETF家族
+      (例如眾多高股息ETF)，並為每一群挑選代表ETF
+"""
+
+import copy
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.cluster.hierarchy import fcluster, linkage
+from scipy.spatial.distance import squareform
+
+from etf_holdings_matrix import ETFHoldingsMatrix
+
+
+class ETFSimilarityClusterer:
+    """ETF相似度分群器"""
+
+    def __init__(self, etf_constituents=None, holdings=None, cache_dir=None):
+        """
+        初始化ETF相似度分群器
+
+        Args:
+            etf_constituents (dict): TaiwanETFScraper.etf_constituents 格式的資料
+            holdings (ETFHoldingsMatrix): 已建立的持股矩陣，提供時忽略 etf_constituents
+            cache_dir (str): 分群結果的磁碟快取目錄，None表示只使用記憶體快取
+        """
+        if holdings is None:
+            if etf_constituents is None:
+                raise ValueError("需提供 etf_constituents 或 holdings")
+            holdings = ETFHoldingsMatrix.from_constituents(etf_constituents)
+        self.holdings = holdings
+        self.cache_dir = cache_dir
+        # 分群結果的記憶體快取，只保留最新持股快照版本的結果 (參數 → 結果)
+        self._cache = {}
+        self._cache_version = None
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def cosine_similarity(self):
+        """
+        計算所有ETF兩兩之間的加權餘弦相似度
+
+        Returns:
+            pd.DataFrame: ETF × ETF 相似度矩陣
+        """
+        matrix = self.holdings.matrix
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        scale = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+        unit = sparse.diags(scale) @ matrix
+        similarity = (unit @ unit.T).toarray()
+        np.clip(similarity, 0.0, 1.0, out=similarity)
+
+        codes = self.holdings.etf_codes
+        return pd.DataFrame(similarity, index=codes, columns=codes)
+
+    def overlap_matrix(self):
+        """
+        計算所有ETF兩兩之間的成份股 Jaccard 重疊比例 (與 get_etf_overlap 的 overlap_ratio 相同定義)
+
+        Returns:
+            pd.DataFrame: ETF × ETF 重疊比例矩陣
+        """
+        presence = (self.holdings.matrix != 0).astype(np.float64)
+        intersection = (presence @ presence.T).toarray()
+        counts = np.diag(intersection)
+        union = counts[:, None] + counts[None, :] - intersection
+        overlap = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+        codes = self.holdings.etf_codes
+        return pd.DataFrame(overlap, index=codes, columns=codes)
+
+    def cluster(self, distance_threshold=0.3, method='average'):
+        """
+        階層式分群並挑選各群代表ETF
+
+        結果依持股快照版本與參數快取，持股未變動時重複查詢直接回傳快取的複本
+
+        Args:
+            distance_threshold (float): 分群距離門檻 (距離 = 1 - 餘弦相似度)
+            method (str): scipy linkage 方法 ('average'、'complete'、'single')
+
+        Returns:
+            dict: 包含 snapshot_version、assignments (ETF代碼對應群組編號)、
+                  representatives (群組編號對應代表ETF) 與 clusters (群組編號對應成員清單)
+        """
+        version = self.holdings.snapshot_version
+        if version != self._cache_version:
+            # 持股更新後舊版本的結果不會再用到
+            self._cache = {}
+            self._cache_version = version
+        key = f"{version}_{method}_{distance_threshold:g}"
+        if key in self._cache:
+            return copy.deepcopy(self._cache[key])
+
+        cache_path = os.path.join(self.cache_dir, f"etf_clusters_{key}.json") if self.cache_dir else None
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+        else:
+            result = self._compute_clusters(distance_threshold, method)
+            if cache_path:
+                tmp_path = f"{cache_path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(result, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, cache_path)
+        self._cache[key] = result
+        return copy.deepcopy(result)
+
+    def _compute_clusters(self, distance_threshold, method):
+        """實際執行相似度計算與分群"""
+        codes = self.holdings.etf_codes
+        similarity = self.cosine_similarity().to_numpy()
+
+        if len(codes) == 1:
+            labels = np.ones(1, dtype=int)
+        elif len(codes) == 0:
+            labels = np.zeros(0, dtype=int)
+        else:
+            distance = 1.0 - similarity
+            np.fill_diagonal(distance, 0.0)
+            distance = (distance + distance.T) / 2
+            tree = linkage(squareform(distance, checks=False), method=method)
+            labels = fcluster(tree, t=distance_threshold, criterion='distance')
+
+        clusters = {}
+        representatives = {}
+        for label in np.unique(labels):
+            members = np.flatnonzero(labels == label)
+            # 代表ETF: 與群內其他成員平均相似度最高者 (medoid)
+            within = similarity[np.ix_(members, members)].mean(axis=1)
+            representative = members[int(np.argmax(within))]
+            clusters[str(label)] = [codes[i] for i in members]
+            representatives[str(label)] = codes[representative]
+
+        return {
+            'snapshot_version': self.holdings.snapshot_version,
+            'method': method,
+            'distance_threshold': distance_threshold,
+            'assignments': {code: str(label) for code, label in zip(codes, labels)},
+            'representatives': representatives,
+            'clusters': clusters,
+        }
+
+    def cluster_table(self, distance_threshold=0.3, method='average'):
+        """
+        以表格呈現分群結果
+
+        Args:
+            distance_threshold (float): 分群距離門檻
+            method (str): scipy linkage 方法
+
+        Returns:
+            pd.DataFrame: 每檔ETF的群組、群組大小、代表ETF與是否為代表
+        """
+        result = self.cluster(distance_threshold, method)
+        rows = []
+        for code, label in result['assignments'].items():
+            rows.append({
+                'etf_code': code,
+                'etf_name': self.holdings.etf_names.get(code, ''),
+                'cluster': label,
+                'cluster_size': len(result['clusters'][label]),
+                'representative': result['representatives'][label],
+                'is_representative': result['representatives'][label] == code,
+            })
+        df = pd.DataFrame(rows)
+        return df.sort_values(['cluster_size', 'cluster', 'is_representative'], ascending=[False, True, False]).reset_index(drop=True)
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+三大法人籌碼事件研究
+Institutional-Flow Event Study
+
+用途: major_investors_movements.ipynb 只以單一股票的圖表與全期相關係數觀察法人買賣超，
+      本模組在 market_matrix 的 日期 × 證券 矩陣上定義法人訊號並回測: 所有證券、所有參數組合
+      一次以陣列運算完成，不逐檔迴圈
+
+訊號 (事件為訊號成立的那一天):
+    z 分數穿越   當日買賣超以前 window 個交易日 (不含當日) 的平均與標準差標準化，由門檻下方穿越到上方
+                 (負門檻為由上往下穿越)
+    連續買賣超   外資、投信、自營商同方向買賣超的連續天數剛好達到 length (每段連續只算一次事件)
+
+T86 於收盤後公布，事件日 t 的訊號最早只能以 t + ENTRY_LAG 日的收盤價進場；
+前瞻報酬與事件曲線都以進場日收盤價為基準，缺漏收盤價沿用前一日 (停牌期間報酬為 0)
+
+結果:
+    summary       (訊號, 天期) 的事件數、平均前瞻報酬、勝率、相對該股無條件平均的超額報酬與 t 值
+    by_stock      (訊號, 天期, 證券) 的同上統計 (只列出有事件的證券)
+    curves        進場日前後各日的平均累計報酬 (日 × 訊號)
+    stock_curves  (訊號, 證券) × 日 的平均累計報酬
+持有期間重疊的事件並非獨立，t 值會高估顯著性，僅供排序參數
+
+使用方式:
+    study = FlowEventStudy(QuoteStore(), FlowMatrix(), start='2019-01-01')
+    result = study.run(study.signals(z_windows=(20, 60), z_thresholds=(1.5, 2.0), streak_lengths=(3, 5)))
+    result.summary.sort_values('excess', ascending=False)
+    result.save('data/flow_event_study')
+"""
+
+import os
+
+import numpy as np
+
+from indicator_engine import forward_fill
+from instrumentation import count, span
+from market_matrix import FLOW_FIELDS
+
+DEFAULT_HORIZONS = (1, 5, 10, 20)
+DEFAULT_Z_WINDOWS = (20, 60)
+DEFAULT_Z_THRESHOLDS = (2.0,)
+DEFAULT_STREAK_LENGTHS = (3, 5)
+
+# 事件日收盤後才取得 T86，隔一個交易日進場
+ENTRY_LAG = 1
+
+# 事件曲線涵蓋進場日前後的交易日數
+PRE_DAYS = 10
+POST_DAYS = 20
+
+# 連續買賣超訊號要求同方向的法人
+STREAK_FIELDS = ('foreign', 'trust', 'dealer')
+
+
+def rolling_zscore(values, window):
+    """
+    以前 window 日 (不含當日) 的平均與標準差標準化當日值
+
+    Args:
+        values (np.ndarray): (日期, 證券)
+        window (int): 交易日數
+
+    Returns:
+        np.ndarray: float64，前 window 列與標準差為 0 的區間為 NaN
+    """
+    values = values.astype(np.float64)
+    # 先減去全期平均，降低累加平方和的相消誤差
+    values = values - values.mean(axis=0)
+    n = len(values)
+    z = np.full(values.shape, np.nan)
+    if n <= window:
+        return z
+
+    padded = np.vstack([np.zeros((1, values.shape[1])), values])
+    sums = np.cumsum(padded, axis=0)
+    squares = np.cumsum(padded * padded, axis=0)
+    mean = (sums[window:n] - sums[:n - window]) / window
+    mean_square = (squares[window:n] - squares[:n - window]) / window
+    variance = mean_square - mean * mean
+    # 整段沒有法人進出時變異數只剩捨入誤差，視為 0
+    flat = variance <= 1e-9 * mean_square
+    std = np.sqrt(np.where(flat, np.nan, variance))
+    z[window:] = (values[window:] - mean) / std
+    return z
+
+
+def crossing_events(z, threshold):
+    """
+    z 分數穿越門檻的日期 (前一日需有 z 分數)
+
+    Args:
+        z (np.ndarray): (日期, 證券)
+        threshold (float): 正值為向上穿越，負值為向下穿越
+
+    Returns:
+        np.ndarray: bool (日期, 證券)
+    """
+    with np.errstate(invalid='ignore'):
+        beyond = z >= threshold if threshold >= 0 else z <= threshold
+    events = np.zeros_like(beyond)
+    events[1:] = beyond[1:] & ~beyond[:-1] & np.isfinite(z[:-1])
+    return events
+
+
+def run_lengths(mask):
+    """
+    沿日期軸的連續 True 天數
+
+    Args:
+        mask (np.ndarray): bool (日期, 證券)
+
+    Returns:
+        np.ndarray: int64，mask 為 False 的位置為 0
+    """
+    counts = np.cumsum(mask, axis=0, dtype=np.int64)
+    reset = np.where(mask, 0, counts)
+    np.maximum.accumulate(reset, axis=0, out=reset)
+    return counts - reset
+
+
+def streak_events(flows, length, direction=1, fields=STREAK_FIELDS):
+    """
+    各法人同方向買賣超連續天數剛好達到 length 的日期
+
+    Args:
+        flows (dict): 欄位 → (日期, 證券) 買賣超
+        length (int): 連續天數
+        direction (int): 1 為買超、-1 為賣超
+        fields (tuple): 需同方向的法人
+
+    Returns:
+        np.ndarray: bool (日期, 證券)
+    """
+    agree = np.logical_and.reduce([np.sign(flows[field]) == direction for field in fields])
+    return run_lengths(agree) == length
+
+
+class EventStudyResult:
+    """FlowEventStudy.run 的結果表格"""
+
+    def __init__(self, summary, by_stock, curves, stock_curves):
+        self.summary = summary
+        self.by_stock = by_stock
+        self.curves = curves
+        self.stock_curves = stock_curves
+
+    def save(self, directory):
+        """
+        各表格存為 CSV
+
+        Returns:
+            list: 儲存的檔案路徑
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for name in ('summary', 'by_stock', 'curves', 'stock_curves'):
+            path = os.path.join(directory, f'{name}.csv')
+            getattr(self, name).to_csv(path, encoding='utf-8-sig')
+            paths.append(path)
+        return paths
+
+
+class FlowEventStudy:
+    """行情矩陣與買賣超矩陣共同日期、證券上的法人訊號事件研究"""
+
+    def __init__(self, quotes, flows, codes=None, start=None, end=None):
+        """
+        Args:
+            quotes (QuoteStore): 行情矩陣
+            flows (FlowMatrix): 買賣超矩陣
+            codes (list): 只研究這些證券，None表示兩者共同的全部證券
+            start (str): 起始日
+            end (str): 結束日
+        """
+        dates, common, rows, columns, flow_rows, flow_columns = quotes.align(flows, start, end)
+        if codes is not None:
+            wanted = {str(code).split('.')[0] for code in codes}
+            keep = np.array([code in wanted for code in common], dtype=bool)
+            common = [code for code, kept in zip(common, keep) if kept]
+            columns, flow_columns = columns[keep], flow_columns[keep]
+        self.dates = dates
+        self.codes = common
+
+        with span('event_study.load'):
+            close = np.asarray(quotes.open('close')[rows][:, columns], dtype=np.float64)
+            close[~(close > 0)] = np.nan
+            self.log_price = np.log(forward_fill(close, np.full(len(common), np.nan))[1:])
+            self.flows = {field: np.asarray(flows.open(field)[flow_rows][:, flow_columns], dtype=np.float64)
+                          for field in FLOW_FIELDS}
+
+    def signals(self, field='foreign', z_windows=DEFAULT_Z_WINDOWS, z_thresholds=DEFAULT_Z_THRESHOLDS,
+                streak_lengths=DEFAULT_STREAK_LENGTHS, directions=(1,)):
+        """
+        參數組合的事件矩陣
+
+        Args:
+            field (str): z 分數訊號使用的買賣超欄位 (FLOW_FIELDS)
+            z_windows (tuple): z 分數視窗
+            z_thresholds (tuple): z 分數門檻 (正值)
+            streak_lengths (tuple): 連續買賣超天數
+            directions (tuple): 1 為買超訊號、-1 為賣超訊號
+
+        Returns:
+            dict: 訊號名稱 (如 foreign_z20>2、buy_streak3) → bool (日期, 證券)
+        """
+        if field not in self.flows:
+            raise ValueError(f"未知的買賣超欄位: {field} (可用: {', '.join(FLOW_FIELDS)})")
+        result = {}
+        for window in z_windows:
+            z = rolling_zscore(self.flows[field], window)
+            for threshold in z_thresholds:
+                for direction in directions:
+                    name = f"{field}_z{window}{'>' if direction > 0 else '<'}{direction * threshold:g}"
+                    result[name] = crossing_events(z, direction * abs(threshold))
+        for length in streak_lengths:
+            for direction in directions:
+                result[f"{'buy' if direction > 0 else 'sell'}_streak{length}"] = streak_events(self.flows, length,
+                                                                                               direction)
+        return result
+
+    def _baseline(self, horizons):
+        """各天期所有進場日的平均前瞻報酬 (證券,)，作為超額報酬的基準"""
+        baseline = {}
+        for horizon in horizons:
+            with np.errstate(invalid='ignore'):
+                forward = np.expm1(self.log_price[horizon:] - self.log_price[:-horizon])
+            valid = np.isfinite(forward)
+            n = valid.sum(axis=0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                baseline[horizon] = np.where(valid, forward, 0).sum(axis=0) / n
+        return baseline
+
+    def _paths(self, events, offsets, lag):
+        """
+        事件的進場日與進場日前後的對數價格變化
+
+        Returns:
+            tuple: (證券欄位置, (事件, 日) 對數報酬)，只保留進場價存在的事件
+        """
+        rows, columns = np.nonzero(events)
+        entry = rows + lag
+        inside = entry < len(self.log_price)
+        rows, columns, entry = rows[inside], columns[inside], entry[inside]
+        entry_price = self.log_price[entry, columns]
+        listed = np.isfinite(entry_price)
+        columns, entry, entry_price = columns[listed], entry[listed], entry_price[listed]
+
+        positions = entry[:, None] + offsets[None, :]
+        outside = (positions < 0) | (positions >= len(self.log_price))
+        prices = self.log_price[np.clip(positions, 0, len(self.log_price) - 1), columns[:, None]]
+        paths = prices - entry_price[:, None]
+        paths[outside] = np.nan
+        return columns, paths
+
+    def run(self, signals, horizons=DEFAULT_HORIZONS, lag=ENTRY_LAG, pre=PRE_DAYS, post=POST_DAYS):
+        """
+        回測全部訊號
+
+        Args:
+            signals (dict): signals() 的結果
+            horizons (tuple): 前瞻報酬天期 (交易日)
+            lag (int): 事件日到進場日的交易日數
+            pre (int): 事件曲線的進場前天數
+            post (int): 事件曲線的進場後天數
+
+        Returns:
+            EventStudyResult: 結果表格
+        """
+        import pandas as pd
+
+        horizons = tuple(int(horizon) for horizon in horizons)
+        offsets = np.arange(-pre, max(post, *horizons) + 1)
+        curve_offsets = (offsets >= -pre) & (offsets <= post)
+        n_codes = len(self.codes)
+        code_index = pd.Index(self.codes, name='code')
+
+        summary_rows, stock_frames, curves, stock_curves = [], [], {}, []
+        with span('event_study.run'):
+            baseline = self._baseline(horizons)
+            for name, events in signals.items():
+                columns, paths = self._paths(events, offsets, lag)
+                count('event_study.events', len(columns))
+                returns = np.expm1(paths)
+
+                for horizon in horizons:
+                    forward = returns[:, pre + horizon]
+                    valid = np.isfinite(forward)
+                    stock, value = columns[valid], forward[valid]
+                    excess = value - baseline[horizon][stock]
+                    events_per_stock = np.bincount(stock, minlength=n_codes)
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        mean = np.bincount(stock, value, n_codes) / events_per_stock
+                        hit_rate = np.bincount(stock, value > 0, n_codes) / events_per_stock
+                        stock_excess = np.bincount(stock, excess, n_codes) / events_per_stock
+                    has_events = events_per_stock > 0
+                    stock_frames.append(pd.DataFrame({
+                        'signal': name, 'horizon': horizon, 'code': code_index[has_events],
+                        'events': events_per_stock[has_events], 'mean': mean[has_events],
+                        'hit_rate': hit_rate[has_events], 'excess': stock_excess[has_events],
+                    }))
+
+                    n = len(value)
+                    std = excess.std(ddof=1) if n > 1 else np.nan
+                    summary_rows.append({
+                        'signal': name, 'horizon': horizon, 'events': n, 'stocks': int(has_events.sum()),
+                        'mean': value.mean() if n else np.nan,
+                        'hit_rate': (value > 0).mean() if n else np.nan,
+                        'excess': excess.mean() if n else np.nan,
+                        't_stat': excess.mean() / (std / np.sqrt(n)) if n > 1 and std > 0 else np.nan,
+                    })
+
+                # 事件曲線: 以 (證券, 日) 攤平後一次 bincount 求各證券各日的平均
+                curve = returns[:, curve_offsets]
+                valid = np.isfinite(curve)
+                flat = (columns[:, None] * curve.shape[1] + np.arange(curve.shape[1])[None, :])[valid]
+                size = n_codes * curve.shape[1]
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    sums = np.bincount(flat, curve[valid], size).reshape(n_codes, -1)
+                    counts = np.bincount(flat, minlength=size).reshape(n_codes, -1)
+                    curves[name] = sums.sum(axis=0) / counts.sum(axis=0)
+                    stock_curve = sums / counts
+                has_events = counts.any(axis=1)
+                stock_curves.append(pd.DataFrame(
+                    stock_curve[has_events], columns=offsets[curve_offsets],
+                    index=pd.MultiIndex.from_arrays([[name] * int(has_events.sum()), code_index[has_events]],
+                                                    names=['signal', 'code'])))
+
+        summary = pd.DataFrame(summary_rows).set_index(['signal', 'horizon'])
+        by_stock = pd.concat(stock_frames, ignore_index=True).set_index(['signal', 'horizon', 'code']).sort_index()
+        curves = pd.DataFrame(curves, index=pd.Index(offsets[curve_offsets], name='day'))
+        stock_curves = pd.concat(stock_curves) if stock_curves else pd.DataFrame()
+        return EventStudyResult(summary, by_stock, curves, stock_curves)
+
+
+def run_flow_event_study(quotes=None, flows=None, codes=None, start=None, end=None, field='foreign',
+                         z_windows=DEFAULT_Z_WINDOWS, z_thresholds=DEFAULT_Z_THRESHOLDS,
+                         streak_lengths=DEFAULT_STREAK_LENGTHS, directions=(1,), horizons=DEFAULT_HORIZONS,
+                         lag=ENTRY_LAG):
+    """
+    以預設矩陣執行參數網格的事件研究
+
+    Args:
+        quotes (QuoteStore): 行情矩陣，None表示預設目錄
+        flows (FlowMatrix): 買賣超矩陣，None表示預設目錄
+        其餘參數同 FlowEventStudy.signals 與 FlowEventStudy.run
+
+    Returns:
+        EventStudyResult: 結果表格
+    """
+    if quotes is None:
+        from twse_daily_quotes import QuoteStore
+
+        quotes = QuoteStore()
+    if flows is None:
+        from market_matrix import FlowMatrix
+
+        flows = FlowMatrix()
+
+    study = FlowEventStudy(quotes, flows, codes, start, end)
+    signals = study.signals(field, z_windows, z_thresholds, streak_lengths, directions)
+    print(f"📊 事件研究: {len(study.dates)} 個交易日 × {len(study.codes)} 檔證券，{len(signals)} 個訊號 × "
+          f"{len(horizons)} 個天期")
+    return study.run(signals, horizons, lag)
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+共用HTTP連線層
+Shared Pooled HTTP Client
+
+用途: 提供專案所有爬蟲共用的HTTP客戶端，包含
+      - 依主機調整的連線池
+      - gzip 壓縮傳輸
+      - 5xx / 429 有上限的重試 (含隨機抖動的指數退避)
+      - ETag / If-Modified-Since 條件式請求與本地回應快取
+      - 依主機的請求頻率限制
+      - 傳輸位元組與延遲統計
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'http_cache')
+
+# 每秒最多請求數；證交所對短時間大量請求會暫時封鎖IP
+DEFAULT_RATE_LIMITS = {
+    'www.twse.com.tw': 1.0,
+    'nstatdb.dgbas.gov.tw': 2.0,
+    'news.cnyes.com': 2.0,
+    'goodinfo.tw': 0.5,
+}
+
+# 各主機連線池大小 (同時連線數)
+DEFAULT_POOL_SIZES = {
+    'www.twse.com.tw': 4,
+    'news.cnyes.com': 8,
+}
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# 錄製回應時保留的標頭
+RECORDED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+# 每個主機保留的最大延遲樣本數，超過時以蓄水池抽樣估計 p95，避免長時間執行記憶體無限成長
+MAX_LATENCY_SAMPLES = 10000
+
+
+class ResponseCache:
+    """以檔案儲存的HTTP回應快取，保存 ETag / Last-Modified 供條件式請求使用"""
+
+    def __init__(self, cache_dir):
+        """
+        初始化回應快取
+
+        Args:
+            cache_dir (str): 快取目錄
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, key):
+        return (os.path.join(self.cache_dir, f"{key}.json"),
+                os.path.join(self.cache_dir, f"{key}.body"))
+
+    def get(self, key):
+        """
+        讀取快取
+
+        Args:
+            key (str): 快取鍵值
+
+        Returns:
+            tuple: (metadata dict, body bytes)，無快取時回傳 (None, None)
+        """
+        meta_path, body_path = self._paths(key)
+        if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+            return None, None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None, None
+        return meta, body
+
+    def put(self, key, meta, body):
+        """
+        寫入快取 (先寫暫存檔再替換，避免中斷時留下不完整的檔案)
+
+        Args:
+            key (str): 快取鍵值
+            meta (dict): 回應資訊 (url、etag、last_modified、headers)
+            body (bytes): 回應內容
+        """
+        meta_path, body_path = self._paths(key)
+        for path, data, mode in ((body_path, body, 'wb'), (meta_path, json.dumps(meta, ensure_ascii=False), 'w')):
+            tmp_path = f"{path}.tmp"
+            if mode == 'wb':
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+            else:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(data)
+            os.replace(tmp_path, path)
+
+
+class HostRateLimiter:
+    """依主機限制請求頻率 (最小請求間隔)"""
+
+    def __init__(self, rate_limits=None, default_rate=None):
+        """
+        初始化頻率限制器
+
+        Args:
+            rate_limits (dict): 主機對應每秒最多請求數
+            default_rate (float): 未列出主機的每秒最多請求數，None表示不限制
+        """
+        self.rate_limits = dict(rate_limits or {})
+        self.default_rate = default_rate
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        """
+        等待至該主機允許下一次請求
+
+        Args:
+            host (str): 主機名稱
+
+        Returns:
+            float: 實際等待秒數
+        """
+        rate = self.rate_limits.get(host, self.default_rate)
+        if not rate:
+            return 0.0
+
+        interval = 1.0 / rate
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class HTTPMetrics:
+    """依主機統計請求數、傳輸量與延遲"""
+
+    def __init__(self):
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+
+    def record(self, host, status, latency, body_bytes=0, wire_bytes=0, retries=0, not_modified=False, error=False):
+        """記錄一次請求結果"""
+        with self._lock:
+            stats = self._hosts.setdefault(host, {
+                'requests': 0,
+                'errors': 0,
+                'retries': 0,
+                'not_modified': 0,
+                'body_bytes': 0,
+                'wire_bytes': 0,
+                'latency_total': 0.0,
+                'latencies': [],
+                'status_codes': {},
+            })
+            stats['requests'] += 1
+            stats['retries'] += retries
+            stats['body_bytes'] += body_bytes
+            stats['wire_bytes'] += wire_bytes
+            stats['latency_total'] += latency
+            if len(stats['latencies']) < MAX_LATENCY_SAMPLES:
+                stats['latencies'].append(latency)
+            else:
+                slot = self._rng.randrange(stats['requests'])
+                if slot < MAX_LATENCY_SAMPLES:
+                    stats['latencies'][slot] = latency
+            if not_modified:
+                stats['not_modified'] += 1
+            if error:
+                stats['errors'] += 1
+            if status is not None:
+                stats['status_codes'][str(status)] = stats['status_codes'].get(str(status), 0) + 1
+
+    def summary(self):
+        """
+        取得各主機統計摘要
+
+        Returns:
+            dict: 主機對應統計 (請求數、錯誤數、304次數、位元組、平均/p95延遲)
+        """
+        with self._lock:
+            result = {}
+            for host, stats in self._hosts.items():
+                latencies = sorted(stats['latencies'])
+                count = len(latencies)
+                result[host] = {
+                    'requests': stats['requests'],
+                    'errors': stats['errors'],
+                    'retries': stats['retries'],
+                    'not_modified': stats['not_modified'],
+                    'body_bytes': stats['body_bytes'],
+                    'wire_bytes': stats['wire_bytes'],
+                    'avg_latency': stats['latency_total'] / stats['requests'],
+                    'p95_latency': latencies[min(count - 1, int(count * 0.95))] if count else 0.0,
+                    'status_codes': dict(stats['status_codes']),
+                }
+            return result
+
+    def reset(self):
+        """清除統計"""
+        with self._lock:
+            self._hosts = {}
+
+
+class HTTPClient:
+    """專案共用HTTP客戶端"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, timeout=10, max_retries=3, backoff_factor=0.5,
+                 max_backoff=30.0, rate_limits=None, default_rate=None, pool_sizes=None,
+                 pool_connections=10, pool_maxsize=10, headers=None, record_dir=None, replay_url=None):
+        """
+        初始化HTTP客戶端
+
+        Args:
+            cache_dir (str): 條件式請求使用的回應快取目錄，None表示不使用快取
+            timeout (float): 預設逾時秒數
+            max_retries (int): 5xx / 429 / 連線錯誤的最大重試次數
+            backoff_factor (float): 指數退避基數 (秒)
+            max_backoff (float): 單次退避上限 (秒)
+            rate_limits (dict): 主機對應每秒最多請求數，None表示使用 DEFAULT_RATE_LIMITS
+            default_rate (float): 未列出主機的每秒最多請求數
+            pool_sizes (dict): 主機對應連線池大小，None表示使用 DEFAULT_POOL_SIZES
+            pool_connections (int): 預設連線池數量
+            pool_maxsize (int): 預設每個連線池的連線數
+            headers (dict): 額外的預設請求標頭
+            record_dir (str): 錄製目錄，設定時每個回應都會存入供離線重播，
+                              None表示使用環境變數 TW_STOCK_HTTP_RECORD_DIR
+            replay_url (str): 本地重播伺服器網址 (如 http://127.0.0.1:8765)，設定時所有請求改送至該伺服器，
+                              None表示使用環境變數 TW_STOCK_HTTP_REPLAY_URL
+        """
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        self.rate_limiter = HostRateLimiter(DEFAULT_RATE_LIMITS if rate_limits is None else rate_limits, default_rate)
+        self.metrics = HTTPMetrics()
+        record_dir = record_dir or os.environ.get('TW_STOCK_HTTP_RECORD_DIR')
+        self.recorder = ResponseCache(record_dir) if record_dir else None
+        self.replay_url = (replay_url or os.environ.get('TW_STOCK_HTTP_REPLAY_URL') or '').rstrip('/') or None
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': DEFAULT_USER_AGENT,
+            'Accept-Encoding': 'gzip, deflate',
+        })
+        if headers:
+            self.session.headers.update(headers)
+
+        # 重試由本類別處理 (含抖動與 Retry-After)，adapter 層不重試
+        default_adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('https://', default_adapter)
+        self.session.mount('http://', default_adapter)
+        for host, size in (DEFAULT_POOL_SIZES if pool_sizes is None else pool_sizes).items():
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=0)
+            self.session.mount(f'https://{host}/', adapter)
+            self.session.mount(f'http://{host}/', adapter)
+
+    def get(self, url, params=None, headers=None, timeout=None, use_cache=True, **kwargs):
+        """
+        發送GET請求
+
+        有快取時附帶 If-None-Match / If-Modified-Since，伺服器回應304時直接使用快取內容，
+        回傳的 response 狀態碼為200且 from_cache 屬性為 True
+
+        Args:
+            url (str): 請求網址
+            params (dict): 查詢參數
+            headers (dict): 額外請求標頭
+            timeout (float): 逾時秒數，None表示使用預設值
+            use_cache (bool): 是否使用條件式請求與回應快取
+            **kwargs: 其餘傳給 requests.Session.get 的參數
+
+        Returns:
+            requests.Response: 回應物件
+        """
+        full_url = f"{url}{'&' if '?' in url else '?'}{urlencode(params)}" if params else url
+        host = urlsplit(full_url).hostname or ''
+        request_headers = dict(headers or {})
+
+        cache_key = request_key(full_url) if (self.cache and use_cache) else None
+        cached_meta, cached_body = self.cache.get(cache_key) if cache_key else (None, None)
+        if cached_meta:
+            if cached_meta.get('etag'):
+                request_headers['If-None-Match'] = cached_meta['etag']
+            if cached_meta.get('last_modified'):
+                request_headers['If-Modified-Since'] = cached_meta['last_modified']
+
+        request_url = replay_target(self.replay_url, full_url) if self.replay_url else full_url
+        response, retries, latency = self._send(request_url, host, request_headers, timeout, **kwargs)
+
+        if response.status_code == 304 and cached_meta:
+            response = self._response_from_cache(response, cached_meta, cached_body)
+            self.metrics.record(host, 304, latency, wire_bytes=_wire_bytes(response, 0),
+                                retries=retries, not_modified=True)
+            # 錄製完整內容，重播時不會有快取可做條件式請求
+            self._record(full_url, response, cached_body)
+            return response
+
+        response.from_cache = False
+        body = response.content
+        self.metrics.record(host, response.status_code, latency, body_bytes=len(body),
+                            wire_bytes=_wire_bytes(response, len(body)), retries=retries,
+                            error=response.status_code >= 400)
+
+        self._record(full_url, response, body)
+
+        if cache_key and response.status_code == 200:
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if etag or last_modified:
+                self.cache.put(cache_key, {
+                    'url': full_url,
+                    'etag': etag,
+                    'last_modified': last_modified,
+                    'headers': {key: response.headers[key] for key in ('Content-Type',) if key in response.headers},
+                    'stored_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                }, body)
+
+        return response
+
+    def get_json(self, url, **kwargs):
+        """
+        發送GET請求並解析JSON
+
+        Args:
+            url (str): 請求網址
+            **kwargs: 傳給 get 的參數
+
+        Returns:
+            dict | list: JSON內容
+        """
+        response = self.get(url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def metrics_summary(self):
+        """取得各主機傳輸統計"""
+        return self.metrics.summary()
+
+    def close(self):
+        """關閉連線池"""
+        self.session.close()
+
+    def _send(self, url, host, headers, timeout, **kwargs):
+        """含頻率限制與重試的實際請求"""
+        timeout = self.timeout if timeout is None else timeout
+        attempt = 0
+        start = time.perf_counter()
+
+        while True:
+            self.rate_limiter.wait(host)
+            try:
+                response = self.session.get(url, headers=headers, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    self.metrics.record(host, None, time.perf_counter() - start, retries=attempt, error=True)
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    return response, attempt, time.perf_counter() - start
+                retry_after = _retry_after_seconds(response)
+                response.close()
+                if retry_after is not None:
+                    time.sleep(min(retry_after, self.max_backoff))
+                    attempt += 1
+                    continue
+
+            time.sleep(self._backoff(attempt))
+            attempt += 1
+
+    def _backoff(self, attempt):
+        """指數退避加上 ±50% 隨機抖動，避免多個程序同時重試"""
+        delay = min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.5)
+
+    def _record(self, full_url, response, body):
+        """有錄製器時寫入回應"""
+        if not self.recorder:
+            return
+        self.recorder.put(request_key(full_url), {
+            'url': full_url,
+            'status': response.status_code,
+            'headers': {key: response.headers[key] for key in RECORDED_HEADERS if key in response.headers},
+            'stored_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }, body)
+
+    @staticmethod
+    def _response_from_cache(response, meta, body):
+        """以快取內容組成304回應對應的完整回應"""
+        response.status_code = 200
+        response._content = body
+        response.from_cache = True
+        for key, value in meta.get('headers', {}).items():
+            response.headers.setdefault(key, value)
+        return response
+
+
+def request_key(url):
+    """
+    由完整網址計算快取與錄製檔的鍵值
+
+    Args:
+        url (str): 含查詢參數的完整網址
+
+    Returns:
+        str: 鍵值
+    """
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+
+def replay_target(replay_url, url):
+    """
+    將原始網址改寫為重播伺服器網址 ({replay_url}/{scheme}/{host}{path}?{query})
+
+    Args:
+        replay_url (str): 重播伺服器網址
+        url (str): 原始網址
+
+    Returns:
+        str: 改寫後的網址
+    """
+    parts = urlsplit(url)
+    target = f"{replay_url}/{parts.scheme}/{parts.netloc}{parts.path or '/'}"
+    return f"{target}?{parts.query}" if parts.query else target
+
+
+def _retry_after_seconds(response):
+    """解析 Retry-After 標頭 (秒數格式)"""
+    value = response.headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def _wire_bytes(response, default):
+    """實際傳輸位元組 (壓縮後)，無 Content-Length 時使用預設值"""
+    try:
+        return int(response.headers.get('Content-Length', default))
+    except (TypeError, ValueError):
+        return default
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client():
+    """
+    取得程序內共用的HTTP客戶端
+
+    Returns:
+        HTTPClient: 共用客戶端
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HTTPClient()
+        return _default_client
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+增量技術指標
+Incremental Indicator Engine
+
+用途: 研究筆記本每次執行都以整段歷史重算衍生序列:
+      - get_stock_from_yf 的 price_cum_growth: (1 + pct_change).cumprod() - 1
+      - JPY_interest.ipynb 的 Normalized Close: 以全期最小/最大值做 min-max 正規化
+      - unemployment_rate.ipynb 的累計成長率縮放到 0~7
+      本模組對 twse_daily_quotes.QuoteStore 的每檔證券保存執行狀態 (最後累乘值、最後有效收盤價、
+      歷史最小/最大值、移動平均視窗尾端)，新交易日到來時只處理新增的列，全市場每日更新不必重算歷史
+
+儲存 ({行情目錄}/indicators/):
+    meta.json、{欄位}.bin   # market_matrix.MarketMatrix: cum_growth (float64)、sma_{視窗} (float32)
+    state.npz               # 執行狀態、已處理的列數與行情的寫入序號 (行情覆寫近期列時由覆寫的列重算)
+
+min-max 正規化是對累計序列的線性轉換，新高或新低出現時整段都會改變，因此不儲存正規化結果，
+讀取時以狀態中的最小/最大值轉換 (O(讀取的列數))
+
+使用方式:
+    engine = IndicatorEngine(QuoteStore())
+    engine.update()                                    # 只計算尚未處理的交易日
+    engine.frame('cum_growth', codes=['2330'])
+    engine.normalized('cum_growth', codes=['2330'], new_max=7)   # unemployment_rate.ipynb 的縮放
+"""
+
+import os
+
+import numpy as np
+
+from instrumentation import count, span
+from market_matrix import MarketMatrix
+
+DEFAULT_WINDOWS = (20, 60)
+
+# 重算或回補時每次處理的列數 (限制記憶體用量)
+CHUNK_ROWS = 500
+
+# 追蹤歷史最小/最大值的序列
+RANGE_SERIES = ('close', 'cum_growth')
+
+
+def forward_fill(values, initial):
+    """
+    沿日期軸以前一個有效值填補 NaN
+
+    Args:
+        values (np.ndarray): (列, 證券)
+        initial (np.ndarray): (證券,) 區塊之前最後的有效值 (NaN 表示沒有)
+
+    Returns:
+        np.ndarray: (列 + 1, 證券)，第一列為 initial
+    """
+    stacked = np.vstack([initial[None, :], values])
+    rows = np.where(np.isnan(stacked), 0, np.arange(len(stacked))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return stacked[rows, np.arange(stacked.shape[1])]
+
+
+class IndicatorState:
+    """各證券的執行狀態 (可序列化為 npz)"""
+
+    def __init__(self, n_codes=0, windows=DEFAULT_WINDOWS):
+        self.windows = tuple(int(window) for window in windows)
+        self.n_rows = 0
+        self.last_date = ''
+        self.generation = None
+        self.last_close = np.full(n_codes, np.nan)
+        self.cum_factor = np.full(n_codes, np.nan)
+        self.minimum = {series: np.full(n_codes, np.nan) for series in RANGE_SERIES}
+        self.maximum = {series: np.full(n_codes, np.nan) for series in RANGE_SERIES}
+        self.tail = np.full((max(self.windows) - 1, n_codes), np.nan)
+
+    @property
+    def n_codes(self):
+        return len(self.last_close)
+
+    def extend(self, n_codes):
+        """新上市證券附加到尾端，狀態為尚未有資料"""
+        extra = n_codes - self.n_codes
+        if extra <= 0:
+            return
+        pad = np.full(extra, np.nan)
+        self.last_close = np.concatenate([self.last_close, pad])
+        self.cum_factor = np.concatenate([self.cum_factor, pad])
+        for series in RANGE_SERIES:
+            self.minimum[series] = np.concatenate([self.minimum[series], pad])
+            self.maximum[series] = np.concatenate([self.maximum[series], pad])
+        self.tail = np.hstack([self.tail, np.full((len(self.tail), extra), np.nan)])
+
+    def save(self, path):
+        """寫入暫存檔後再取代"""
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            windows=np.array(self.windows), n_rows=np.array(self.n_rows), last_date=np.array(self.last_date),
+            generation=np.array(-1 if self.generation is None else self.generation),
+            last_close=self.last_close, cum_factor=self.cum_factor, tail=self.tail,
+            **{f'min_{series}': self.minimum[series] for series in RANGE_SERIES},
+            **{f'max_{series}': self.maximum[series] for series in RANGE_SERIES},
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            state = cls(0, data['windows'].tolist())
+            state.n_rows = int(data['n_rows'])
+            state.last_date = str(data['last_date'])
+            # 舊版狀態沒有寫入序號，視為未知
+            generation = int(data['generation']) if 'generation' in data.files else -1
+            state.generation = None if generation < 0 else generation
+            state.last_close = data['last_close']
+            state.cum_factor = data['cum_factor']
+            state.tail = data['tail']
+            for series in RANGE_SERIES:
+                state.minimum[series] = data[f'min_{series}']
+                state.maximum[series] = data[f'max_{series}']
+        return state
+
+
+class IndicatorEngine:
+    """QuoteStore 收盤價的增量指標"""
+
+    def __init__(self, quotes, windows=DEFAULT_WINDOWS, root=None):
+        """
+        Args:
+            quotes (QuoteStore): 行情矩陣
+            windows (tuple): 移動平均視窗 (交易日)
+            root (str): 指標目錄，None表示 {行情目錄}/indicators
+        """
+        self.quotes = quotes
+        self.windows = tuple(sorted(int(window) for window in windows))
+        self.root = root or os.path.join(quotes.root, 'indicators')
+        self.state_path = os.path.join(self.root, 'state.npz')
+        self.matrix = MarketMatrix(self.root, self._fields())
+        self.state = IndicatorState.load(self.state_path) if os.path.exists(self.state_path) else None
+
+    def _fields(self):
+        fields = {'cum_growth': (np.float64, np.nan)}
+        fields.update({f'sma_{window}': (np.float32, np.nan) for window in self.windows})
+        return fields
+
+    def _is_consistent(self):
+        """狀態是否仍對應行情矩陣的前 n_rows 列 (回補較早日期會使行情整份重寫)"""
+        state = self.state
+        if state is None or state.windows != self.windows:
+            return False
+        if state.n_rows != len(self.matrix.dates) or state.n_rows > len(self.quotes.dates):
+            return False
+        return state.n_rows == 0 or self.quotes.dates[state.n_rows - 1] == state.last_date
+
+    def reset(self):
+        """清除指標與狀態，下次 update 由第一個交易日重算"""
+        for field in self.matrix.fields:
+            path = self.matrix.field_path(field)
+            if os.path.exists(path):
+                os.remove(path)
+        for path in (self.matrix.meta_path, self.state_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.matrix = MarketMatrix(self.root, self._fields())
+        self.state = IndicatorState(0, self.windows)
+
+    def update(self):
+        """
+        計算行情矩陣中尚未處理的交易日
+
+        Returns:
+            int: 新處理的交易日數
+        """
+        if not self._is_consistent():
+            if self.state is not None:
+                count('indicators.rebuild')
+                print("指標狀態與行情不一致 (回補或視窗變更)，由第一個交易日重算")
+            self.reset()
+        else:
+            changed = self.quotes.changed_since(self.state.generation)
+            if changed < self.state.n_rows:
+                count('indicators.recompute')
+                print(f"行情自 {self.quotes.dates[changed]} 起已覆寫，由該日重算指標")
+                self.rewind(changed)
+
+        start = self.state.n_rows
+        total = len(self.quotes.dates)
+        close = self.quotes.open('close')
+        with span('indicators.update'):
+            for offset in range(start, total, CHUNK_ROWS):
+                stop = min(offset + CHUNK_ROWS, total)
+                self._process(offset, stop, np.asarray(close[offset:stop], dtype=np.float64))
+        if self.state.generation != self.quotes.generation:
+            self.state.generation = self.quotes.generation
+            os.makedirs(self.root, exist_ok=True)
+            self.state.save(self.state_path)
+        return total - start
+
+    def rewind(self, row):
+        """
+        狀態回到行情第 row 列之前，之後的列由下次 update 重算
+
+        由已儲存的收盤價與 cum_growth 重建狀態 (讀取前 row 列，不重算指標)
+
+        Args:
+            row (int): 第一個要重算的列
+        """
+        if row <= 0:
+            self.reset()
+            return
+        n_codes = len(self.matrix.codes)
+        state = IndicatorState(n_codes, self.windows)
+        close = self.quotes.open('close')
+        cum_growth = self.matrix.open('cum_growth')
+        for offset in range(0, row, CHUNK_ROWS):
+            stop = min(offset + CHUNK_ROWS, row)
+            block = np.asarray(close[offset:stop, :n_codes], dtype=np.float64)
+            state.last_close = forward_fill(block, state.last_close)[-1]
+            for series, values in (('close', block), ('cum_growth', np.asarray(cum_growth[offset:stop]))):
+                state.minimum[series] = np.fmin(state.minimum[series], np.fmin.reduce(values, axis=0))
+                state.maximum[series] = np.fmax(state.maximum[series], np.fmax.reduce(values, axis=0))
+        state.cum_factor = np.asarray(cum_growth[row - 1], dtype=np.float64) + 1
+        recent = np.asarray(close[max(row - len(state.tail), 0):row, :n_codes], dtype=np.float64)
+        if len(recent):
+            state.tail[len(state.tail) - len(recent):] = recent
+        state.n_rows = row
+        state.last_date = self.quotes.dates[row - 1]
+        self.state = state
+
+    def _process(self, start, stop, block):
+        """處理行情矩陣第 start ~ stop 列並寫入指標與狀態"""
+        state = self.state
+        n_codes = block.shape[1]
+        state.extend(n_codes)
+
+        # 累計成長率: 缺漏收盤價沿用前一日 (即 close.ffill().pct_change())，停牌前後的漲跌不會遺失；第一筆報酬為 0
+        filled = forward_fill(block, state.last_close)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            growth_factor = 1 + (filled[1:] / filled[:-1] - 1)
+        growth_factor[np.isnan(filled[:-1])] = 1.0
+        initial = np.where(np.isnan(state.cum_factor), 1.0, state.cum_factor)
+        cum_factor = np.cumprod(np.vstack([initial[None, :], growth_factor]), axis=0)[1:]
+        cum_factor[np.isnan(filled[1:])] = np.nan
+        cum_growth = cum_factor - 1
+
+        arrays = {'cum_growth': cum_growth}
+        history = np.vstack([state.tail, block])
+        for window in self.windows:
+            recent = history[len(state.tail) - (window - 1):]
+            windows = np.lib.stride_tricks.sliding_window_view(recent, window, axis=0)
+            arrays[f'sma_{window}'] = windows.mean(axis=-1)
+
+        dates = self.quotes.dates[start:stop]
+        self.matrix.write_arrays(dates, self.quotes.codes[:n_codes], arrays)
+
+        state.last_close = filled[-1]
+        state.cum_factor = cum_factor[-1]
+        for series, values in (('close', block), ('cum_growth', cum_growth)):
+            # fmin/fmax 略過 NaN，整欄都是 NaN 時維持 NaN
+            state.minimum[series] = np.fmin(state.minimum[series], np.fmin.reduce(values, axis=0))
+            state.maximum[series] = np.fmax(state.maximum[series], np.fmax.reduce(values, axis=0))
+        state.tail = history[len(history) - len(state.tail):] if len(state.tail) else state.tail
+        state.n_rows = stop
+        state.last_date = dates[-1]
+        state.generation = self.quotes.generation
+        os.makedirs(self.root, exist_ok=True)
+        state.save(self.state_path)
+
+    def frame(self, field, codes=None, start=None, end=None):
+        """指標的 日期 × 證券 表 (欄位: cum_growth、sma_{視窗})"""
+        return self.matrix.frame(field, codes, start, end)
+
+    def normalized(self, series='close', codes=None, start=None, end=None, new_min=0.0, new_max=1.0):
+        """
+        min-max 正規化序列
+
+        未指定日期區間時以狀態中的全期最小/最大值轉換，不必掃描歷史；指定區間時以區間內的最小/最大值
+        (與筆記本對下載區間正規化相同)
+
+        Args:
+            series (str): 'close' 或 'cum_growth'
+            codes (list): 證券代號，None表示全部
+            start (str): 起始日
+            end (str): 結束日
+            new_min (float): 轉換後的最小值
+            new_max (float): 轉換後的最大值
+
+        Returns:
+            pd.DataFrame: 日期 × 證券
+        """
+        source = self.quotes if series == 'close' else self.matrix
+        frame = source.frame(series, codes, start, end).astype(np.float64)
+        if start is None and end is None:
+            positions = source.positions(frame.columns)
+            low, high = self.state.minimum[series][positions], self.state.maximum[series][positions]
+        else:
+            low, high = np.nanmin(frame.to_numpy(), axis=0), np.nanmax(frame.to_numpy(), axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = (new_max - new_min) / (high - low)
+        return (frame - low) * scale + new_min
+
+
+def update_indicators(quotes=None, windows=DEFAULT_WINDOWS, rebuild=False):
+    """
+    更新行情矩陣的增量指標
+
+    Args:
+        quotes (QuoteStore): 行情矩陣，None表示預設目錄
+        windows (tuple): 移動平均視窗
+        rebuild (bool): 清除狀態後重算
+
+    Returns:
+        IndicatorEngine: 更新後的引擎
+    """
+    if quotes is None:
+        from twse_daily_quotes import QuoteStore
+
+        quotes = QuoteStore()
+    engine = IndicatorEngine(quotes, windows)
+    if rebuild:
+        engine.reset()
+    added = engine.update()
+    print(f"✓ 增量指標: 新處理 {added} 個交易日，共 {engine.state.n_rows} 個交易日 × {engine.state.n_codes} 檔證券")
+    return engine
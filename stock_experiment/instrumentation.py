@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+熱點路徑計時與效能剖析
+Hot-path Instrumentation and Profiling
+
+用途: 以輕量的計時區段 (span) 與計數器記錄爬蟲、財報抓取、比率計算、評分、T86 抓取等路徑的耗時，
+      彙整 p50/p95 延遲、吞吐量與錯誤數，輸出為 JSON 或 Prometheus textfile，並提供可選的 cProfile 模式
+
+啟用方式 (預設關閉，關閉時每次呼叫只多一次旗標判斷):
+    TW_STOCK_INSTRUMENT=1                          啟用計時
+    TW_STOCK_METRICS_PATH=metrics.json|metrics.prom  程式結束時輸出統計 (依副檔名決定格式)
+    TW_STOCK_PROFILE=run.prof                      以 cProfile 剖析整個程式，結束時寫入 (可用 snakeviz 檢視)
+
+使用方式:
+    from instrumentation import span, timed, count
+
+    with span('etf.constituents_fetch'):
+        ...
+
+    @timed('score.industry_score')
+    def calculate_industry_score(...): ...
+
+py-spy 不需要本模組協助: 計時區段只是一般的 context manager，不改變呼叫堆疊，
+可直接 `py-spy record -o profile.svg -- python taiwan_etf_scraper.py`
+"""
+
+import atexit
+import functools
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+ENABLE_ENV = 'TW_STOCK_INSTRUMENT'
+METRICS_PATH_ENV = 'TW_STOCK_METRICS_PATH'
+PROFILE_ENV = 'TW_STOCK_PROFILE'
+
+# 每個區段保留的最大樣本數，超過時以蓄水池抽樣維持分位數估計，避免長時間執行記憶體無限成長
+MAX_SAMPLES = 10000
+
+
+class _NullSpan:
+    """停用時使用的空區段，共用同一個實例避免配置成本"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class SpanStats:
+    """單一區段的統計"""
+
+    __slots__ = ('count', 'errors', 'total', 'max', 'samples', 'first_start', 'last_end', '_seen')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = []
+        self.first_start = None
+        self.last_end = None
+        self._seen = 0
+
+    def add(self, start, duration, error, rng):
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        if error:
+            self.errors += 1
+        if self.first_start is None or start < self.first_start:
+            self.first_start = start
+        end = start + duration
+        if self.last_end is None or end > self.last_end:
+            self.last_end = end
+
+        self._seen += 1
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(duration)
+        else:
+            slot = rng.randrange(self._seen)
+            if slot < MAX_SAMPLES:
+                self.samples[slot] = duration
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        wall = (self.last_end - self.first_start) if self.count else 0.0
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'total_seconds': self.total,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'p50_ms': _percentile(ordered, 0.50) * 1000,
+            'p95_ms': _percentile(ordered, 0.95) * 1000,
+            'max_ms': self.max * 1000,
+            'throughput_per_second': self.count / wall if wall > 0 else None,
+        }
+
+
+class Span:
+    """計時區段，離開時記錄耗時，區段內拋出例外時計為錯誤"""
+
+    __slots__ = ('registry', 'name', 'start')
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.record(self.name, self.start, time.perf_counter() - self.start, exc_type is not None)
+        return False
+
+
+class Instrumentation:
+    """計時區段與計數器的登錄處"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.spans = {}
+        self.counters = {}
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+
+    def span(self, name):
+        """
+        建立計時區段
+
+        Args:
+            name (str): 區段名稱，以 '.' 分層 (如 'etf.constituents_fetch')
+
+        Returns:
+            context manager: 停用時為共用的空區段
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name)
+
+    def record(self, name, start, duration, error=False):
+        """記錄一次區段耗時"""
+        with self._lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = SpanStats()
+            stats.add(start, duration, error, self._rng)
+
+    def count(self, name, value=1):
+        """
+        累加計數器
+
+        Args:
+            name (str): 計數器名稱
+            value (int | float): 增加量
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self):
+        """
+        彙整所有區段與計數器
+
+        Returns:
+            dict: 包含 started_at、spans (各區段 count、errors、p50_ms、p95_ms、throughput...) 與 counters
+        """
+        with self._lock:
+            return {
+                'started_at': self.started_at,
+                'exported_at': datetime.now().isoformat(timespec='seconds'),
+                'spans': {name: stats.summary() for name, stats in sorted(self.spans.items())},
+                'counters': dict(sorted(self.counters.items())),
+            }
+
+    def reset(self):
+        """清除所有統計"""
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+            self.started_at = datetime.now().isoformat(timespec='seconds')
+
+    def export_json(self, path):
+        """輸出 JSON 統計"""
+        _atomic_write(path, json.dumps(self.summary(), ensure_ascii=False, indent=2))
+
+    def export_prometheus(self, path, prefix='tw_stock'):
+        """
+        輸出 Prometheus textfile (供 node_exporter textfile collector 讀取)
+
+        Args:
+            path (str): 輸出路徑 (.prom)
+            prefix (str): 指標名稱前綴
+        """
+        _atomic_write(path, self.prometheus_text(prefix))
+
+    def prometheus_text(self, prefix='tw_stock'):
+        """產生 Prometheus 文字格式"""
+        summary = self.summary()
+        lines = [
+            f"# HELP {prefix}_span_seconds 計時區段耗時",
+            f"# TYPE {prefix}_span_seconds summary",
+        ]
+        for name, stats in summary['spans'].items():
+            label = f'span="{_escape_label(name)}"'
+            lines.append(f'{prefix}_span_seconds{{{label},quantile="0.5"}} {stats["p50_ms"] / 1000:.6f}')
+            lines.append(f'{prefix}_span_seconds{{{label},quantile="0.95"}} {stats["p95_ms"] / 1000:.6f}')
+            lines.append(f'{prefix}_span_seconds_sum{{{label}}} {stats["total_seconds"]:.6f}')
+            lines.append(f'{prefix}_span_seconds_count{{{label}}} {stats["count"]}')
+
+        lines.append(f"# HELP {prefix}_span_errors_total 計時區段內發生例外的次數")
+        lines.append(f"# TYPE {prefix}_span_errors_total counter")
+        for name, stats in summary['spans'].items():
+            lines.append(f'{prefix}_span_errors_total{{span="{_escape_label(name)}"}} {stats["errors"]}')
+
+        lines.append(f"# HELP {prefix}_events_total 計數器")
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        for name, value in summary['counters'].items():
+            lines.append(f'{prefix}_events_total{{name="{_escape_label(name)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path):
+        """依副檔名輸出 (.prom 為 Prometheus，其餘為 JSON)"""
+        if path.endswith('.prom'):
+            self.export_prometheus(path)
+        else:
+            self.export_json(path)
+
+    def print_report(self):
+        """列印統計表"""
+        summary = self.summary()
+        if not summary['spans'] and not summary['counters']:
+            print("沒有計時資料 (是否已設定 TW_STOCK_INSTRUMENT=1?)")
+            return
+
+        print("=" * 90)
+        print(f"{'區段':32s} {'次數':>7s} {'錯誤':>5s} {'總耗時(s)':>10s} {'p50(ms)':>9s} {'p95(ms)':>9s} {'每秒':>8s}")
+        print("-" * 90)
+        for name, stats in sorted(summary['spans'].items(), key=lambda item: -item[1]['total_seconds']):
+            throughput = f"{stats['throughput_per_second']:.1f}" if stats['throughput_per_second'] else '-'
+            print(f"{name:32s} {stats['count']:7d} {stats['errors']:5d} {stats['total_seconds']:10.3f} "
+                  f"{stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} {throughput:>8s}")
+        for name, value in summary['counters'].items():
+            print(f"  {name}: {value}")
+        print("=" * 90)
+
+
+def _percentile(ordered, q):
+    """已排序樣本的線性內插分位數"""
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _atomic_write(path, text):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+# ----------------------------------------------------------------------
+# 模組層級的預設登錄處
+# ----------------------------------------------------------------------
+
+_default = Instrumentation(enabled=os.environ.get(ENABLE_ENV, '').lower() in ('1', 'true', 'yes'))
+
+
+def get_instrumentation():
+    """取得程序共用的登錄處"""
+    return _default
+
+
+def enable():
+    """啟用計時"""
+    _default.enabled = True
+
+
+def disable():
+    """停用計時"""
+    _default.enabled = False
+
+
+def span(name):
+    """於預設登錄處建立計時區段，見 Instrumentation.span"""
+    if not _default.enabled:
+        return _NULL_SPAN
+    return Span(_default, name)
+
+
+def count(name, value=1):
+    """於預設登錄處累加計數器"""
+    if _default.enabled:
+        _default.count(name, value)
+
+
+def timed(name):
+    """
+    將函數整體納入計時區段的裝飾器
+
+    Args:
+        name (str): 區段名稱
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _default.enabled:
+                return func(*args, **kwargs)
+            with Span(_default, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def profiling(path=None, sort='cumulative', limit=30):
+    """
+    以 cProfile 剖析區塊
+
+    Args:
+        path (str): 剖析結果輸出路徑 (pstats 格式)，None表示只列印
+        sort (str): 列印時的排序欄位
+        limit (int): 列印的函數數量
+
+    Example:
+        with profiling('nightly.prof'):
+            scraper.collect_all_etf_data()
+    """
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if path:
+            profiler.dump_stats(path)
+            print(f"cProfile 結果已儲存至: {path}")
+        else:
+            pstats.Stats(profiler).sort_stats(sort).print_stats(limit)
+
+
+def _install_exit_hooks():
+    """依環境變數在程式結束時輸出統計與剖析結果"""
+    metrics_path = os.environ.get(METRICS_PATH_ENV)
+    if metrics_path:
+        _default.enabled = True
+        atexit.register(_default.export, metrics_path)
+
+    profile_path = os.environ.get(PROFILE_ENV)
+    if profile_path:
+        session = profiling(profile_path)
+        session.__enter__()
+        atexit.register(session.__exit__, None, None, None)
+
+
+_install_exit_hooks()
@@ -0,0 +1,656 @@
+#!/usr/bin/env python3
+"""
+日期 × 證券 記憶體映射矩陣
+Memory-Mapped Market Matrices
+
+用途: 收盤價、報酬與三大法人各類買賣超共用的磁碟格式。每個欄位是一個 row-major 原始陣列，
+      日期軸與證券軸記錄在同目錄的 meta.json；任何程序以 np.memmap 開啟即為零複製的唯讀視圖，
+      多個分析程序同時讀取全市場時共用作業系統的頁面快取，不必各自載入 pandas 表格再對齊索引
+
+儲存格式 ({root}/):
+    meta.json       # dates、codes (欄位順序)、capacity、fields (dtype 與缺值)、names、closed_dates、
+                    # generation 與 changes (最近各次寫入的第一個變更列，供衍生資料判斷要重算的範圍)
+    {欄位}.bin      # 形狀 (日期數, capacity)
+
+新證券依出現順序附加到證券軸尾端，既有證券位置不變；證券軸預留容量，新增交易日只附加列，
+重寫最近幾列時就地覆寫；回補較早的日期、容量不足或新增欄位時才整份重寫
+
+目前的矩陣:
+    data/market_quotes/   twse_daily_quotes.QuoteStore (開高低收量、報酬)
+    data/market_flows/    FlowMatrix (三大法人各類買賣超股數)
+
+使用方式:
+    quotes, flows = QuoteStore(), FlowMatrix()
+    quotes.open('returns')[-250:, quotes.positions(['2330', '2317'])]
+    flow_price_correlations(quotes, flows, start='2023-01-01')
+    parallel_flow_correlations(quotes.root, flows.root, processes=4)
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from instrumentation import count, span
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FLOWS_DIR = os.path.join(REPO_ROOT, 'data', 'market_flows')
+
+# 證券軸容量以此為單位成長，新上市證券通常不需要重寫
+CODE_BLOCK = 256
+
+# 沒有既有資料且未指定起始日時回補的天數
+DEFAULT_BACKFILL_DAYS = 365
+
+# 每累積這麼多交易日寫入一次，中斷時已寫入的日期不必重抓
+FLUSH_DAYS = 60
+
+# meta.json 保留的寫入紀錄筆數；衍生資料落後更多次寫入時整份重算
+CHANGE_LOG_SIZE = 100
+
+# 三大法人各類買賣超 → T86 欄位 (2018-01-02 之後的格式)
+FLOW_FIELDS = {
+    'foreign': '外陸資買賣超股數(不含外資自營商)',
+    'foreign_dealer': '外資自營商買賣超股數',
+    'trust': '投信買賣超股數',
+    'dealer': '自營商買賣超股數',
+    'total': '三大法人買賣超股數',
+}
+
+# major_investors_movements.ipynb 的三大法人加權 (外資、投信、自營商)
+FLOW_WEIGHTS = {'foreign': 0.7, 'trust': 0.2, 'dealer': 0.1}
+
+
+def _atomic_write_json(path, data):
+    """寫入暫存檔後再取代，避免中斷時留下不完整的檔案"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _capacity_for(n_codes):
+    """預留至少一個 CODE_BLOCK 的空間"""
+    return (n_codes // CODE_BLOCK + 1) * CODE_BLOCK
+
+
+class MarketMatrix:
+    """日期 × 證券 的記憶體映射欄位集合"""
+
+    # 欄位 → (dtype, 缺值)；整數欄位沒有 NaN，以 0 表示當日沒有資料
+    FIELDS = {}
+
+    def __init__(self, root, fields=None):
+        """
+        Args:
+            root (str): 儲存目錄
+            fields (dict): 欄位 → (dtype, 缺值)，None表示使用類別的 FIELDS
+        """
+        self.root = root
+        self.fields = {name: (np.dtype(dtype), fill) for name, (dtype, fill) in (fields or self.FIELDS).items()}
+        self.meta_path = os.path.join(root, 'meta.json')
+        self._load_meta()
+
+    def _load_meta(self):
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        else:
+            meta = {}
+        self.dates = meta.get('dates', [])
+        self.codes = meta.get('codes', [])
+        self.names = meta.get('names', {})
+        self.capacity = meta.get('capacity', 0)
+        self.closed_dates = set(meta.get('closed_dates', []))
+        self.generation = meta.get('generation', 0)
+        self.changes = meta.get('changes', [])
+        # 既有矩陣沒有的欄位 (如新版新增的欄位) 在下次寫入時補齊；舊版 meta 沒有 fields 時以檔案判斷
+        if 'fields' in meta:
+            self.stored_fields = set(meta['fields'])
+        else:
+            self.stored_fields = {field for field in self.fields if os.path.exists(self.field_path(field))}
+        self.code_index = {code: i for i, code in enumerate(self.codes)}
+
+    def _save_meta(self):
+        os.makedirs(self.root, exist_ok=True)
+        _atomic_write_json(self.meta_path, {
+            'dates': self.dates,
+            'codes': self.codes,
+            'names': self.names,
+            'capacity': self.capacity,
+            'fields': {name: [dtype.str, None if np.isnan(fill) else fill]
+                       for name, (dtype, fill) in self.fields.items() if name in self.stored_fields},
+            'closed_dates': sorted(self.closed_dates),
+            'generation': self.generation,
+            'changes': self.changes,
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+        })
+
+    def field_path(self, field):
+        """欄位的原始陣列路徑"""
+        return os.path.join(self.root, f"{field}.bin")
+
+    @property
+    def shape(self):
+        """(日期數, 證券數)"""
+        return len(self.dates), len(self.codes)
+
+    # ------------------------------------------------------------------
+    # 讀取
+    # ------------------------------------------------------------------
+
+    def open(self, field, mode='r'):
+        """
+        記憶體映射陣列
+
+        Args:
+            field (str): 欄位
+            mode (str): 'r' 唯讀 (多程序共用頁面快取)，'r+' 可寫
+
+        Returns:
+            np.ndarray: (日期數, 證券數) 的視圖，不會載入整個檔案
+        """
+        dtype, fill = self.fields[field]
+        if not self.dates:
+            return np.empty((0, len(self.codes)), dtype=dtype)
+        if field not in self.stored_fields:
+            return np.full(self.shape, fill, dtype=dtype)
+        array = np.memmap(self.field_path(field), dtype=dtype, mode=mode, shape=(len(self.dates), self.capacity))
+        return array[:, :len(self.codes)]
+
+    def changed_since(self, generation):
+        """
+        某次寫入之後第一個變更的列
+
+        Args:
+            generation (int): 衍生資料處理到的寫入序號，None表示未知
+
+        Returns:
+            int: 列位置；之後沒有寫入時為日期數，寫入紀錄已不足以判斷時為 0
+        """
+        if generation == self.generation:
+            return len(self.dates)
+        logged = [row for written, row in self.changes if written > (generation or 0)]
+        if generation is None or generation > self.generation or len(logged) < self.generation - generation:
+            return 0
+        return min(logged)
+
+    def positions(self, codes):
+        """
+        證券代號在證券軸上的位置
+
+        Args:
+            codes (list): 證券代號 (可帶 .TW)
+
+        Returns:
+            np.ndarray: 位置，不存在的代號為 -1
+        """
+        return np.array([self.code_index.get(str(code).split('.')[0], -1) for code in codes], dtype=np.int64)
+
+    def date_slice(self, start=None, end=None):
+        """日期區間 [start, end] 在日期軸上的 slice"""
+        lo = int(np.searchsorted(self.dates, start)) if start else 0
+        hi = int(np.searchsorted(self.dates, end, side='right')) if end else len(self.dates)
+        return slice(lo, hi)
+
+    def align(self, other, start=None, end=None):
+        """
+        與另一個矩陣共同的日期與證券
+
+        Args:
+            other (MarketMatrix): 另一個矩陣
+            start (str): 起始日
+            end (str): 結束日
+
+        Returns:
+            tuple: (dates, codes, 本矩陣列位置, 本矩陣欄位置, other 列位置, other 欄位置)
+        """
+        window = self.date_slice(start, end)
+        other_dates = {date: i for i, date in enumerate(other.dates)}
+        rows = np.array([row for row in range(window.start, window.stop) if self.dates[row] in other_dates],
+                        dtype=np.int64)
+        dates = [self.dates[row] for row in rows]
+        codes = [code for code in self.codes if code in other.code_index]
+        other_rows = np.array([other_dates[date] for date in dates], dtype=np.int64)
+        return dates, codes, rows, self.positions(codes), other_rows, other.positions(codes)
+
+    def frame(self, field, codes=None, start=None, end=None):
+        """
+        單一欄位的 日期 × 證券 表
+
+        Args:
+            field (str): 欄位
+            codes (list): 證券代號 (可帶 .TW)，None表示全部
+            start (str): 起始日 'YYYY-MM-DD'
+            end (str): 結束日 'YYYY-MM-DD'
+
+        Returns:
+            pd.DataFrame: 日期為索引、證券代號為欄位
+        """
+        import pandas as pd
+
+        array = self.open(field)
+        window = self.date_slice(start, end)
+        if codes is None:
+            columns, values = self.codes, array[window]
+        else:
+            columns = [str(code).split('.')[0] for code in codes]
+            columns = [code for code in columns if code in self.code_index]
+            values = array[window, self.positions(columns)]
+        return pd.DataFrame(np.asarray(values), index=pd.DatetimeIndex(self.dates[window], name='Date'),
+                            columns=columns)
+
+    # ------------------------------------------------------------------
+    # 寫入
+    # ------------------------------------------------------------------
+
+    def write_days(self, rows_by_date, closed_dates=()):
+        """
+        寫入多個交易日
+
+        容量足夠且欄位齊全時，晚於既有最後一日的日期附加列寫入；由某一既有日期起涵蓋其後全部既有日期時
+        就地覆寫這些列 (重算近期資料)；其他情況 (如回補較早的日期) 整份重寫
+
+        Args:
+            rows_by_date (dict): {'YYYY-MM-DD': 證券代號為索引、欄位為 FIELDS 的 DataFrame (可含 name 欄)}，
+                缺少的欄位以缺值填入
+            closed_dates (iterable): 查詢過但休市的日期，之後不再請求
+
+        Returns:
+            int: 寫入的交易日數
+        """
+        self.closed_dates.update(closed_dates)
+        days = {date: rows for date, rows in rows_by_date.items() if rows is not None and not rows.empty}
+        if not days:
+            self._save_meta()
+            return 0
+
+        new_dates = sorted(days)
+        codes = list(self.codes)
+        known = set(codes)
+        for date in new_dates:
+            rows = days[date]
+            for code in rows.index:
+                if code not in known:
+                    known.add(code)
+                    codes.append(code)
+            if 'name' in rows:
+                self.names.update(rows['name'].to_dict())
+        code_index = {code: i for i, code in enumerate(codes)}
+
+        arrays = {field: np.full((len(new_dates), len(codes)), fill, dtype=dtype)
+                  for field, (dtype, fill) in self.fields.items()}
+        for i, date in enumerate(new_dates):
+            frame = days[date]
+            columns = np.fromiter((code_index[code] for code in frame.index), dtype=np.int64, count=len(frame))
+            for field in self.fields:
+                if field in frame:
+                    arrays[field][i, columns] = frame[field].to_numpy()
+        self._write(new_dates, codes, arrays)
+        return len(new_dates)
+
+    def write_arrays(self, dates, codes, arrays):
+        """
+        以陣列寫入多個交易日 (規則同 write_days)
+
+        Args:
+            dates (list): 'YYYY-MM-DD'，與既有日期相同時取代該日資料
+            codes (list): 陣列欄位對應的證券代號
+            arrays (dict): 欄位 → (len(dates), len(codes)) 陣列，缺少的欄位以缺值填入
+
+        Returns:
+            int: 寫入的交易日數
+        """
+        if not len(dates):
+            return 0
+        all_codes = list(self.codes) + [code for code in codes if code not in self.code_index]
+        all_index = {code: i for i, code in enumerate(all_codes)}
+        columns = np.array([all_index[code] for code in codes], dtype=np.int64)
+        order = np.argsort(dates, kind='stable')
+        full = {}
+        for field, (dtype, fill) in self.fields.items():
+            values = np.full((len(dates), len(all_codes)), fill, dtype=dtype)
+            if field in arrays:
+                values[:, columns] = arrays[field]
+            full[field] = values[order]
+        self._write([dates[i] for i in order], all_codes, full)
+        return len(dates)
+
+    def _write(self, new_dates, codes, arrays):
+        """寫入排序後的新日期，arrays 為 欄位 → (len(new_dates), len(codes))"""
+        first_row = int(np.searchsorted(self.dates, new_dates[0])) if self.dates else 0
+        replaced = self.dates[first_row:]
+        in_place = (self.dates and new_dates[:len(replaced)] == replaced and len(codes) <= self.capacity
+                    and self.stored_fields >= set(self.fields))
+        with span('matrix.write'):
+            if in_place:
+                if replaced:
+                    self._overwrite_rows(first_row, {field: values[:len(replaced)] for field, values in arrays.items()})
+                if len(new_dates) > len(replaced):
+                    self._append_rows(new_dates[len(replaced):],
+                                      {field: values[len(replaced):] for field, values in arrays.items()})
+            else:
+                first_row = 0
+                self._rewrite(new_dates, codes, arrays)
+        self.codes = codes
+        self.code_index = {code: i for i, code in enumerate(codes)}
+        self.stored_fields = set(self.fields)
+        self.generation += 1
+        self.changes = (self.changes + [[self.generation, first_row]])[-CHANGE_LOG_SIZE:]
+        self._after_write(first_row)
+        self._save_meta()
+
+    def _after_write(self, first_row):
+        """寫入後更新衍生欄位 (first_row 之後的列已變更)，子類別覆寫"""
+
+    def _padded(self, values, capacity, fill):
+        """(列, 證券數) 補到 (列, capacity)"""
+        if values.shape[1] == capacity:
+            return values
+        padded = np.full((values.shape[0], capacity), fill, dtype=values.dtype)
+        padded[:, :values.shape[1]] = values
+        return padded
+
+    def _overwrite_rows(self, first_row, arrays):
+        """就地覆寫 first_row 起到最後一列的既有列"""
+        for field, (dtype, fill) in self.fields.items():
+            array = np.memmap(self.field_path(field), dtype=dtype, mode='r+', shape=(len(self.dates), self.capacity))
+            array[first_row:] = self._padded(arrays[field], self.capacity, fill)
+            array.flush()
+            del array
+        count('matrix.overwrite')
+
+    def _append_rows(self, dates, arrays):
+        for field, (dtype, fill) in self.fields.items():
+            values = self._padded(arrays[field], self.capacity, fill)
+            row_bytes = self.capacity * dtype.itemsize
+            with open(self.field_path(field), 'r+b') as f:
+                # 上次中斷時可能已附加但未更新 meta，先截掉多出的列
+                f.truncate(len(self.dates) * row_bytes)
+                f.seek(0, os.SEEK_END)
+                f.write(values.tobytes())
+        self.dates = self.dates + dates
+
+    def _rewrite(self, new_dates, codes, arrays):
+        capacity = max(self.capacity, _capacity_for(len(codes)))
+        all_dates = sorted(set(self.dates) | set(new_dates))
+        positions = {date: i for i, date in enumerate(all_dates)}
+        old_rows = np.array([positions[date] for date in self.dates], dtype=np.int64)
+        new_rows = np.array([positions[date] for date in new_dates], dtype=np.int64)
+
+        os.makedirs(self.root, exist_ok=True)
+        for field, (dtype, fill) in self.fields.items():
+            values = np.full((len(all_dates), capacity), fill, dtype=dtype)
+            if self.dates and field in self.stored_fields:
+                values[old_rows, :len(self.codes)] = self.open(field)
+            values[new_rows, :len(codes)] = arrays[field]
+            tmp_path = f"{self.field_path(field)}.tmp"
+            values.tofile(tmp_path)
+            os.replace(tmp_path, self.field_path(field))
+        count('matrix.rewrite')
+        self.dates = all_dates
+        self.capacity = capacity
+
+    def missing_dates(self, start, end):
+        """
+        區間內尚未儲存、也不是已知休市日的平日
+
+        Args:
+            start (datetime): 起始日
+            end (datetime): 結束日
+
+        Returns:
+            list: datetime，由舊到新
+        """
+        stored = set(self.dates) | self.closed_dates
+        dates = []
+        current = start
+        while current <= end:
+            if current.weekday() < 5 and current.strftime('%Y-%m-%d') not in stored:
+                dates.append(current)
+            current += timedelta(days=1)
+        return dates
+
+    def summary(self):
+        """儲存規模摘要"""
+        return {
+            'dates': len(self.dates),
+            'codes': len(self.codes),
+            'first_date': self.dates[0] if self.dates else None,
+            'last_date': self.dates[-1] if self.dates else None,
+            'capacity': self.capacity,
+            'closed_dates': len(self.closed_dates),
+        }
+
+
+def update_matrix(matrix, fetch_day, start_date=None, end_date=None, http=None, max_workers=4, label='每日資料'):
+    """
+    回補並增量更新矩陣
+
+    只請求尚未儲存、也不是已知休市日的平日；請求以多執行緒並行，實際頻率由 HTTPClient 的主機限速控制
+    某日請求失敗時只寫入該日之前的資料並停止，避免之後的交易日把缺口當成相鄰交易日 (報酬、連續買賣超)；
+    下次更新由第一個儲存日掃描，缺口會再次請求
+
+    Args:
+        matrix (MarketMatrix): 要更新的矩陣
+        fetch_day (callable): fetch_day(date, http) 回傳當日 證券代號為索引 的 DataFrame，休市為 None
+        start_date (str): 起始日 'YYYY-MM-DD'，None表示第一個儲存日 (沒有資料時往前 DEFAULT_BACKFILL_DAYS 天)
+        end_date (str): 結束日 'YYYY-MM-DD'，None表示今天
+        http (HTTPClient): HTTP客戶端
+        max_workers (int): 同時請求數
+        label (str): 訊息中的資料名稱
+
+    Returns:
+        int: 新增的交易日數
+    """
+    end = datetime.strptime(end_date, '%Y-%m-%d') if end_date else datetime.now()
+    if start_date:
+        start = datetime.strptime(start_date, '%Y-%m-%d')
+    elif matrix.dates:
+        # 已儲存與已知休市的日期直接略過，由第一個儲存日開始可補回先前失敗留下的缺口
+        start = datetime.strptime(matrix.dates[0], '%Y-%m-%d')
+    else:
+        start = end - timedelta(days=DEFAULT_BACKFILL_DAYS)
+
+    dates = matrix.missing_dates(start, end)
+    if not dates:
+        print(f"{label}已是最新")
+        return 0
+    print(f"更新{label}: {dates[0]:%Y-%m-%d} ~ {dates[-1]:%Y-%m-%d} ({len(dates)} 個平日)")
+
+    started = time.perf_counter()
+    added = 0
+    for offset in range(0, len(dates), FLUSH_DAYS):
+        batch = dates[offset:offset + FLUSH_DAYS]
+        rows_by_date, closed, failed = {}, [], []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(fetch_day, date, http): date for date in batch}
+            for future in as_completed(futures):
+                date = futures[future]
+                key = date.strftime('%Y-%m-%d')
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    count('matrix.day_failed')
+                    print(f"該日缺失: {key} ({e})")
+                    failed.append(key)
+                    continue
+                if rows is None:
+                    # 今天的資料可能尚未公布，不記為休市
+                    if date.date() < datetime.now().date():
+                        closed.append(key)
+                else:
+                    rows_by_date[key] = rows
+        if failed:
+            first_failed = min(failed)
+            rows_by_date = {key: rows for key, rows in rows_by_date.items() if key < first_failed}
+            closed = [key for key in closed if key < first_failed]
+            added += matrix.write_days(rows_by_date, closed)
+            print(f"⚠️ {first_failed} 請求失敗，停止於此日之前 (新增 {added} 個交易日)，下次更新會重試")
+            break
+        added += matrix.write_days(rows_by_date, closed)
+        print(f"  已處理 {min(offset + FLUSH_DAYS, len(dates))}/{len(dates)} 天，新增 {added} 個交易日 "
+              f"({time.perf_counter() - started:.0f} 秒)")
+
+    summary = matrix.summary()
+    print(f"✓ {label}: {summary['dates']} 個交易日 × {summary['codes']} 檔證券 "
+          f"({summary['first_date']} ~ {summary['last_date']})")
+    return added
+
+
+# ----------------------------------------------------------------------
+# 三大法人買賣超
+# ----------------------------------------------------------------------
+
+class FlowMatrix(MarketMatrix):
+    """三大法人各類買賣超股數 (int64，沒有法人進出的證券為 0)"""
+
+    FIELDS = {field: (np.int64, 0) for field in FLOW_FIELDS}
+
+    def __init__(self, root=FLOWS_DIR):
+        super().__init__(root)
+
+
+def fetch_flow_day(date, http=None):
+    """
+    單日全市場三大法人買賣超
+
+    Returns:
+        pd.DataFrame: 證券代號為索引，欄位為 name 與 FLOW_FIELDS，休市為 None
+    """
+    import pandas as pd
+
+    from t86_flows import CODE_COLUMN, fetch_t86_day
+
+    table = fetch_t86_day(date, http)
+    if table is None or table.empty:
+        return None
+    rows = pd.DataFrame({'name': table['證券名稱'].astype(str).str.strip().to_numpy()},
+                        index=pd.Index(table[CODE_COLUMN].to_numpy(), name='code'))
+    for field, column in FLOW_FIELDS.items():
+        if column in table:
+            values = table[column].astype(str).str.replace(',', '', regex=False)
+            rows[field] = pd.to_numeric(values, errors='coerce').fillna(0).astype(np.int64).to_numpy()
+    return rows[~rows.index.duplicated(keep='first')]
+
+
+def update_flow_matrix(matrix=None, start_date=None, end_date=None, http=None, max_workers=4):
+    """增量更新全市場三大法人買賣超矩陣 (參數同 update_matrix)"""
+    return update_matrix(matrix or FlowMatrix(), fetch_flow_day, start_date, end_date, http, max_workers,
+                         label='全市場三大法人買賣超')
+
+
+# ----------------------------------------------------------------------
+# 全市場分析
+# ----------------------------------------------------------------------
+
+def _standardized_cumsum(values):
+    """
+    各欄標準化後的累計值 (與 major_investors_movements.ipynb 的 StandardScaler + cumsum 相同)
+
+    Args:
+        values (np.ndarray): (日期, 證券)
+
+    Returns:
+        np.ndarray: float64，標準差為 0 的欄位為 NaN
+    """
+    values = values.astype(np.float64)
+    std = values.std(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scaled = (values - values.mean(axis=0)) / np.where(std > 0, std, np.nan)
+    return np.cumsum(scaled, axis=0)
+
+
+def _column_corr(a, b):
+    """兩個 (日期, 證券) 陣列逐欄的相關係數，略過任一方為 NaN 的日期"""
+    valid = np.isfinite(a) & np.isfinite(b)
+    n = valid.sum(axis=0)
+    a = np.where(valid, a, 0.0)
+    b = np.where(valid, b, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_a, mean_b = a.sum(axis=0) / n, b.sum(axis=0) / n
+        da, db = np.where(valid, a - mean_a, 0.0), np.where(valid, b - mean_b, 0.0)
+        corr = (da * db).sum(axis=0) / np.sqrt((da * da).sum(axis=0) * (db * db).sum(axis=0))
+    return np.where(n >= 3, corr, np.nan)
+
+
+def flow_price_correlations(quotes, flows, codes=None, start=None, end=None):
+    """
+    全市場的股價累計報酬與三大法人累計買賣超相關係數
+
+    major_investors_movements.ipynb 的 correlation() 一次套用到所有證券: 累計報酬對
+    各類法人買賣超標準化後的累計值 (另含外資 0.7、投信 0.2、自營商 0.1 的加權)
+
+    Args:
+        quotes (QuoteStore): 行情矩陣 (需要 returns 欄位)
+        flows (FlowMatrix): 買賣超矩陣
+        codes (list): 只計算這些證券，None表示兩者共同的全部證券
+        start (str): 起始日
+        end (str): 結束日
+
+    Returns:
+        pd.DataFrame: 證券代號為索引，欄位為 FLOW_FIELDS 與 weighted
+    """
+    import pandas as pd
+
+    dates, common, rows, columns, flow_rows, flow_columns = quotes.align(flows, start, end)
+    if codes is not None:
+        wanted = {str(code).split('.')[0] for code in codes}
+        keep = np.array([code in wanted for code in common], dtype=bool)
+        common = [code for code, kept in zip(common, keep) if kept]
+        columns, flow_columns = columns[keep], flow_columns[keep]
+
+    with span('matrix.flow_correlations'):
+        returns = np.asarray(quotes.open('returns')[rows][:, columns], dtype=np.float64)
+        # 與 get_stock_from_yf 相同: 缺漏日報酬視為 0 後累乘
+        growth = np.cumprod(1 + np.nan_to_num(returns), axis=0) - 1
+        growth[np.isnan(np.asarray(quotes.open('close')[rows][:, columns]))] = np.nan
+
+        cumulative = {field: _standardized_cumsum(flows.open(field)[flow_rows][:, flow_columns])
+                      for field in FLOW_FIELDS}
+        result = {field: _column_corr(growth, values) for field, values in cumulative.items()}
+        weighted = sum(cumulative[field] * weight for field, weight in FLOW_WEIGHTS.items())
+        result['weighted'] = _column_corr(growth, weighted)
+    return pd.DataFrame(result, index=pd.Index(common, name='code'))
+
+
+def _correlation_worker(quotes_root, flows_root, codes, start, end):
+    """子程序各自以 memmap 開啟矩陣，不經由 pickle 傳遞陣列"""
+    from twse_daily_quotes import QuoteStore
+
+    return flow_price_correlations(QuoteStore(quotes_root), FlowMatrix(flows_root), codes, start, end)
+
+
+def parallel_flow_correlations(quotes_root, flows_root, codes=None, start=None, end=None, processes=4):
+    """
+    以多個程序計算 flow_price_correlations
+
+    各程序只收到矩陣路徑與負責的證券代號，資料由作業系統頁面快取共用
+
+    Args:
+        quotes_root (str): QuoteStore 目錄
+        flows_root (str): FlowMatrix 目錄
+        codes (list): 證券代號，None表示全部
+        start (str): 起始日
+        end (str): 結束日
+        processes (int): 程序數
+
+    Returns:
+        pd.DataFrame: 與 flow_price_correlations 相同
+    """
+    import pandas as pd
+    from concurrent.futures import ProcessPoolExecutor
+
+    from twse_daily_quotes import QuoteStore
+
+    if codes is None:
+        flows = FlowMatrix(flows_root)
+        codes = [code for code in QuoteStore(quotes_root).codes if code in flows.code_index]
+    chunks = [list(chunk) for chunk in np.array_split(np.array(codes, dtype=object), processes) if len(chunk)]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        parts = executor.map(_correlation_worker, *zip(*[(quotes_root, flows_root, chunk, start, end)
+                                                         for chunk in chunks]))
+        return pd.concat(list(parts))
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+個股新聞情緒指數
+Daily News Sentiment Index
+
+用途: finance_news.ipynb 以 split_text_by_length 將新聞切成 chunk，再以 sentiment_model_label 標註
+      label 與 score，但標註結果從未彙總。本模組將 chunk 標註彙總為文章情緒，再彙總為每日每檔證券的
+      情緒指數，以 market_matrix.MarketMatrix 的 日期 × 證券 格式儲存，可直接與行情、法人買賣超矩陣
+      對齊後一次計算全市場相關係數
+
+資料流:
+    data/news_labels.jsonl       標註程序以 record_labels 附加的 chunk 標註 (只附加)
+    data/news_sentiment/
+        articles.csv             文章情緒 (code, article, date, chunks, score)，只附加，同一文章以最後一列為準
+        state.json               已讀取的標註檔位置、半衰期
+        meta.json、{欄位}.bin     每日情緒矩陣，日期軸與行情矩陣的交易日相同
+
+情緒分數:
+    chunk    label 的方向 (正面 +1、負面 -1、中立 0) × 模型信心分數
+    文章     各 chunk 以文字長度加權平均；同一篇文章的 chunk 一起標註，重新標註時整篇取代
+    每日     articles (文章數)、score (平均文章情緒)、decayed (文章情緒以半衰期指數衰減的累計值，
+             沒有新聞時逐日衰減趨近 0)
+    非交易日的新聞歸入下一個交易日；標註含時間 (YYYY-MM-DD HH:MM) 且在收盤 (MARKET_CLOSE) 之後的新聞
+    也歸入下一個交易日。只有日期的新聞 (finance_news.ipynb 目前只保留日期) 無法分辨盤後，歸入當天，
+    same_day 相關係數因此可能含有盤後新聞反映當日報酬的前視偏誤，預測力以 forward_{天期} 判斷
+
+增量更新: 只讀取標註檔新增的行，由受影響的最早交易日起重算到最後一個交易日 (近期列就地覆寫)；
+行情回補較早日期使交易日軸改變時整份重算
+
+使用方式:
+    record_labels('2330', '2024-03-08', link, nlp(chunks), lengths=[len(chunk) for chunk in chunks])
+    index = SentimentIndex()
+    index.update(QuoteStore())
+    sentiment_correlations(index, QuoteStore(), FlowMatrix())
+"""
+
+import json
+import os
+
+import numpy as np
+
+from instrumentation import count, span
+from market_matrix import FLOW_FIELDS, MarketMatrix, _atomic_write_json, _column_corr
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SENTIMENT_DIR = os.path.join(REPO_ROOT, 'data', 'news_sentiment')
+LABELS_PATH = os.path.join(REPO_ROOT, 'data', 'news_labels.jsonl')
+
+# 證交所收盤時間，此時間 (含) 之後的新聞歸入下一個交易日
+MARKET_CLOSE = '13:30'
+
+# 衰減情緒的半衰期 (交易日)
+DEFAULT_HALF_LIFE = 5
+
+# 情緒模型 label → 方向 (finbert-tone-chinese 為 Positive/Negative/Neutral)
+LABEL_POLARITY = {
+    'positive': 1.0,
+    'negative': -1.0,
+    'neutral': 0.0,
+}
+
+ARTICLE_COLUMNS = ['code', 'article', 'date', 'chunks', 'score']
+
+
+def record_labels(code, date, article, labels, lengths=None, path=LABELS_PATH):
+    """
+    附加一篇文章的 chunk 標註
+
+    同一篇文章的 chunk 以一次寫入附加，讀取端不會只讀到部分 chunk
+
+    Args:
+        code (str): 證券代號 (可帶 .TW)
+        date (str): 新聞時間 'YYYY-MM-DD HH:MM' (或 datetime)；只有日期 'YYYY-MM-DD' 時歸入當天
+        article (str): 文章識別 (連結)
+        labels (list): 情緒模型 pipeline 的輸出，每個 chunk 一個 {'label', 'score'}
+        lengths (list): 各 chunk 的文字長度，None表示等權重
+        path (str): 標註檔路徑
+    """
+    code = str(code).split('.')[0]
+    lines = []
+    for chunk, label in enumerate(labels):
+        record = {'code': code, 'date': str(date)[:16], 'article': str(article), 'chunk': chunk,
+                  'label': label['label'], 'score': float(label['score'])}
+        if lengths is not None:
+            record['length'] = int(lengths[chunk])
+        lines.append(json.dumps(record, ensure_ascii=False) + '\n')
+    if not lines:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(''.join(lines))
+
+
+def trading_rows(trading_dates, dates):
+    """
+    新聞時間 → 歸入的交易日列位置
+
+    日期當天或之後的第一個交易日；含時間且不早於 MARKET_CLOSE 時為日期之後的第一個交易日
+
+    Args:
+        trading_dates (list): 由舊到新的交易日 'YYYY-MM-DD'
+        dates (iterable): 'YYYY-MM-DD' 或 'YYYY-MM-DD HH:MM'
+
+    Returns:
+        np.ndarray: 列位置，晚於最後一個交易日時為 len(trading_dates)
+    """
+    dates = np.asarray(list(dates), dtype=str)
+    days = dates.astype('U10')
+    after_close = np.array([date[11:16] >= MARKET_CLOSE for date in dates], dtype=bool)
+    same_day = np.searchsorted(trading_dates, days, side='left')
+    next_day = np.searchsorted(trading_dates, days, side='right')
+    return np.where(after_close, next_day, same_day)
+
+
+def read_new_labels(path, offset=0):
+    """
+    讀取標註檔 offset 之後的完整行 (標註程序寫到一半的最後一行留待下次)
+
+    Returns:
+        tuple: (chunk 標註 list, 新的 offset)
+    """
+    if not os.path.exists(path):
+        return [], offset
+    if os.path.getsize(path) < offset:
+        # 標註檔被重建，由頭讀取 (文章以最後一次標註為準，重複讀取不會重複計算)
+        offset = 0
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    complete = data[:data.rfind(b'\n') + 1]
+    records = []
+    for line in complete.decode('utf-8').splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            count('sentiment.bad_line')
+    return records, offset + len(complete)
+
+
+def article_scores(records, label_polarity=LABEL_POLARITY):
+    """
+    chunk 標註彙總為文章情緒
+
+    Args:
+        records (list): read_new_labels 的 chunk 標註
+        label_polarity (dict): label (小寫) → 方向
+
+    Returns:
+        pd.DataFrame: ARTICLE_COLUMNS，同一文章在 records 中出現多次時以最後一次標註為準
+    """
+    import pandas as pd
+
+    if not records:
+        return pd.DataFrame(columns=ARTICLE_COLUMNS)
+    chunks = pd.DataFrame(records)
+    polarity = chunks['label'].astype(str).str.lower().map(label_polarity)
+    unknown = polarity.isna()
+    if unknown.any():
+        count('sentiment.unknown_label', int(unknown.sum()))
+        print(f"⚠️ 略過 {int(unknown.sum())} 個未知 label 的 chunk: {sorted(chunks.loc[unknown, 'label'].unique())}")
+    chunks = chunks[~unknown].assign(polarity=polarity[~unknown])
+    if chunks.empty:
+        return pd.DataFrame(columns=ARTICLE_COLUMNS)
+    chunks['code'] = chunks['code'].astype(str)
+    chunks['article'] = chunks['article'].astype(str)
+    # 重新標註的文章只保留最後一批 chunk (chunk 編號由 0 重新開始)
+    batch = (chunks['chunk'] == 0).groupby([chunks['code'], chunks['article']]).cumsum()
+    chunks = chunks[batch == batch.groupby([chunks['code'], chunks['article']]).transform('max')]
+
+    weight = chunks['length'].fillna(1).astype(float) if 'length' in chunks else pd.Series(1.0, index=chunks.index)
+    chunks = chunks.assign(weight=weight, weighted=weight * chunks['polarity'] * chunks['score'].astype(float))
+    grouped = chunks.groupby(['code', 'article'], sort=False)
+    articles = grouped.agg(date=('date', 'last'), chunks=('chunk', 'size'), weighted=('weighted', 'sum'),
+                           weight=('weight', 'sum')).reset_index()
+    articles['score'] = articles['weighted'] / articles['weight'].where(articles['weight'] > 0)
+    return articles[ARTICLE_COLUMNS]
+
+
+class SentimentIndex(MarketMatrix):
+    """日期 × 證券 的每日新聞情緒指數"""
+
+    FIELDS = {
+        'articles': (np.int32, 0),
+        'score': (np.float32, np.nan),
+        'decayed': (np.float32, 0.0),
+    }
+
+    def __init__(self, root=SENTIMENT_DIR, labels_path=LABELS_PATH, half_life=DEFAULT_HALF_LIFE):
+        """
+        Args:
+            root (str): 儲存目錄
+            labels_path (str): chunk 標註檔
+            half_life (float): 衰減情緒的半衰期 (交易日)
+        """
+        super().__init__(root)
+        self.labels_path = labels_path
+        self.half_life = float(half_life)
+        self.articles_path = os.path.join(root, 'articles.csv')
+        self.state_path = os.path.join(root, 'state.json')
+        self.state = {'offset': 0, 'half_life': self.half_life}
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self.state.update(json.load(f))
+
+    def _read_articles(self):
+        import pandas as pd
+
+        if not os.path.exists(self.articles_path):
+            return pd.DataFrame(columns=ARTICLE_COLUMNS)
+        return pd.read_csv(self.articles_path, dtype={'code': str, 'article': str, 'date': str})
+
+    def load_articles(self):
+        """文章情緒表 (重新標註的文章只保留最後一次)"""
+        return self._read_articles().drop_duplicates(['code', 'article'], keep='last').reset_index(drop=True)
+
+    def _append_articles(self, articles):
+        """新標註的文章附加到文章情緒表，不重寫既有內容"""
+        os.makedirs(self.root, exist_ok=True)
+        header = not os.path.exists(self.articles_path)
+        with open(self.articles_path, 'a', encoding='utf-8', newline='') as f:
+            f.write(articles[ARTICLE_COLUMNS].to_csv(index=False, header=header))
+
+    def _compact_articles(self, articles):
+        """重新標註累積的舊列過多時重寫文章情緒表"""
+        tmp_path = f"{self.articles_path}.tmp"
+        articles.to_csv(tmp_path, index=False, encoding='utf-8')
+        os.replace(tmp_path, self.articles_path)
+        count('sentiment.compact')
+
+    def _ingest(self):
+        """
+        讀取新的標註並合併到文章情緒表
+
+        Returns:
+            tuple: (文章情緒表, 新增或取代的文章日期 set)
+        """
+        import pandas as pd
+
+        stored = self._read_articles()
+        articles = stored.drop_duplicates(['code', 'article'], keep='last')
+        records, offset = read_new_labels(self.labels_path, int(self.state['offset']))
+        self.state['offset'] = offset
+        updated = article_scores(records)
+        if updated.empty:
+            return articles, set()
+
+        keys = pd.MultiIndex.from_frame(updated[['code', 'article']])
+        replaced = pd.MultiIndex.from_frame(articles[['code', 'article']]).isin(keys)
+        changed = set(updated['date']) | set(articles.loc[replaced, 'date'])
+        articles = pd.concat([articles[~replaced], updated], ignore_index=True)
+        if len(stored) + len(updated) > 2 * len(articles):
+            self._compact_articles(articles)
+        else:
+            self._append_articles(updated)
+        count('sentiment.articles', len(updated))
+        return articles, changed
+
+    def _reset(self):
+        """清除情緒矩陣 (文章情緒表保留)"""
+        for field in self.fields:
+            path = self.field_path(field)
+            if os.path.exists(path):
+                os.remove(path)
+        if os.path.exists(self.meta_path):
+            os.remove(self.meta_path)
+        self._load_meta()
+
+    def update(self, quotes):
+        """
+        讀取新標註並更新情緒矩陣到行情矩陣的最後一個交易日
+
+        Args:
+            quotes (QuoteStore): 提供交易日軸的行情矩陣
+
+        Returns:
+            int: 重算的交易日數
+        """
+        trading_dates = list(quotes.dates)
+        with span('sentiment.update'):
+            articles, changed = self._ingest()
+            consistent = (self.dates == trading_dates[:len(self.dates)]
+                          and float(self.state.get('half_life', self.half_life)) == self.half_life)
+            if not consistent:
+                count('sentiment.rebuild')
+                print("情緒矩陣與行情交易日不一致 (回補或半衰期變更)，由第一個交易日重算")
+                self._reset()
+            first_row = len(self.dates)
+            if changed and self.dates:
+                first_row = min(first_row, int(trading_rows(self.dates, changed).min()))
+            if first_row < len(trading_dates):
+                self._compute(articles, trading_dates, first_row)
+            self.state['half_life'] = self.half_life
+            os.makedirs(self.root, exist_ok=True)
+            _atomic_write_json(self.state_path, self.state)
+        return len(trading_dates) - first_row
+
+    def _compute(self, articles, trading_dates, first_row):
+        """重算 first_row 起到最後一個交易日的情緒"""
+        # 早於第一個交易日或晚於最後一個交易日的文章不計入
+        dates = articles['date'].to_numpy(dtype=str)
+        rows = trading_rows(trading_dates, dates)
+        inside = (rows >= first_row) & (rows < len(trading_dates)) & (dates.astype('U10') >= trading_dates[0])
+        inside &= articles['score'].notna().to_numpy()
+        codes_in = articles['code'].to_numpy(dtype=str)[inside]
+        codes = list(self.codes) + sorted(set(codes_in) - set(self.code_index))
+        if not codes:
+            return
+        code_index = {code: i for i, code in enumerate(codes)}
+
+        n_rows, n_codes = len(trading_dates) - first_row, len(codes)
+        flat = (rows[inside] - first_row) * n_codes + np.array([code_index[code] for code in codes_in], dtype=np.int64)
+        counts = np.bincount(flat, minlength=n_rows * n_codes).reshape(n_rows, n_codes)
+        sums = np.bincount(flat, articles['score'].to_numpy(dtype=np.float64)[inside],
+                           n_rows * n_codes).reshape(n_rows, n_codes)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            score = sums / counts
+
+        decay = 0.5 ** (1 / self.half_life)
+        decayed = np.empty((n_rows, n_codes))
+        current = np.zeros(n_codes)
+        if first_row > 0:
+            current[:len(self.codes)] = self.open('decayed')[first_row - 1]
+        for i in range(n_rows):
+            current = current * decay + sums[i]
+            decayed[i] = current
+
+        self.write_arrays(trading_dates[first_row:], codes, {'articles': counts, 'score': score, 'decayed': decayed})
+
+
+def _forward_log_returns(close, horizon):
+    """收盤價 (沿用前一日) 的未來 horizon 日對數報酬，(日期, 證券)"""
+    from indicator_engine import forward_fill
+
+    close = np.asarray(close, dtype=np.float64)
+    close[~(close > 0)] = np.nan
+    log_price = np.log(forward_fill(close, np.full(close.shape[1], np.nan))[1:])
+    forward = np.full(log_price.shape, np.nan)
+    forward[:len(log_price) - horizon] = log_price[horizon:] - log_price[:-horizon]
+    return forward
+
+
+def sentiment_correlations(index, quotes, flows=None, field='decayed', horizons=(1, 5), start=None, end=None):
+    """
+    全市場的情緒與報酬、法人買賣超相關係數
+
+    same_day 為情緒與歸入日當日報酬；只有日期的新聞可能在收盤後發布，此欄位會高估同步性
+
+    Args:
+        index (SentimentIndex): 情緒矩陣
+        quotes (QuoteStore): 行情矩陣
+        flows (FlowMatrix): 買賣超矩陣，None表示不計算
+        field (str): 情緒欄位 ('score' 或 'decayed')
+        horizons (tuple): 未來報酬天期 (情緒日收盤到 horizon 日後收盤)
+        start (str): 起始日
+        end (str): 結束日
+
+    Returns:
+        pd.DataFrame: 證券代號為索引，欄位為 same_day、forward_{天期} 與各法人買賣超
+    """
+    import pandas as pd
+
+    with span('sentiment.correlations'):
+        dates, codes, rows, columns, quote_rows, quote_columns = index.align(quotes, start, end)
+        sentiment = np.asarray(index.open(field)[rows][:, columns], dtype=np.float64)
+        close = quotes.open('close')[quote_rows][:, quote_columns]
+        returns = np.asarray(quotes.open('returns')[quote_rows][:, quote_columns], dtype=np.float64)
+        result = {'same_day': _column_corr(sentiment, returns)}
+        for horizon in horizons:
+            result[f'forward_{horizon}'] = _column_corr(sentiment, _forward_log_returns(close, horizon))
+        frame = pd.DataFrame(result, index=pd.Index(codes, name='code'))
+
+        if flows is not None:
+            dates, flow_codes, rows, columns, flow_rows, flow_columns = index.align(flows, start, end)
+            sentiment = np.asarray(index.open(field)[rows][:, columns], dtype=np.float64)
+            flow_result = {
+                flow_field: _column_corr(sentiment,
+                                         np.asarray(flows.open(flow_field)[flow_rows][:, flow_columns], dtype=np.float64))
+                for flow_field in FLOW_FIELDS
+            }
+            frame = frame.join(pd.DataFrame(flow_result, index=pd.Index(flow_codes, name='code')), how='outer')
+    return frame
+
+
+def update_sentiment_index(index=None, quotes=None):
+    """
+    以預設路徑更新情緒矩陣
+
+    Returns:
+        SentimentIndex: 更新後的情緒矩陣
+    """
+    if quotes is None:
+        from twse_daily_quotes import QuoteStore
+
+        quotes = QuoteStore()
+    index = index or SentimentIndex()
+    recomputed = index.update(quotes)
+    summary = index.summary()
+    print(f"✓ 新聞情緒: 重算 {recomputed} 個交易日，共 {summary['dates']} 個交易日 × {summary['codes']} 檔證券")
+    return index
@@ -0,0 +1,656 @@
+#!/usr/bin/env python3
+"""
+新聞向量索引
+News Vector Index
+
+用途: finance_news.ipynb 爬取的公告與新聞存為 JSONL (date, supplier, link, content)，要找出與某則公告相似的
+      其他公告 (如各家公司的每月營收報告、擴產公告) 只能逐筆掃描。本模組將新聞切成 chunk、以 CPU 批次計算
+      向量，存為記憶體映射的 float16 矩陣，提供精確與 IVF 近似最近鄰搜尋，並可先以證券與日期篩選
+
+儲存 (data/news_index/):
+    meta.json           向量維度、嵌入模型、已提交的 chunk 與文章數、證券代號、IVF 參數
+    vectors.f16         (chunk 數, 維度) float16，L2 正規化 (內積即 cosine 相似度)
+    chunks.bin          每個 chunk 的文章、證券、日期 (YYYYMMDD)、chunk 序號與文字位置 (結構化陣列)
+    chunks.jsonl        chunk 文字
+    articles.jsonl      文章識別 (連結)、證券、日期、來源
+    articles.idx        各文章在 articles.jsonl 的位置 (int64)
+    ivf_centroids.{版本}.npy   IVF 群心 (nlist, 維度)
+    ivf_assign.{版本}.i32      每個 chunk 所屬的群
+    ivf_postings.{版本}.npz    依群排序的 chunk 位置與各群起點 (分派後重建，查詢時不必重新排序)
+
+只附加: 新文章附加到各檔尾端後才更新 meta.json，中斷時多寫的部分在下次附加前截掉；已索引的文章連結直接略過，
+沒有可解析日期的文章略過。重新訓練 IVF 時以新版本號寫入全部 IVF 檔案，meta.json 切換版本後才刪除舊版本
+
+嵌入模型:
+    HashingEmbedder      字元 unigram/bigram 特徵雜湊 (不需模型檔，純 numpy 批次計算)，適合找出用詞相近的公告
+    TransformerEmbedder  ../model/ 下的 transformers 模型 (與 sentiment_model_label 相同的模型目錄)，mean pooling
+
+搜尋:
+    篩選後的 chunk 數不超過 EXACT_LIMIT 或尚未建立 IVF 時精確計算全部內積；
+    否則只計算與查詢最接近的 nprobe 個群內的 chunk
+
+使用方式:
+    index = NewsVectorIndex()
+    index.add_news_jsonl('2024_news.json', code='2330')
+    index.build_ivf()
+    index.search('營收報告 較去年同期增加', k=10, codes=['2330'], start='2024-01-01')
+    index.similar(link, k=10)                         # 與某則公告相似的其他公告
+"""
+
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+import numpy as np
+
+from instrumentation import count, span
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INDEX_DIR = os.path.join(REPO_ROOT, 'data', 'news_index')
+
+DEFAULT_DIM = 256
+
+# 每批計算向量的 chunk 數 (限制記憶體用量)
+EMBED_BATCH = 512
+
+# 篩選後不超過此數量時直接精確搜尋
+EXACT_LIMIT = 20000
+
+# IVF 檔案 (檔名插入版本號)
+IVF_FILES = ('ivf_centroids.npy', 'ivf_assign.i32', 'ivf_postings.npz')
+
+DATE_PATTERN = re.compile(r'(\d{4})[-/](\d{2})[-/](\d{2})')
+
+# 精確搜尋全部向量時每次轉為 float32 的列數
+SCAN_ROWS = 65536
+
+DEFAULT_NPROBE = 8
+
+# IVF 訓練: 每群取樣數、k-means 迭代次數、自動建立的最少 chunk 數
+IVF_SAMPLES_PER_LIST = 40
+IVF_ITERATIONS = 10
+IVF_MIN_CHUNKS = 50000
+
+CHUNK_DTYPE = np.dtype([('article', '<i4'), ('code', '<i4'), ('date', '<i4'), ('number', '<i4'), ('offset', '<i8')])
+
+_DELIMITERS = re.compile('[， 。]')
+_WHITESPACE = {ord(char) for char in ' \t\r\n　'}
+
+
+def split_text(text, max_length=512):
+    """
+    依標點切分文字，每段不超過 max_length 字 (finance_news.ipynb 的 split_text_by_length)
+
+    Returns:
+        list: 文字段落
+    """
+    parts, current, length = [], [], 0
+    for word in _DELIMITERS.split(text or ''):
+        if current and length + len(word) + 1 > max_length:
+            parts.append(' '.join(current))
+            current, length = [], 0
+        current.append(word)
+        length += len(word) + 1
+    if current:
+        parts.append(' '.join(current))
+    return [part for part in parts if part.strip()]
+
+
+def _article_date(value):
+    """
+    文章日期 → 'YYYY-MM-DD'
+
+    finance_news.ipynb 以 DataFrame.to_json 輸出，日期預設為 epoch 毫秒；字串接受 YYYY-MM-DD 與 YYYY/MM/DD
+
+    Returns:
+        str: 無法解析時為 None
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if not np.isfinite(value):
+            return None
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+    match = DATE_PATTERN.match(str(value or ''))
+    return f"{match[1]}-{match[2]}-{match[3]}" if match else None
+
+
+def _date_number(date):
+    """'YYYY-MM-DD' → YYYYMMDD"""
+    return int(str(date)[:10].replace('-', '').replace('/', ''))
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+class HashingEmbedder:
+    """字元 unigram 與 bigram 的特徵雜湊向量 (次線性詞頻、L2 正規化)"""
+
+    def __init__(self, dim=DEFAULT_DIM):
+        self.dim = int(dim)
+        self.name = f'hashing-char12-{self.dim}'
+
+    def __call__(self, texts):
+        """
+        Args:
+            texts (list): 文字
+
+        Returns:
+            np.ndarray: (len(texts), dim) float32
+        """
+        codepoints = [np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32) for text in texts]
+        lengths = np.array([len(points) for points in codepoints], dtype=np.int64)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float64)
+        if not lengths.sum():
+            return vectors.astype(np.float32)
+        points = np.concatenate(codepoints).astype(np.uint64)
+        owner = np.repeat(np.arange(len(texts)), lengths)
+        keep = ~np.isin(points, list(_WHITESPACE))
+        points, owner = points[keep], owner[keep]
+
+        same_text = owner[:-1] == owner[1:]
+        grams = np.concatenate([points, (points[:-1] << np.uint64(21) | points[1:])[same_text] + np.uint64(1 << 42)])
+        gram_owner = np.concatenate([owner, owner[:-1][same_text]])
+        hashed = grams * np.uint64(0x9E3779B97F4A7C15)
+        bucket = ((hashed >> np.uint64(40)) % np.uint64(self.dim)).astype(np.int64)
+        sign = np.where((hashed >> np.uint64(23)) & np.uint64(1), 1.0, -1.0)
+        vectors = np.bincount(gram_owner * self.dim + bucket, sign, len(texts) * self.dim).reshape(len(texts), self.dim)
+        return _normalize(np.sign(vectors) * np.log1p(np.abs(vectors)))
+
+
+class TransformerEmbedder:
+    """transformers 模型的 mean pooling 向量 (需要 transformers 與 torch)"""
+
+    def __init__(self, model_dir, batch_size=32, max_length=512):
+        """
+        Args:
+            model_dir (str): 模型目錄 (如 ../model/finbert-tone-chinese)
+            batch_size (int): 每次推論的 chunk 數
+            max_length (int): token 上限
+        """
+        from transformers import AutoModel, AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model = AutoModel.from_pretrained(model_dir).eval()
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.dim = int(self.model.config.hidden_size)
+        self.name = f'transformers:{os.path.basename(os.path.normpath(model_dir))}'
+
+    def __call__(self, texts):
+        import torch
+
+        outputs = []
+        with torch.no_grad():
+            for start in range(0, len(texts), self.batch_size):
+                batch = self.tokenizer(list(texts[start:start + self.batch_size]), padding=True, truncation=True,
+                                       max_length=self.max_length, return_tensors='pt')
+                hidden = self.model(**batch).last_hidden_state
+                mask = batch['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+                outputs.append(((hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)).numpy())
+        return _normalize(np.vstack(outputs)) if outputs else np.zeros((0, self.dim), dtype=np.float32)
+
+
+def spherical_kmeans(vectors, n_clusters, iterations=IVF_ITERATIONS, seed=0):
+    """
+    以內積為相似度的 k-means (向量需已正規化)
+
+    Returns:
+        np.ndarray: (n_clusters, 維度) 正規化的群心
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        labels = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        empty = ~sums.any(axis=1)
+        # 空群以隨機向量重新初始化
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class NewsVectorIndex:
+    """新聞 chunk 的記憶體映射向量索引"""
+
+    def __init__(self, root=INDEX_DIR, embedder=None):
+        """
+        Args:
+            root (str): 索引目錄
+            embedder (callable): 文字 list → 正規化向量，None表示 HashingEmbedder (既有索引沿用建立時的維度)
+        """
+        self.root = root
+        self.meta_path = os.path.join(root, 'meta.json')
+        meta = {}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        if embedder is None:
+            embedder = HashingEmbedder(meta.get('dim', DEFAULT_DIM))
+        if meta and meta.get('embedder') != embedder.name:
+            raise ValueError(f"索引以 {meta.get('embedder')} 建立，不能以 {embedder.name} 查詢或附加")
+        self.embedder = embedder
+        self.dim = embedder.dim
+        self.n_chunks = meta.get('n_chunks', 0)
+        self.n_articles = meta.get('n_articles', 0)
+        self.sizes = meta.get('sizes', {})
+        self.codes = meta.get('codes', [])
+        self.code_index = {code: i for i, code in enumerate(self.codes)}
+        self.ivf_meta = meta.get('ivf')
+        self._articles = None
+        self._postings = None
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def _ivf_path(self, name, ivf_meta=None):
+        """IVF 檔案路徑 (ivf_meta 的版本，None表示目前版本；沒有版本號的舊索引使用原檔名)"""
+        version = (ivf_meta or self.ivf_meta or {}).get('version')
+        if version is None:
+            return self._path(name)
+        stem, extension = name.split('.')
+        return self._path(f"{stem}.{version}.{extension}")
+
+    def _save_meta(self):
+        from market_matrix import _atomic_write_json
+
+        _atomic_write_json(self.meta_path, {
+            'dim': self.dim,
+            'embedder': self.embedder.name,
+            'n_chunks': self.n_chunks,
+            'n_articles': self.n_articles,
+            'sizes': self.sizes,
+            'codes': self.codes,
+            'ivf': self.ivf_meta,
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+        })
+
+    # ------------------------------------------------------------------
+    # 讀取
+    # ------------------------------------------------------------------
+
+    def vectors(self):
+        """(chunk 數, 維度) float16 唯讀視圖"""
+        if not self.n_chunks:
+            return np.zeros((0, self.dim), dtype=np.float16)
+        return np.memmap(self._path('vectors.f16'), dtype=np.float16, mode='r', shape=(self.n_chunks, self.dim))
+
+    def chunks(self):
+        """chunk 的文章、證券、日期、序號與文字位置"""
+        if not self.n_chunks:
+            return np.zeros(0, dtype=CHUNK_DTYPE)
+        return np.memmap(self._path('chunks.bin'), dtype=CHUNK_DTYPE, mode='r', shape=(self.n_chunks,))
+
+    @property
+    def articles(self):
+        """文章資訊 list (依加入順序)"""
+        if self._articles is None:
+            self._articles = []
+            path = self._path('articles.jsonl')
+            if self.n_articles:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._articles = [json.loads(line) for line, _ in zip(f, range(self.n_articles))]
+        return self._articles
+
+    def _article_records(self, numbers):
+        """讀取指定文章的資訊 (不載入全部文章)"""
+        offsets = np.fromfile(self._path('articles.idx'), dtype='<i8', count=self.n_articles)[numbers]
+        records = []
+        with open(self._path('articles.jsonl'), 'rb') as f:
+            for offset in offsets:
+                f.seek(int(offset))
+                records.append(json.loads(f.readline()))
+        return records
+
+    def _article_number(self, article_id):
+        """文章連結 → 加入順序 (在 articles.jsonl 中搜尋行首，不解析全部文章)"""
+        if not self.n_articles:
+            return None
+        head = ('\n{"id": ' + json.dumps(str(article_id), ensure_ascii=False) + ',').encode('utf-8')
+        with open(self._path('articles.jsonl'), 'rb') as f:
+            data = b'\n' + f.read(self.sizes.get('articles.jsonl', 0))
+        position = data.find(head)
+        if position < 0:
+            return None
+        offsets = np.fromfile(self._path('articles.idx'), dtype='<i8', count=self.n_articles)
+        return int(np.searchsorted(offsets, position))
+
+    def _texts(self, rows):
+        """讀取指定 chunk 的文字"""
+        offsets = self.chunks()['offset'][rows]
+        texts = []
+        with open(self._path('chunks.jsonl'), 'rb') as f:
+            for offset in offsets:
+                f.seek(int(offset))
+                texts.append(json.loads(f.readline())['text'])
+        return texts
+
+    # ------------------------------------------------------------------
+    # 附加
+    # ------------------------------------------------------------------
+
+    def _truncate(self):
+        """截掉上次中斷時多寫、尚未提交的部分"""
+        committed = {
+            'vectors.f16': self.n_chunks * self.dim * 2,
+            'chunks.bin': self.n_chunks * CHUNK_DTYPE.itemsize,
+            'articles.idx': self.n_articles * 8,
+            'chunks.jsonl': self.sizes.get('chunks.jsonl', 0),
+            'articles.jsonl': self.sizes.get('articles.jsonl', 0),
+        }
+        paths = {self._path(name): size for name, size in committed.items()}
+        if self.ivf_meta:
+            paths[self._ivf_path('ivf_assign.i32')] = self.ivf_meta['assigned'] * 4
+        for path, size in paths.items():
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+
+    def add_articles(self, articles, code=None):
+        """
+        附加新文章 (已索引的連結略過)
+
+        Args:
+            articles (iterable): dict，欄位 link、date、content，可含 code、supplier
+            code (str): 文章沒有 code 欄位時使用的證券代號
+
+        Returns:
+            int: 新增的 chunk 數
+        """
+        known = {article['id'] for article in self.articles}
+        pending = []
+        undated = 0
+        for article in articles:
+            link = str(article.get('link') or article.get('id') or '')
+            if not link or link in known or not article.get('content'):
+                continue
+            date = _article_date(article.get('date'))
+            if date is None:
+                undated += 1
+                continue
+            known.add(link)
+            pending.append((article, date))
+        if undated:
+            count('news_index.undated', undated)
+            print(f"⚠️ 略過 {undated} 篇沒有可解析日期的文章")
+        if not pending:
+            return 0
+
+        os.makedirs(self.root, exist_ok=True)
+        self._truncate()
+        rows, texts = [], []
+        text_offset = self.sizes.get('chunks.jsonl', 0)
+        article_offset = self.sizes.get('articles.jsonl', 0)
+        article_lines, article_offsets, text_lines = [], [], []
+        for number, (article, date) in enumerate(pending, start=self.n_articles):
+            stock = str(article.get('code') or code or '').split('.')[0]
+            if stock not in self.code_index:
+                self.code_index[stock] = len(self.codes)
+                self.codes.append(stock)
+            line = (json.dumps({'id': str(article.get('link') or article.get('id')), 'code': stock, 'date': date,
+                                'supplier': article.get('supplier')}, ensure_ascii=False) + '\n').encode('utf-8')
+            article_lines.append(line)
+            article_offsets.append(article_offset)
+            article_offset += len(line)
+            for chunk_number, text in enumerate(split_text(str(article['content']))):
+                line = (json.dumps({'article': number, 'chunk': chunk_number, 'text': text}, ensure_ascii=False)
+                        + '\n').encode('utf-8')
+                rows.append((number, self.code_index[stock], _date_number(date), chunk_number, text_offset))
+                text_lines.append(line)
+                texts.append(text)
+                text_offset += len(line)
+
+        with span('news_index.embed'):
+            with open(self._path('vectors.f16'), 'ab') as f:
+                for start in range(0, len(texts), EMBED_BATCH):
+                    f.write(np.asarray(self.embedder(texts[start:start + EMBED_BATCH]), dtype=np.float16).tobytes())
+        with open(self._path('chunks.jsonl'), 'ab') as f:
+            f.write(b''.join(text_lines))
+        with open(self._path('articles.jsonl'), 'ab') as f:
+            f.write(b''.join(article_lines))
+        with open(self._path('articles.idx'), 'ab') as f:
+            f.write(np.array(article_offsets, dtype='<i8').tobytes())
+        with open(self._path('chunks.bin'), 'ab') as f:
+            f.write(np.array(rows, dtype=CHUNK_DTYPE).tobytes())
+
+        first = self.n_chunks
+        self.n_chunks += len(rows)
+        self.n_articles += len(pending)
+        self.sizes = {name: os.path.getsize(self._path(name)) for name in ('chunks.jsonl', 'articles.jsonl')}
+        self._articles = None
+        if self.ivf_meta:
+            self._assign(first)
+        self._save_meta()
+        count('news_index.chunks', len(rows))
+        return len(rows)
+
+    def add_news_jsonl(self, path, code=None):
+        """
+        附加 finance_news.ipynb 輸出的新聞 JSONL (date, supplier, link, content)
+
+        Returns:
+            int: 新增的 chunk 數
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            articles = [json.loads(line) for line in f if line.strip()]
+        return self.add_articles(articles, code=code)
+
+    # ------------------------------------------------------------------
+    # IVF
+    # ------------------------------------------------------------------
+
+    def build_ivf(self, nlist=None, iterations=IVF_ITERATIONS, seed=0):
+        """
+        以取樣的 chunk 訓練群心並分派全部 chunk
+
+        Args:
+            nlist (int): 群數，None表示約 sqrt(chunk 數)
+            iterations (int): k-means 迭代次數
+            seed (int): 取樣亂數種子
+        """
+        if not self.n_chunks:
+            return
+        nlist = int(nlist or max(1, round(np.sqrt(self.n_chunks))))
+        nlist = min(nlist, self.n_chunks)
+        rng = np.random.default_rng(seed)
+        sample_size = min(self.n_chunks, nlist * IVF_SAMPLES_PER_LIST)
+        sample = np.sort(rng.choice(self.n_chunks, sample_size, replace=False))
+        with span('news_index.train_ivf'):
+            centroids = spherical_kmeans(np.asarray(self.vectors()[sample], dtype=np.float32), nlist, iterations, seed)
+        # 新版本的檔案寫完並切換 meta.json 後才刪除舊版本，中斷時仍使用舊版本的群心與分派
+        previous = self.ivf_meta
+        version = (previous or {}).get('version', 0) + 1
+        self.ivf_meta = {'nlist': nlist, 'trained': self.n_chunks, 'assigned': 0, 'version': version}
+        for name in IVF_FILES:
+            if os.path.exists(self._ivf_path(name)):
+                os.remove(self._ivf_path(name))
+        np.save(self._ivf_path('ivf_centroids.npy'), centroids)
+        self._assign(0)
+        self._save_meta()
+        if previous:
+            for name in IVF_FILES:
+                if os.path.exists(self._ivf_path(name, previous)):
+                    os.remove(self._ivf_path(name, previous))
+        print(f"✓ IVF 索引: {nlist} 群，{self.n_chunks} 個 chunk")
+
+    def _assign(self, first):
+        """分派第 first 個之後的 chunk 到最接近的群心"""
+        centroids = np.load(self._ivf_path('ivf_centroids.npy'))
+        vectors = self.vectors()
+        with span('news_index.assign'), open(self._ivf_path('ivf_assign.i32'), 'ab') as f:
+            for start in range(first, self.n_chunks, SCAN_ROWS):
+                block = np.asarray(vectors[start:start + SCAN_ROWS], dtype=np.float32)
+                f.write(np.argmax(block @ centroids.T, axis=1).astype('<i4').tobytes())
+        self.ivf_meta['assigned'] = self.n_chunks
+        self._postings = None
+        centroids, order, starts = self._load_postings()
+        path = self._ivf_path('ivf_postings.npz')
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, order=order, starts=starts, assigned=np.array(self.n_chunks))
+        os.replace(tmp_path, path)
+
+    def needs_ivf(self):
+        """chunk 數已足夠建立 IVF，或新增的 chunk 已超過訓練時的一倍"""
+        if self.ivf_meta is None:
+            return self.n_chunks >= IVF_MIN_CHUNKS
+        return self.n_chunks > 2 * self.ivf_meta['trained']
+
+    def _load_postings(self):
+        """各群的 chunk 列表 (CSR: 排序後的 chunk 位置與各群起點)"""
+        if self._postings is None:
+            centroids = np.load(self._ivf_path('ivf_centroids.npy'))
+            path = self._ivf_path('ivf_postings.npz')
+            if os.path.exists(path):
+                with np.load(path) as postings:
+                    if int(postings['assigned']) == self.ivf_meta['assigned']:
+                        self._postings = (centroids, postings['order'], postings['starts'])
+                        return self._postings
+            assign = np.fromfile(self._ivf_path('ivf_assign.i32'), dtype='<i4', count=self.ivf_meta['assigned'])
+            order = np.argsort(assign, kind='stable')
+            starts = np.searchsorted(assign[order], np.arange(len(centroids) + 1))
+            self._postings = (centroids, order, starts)
+        return self._postings
+
+    # ------------------------------------------------------------------
+    # 搜尋
+    # ------------------------------------------------------------------
+
+    def _prefilter(self, codes=None, start=None, end=None):
+        """證券與日期篩選，None表示不篩選"""
+        if codes is None and start is None and end is None:
+            return None
+        chunks = self.chunks()
+        mask = np.ones(self.n_chunks, dtype=bool)
+        if codes is not None:
+            wanted = [self.code_index[code] for code in (str(code).split('.')[0] for code in codes)
+                      if code in self.code_index]
+            mask &= np.isin(chunks['code'], wanted)
+        if start is not None:
+            mask &= chunks['date'] >= _date_number(start)
+        if end is not None:
+            mask &= chunks['date'] <= _date_number(end)
+        return mask
+
+    def _scores(self, query, rows):
+        """查詢向量與指定 chunk (None表示全部) 的內積"""
+        vectors = self.vectors()
+        if rows is not None:
+            return np.asarray(vectors[rows], dtype=np.float32) @ query
+        scores = np.empty(self.n_chunks, dtype=np.float32)
+        for start in range(0, self.n_chunks, SCAN_ROWS):
+            scores[start:start + SCAN_ROWS] = np.asarray(vectors[start:start + SCAN_ROWS], dtype=np.float32) @ query
+        return scores
+
+    def search_vector(self, query, k=10, codes=None, start=None, end=None, nprobe=DEFAULT_NPROBE, exact=None,
+                      exclude_articles=()):
+        """
+        以向量搜尋最相似的 chunk
+
+        Args:
+            query (np.ndarray): (維度,) 查詢向量
+            k (int): 回傳數量
+            codes (list): 只搜尋這些證券的新聞
+            start (str): 起始日期
+            end (str): 結束日期
+            nprobe (int): IVF 搜尋的群數
+            exact (bool): True 精確搜尋、False 使用 IVF，None表示依篩選後的數量決定
+            exclude_articles (iterable): 排除的文章編號
+
+        Returns:
+            tuple: (chunk 位置, 相似度)，依相似度由高到低
+        """
+        if not self.n_chunks:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        query = _normalize(query).reshape(-1)
+        mask = self._prefilter(codes, start, end)
+        if exclude_articles:
+            mask = np.ones(self.n_chunks, dtype=bool) if mask is None else mask
+            mask &= ~np.isin(self.chunks()['article'], list(exclude_articles))
+        if exact is None:
+            n_candidates = self.n_chunks if mask is None else int(mask.sum())
+            exact = not self.ivf_meta or n_candidates <= EXACT_LIMIT
+
+        with span('news_index.search'):
+            if exact:
+                rows = None if mask is None else np.nonzero(mask)[0]
+            else:
+                centroids, order, starts = self._load_postings()
+                probes = np.argsort(centroids @ query)[::-1][:nprobe]
+                rows = np.sort(np.concatenate([order[starts[probe]:starts[probe + 1]] for probe in probes]))
+                if mask is not None:
+                    rows = rows[mask[rows]]
+            scores = self._scores(query, rows)
+            if rows is None:
+                rows = np.arange(self.n_chunks)
+            top = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+            top = top[np.argsort(-scores[top], kind='stable')]
+        return rows[top], scores[top]
+
+    def _results(self, rows, scores):
+        import pandas as pd
+
+        chunks = self.chunks()[rows]
+        articles = self._article_records(chunks['article'])
+        return pd.DataFrame({
+            'score': scores,
+            'code': [self.codes[code] for code in chunks['code']],
+            'date': [article['date'] for article in articles],
+            'article': [article['id'] for article in articles],
+            'supplier': [article.get('supplier') for article in articles],
+            'chunk': chunks['number'],
+            'text': self._texts(rows),
+        })
+
+    def search(self, text, k=10, codes=None, start=None, end=None, nprobe=DEFAULT_NPROBE, exact=None):
+        """
+        以文字搜尋最相似的 chunk (參數同 search_vector)
+
+        Returns:
+            pd.DataFrame: score、code、date、article、supplier、chunk、text
+        """
+        query = self.embedder([text])[0]
+        rows, scores = self.search_vector(query, k, codes, start, end, nprobe, exact)
+        return self._results(rows, scores)
+
+    def similar(self, article_id, k=10, codes=None, start=None, end=None, nprobe=DEFAULT_NPROBE, exact=None):
+        """
+        與某篇已索引文章相似的其他文章 chunk (以該文章各 chunk 的平均向量查詢)
+
+        Args:
+            article_id (str): 文章連結
+
+        Returns:
+            pd.DataFrame: 同 search
+        """
+        number = self._article_number(article_id)
+        if number is None:
+            raise KeyError(f"索引中沒有這篇文章: {article_id}")
+        rows = np.nonzero(self.chunks()['article'] == number)[0]
+        query = np.asarray(self.vectors()[rows], dtype=np.float32).mean(axis=0)
+        rows, scores = self.search_vector(query, k, codes, start, end, nprobe, exact, exclude_articles=[number])
+        return self._results(rows, scores)
+
+
+def index_news_files(paths, code=None, index=None):
+    """
+    將新聞 JSONL 加入索引，chunk 數足夠或成長一倍時重建 IVF
+
+    Args:
+        paths (list): finance_news.ipynb 輸出的 JSONL
+        code (str): 檔案沒有 code 欄位時使用的證券代號
+        index (NewsVectorIndex): 索引，None表示預設目錄
+
+    Returns:
+        NewsVectorIndex: 更新後的索引
+    """
+    index = index or NewsVectorIndex()
+    added = 0
+    for path in paths:
+        added += index.add_news_jsonl(path, code=code)
+    print(f"✓ 新聞向量索引: 新增 {added} 個 chunk，共 {index.n_articles} 篇文章、{index.n_chunks} 個 chunk")
+    if index.needs_ivf():
+        index.build_ivf()
+    return index
@@ -0,0 +1,599 @@
+#!/usr/bin/env python3
+"""
+每日排程管線
+Dependency-aware Pipeline Scheduler
+
+用途: 將 ETF清單 → 成份股 → CSV、財報抓取 → 評分、T86 更新等階段宣告為有向無環圖，
+      依輸入檔案的指紋 (mtime 或內容雜湊) 判斷是否需要重跑，互不相依的分支以執行緒平行執行，
+      並輸出各階段耗時的執行報告
+
+設計:
+    - 每個階段宣告 inputs (讀取的檔案/目錄)、outputs (產生的檔案/目錄) 與額外的 key (如日期)
+    - 階段的指紋 = 名稱 + version + key + 所有輸入的指紋；輸出不存在時一定重跑
+    - 上游階段的 outputs 即為下游的 inputs，依此自動推導相依關係，也可用 deps 明確指定
+    - 指紋在階段成功後寫入狀態檔，沒有變更的夜晚只需計算指紋即可結束
+
+使用方式:
+    pipeline = build_nightly_pipeline()
+    report = pipeline.run(max_workers=4)
+    report.print_report()
+
+    tw-stock nightly --dry-run
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta
+
+from instrumentation import span
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(REPO_ROOT, 'data')
+DEFAULT_STATE_PATH = os.path.join(DATA_DIR, 'pipeline_state.json')
+
+# 夜間評分預設的股票 (與 company_health_analysis.ipynb 的比較範例相同)
+DEFAULT_SYMBOLS = ('2330.TW', '2317.TW', '2454.TW', '2881.TW')
+
+# 證交所盤後資料 (MI_INDEX、T86、ETF申購買回清單) 公布的時間，之後才視為當天有新資料
+SESSION_DATA_READY = '17:00'
+
+
+class Stage:
+    """管線中的一個階段"""
+
+    def __init__(self, name, func, inputs=(), outputs=(), deps=(), key=None, fingerprint='mtime', version='1'):
+        """
+        初始化階段
+
+        Args:
+            name (str): 階段名稱
+            func (callable): 執行函數，不需參數
+            inputs (iterable): 讀取的檔案或目錄
+            outputs (iterable): 產生的檔案或目錄
+            deps (iterable): 額外指定的上游階段名稱
+            key (callable): 回傳額外指紋字串的函數 (如今天日期，讓網路資料每天更新一次)
+            fingerprint (str): 輸入指紋方式，'mtime' (修改時間與大小) 或 'content' (內容雜湊)
+            version (str): 階段邏輯版本，修改計算方式時遞增以強制重跑
+        """
+        if fingerprint not in ('mtime', 'content'):
+            raise ValueError(f"不支援的指紋方式: {fingerprint}")
+        self.name = name
+        self.func = func
+        self.inputs = [os.path.abspath(path) for path in inputs]
+        self.outputs = [os.path.abspath(path) for path in outputs]
+        self.deps = list(deps)
+        self.key = key
+        self.fingerprint = fingerprint
+        self.version = str(version)
+
+    def compute_fingerprint(self):
+        """計算目前輸入的指紋"""
+        digest = hashlib.sha1()
+        digest.update(f"{self.name}\0{self.version}\0".encode('utf-8'))
+        if self.key is not None:
+            digest.update(f"key={self.key()}\0".encode('utf-8'))
+        for path in sorted(self.inputs):
+            digest.update(path_fingerprint(path, self.fingerprint).encode('utf-8'))
+        return digest.hexdigest()
+
+    def outputs_exist(self):
+        return all(os.path.exists(path) for path in self.outputs)
+
+
+class StageResult:
+    """單一階段的執行結果"""
+
+    __slots__ = ('name', 'status', 'reason', 'duration', 'error', 'started_at')
+
+    def __init__(self, name, status, reason='', duration=0.0, error=None, started_at=None):
+        self.name = name
+        self.status = status        # ran / skipped / failed / blocked / would_run
+        self.reason = reason
+        self.duration = duration
+        self.error = error
+        self.started_at = started_at
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'status': self.status,
+            'reason': self.reason,
+            'duration_seconds': round(self.duration, 4),
+            'error': self.error,
+            'started_at': self.started_at,
+        }
+
+
+class RunReport:
+    """一次管線執行的報告"""
+
+    def __init__(self, results, started_at, duration):
+        self.results = results
+        self.started_at = started_at
+        self.duration = duration
+
+    @property
+    def ok(self):
+        return not any(result.status in ('failed', 'blocked') for result in self.results)
+
+    def to_dict(self):
+        return {
+            'started_at': self.started_at,
+            'duration_seconds': round(self.duration, 4),
+            'ok': self.ok,
+            'stages': [result.to_dict() for result in self.results],
+        }
+
+    def save(self, path):
+        """以 JSON 儲存報告"""
+        _atomic_write_json(path, self.to_dict())
+
+    def print_report(self):
+        """列印各階段狀態與耗時"""
+        markers = {'ran': '✓', 'skipped': '·', 'failed': '✗', 'blocked': '⊘', 'would_run': '→'}
+        print("=" * 72)
+        print(f"{'階段':24s} {'狀態':10s} {'耗時(s)':>9s}  原因")
+        print("-" * 72)
+        for result in self.results:
+            reason = result.error or result.reason
+            print(f"{markers.get(result.status, ' ')} {result.name:22s} {result.status:10s} "
+                  f"{result.duration:9.2f}  {reason}")
+        print("-" * 72)
+        print(f"總耗時: {self.duration:.2f} 秒")
+        print("=" * 72)
+
+
+class Pipeline:
+    """依相依關係與輸入指紋執行階段的排程器"""
+
+    def __init__(self, state_path=DEFAULT_STATE_PATH):
+        """
+        初始化管線
+
+        Args:
+            state_path (str): 記錄各階段成功指紋的狀態檔
+        """
+        self.state_path = state_path
+        self.stages = {}
+        self._state_lock = threading.Lock()
+
+    def add_stage(self, name, func, **kwargs):
+        """
+        新增階段，參數見 Stage
+
+        Returns:
+            Stage: 新增的階段
+        """
+        if name in self.stages:
+            raise ValueError(f"階段名稱重複: {name}")
+        stage = Stage(name, func, **kwargs)
+        self.stages[name] = stage
+        return stage
+
+    def stage(self, name=None, **kwargs):
+        """以裝飾器新增階段"""
+        def decorator(func):
+            self.add_stage(name or func.__name__, func, **kwargs)
+            return func
+        return decorator
+
+    def dependencies(self):
+        """
+        推導每個階段的上游階段
+
+        Returns:
+            dict: 階段名稱對應上游階段名稱集合
+        """
+        producers = {}
+        for stage in self.stages.values():
+            for path in stage.outputs:
+                producers[path] = stage.name
+
+        graph = {}
+        for stage in self.stages.values():
+            upstream = set(stage.deps)
+            for path in stage.inputs:
+                for output, producer in producers.items():
+                    # 輸入是上游輸出本身，或位於上游輸出的目錄內
+                    if producer != stage.name and (path == output or path.startswith(output + os.sep)):
+                        upstream.add(producer)
+            unknown = upstream - set(self.stages)
+            if unknown:
+                raise ValueError(f"階段 {stage.name} 相依於不存在的階段: {sorted(unknown)}")
+            graph[stage.name] = upstream
+        self._check_acyclic(graph)
+        return graph
+
+    @staticmethod
+    def _check_acyclic(graph):
+        visiting, done = set(), set()
+
+        def visit(name, path):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"階段相依關係有循環: {' → '.join(path + [name])}")
+            visiting.add(name)
+            for upstream in graph[name]:
+                visit(upstream, path + [name])
+            visiting.discard(name)
+            done.add(name)
+
+        for name in graph:
+            visit(name, [])
+
+    def load_state(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_stage_state(self, state, name, fingerprint, duration):
+        with self._state_lock:
+            state[name] = {
+                'fingerprint': fingerprint,
+                'finished_at': datetime.now().isoformat(timespec='seconds'),
+                'duration_seconds': round(duration, 4),
+            }
+            _atomic_write_json(self.state_path, state)
+
+    def _clear_stage_state(self, state, name):
+        with self._state_lock:
+            if state.pop(name, None) is not None:
+                _atomic_write_json(self.state_path, state)
+
+    def run(self, targets=None, force=False, max_workers=4, dry_run=False):
+        """
+        執行管線
+
+        Args:
+            targets (iterable): 只執行這些階段與其上游，None表示全部
+            force (bool | iterable): True 表示全部重跑，或指定要強制重跑的階段名稱
+            max_workers (int): 同時執行的階段數
+            dry_run (bool): 只判斷哪些階段需要執行，不實際執行
+
+        Returns:
+            RunReport: 執行報告
+        """
+        graph = self.dependencies()
+        selected = self._select(graph, targets)
+        forced = set(selected) if force is True else set(force or ())
+        state = self.load_state()
+        started_at = datetime.now().isoformat(timespec='seconds')
+        run_start = time.perf_counter()
+
+        results = {}
+        pending = {name: set(graph[name]) & selected for name in selected}
+
+        def evaluate(name):
+            stage = self.stages[name]
+            with span(f'pipeline.fingerprint.{name}'):
+                fingerprint = stage.compute_fingerprint()
+            previous = state.get(name, {}).get('fingerprint')
+            if name in forced:
+                reason = '強制執行'
+            elif not stage.outputs_exist():
+                reason = '輸出不存在'
+            elif previous is None:
+                reason = '沒有執行紀錄'
+            elif previous != fingerprint:
+                reason = '輸入已變更'
+            else:
+                return StageResult(name, 'skipped', '輸入未變更')
+
+            if dry_run:
+                return StageResult(name, 'would_run', reason)
+
+            start_time = datetime.now().isoformat(timespec='seconds')
+            start = time.perf_counter()
+            try:
+                with span(f'pipeline.stage.{name}'):
+                    stage.func()
+            except Exception as e:
+                # 失敗的階段可能只寫了一半的輸出，清除紀錄讓下次一定重跑
+                self._clear_stage_state(state, name)
+                return StageResult(name, 'failed', reason, time.perf_counter() - start,
+                                   f"{type(e).__name__}: {e}", start_time)
+            duration = time.perf_counter() - start
+            # 執行後重新計算指紋: 階段可能更新了自己的輸入 (如增量更新的CSV)
+            self._save_stage_state(state, name, stage.compute_fingerprint(), duration)
+            return StageResult(name, 'ran', reason, duration, None, start_time)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            running = {}
+            while pending or running:
+                for name in [name for name, upstream in pending.items() if not upstream - set(results)]:
+                    del pending[name]
+                    failed_upstream = [up for up in graph[name] & selected
+                                       if results[up].status in ('failed', 'blocked')]
+                    if failed_upstream:
+                        results[name] = StageResult(name, 'blocked', f"上游失敗: {', '.join(sorted(failed_upstream))}")
+                        continue
+                    running[executor.submit(evaluate, name)] = name
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    results[name] = future.result()
+
+        ordered = [results[name] for name in self._topological_order(graph) if name in results]
+        return RunReport(ordered, started_at, time.perf_counter() - run_start)
+
+    def _select(self, graph, targets):
+        if targets is None:
+            return set(self.stages)
+        selected = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.stages:
+                raise ValueError(f"找不到階段: {name}")
+            if name not in selected:
+                selected.add(name)
+                stack.extend(graph[name])
+        return selected
+
+    def _topological_order(self, graph):
+        order, done = [], set()
+
+        def visit(name):
+            if name in done:
+                return
+            done.add(name)
+            for upstream in sorted(graph[name]):
+                visit(upstream)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+
+def path_fingerprint(path, mode='mtime'):
+    """
+    計算檔案或目錄的指紋
+
+    Args:
+        path (str): 檔案或目錄
+        mode (str): 'mtime' 使用修改時間與大小，'content' 使用內容 SHA-1
+
+    Returns:
+        str: 指紋字串，路徑不存在時為 'missing'
+    """
+    if not os.path.exists(path):
+        return f"{path}:missing\0"
+    if os.path.isfile(path):
+        return f"{path}:{_file_fingerprint(path, mode)}\0"
+
+    parts = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            parts.append(f"{os.path.relpath(file_path, path)}:{_file_fingerprint(file_path, mode)}")
+    return f"{path}:[{';'.join(parts)}]\0"
+
+
+def _file_fingerprint(path, mode):
+    if mode == 'mtime':
+        stat = os.stat(path)
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _atomic_write_json(path, payload):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+# ----------------------------------------------------------------------
+# 每日管線
+# ----------------------------------------------------------------------
+
+def _iso_week():
+    year, week, _ = date.today().isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def latest_session(now=None):
+    """
+    最近一個已公布盤後資料的平日
+
+    國定假日仍視為交易日，由各資料庫的休市紀錄略過
+
+    Args:
+        now (datetime): 目前時間，None表示現在
+
+    Returns:
+        str: 'YYYY-MM-DD'
+    """
+    now = now or datetime.now()
+    day = now.date()
+    if now.strftime('%H:%M') < SESSION_DATA_READY:
+        day -= timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day.isoformat()
+
+
+def _session_key(last_saved):
+    """
+    網路資料階段的 key: 最近的交易日與資料庫已有的最後日期
+
+    週末、盤後資料公布前或同一天重跑時兩者都不變而略過，不會重新請求；
+    資料庫的最後日期由階段執行後重新計算的指紋記錄
+
+    Args:
+        last_saved (callable): 回傳資料庫最後日期的函數，沒有資料時回傳 None
+    """
+    def key():
+        return f"{latest_session()}:{last_saved() or ''}"
+    return key
+
+
+def _matrix_last_date(matrix):
+    """MarketMatrix 已有的最後日期 (含休市日)，沒有資料時為 None"""
+    known = matrix.dates + sorted(matrix.closed_dates)
+    return max(known) if known else None
+
+
+def build_nightly_pipeline(data_dir=DATA_DIR, symbols=DEFAULT_SYMBOLS, flow_codes=None, max_etfs=None,
+                           delay=1.0, pcf_dir=None, state_path=None):
+    """
+    建立每日排程管線
+
+    階段:
+        etf_holdings   ETF清單 → 成份股 → CSV (有新的交易日時)
+        statements     以 replay_harness.record_ticker 錄製財報 (每週一次)
+        health_scores  讀取錄製的財報計算產業評分 (財報內容未變更時略過)
+        t86_flows      增量更新三大法人買賣超 (有新的交易日時)
+        daily_quotes   增量更新全市場每日行情與指標 (有新的交易日時)
+        market_flows   增量更新全市場三大法人買賣超矩陣 (有新的交易日時)
+        news_sentiment 新的新聞情緒標註或新交易日彙總為每日情緒矩陣
+
+    Args:
+        data_dir (str): 資料根目錄
+        symbols (iterable): 要抓取財報與評分的 yfinance 代碼
+        flow_codes (iterable): 要更新買賣超的股票代號，None表示由 symbols 推得
+        max_etfs (int): ETF最大收集數量
+        delay (float): ETF請求間隔 (秒)
+        pcf_dir (str): 投信PCF檔案目錄
+        state_path (str): 狀態檔路徑，None表示 {data_dir}/pipeline_state.json
+
+    Returns:
+        Pipeline: 每日管線
+    """
+    symbols = list(symbols)
+    flow_codes = list(flow_codes) if flow_codes else [symbol.split('.')[0] for symbol in symbols]
+    etf_dir = os.path.join(data_dir, 'etf_data')
+    statements_dir = os.path.join(data_dir, 'statements')
+    scores_path = os.path.join(data_dir, 'health_scores.json')
+    flows_dir = os.path.join(data_dir, 'mi_movements_csv')
+    quotes_dir = os.path.join(data_dir, 'market_quotes')
+    market_flows_dir = os.path.join(data_dir, 'market_flows')
+    sentiment_dir = os.path.join(data_dir, 'news_sentiment')
+    labels_path = os.path.join(data_dir, 'news_labels.jsonl')
+    # 檢查點放在輸出目錄之外，避免影響下游的輸入指紋
+    etf_journal_path = os.path.join(data_dir, 'etf_collect_journal.jsonl')
+    statements_journal_path = os.path.join(data_dir, 'statements_journal.jsonl')
+    standards_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'company_health_analysis',
+                                  'taiwan_industry_scoring_standards.json')
+
+    pipeline = Pipeline(state_path or os.path.join(data_dir, 'pipeline_state.json'))
+
+    def etf_holdings():
+        from taiwan_etf_scraper import TaiwanETFScraper
+
+        scraper = TaiwanETFScraper(data_dir=etf_dir, pcf_dir=pcf_dir)
+        scraper.get_taiwan_etf_list()
+        # 中斷後重跑本階段時由檢查點續跑，完整輸出後才清除
+        scraper.collect_all_etf_data(max_etfs=max_etfs, delay=delay, journal_path=etf_journal_path)
+        if not scraper.etf_constituents:
+            raise RuntimeError("沒有收集到任何ETF成份股")
+        scraper.save_to_csv()
+        if os.path.exists(etf_journal_path):
+            os.remove(etf_journal_path)
+
+    def statements():
+        from checkpoint_journal import CheckpointJournal
+        from replay_harness import record_ticker
+
+        journal = CheckpointJournal(statements_journal_path)
+        journal.run(symbols, lambda symbol: record_ticker(symbol, statements_dir))
+        failed = [symbol for symbol in symbols if not journal.is_done(symbol)]
+        if failed:
+            # 保留檢查點，重新執行本階段時只重試失敗的股票
+            raise RuntimeError(f"{len(failed)} 檔股票的財報錄製失敗: {', '.join(failed)}")
+        journal.clear()
+
+    def health_scores():
+        from company_health_analysis import TaiwanIndustryScorer, calculate_health_metrics, get_company_financial_data
+        from replay_harness import ReplayTicker
+
+        scorer = TaiwanIndustryScorer(standards_path)
+        results = {}
+        for symbol in symbols:
+            financial_data = get_company_financial_data(symbol, period=None,
+                                                        ticker=ReplayTicker(symbol, statements_dir))
+            metrics = calculate_health_metrics(financial_data) if financial_data else {}
+            if metrics:
+                results[symbol] = scorer.calculate_industry_score(metrics, metrics.get('sector', 'Unknown'))
+        _atomic_write_json(scores_path, json.loads(json.dumps(results, default=str)))
+
+    def t86_flows():
+        from t86_flows import update_flow_csvs
+
+        update_flow_csvs(flow_codes, data_dir=flows_dir)
+
+    def daily_quotes():
+        from indicator_engine import update_indicators
+        from twse_daily_quotes import QuoteStore, update_quote_store
+
+        store = QuoteStore(quotes_dir)
+        update_quote_store(store)
+        update_indicators(store)
+
+    def market_flows():
+        from market_matrix import FlowMatrix, update_flow_matrix
+
+        update_flow_matrix(FlowMatrix(market_flows_dir))
+
+    def news_sentiment():
+        from news_sentiment import SentimentIndex, update_sentiment_index
+        from twse_daily_quotes import QuoteStore
+
+        update_sentiment_index(SentimentIndex(sentiment_dir, labels_path=labels_path), QuoteStore(quotes_dir))
+
+    def t86_last_date():
+        from t86_flows import flow_csv_path, last_saved_date
+
+        # 最落後的一檔決定是否還有資料要補
+        saved = [last_saved_date(flow_csv_path(code, flows_dir)) for code in flow_codes]
+        return None if None in saved else min(saved)
+
+    def quotes_last_date():
+        from twse_daily_quotes import QuoteStore
+
+        return _matrix_last_date(QuoteStore(quotes_dir))
+
+    def market_flows_last_date():
+        from market_matrix import FlowMatrix
+
+        return _matrix_last_date(FlowMatrix(market_flows_dir))
+
+    pipeline.add_stage('etf_holdings', etf_holdings, outputs=[
+        os.path.join(etf_dir, 'taiwan_etf_list.csv'),
+        os.path.join(etf_dir, 'all_etf_constituents.csv'),
+    ], key=latest_session)
+    pipeline.add_stage('statements', statements, outputs=[statements_dir], key=_iso_week)
+    pipeline.add_stage('health_scores', health_scores, inputs=[statements_dir, standards_path],
+                       outputs=[scores_path], fingerprint='content')
+    pipeline.add_stage('t86_flows', t86_flows, outputs=[flows_dir], key=_session_key(t86_last_date))
+    pipeline.add_stage('daily_quotes', daily_quotes, outputs=[quotes_dir], key=_session_key(quotes_last_date))
+    pipeline.add_stage('market_flows', market_flows, outputs=[market_flows_dir],
+                       key=_session_key(market_flows_last_date))
+    pipeline.add_stage('news_sentiment', news_sentiment, inputs=[labels_path, quotes_dir], outputs=[sentiment_dir])
+    return pipeline
+
+
+def main():
+    """執行每日管線並列印報告"""
+    pipeline = build_nightly_pipeline()
+    report = pipeline.run()
+    report.print_report()
+
+
+if __name__ == "__main__":
+    main()
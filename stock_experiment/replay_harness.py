@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+離線錄製/重播測試環境
+Offline Record/Replay Harness for TWSE, yfinance and News Endpoints
+
+用途: 在無網路環境下重現證交所 (MI_INDEX、T86)、主計總處 SDMX、新聞頁面與 yfinance 的資料來源，
+      並可設定延遲、錯誤率與 429 頻率，用於可重現的併發、重試與吞吐量測試
+
+錄製:
+    TW_STOCK_HTTP_RECORD_DIR=../data/replay/http python taiwan_etf_scraper.py
+    record_ticker('2330.TW', '../data/replay/yfinance')
+
+重播:
+    python replay_harness.py serve --store ../data/replay/http --port 8765 --latency-ms 80 --error-rate 0.02
+    TW_STOCK_HTTP_REPLAY_URL=http://127.0.0.1:8765 python taiwan_etf_scraper.py
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from http_client import ResponseCache, request_key
+
+# yfinance Ticker 會被錄製的屬性
+TICKER_FRAMES = (
+    'income_stmt',
+    'balance_sheet',
+    'cashflow',
+    'quarterly_income_stmt',
+    'quarterly_balance_sheet',
+    'quarterly_cashflow',
+)
+
+# yfinance 的別名屬性
+TICKER_ALIASES = {
+    'financials': 'income_stmt',
+    'quarterly_financials': 'quarterly_income_stmt',
+}
+
+
+class FaultProfile:
+    """重播時注入的延遲與錯誤設定"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, throttle_rate=0.0, retry_after=1, seed=0):
+        """
+        初始化錯誤注入設定
+
+        Args:
+            latency_ms (float): 每個回應的基本延遲 (毫秒)
+            jitter_ms (float): 延遲的隨機變動範圍 (毫秒)
+            error_rate (float): 回應 503 的機率
+            throttle_rate (float): 回應 429 的機率
+            retry_after (int): 429 回應的 Retry-After 秒數
+            seed (int): 亂數種子，同一個種子、同一個請求序列會得到相同結果
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.seed = seed
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def decide(self, key):
+        """
+        決定此次請求的延遲與狀態
+
+        以 (種子, 請求鍵值, 該鍵值第幾次請求) 產生亂數，併發順序不同時同一請求的結果仍一致
+
+        Args:
+            key (str): 請求鍵值
+
+        Returns:
+            tuple: (延遲秒數, 注入的狀態碼或 None)
+        """
+        with self._lock:
+            attempt = self._counters.get(key, 0)
+            self._counters[key] = attempt + 1
+
+        digest = hashlib.sha1(f"{self.seed}:{key}:{attempt}".encode('utf-8')).digest()
+        rng = random.Random(int.from_bytes(digest[:8], 'big'))
+        latency = max(0.0, self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000.0
+
+        draw = rng.random()
+        if draw < self.throttle_rate:
+            return latency, 429
+        if draw < self.throttle_rate + self.error_rate:
+            return latency, 503
+        return latency, None
+
+
+class ReplayServer:
+    """以錄製資料模擬外部資料來源的本地HTTP伺服器"""
+
+    def __init__(self, store_dir, host='127.0.0.1', port=0, faults=None):
+        """
+        初始化重播伺服器
+
+        Args:
+            store_dir (str): 錄製目錄 (HTTPClient record_dir 產生的檔案)
+            host (str): 監聽位址
+            port (int): 監聽埠號，0表示自動選擇
+            faults (FaultProfile): 延遲與錯誤注入設定
+        """
+        self.store = ResponseCache(store_dir)
+        self.faults = faults or FaultProfile()
+        self.stats = {'requests': 0, 'served': 0, 'not_modified': 0, 'missing': 0, 'injected': 0}
+        self._stats_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """伺服器網址，供 HTTPClient(replay_url=...) 或 TW_STOCK_HTTP_REPLAY_URL 使用"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """於背景執行緒啟動伺服器"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止伺服器"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self):
+        """於目前執行緒啟動伺服器"""
+        self._server.serve_forever()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _handler_class(self):
+        server = self
+
+        class ReplayHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                server._count('requests')
+                original_url = _original_url(self.path)
+                key = request_key(original_url) if original_url else None
+                meta, body = server.store.get(key) if key else (None, None)
+
+                latency, injected = server.faults.decide(key or self.path)
+                if latency:
+                    time.sleep(latency)
+
+                if injected:
+                    server._count('injected')
+                    headers = {'Retry-After': str(server.faults.retry_after)} if injected == 429 else {}
+                    self._send(injected, b'', headers)
+                    return
+
+                if meta is None:
+                    server._count('missing')
+                    self._send(404, f"no recording for {original_url}".encode('utf-8'), {'Content-Type': 'text/plain'})
+                    return
+
+                recorded_headers = meta.get('headers', {})
+                etag = recorded_headers.get('ETag')
+                if etag and self.headers.get('If-None-Match') == etag:
+                    server._count('not_modified')
+                    self._send(304, b'', {'ETag': etag})
+                    return
+
+                server._count('served')
+                self._send(meta.get('status', 200), body, recorded_headers)
+
+            def _send(self, status, body, headers):
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+        return ReplayHandler
+
+
+def _original_url(path):
+    """將 /{scheme}/{host}{path}?{query} 還原為原始網址"""
+    parts = urlsplit(path)
+    segments = parts.path.lstrip('/').split('/', 2)
+    if len(segments) < 2 or segments[0] not in ('http', 'https'):
+        return None
+    scheme, netloc = segments[0], segments[1]
+    rest = '/' + segments[2] if len(segments) > 2 else '/'
+    url = f"{scheme}://{netloc}{rest}"
+    return f"{url}?{parts.query}" if parts.query else url
+
+
+def record_ticker(symbol, store_dir, history_period=None):
+    """
+    錄製 yfinance Ticker 的 info 與財務報表
+
+    Args:
+        symbol (str): 股票代碼，如 '2330.TW'
+        store_dir (str): 錄製目錄
+        history_period (str): 同時錄製的股價歷史期間 (如 '5y')，None表示不錄製
+
+    Returns:
+        str: 該股票的錄製目錄
+    """
+    import yfinance as yf
+
+    ticker = yf.Ticker(symbol)
+    symbol_dir = os.path.join(store_dir, symbol)
+    os.makedirs(symbol_dir, exist_ok=True)
+
+    with open(os.path.join(symbol_dir, 'info.json'), 'w', encoding='utf-8') as f:
+        json.dump(ticker.info, f, ensure_ascii=False, indent=2, default=str)
+
+    for name in TICKER_FRAMES:
+        getattr(ticker, name).to_csv(os.path.join(symbol_dir, f"{name}.csv"))
+
+    if history_period:
+        ticker.history(period=history_period).to_csv(os.path.join(symbol_dir, 'history.csv'))
+
+    print(f"已錄製 {symbol} 至 {symbol_dir}")
+    return symbol_dir
+
+
+class ReplayTicker:
+    """以錄製資料取代 yf.Ticker 的離線物件，屬性與 yfinance 相同"""
+
+    def __init__(self, symbol, store_dir, faults=None):
+        """
+        初始化重播 Ticker
+
+        Args:
+            symbol (str): 股票代碼
+            store_dir (str): 錄製目錄
+            faults (FaultProfile): 延遲與錯誤注入設定，錯誤以 ConnectionError 表現
+        """
+        self.ticker = symbol
+        self.symbol_dir = os.path.join(store_dir, symbol)
+        self.faults = faults
+        self._frames = {}
+
+    def _maybe_fault(self, name):
+        if self.faults is None:
+            return
+        latency, injected = self.faults.decide(f"{self.ticker}:{name}")
+        if latency:
+            time.sleep(latency)
+        if injected:
+            raise ConnectionError(f"injected {injected} for {self.ticker}.{name}")
+
+    def _frame(self, name):
+        import pandas as pd
+
+        self._maybe_fault(name)
+        if name not in self._frames:
+            path = os.path.join(self.symbol_dir, f"{name}.csv")
+            if not os.path.exists(path):
+                self._frames[name] = pd.DataFrame()
+            else:
+                frame = pd.read_csv(path, index_col=0)
+                if name != 'history':
+                    frame.columns = pd.to_datetime(frame.columns)
+                else:
+                    frame.index = pd.to_datetime(frame.index, utc=True)
+                self._frames[name] = frame
+        return self._frames[name]
+
+    @property
+    def info(self):
+        self._maybe_fault('info')
+        path = os.path.join(self.symbol_dir, 'info.json')
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def history(self, period=None, **kwargs):
+        return self._frame('history')
+
+    def __getattr__(self, name):
+        name = TICKER_ALIASES.get(name, name)
+        if name in TICKER_FRAMES:
+            return self._frame(name)
+        raise AttributeError(name)
+
+
+@contextmanager
+def replay_yfinance(store_dir, faults=None):
+    """
+    在區塊內將 yfinance.Ticker 替換為 ReplayTicker
+
+    Args:
+        store_dir (str): yfinance 錄製目錄
+        faults (FaultProfile): 延遲與錯誤注入設定
+
+    Example:
+        with replay_yfinance('../data/replay/yfinance'):
+            data = get_comprehensive_financial_data('2330.TW')
+    """
+    import yfinance as yf
+
+    original = yf.Ticker
+    yf.Ticker = lambda symbol, *args, **kwargs: ReplayTicker(symbol, store_dir, faults)
+    try:
+        yield
+    finally:
+        yf.Ticker = original
+
+
+def main():
+    """啟動本地重播伺服器"""
+    parser = argparse.ArgumentParser(description='台股資料來源離線重播伺服器')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve = subparsers.add_parser('serve', help='以錄製資料啟動重播伺服器')
+    serve.add_argument('--store', required=True, help='HTTP 錄製目錄')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--latency-ms', type=float, default=0.0)
+    serve.add_argument('--jitter-ms', type=float, default=0.0)
+    serve.add_argument('--error-rate', type=float, default=0.0)
+    serve.add_argument('--throttle-rate', type=float, default=0.0)
+    serve.add_argument('--retry-after', type=int, default=1)
+    serve.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args()
+    faults = FaultProfile(args.latency_ms, args.jitter_ms, args.error_rate, args.throttle_rate, args.retry_after, args.seed)
+    server = ReplayServer(args.store, args.host, args.port, faults)
+    print(f"重播伺服器啟動: {server.url} (錄製目錄: {args.store})")
+    print(f"設定 TW_STOCK_HTTP_REPLAY_URL={server.url} 讓爬蟲改用本地資料")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n重播伺服器已停止")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+分片執行
+Sharded Execution for Multi-machine Runs
+
+用途: 將ETF或股票清單以穩定雜湊 (crc32) 分成 N 片，讓多台主機各自處理一片並輸出到分片目錄，
+      最後由合併步驟整合成與單機執行相同的標準輸出；也可在單機以 N 個程序模擬
+
+分片編號採 1 起算: `--shard 1/4` ~ `--shard 4/4`
+
+使用方式:
+    tw-stock etf refresh --shard 2/4            # 主機2: 只收集第2片的ETF
+    tw-stock score 2330.TW 2317.TW --shard 1/2 --output scores.json
+    tw-stock shard merge etf --shards 4          # 合併 data/etf_data/shards/ 的輸出
+    tw-stock shard run 4 -- etf refresh --delay 0  # 單機啟動4個程序並合併
+"""
+
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Shard:
+    """分片設定 (index 為 1 起算)"""
+
+    __slots__ = ('index', 'count')
+
+    def __init__(self, index, count):
+        if count < 1 or not 1 <= index <= count:
+            raise ValueError(f"分片必須為 i/N 且 1 <= i <= N: {index}/{count}")
+        self.index = index
+        self.count = count
+
+    def __repr__(self):
+        return f"Shard({self.index}/{self.count})"
+
+    def __str__(self):
+        return f"{self.index}/{self.count}"
+
+    @property
+    def label(self):
+        """用於檔名的標籤，如 'shard-2-of-4'"""
+        return f"shard-{self.index}-of-{self.count}"
+
+    def owns(self, key):
+        """此分片是否負責該鍵值"""
+        return shard_index(key, self.count) == self.index
+
+    def select(self, items, key=None):
+        """
+        篩選此分片負責的項目
+
+        Args:
+            items (iterable): 項目
+            key (callable): 由項目取得分片鍵值，None表示項目本身
+
+        Returns:
+            list: 維持原順序的項目
+        """
+        key = key or (lambda item: item)
+        return [item for item in items if self.owns(key(item))]
+
+
+def parse_shard(text):
+    """
+    解析 'i/N' 格式的分片設定
+
+    Args:
+        text (str): 如 '2/4'，None 或空字串表示不分片
+
+    Returns:
+        Shard: 分片設定，不分片時為 None
+    """
+    if not text:
+        return None
+    try:
+        index, count = (int(part) for part in str(text).split('/'))
+    except ValueError:
+        raise ValueError(f"分片格式應為 i/N (如 2/4): {text}") from None
+    return Shard(index, count)
+
+
+def shard_index(key, count):
+    """
+    穩定的分片編號
+
+    使用 crc32 而非內建 hash()，不同主機與程序 (PYTHONHASHSEED 不同) 都得到相同結果
+
+    Returns:
+        int: 1 ~ count
+    """
+    return zlib.crc32(str(key).strip().encode('utf-8')) % count + 1
+
+
+def shard_path(path, shard):
+    """
+    分片輸出檔名
+
+    Example:
+        shard_path('data/scores.json', Shard(2, 4)) → 'data/scores.shard-2-of-4.json'
+    """
+    root, ext = os.path.splitext(path)
+    return f"{root}.{shard.label}{ext}"
+
+
+def shard_dir(base_dir, shard):
+    """分片輸出目錄: {base_dir}/shards/shard-i-of-N"""
+    return os.path.join(base_dir, 'shards', shard.label)
+
+
+def _check_complete(found, count, allow_partial, what):
+    missing = [index for index in range(1, count + 1) if index not in found]
+    if missing and not allow_partial:
+        raise FileNotFoundError(f"{what} 缺少分片: {', '.join(str(index) for index in missing)} / {count}")
+    return missing
+
+
+def merge_json_shards(path, count, allow_partial=False):
+    """
+    合併各分片的 JSON 物件輸出 (如評分結果)
+
+    Args:
+        path (str): 標準輸出路徑，分片檔為 shard_path(path, Shard(i, count))
+        count (int): 分片數
+        allow_partial (bool): 允許缺少分片
+
+    Returns:
+        dict: 合併後的內容 (依鍵值排序)，同時寫入 path
+    """
+    merged = {}
+    found = set()
+    for index in range(1, count + 1):
+        part = shard_path(path, Shard(index, count))
+        if not os.path.exists(part):
+            continue
+        found.add(index)
+        with open(part, 'r', encoding='utf-8') as f:
+            merged.update(json.load(f))
+    _check_complete(found, count, allow_partial, path)
+
+    merged = dict(sorted(merged.items()))
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(merged, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    print(f"已合併 {len(found)} 個分片 ({len(merged)} 筆) 至: {path}")
+    return merged
+
+
+def merge_etf_shards(data_dir, count, allow_partial=False):
+    """
+    合併各分片的ETF成份股輸出到標準目錄
+
+    合併結果與 TaiwanETFScraper.save_to_csv 相同: taiwan_etf_list.csv、{代碼}_constituents.csv、
+    all_etf_constituents.csv，ETF依代碼排序
+
+    Args:
+        data_dir (str): 標準資料目錄，分片目錄為 shard_dir(data_dir, Shard(i, count))
+        count (int): 分片數
+        allow_partial (bool): 允許缺少分片
+
+    Returns:
+        tuple: (ETF清單DataFrame, 所有成份股DataFrame)
+    """
+    import pandas as pd
+
+    etf_frames, all_frames = [], []
+    found = set()
+    for index in range(1, count + 1):
+        directory = shard_dir(data_dir, Shard(index, count))
+        all_path = os.path.join(directory, 'all_etf_constituents.csv')
+        if not os.path.exists(all_path):
+            continue
+        found.add(index)
+        all_frames.append(pd.read_csv(all_path, dtype={'etf_code': str, 'stock_code': str}))
+        list_path = os.path.join(directory, 'taiwan_etf_list.csv')
+        if os.path.exists(list_path):
+            etf_frames.append(pd.read_csv(list_path, dtype={'code': str}))
+        for path in glob.glob(os.path.join(directory, '*_constituents.csv')):
+            if os.path.basename(path) != 'all_etf_constituents.csv':
+                shutil.copy2(path, os.path.join(data_dir, os.path.basename(path)))
+    _check_complete(found, count, allow_partial, data_dir)
+    if not found:
+        raise FileNotFoundError(f"{data_dir} 中沒有任何分片輸出")
+
+    os.makedirs(data_dir, exist_ok=True)
+    all_df = pd.concat(all_frames, ignore_index=True)
+    all_df = all_df.drop_duplicates(['etf_code', 'stock_code'], keep='last')
+    all_df = all_df.sort_values('etf_code', kind='stable').reset_index(drop=True)
+    all_df.to_csv(os.path.join(data_dir, 'all_etf_constituents.csv'), index=False, encoding='utf-8-sig')
+
+    etf_df = pd.concat(etf_frames, ignore_index=True) if etf_frames else pd.DataFrame()
+    if not etf_df.empty:
+        etf_df = etf_df.drop_duplicates('code', keep='last').sort_values('code').reset_index(drop=True)
+        etf_df.to_csv(os.path.join(data_dir, 'taiwan_etf_list.csv'), index=False, encoding='utf-8-sig')
+
+    print(f"已合併 {len(found)} 個分片: {all_df['etf_code'].nunique()} 檔ETF、{len(all_df)} 筆成份股 → {data_dir}")
+    return etf_df, all_df
+
+
+def run_local_shards(count, command, cli_path=None, max_parallel=None):
+    """
+    在單機以 N 個程序執行分片指令
+
+    Args:
+        count (int): 分片數
+        command (list): tw-stock 子指令與參數 (不含 --shard)，如 ['etf', 'refresh', '--delay', '0']
+        cli_path (str): tw_stock_cli.py 路徑
+        max_parallel (int): 同時執行的程序數，None表示全部同時
+
+    Returns:
+        list: 各分片的結束代碼
+    """
+    cli_path = cli_path or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tw_stock_cli.py')
+
+    def run(index):
+        argv = [sys.executable, cli_path, *command, '--shard', f"{index}/{count}"]
+        print(f"啟動分片 {index}/{count}: {' '.join(argv[1:])}")
+        completed = subprocess.run(argv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        return index, completed
+
+    codes = []
+    with ThreadPoolExecutor(max_workers=max_parallel or count) as executor:
+        for index, completed in executor.map(run, range(1, count + 1)):
+            status = '✓' if completed.returncode == 0 else '✗'
+            print(f"{status} 分片 {index}/{count} 結束 (代碼 {completed.returncode})")
+            if completed.returncode != 0:
+                print(completed.stdout[-2000:])
+            codes.append(completed.returncode)
+    return codes
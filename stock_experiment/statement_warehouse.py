@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+財務報表欄式倉儲
+Columnar Financial Statement Warehouse
+
+用途: 將 yf.Ticker 的寬表財報 (項目 × 期間) 轉為長表 (symbol, statement, frequency, period_end, item, value)，
+      以 Parquet 依 statement / frequency 分區儲存，symbol 與 item 以字典編碼；
+      檔案內依 item、symbol、period_end 排序，查詢單一項目時只讀取需要的欄位與 row group，
+      全市場約1700家公司的橫斷面查詢可在本機1秒內完成
+
+需要 pyarrow (pip3 install pyarrow)，只在實際讀寫倉儲時匯入
+
+目錄結構:
+    data/statement_warehouse/
+        companies.parquet                                   # symbol、名稱、sector、industry
+        statements/statement=income_stmt/frequency=quarterly/part-{batch}.parquet
+        ...
+
+使用方式:
+    warehouse = StatementWarehouse()
+    warehouse.ingest_statements_dir('../data/statements')   # replay_harness 錄製的財報
+    warehouse.query('Gross Profit', industry='Semiconductors', periods=8)
+    warehouse.compact()                                      # 合併重複寫入的批次
+"""
+
+import glob
+import os
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WAREHOUSE_DIR = os.path.join(REPO_ROOT, 'data', 'statement_warehouse')
+
+# (statement, frequency) 對應 yf.Ticker 屬性
+STATEMENT_ATTRIBUTES = {
+    ('income_stmt', 'annual'): 'income_stmt',
+    ('balance_sheet', 'annual'): 'balance_sheet',
+    ('cashflow', 'annual'): 'cashflow',
+    ('income_stmt', 'quarterly'): 'quarterly_income_stmt',
+    ('balance_sheet', 'quarterly'): 'quarterly_balance_sheet',
+    ('cashflow', 'quarterly'): 'quarterly_cashflow',
+}
+
+# 每筆資料的識別欄位；檔案另存 batch (寫入時間 ns)，同一筆資料重複寫入時以最新批次為準
+KEY_COLUMNS = ['symbol', 'statement', 'frequency', 'period_end', 'item']
+COMPANY_COLUMNS = ['symbol', 'name', 'sector', 'industry']
+
+ROW_GROUP_SIZE = 64 * 1024
+INGEST_CHUNK = 200
+
+
+def _pyarrow():
+    """匯入 pyarrow，未安裝時提示安裝方式"""
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("財務報表倉儲需要 pyarrow，請執行: pip3 install pyarrow") from None
+    return pyarrow
+
+
+def frames_to_long(symbol, frames):
+    """
+    單一股票的寬表財報轉為長表
+
+    Args:
+        symbol (str): 股票代碼
+        frames (dict): yf.Ticker 屬性名稱 (income_stmt、quarterly_cashflow 等) 對應 DataFrame
+
+    Returns:
+        pd.DataFrame: symbol、statement、frequency、period_end、item、value (不含空值)
+    """
+    import pandas as pd
+
+    parts = []
+    for (statement, frequency), attribute in STATEMENT_ATTRIBUTES.items():
+        frame = frames.get(attribute)
+        if frame is None or frame.empty:
+            continue
+        frame = frame.copy()
+        frame.columns = pd.to_datetime(frame.columns)
+        long = frame.rename_axis(index='item', columns='period_end').stack().rename('value').reset_index()
+        long['statement'] = statement
+        long['frequency'] = frequency
+        parts.append(long)
+    if not parts:
+        return pd.DataFrame(columns=['symbol', 'statement', 'frequency', 'period_end', 'item', 'value'])
+
+    result = pd.concat(parts, ignore_index=True)
+    result['symbol'] = symbol
+    result['item'] = result['item'].astype(str)
+    result['value'] = pd.to_numeric(result['value'], errors='coerce')
+    result = result.dropna(subset=['value'])
+    return result[['symbol', 'statement', 'frequency', 'period_end', 'item', 'value']]
+
+
+def _arrow_table(frame):
+    """長表轉為 Arrow Table，symbol 與 item 字典編碼，期末日存為 date32"""
+    pa = _pyarrow()
+    return pa.table({
+        'symbol': pa.array(frame['symbol'].astype(str).to_numpy()).dictionary_encode(),
+        'period_end': pa.array(frame['period_end'].to_numpy(dtype='datetime64[ms]')).cast(pa.date32()),
+        'item': pa.array(frame['item'].astype(str).to_numpy()).dictionary_encode(),
+        'value': pa.array(frame['value'].to_numpy(dtype=float)),
+        'batch': pa.array(frame['batch'].to_numpy(dtype='int64')),
+    })
+
+
+class StatementWarehouse:
+    """以 Parquet 分區儲存的長表財報倉儲"""
+
+    def __init__(self, root=WAREHOUSE_DIR):
+        """
+        初始化倉儲
+
+        Args:
+            root (str): 倉儲根目錄
+        """
+        self.root = root
+        self.statements_dir = os.path.join(root, 'statements')
+        self.companies_path = os.path.join(root, 'companies.parquet')
+
+    # ------------------------------------------------------------------
+    # 寫入
+    # ------------------------------------------------------------------
+
+    def partition_dir(self, statement, frequency):
+        return os.path.join(self.statements_dir, f"statement={statement}", f"frequency={frequency}")
+
+    def write(self, long_frame, companies=None):
+        """
+        寫入一批長表財報
+
+        每個分區寫入一個新檔案 (不改寫既有檔案)，同一筆資料以最新批次為準，可用 compact() 合併
+
+        Args:
+            long_frame (pd.DataFrame): frames_to_long 格式的資料
+            companies (pd.DataFrame): COMPANY_COLUMNS 欄位的公司資料，同代碼以新資料取代
+
+        Returns:
+            int: 寫入筆數
+        """
+        batch = time.time_ns()
+        written = 0
+        for (statement, frequency), group in long_frame.groupby(['statement', 'frequency'], sort=False):
+            # 依 item 排序讓每個 row group 只涵蓋少數項目，查詢時以統計資訊略過其他 row group
+            group = group.sort_values(['item', 'symbol', 'period_end']).assign(batch=batch)
+            table = _arrow_table(group)
+            directory = self.partition_dir(statement, frequency)
+            os.makedirs(directory, exist_ok=True)
+            self._write_table(table, os.path.join(directory, f"part-{batch}.parquet"))
+            written += len(group)
+
+        if companies is not None and len(companies):
+            self._write_companies(companies)
+        return written
+
+    @staticmethod
+    def _write_table(table, path):
+        # 暫存檔以 . 開頭，pyarrow dataset 會略過，寫入中或中斷留下的暫存檔不影響查詢
+        directory, name = os.path.split(path)
+        tmp_path = os.path.join(directory, f".{name}.tmp")
+        pa = _pyarrow()
+        pa.parquet.write_table(
+            table, tmp_path, row_group_size=ROW_GROUP_SIZE, use_dictionary=['symbol', 'item'],
+            compression='zstd', write_statistics=True,
+        )
+        os.replace(tmp_path, path)
+
+    def _write_companies(self, companies):
+        import pandas as pd
+
+        companies = companies.reindex(columns=COMPANY_COLUMNS)
+        existing = self.companies()
+        if not existing.empty:
+            companies = pd.concat([existing[~existing['symbol'].isin(companies['symbol'])], companies])
+        companies = companies.sort_values('symbol').reset_index(drop=True).astype(str)
+        pa = _pyarrow()
+        os.makedirs(self.root, exist_ok=True)
+        self._write_table(pa.Table.from_pandas(companies, preserve_index=False), self.companies_path)
+
+    def ingest_ticker_frames(self, frames_by_symbol, infos=None):
+        """
+        寫入多檔股票的財報
+
+        Args:
+            frames_by_symbol (dict): {股票代碼: {yf.Ticker 屬性名稱: DataFrame}}
+            infos (dict): {股票代碼: yf.Ticker.info}，用於公司產業資料
+
+        Returns:
+            int: 寫入筆數
+        """
+        import pandas as pd
+
+        long_frame = pd.concat(
+            [frames_to_long(symbol, frames) for symbol, frames in frames_by_symbol.items()], ignore_index=True
+        )
+        companies = None
+        if infos:
+            companies = pd.DataFrame([
+                {'symbol': symbol, 'name': info.get('longName', symbol), 'sector': info.get('sector', 'Unknown'),
+                 'industry': info.get('industry', 'Unknown')}
+                for symbol, info in infos.items()
+            ])
+        return self.write(long_frame, companies)
+
+    def ingest_statements_dir(self, statements_dir, symbols=None):
+        """
+        寫入 replay_harness.record_ticker 錄製的財報
+
+        Args:
+            statements_dir (str): 錄製目錄
+            symbols (list): 股票代碼，None表示目錄中所有已錄製的股票
+
+        Returns:
+            int: 寫入筆數
+        """
+        from replay_harness import ReplayTicker
+
+        if symbols is None:
+            symbols = sorted(
+                name for name in os.listdir(statements_dir)
+                if os.path.exists(os.path.join(statements_dir, name, 'income_stmt.csv'))
+            )
+
+        written = 0
+        # 分批寫入，避免一次載入全市場，也避免每檔股票各產生一個小檔案
+        for start in range(0, len(symbols), INGEST_CHUNK):
+            frames, infos = {}, {}
+            for symbol in symbols[start:start + INGEST_CHUNK]:
+                ticker = ReplayTicker(symbol, statements_dir)
+                frames[symbol] = {attribute: getattr(ticker, attribute) for attribute in STATEMENT_ATTRIBUTES.values()}
+                infos[symbol] = ticker.info
+            written += self.ingest_ticker_frames(frames, infos)
+        print(f"已寫入 {len(symbols)} 檔股票、{written} 筆財報資料至: {self.root}")
+        return written
+
+    def compact(self):
+        """
+        每個分區合併為單一檔案，重複寫入的資料只保留最新批次
+
+        Returns:
+            int: 合併後的筆數
+        """
+        pa = _pyarrow()
+        total = 0
+        for directory in sorted(glob.glob(os.path.join(self.statements_dir, 'statement=*', 'frequency=*'))):
+            parts = sorted(glob.glob(os.path.join(directory, 'part-*.parquet')))
+            if len(parts) <= 1:
+                total += sum(pa.parquet.ParquetFile(path).metadata.num_rows for path in parts)
+                continue
+            frame = pa.parquet.read_table(parts).to_pandas()
+            frame = frame.sort_values('batch').drop_duplicates(['symbol', 'period_end', 'item'], keep='last')
+            frame = frame.sort_values(['item', 'symbol', 'period_end'])
+            table = _arrow_table(frame)
+            merged_path = os.path.join(directory, f"part-{int(frame['batch'].max())}.parquet")
+            # 先以合併檔取代最新批次的檔案再刪除其他檔案；中斷時重複的資料由查詢依 batch 去重
+            self._write_table(table, merged_path)
+            for path in parts:
+                if path != merged_path:
+                    os.remove(path)
+            total += len(frame)
+        return total
+
+    # ------------------------------------------------------------------
+    # 查詢
+    # ------------------------------------------------------------------
+
+    def companies(self):
+        """公司產業資料"""
+        import pandas as pd
+
+        if not os.path.exists(self.companies_path):
+            return pd.DataFrame(columns=COMPANY_COLUMNS)
+        return _pyarrow().parquet.read_table(self.companies_path).to_pandas()
+
+    def symbols_for(self, sector=None, industry=None):
+        """
+        依產業篩選股票代碼 (不分大小寫)
+
+        Args:
+            sector (str): yfinance sector，如 'Technology'
+            industry (str): yfinance industry，如 'Semiconductors'
+
+        Returns:
+            list: 股票代碼
+        """
+        companies = self.companies()
+        mask = companies['symbol'].notna()
+        if sector:
+            mask &= companies['sector'].str.lower() == sector.lower()
+        if industry:
+            mask &= companies['industry'].str.lower() == industry.lower()
+        return companies.loc[mask, 'symbol'].tolist()
+
+    def dataset(self):
+        """以 hive 分區讀取的 pyarrow Dataset"""
+        pa = _pyarrow()
+        return pa.dataset.dataset(self.statements_dir, format='parquet', partitioning='hive')
+
+    def query(self, items, symbols=None, sector=None, industry=None, statement=None, frequency='quarterly',
+              periods=None, start=None, end=None, pivot=False):
+        """
+        查詢財報項目
+
+        只讀取 symbol、period_end、item、value、batch 欄位；statement、frequency 以分區目錄略過，
+        item、symbol、期間條件下推到 row group 統計資訊
+
+        Args:
+            items (str | list): 報表項目，如 'Gross Profit'
+            symbols (list): 股票代碼
+            sector (str): 只查詢此 yfinance sector 的股票
+            industry (str): 只查詢此 yfinance industry 的股票
+            statement (str): 'income_stmt'、'balance_sheet' 或 'cashflow'，None表示不限
+            frequency (str): 'quarterly' 或 'annual'，None表示不限
+            periods (int): 每檔股票只保留最近幾期
+            start (str): 期末日下限 (YYYY-MM-DD)
+            end (str): 期末日上限
+            pivot (bool): 轉為寬表 ((symbol, item) × period_end)
+
+        Returns:
+            pd.DataFrame: 長表 (symbol、statement、frequency、period_end、item、value) 或寬表
+        """
+        import pandas as pd
+
+        pa = _pyarrow()
+        ds = pa.dataset
+        items = [items] if isinstance(items, str) else list(items)
+        if sector or industry:
+            industry_symbols = self.symbols_for(sector, industry)
+            symbols = industry_symbols if symbols is None else [s for s in symbols if s in set(industry_symbols)]
+
+        if not os.path.isdir(self.statements_dir) or (symbols is not None and not symbols):
+            return pd.DataFrame(columns=['symbol', 'statement', 'frequency', 'period_end', 'item', 'value'])
+
+        condition = ds.field('item').isin(items)
+        if symbols is not None:
+            condition &= ds.field('symbol').isin(list(symbols))
+        if statement:
+            condition &= ds.field('statement') == statement
+        if frequency:
+            condition &= ds.field('frequency') == frequency
+        if start:
+            condition &= ds.field('period_end') >= pa.scalar(pd.Timestamp(start).date(), pa.date32())
+        if end:
+            condition &= ds.field('period_end') <= pa.scalar(pd.Timestamp(end).date(), pa.date32())
+
+        table = self.dataset().to_table(
+            columns=['symbol', 'statement', 'frequency', 'period_end', 'item', 'value', 'batch'], filter=condition,
+        )
+        frame = table.to_pandas()
+        for column in ('symbol', 'statement', 'frequency', 'item'):
+            frame[column] = frame[column].astype(str)
+        frame['period_end'] = pd.to_datetime(frame['period_end'])
+
+        if frame['batch'].nunique() > 1:
+            frame = frame.sort_values('batch').drop_duplicates(KEY_COLUMNS, keep='last')
+        frame = frame.drop(columns='batch')
+
+        if periods:
+            rank = frame.groupby(['symbol', 'frequency', 'item'])['period_end'].rank(method='dense', ascending=False)
+            frame = frame[rank <= periods]
+
+        frame = frame.sort_values(['symbol', 'item', 'period_end'], ascending=[True, True, False])
+        frame = frame.reset_index(drop=True)
+        if pivot:
+            return frame.pivot_table(index=['symbol', 'item'], columns='period_end', values='value', aggfunc='last')
+        return frame
+
+    def summary(self):
+        """
+        倉儲內容摘要
+
+        Returns:
+            dict: 檔案數、筆數、股票數、各分區筆數
+        """
+        pa = _pyarrow()
+        partitions = {}
+        files = 0
+        for directory in sorted(glob.glob(os.path.join(self.statements_dir, 'statement=*', 'frequency=*'))):
+            parts = glob.glob(os.path.join(directory, 'part-*.parquet'))
+            files += len(parts)
+            key = os.path.relpath(directory, self.statements_dir).replace(os.sep, '/')
+            partitions[key] = sum(pa.parquet.ParquetFile(path).metadata.num_rows for path in parts)
+        return {
+            'files': files,
+            'rows': sum(partitions.values()),
+            'companies': len(self.companies()),
+            'partitions': partitions,
+        }
@@ -0,0 +1,893 @@
+#!/usr/bin/env python3
+"""
+合成台股資料產生器
+Deterministic Synthetic Universe Generator
+
+用途: 不需連網即可產生任意規模 (數千檔ETF、數千檔個股) 的台股模擬資料，供壓力測試與效能測試使用:
+      - ETF清單與成份股 (權重集中於大型股，每季調整成份、每日隨股價漂移)
+      - 多年期每日持股快照
+      - 個股日收盤價與 OHLCV
+      - yfinance 列名相同的年度/季度財務報表
+      - 證交所 T86 三大法人買賣超日報格式
+      - 證交所 MI_INDEX 每日收盤行情 (全部) 格式
+
+所有亂數以 (seed, 資料種類, 代碼/日期) 為鍵產生，同一設定在不同程序、不同查詢順序下結果都相同
+"""
+
+import json
+import os
+import zlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from etf_holdings_matrix import ETFHoldingsMatrix
+
+# 與 major_investors_movements 相同的T86查詢網址
+T86_URL = 'https://www.twse.com.tw/rwd/zh/fund/T86?response=json&date={date}&selectType=ALL'
+
+# 證交所 2018-01-02 之後的T86欄位
+T86_FIELDS = [
+    '證券代號', '證券名稱',
+    '外陸資買進股數(不含外資自營商)', '外陸資賣出股數(不含外資自營商)', '外陸資買賣超股數(不含外資自營商)',
+    '外資自營商買進股數', '外資自營商賣出股數', '外資自營商買賣超股數',
+    '投信買進股數', '投信賣出股數', '投信買賣超股數',
+    '自營商買賣超股數',
+    '自營商買進股數(自行買賣)', '自營商賣出股數(自行買賣)', '自營商買賣超股數(自行買賣)',
+    '自營商買進股數(避險)', '自營商賣出股數(避險)', '自營商買賣超股數(避險)',
+    '三大法人買賣超股數',
+]
+
+# 證交所 MI_INDEX (type=ALL) 每日收盤行情
+MI_INDEX_URL = 'https://www.twse.com.tw/rwd/zh/afterTrading/MI_INDEX?response=json&date={date}&type=ALL'
+
+MI_INDEX_FIELDS = [
+    '證券代號', '證券名稱', '成交股數', '成交筆數', '成交金額', '開盤價', '最高價', '最低價', '收盤價',
+    '漲跌(+/-)', '漲跌價差', '最後揭示買價', '最後揭示買量', '最後揭示賣價', '最後揭示賣量', '本益比',
+]
+
+# yfinance 產業分類與台股大致的家數比例
+SECTOR_SHARES = {
+    'Technology': 0.42,
+    'Industrials': 0.12,
+    'Basic Materials': 0.10,
+    'Consumer Cyclical': 0.10,
+    'Financial Services': 0.07,
+    'Communication Services': 0.04,
+    'Healthcare': 0.06,
+    'Consumer Defensive': 0.04,
+    'Real Estate': 0.03,
+    'Energy': 0.01,
+    'Utilities': 0.01,
+}
+
+ISSUERS = ('元大', '國泰', '富邦', '復華', '群益', '中信', '永豐', '凱基', '統一', '野村')
+
+# 主題: (名稱, 偏好產業, 權重集中度)，集中度 1.0 為純市值加權
+THEMES = (
+    ('台灣50', None, 1.0),
+    ('高股息', 'Financial Services', 0.4),
+    ('ESG永續', None, 0.7),
+    ('半導體', 'Technology', 0.8),
+    ('科技', 'Technology', 0.9),
+    ('金融', 'Financial Services', 0.8),
+    ('電動車', 'Consumer Cyclical', 0.6),
+    ('5G通訊', 'Communication Services', 0.6),
+    ('價值', 'Basic Materials', 0.5),
+    ('中小型', None, 0.3),
+)
+
+INCOME_ITEMS = (
+    'Total Revenue', 'Cost Of Revenue', 'Gross Profit', 'Operating Expense', 'Operating Income',
+    'Pretax Income', 'Tax Provision', 'Net Income', 'Net Income Common Stockholders',
+    'Basic EPS', 'Diluted EPS', 'Basic Average Shares', 'EBITDA',
+)
+BALANCE_ITEMS = (
+    'Total Assets', 'Current Assets', 'Cash And Cash Equivalents', 'Accounts Receivable', 'Inventory',
+    'Total Liabilities Net Minority Interest', 'Current Liabilities', 'Total Debt',
+    'Stockholders Equity', 'Ordinary Shares Number',
+)
+CASHFLOW_ITEMS = (
+    'Operating Cash Flow', 'Investing Cash Flow', 'Financing Cash Flow', 'Free Cash Flow',
+    'Capital Expenditure', 'Cash Dividends Paid',
+)
+# 金融業在 yfinance 沒有的項目
+FINANCIAL_MISSING_ITEMS = ('Cost Of Revenue', 'Gross Profit', 'Current Assets', 'Current Liabilities', 'Inventory')
+
+STATEMENT_ITEMS = {
+    'income_stmt': INCOME_ITEMS,
+    'balance_sheet': BALANCE_ITEMS,
+    'cashflow': CASHFLOW_ITEMS,
+}
+
+# 季度調整成份股的月份 (與台灣50相同)
+REBALANCE_MONTHS = (3, 6, 9, 12)
+
+
+def _rng(seed, *keys):
+    """以 (seed, 鍵值...) 建立獨立且跨程序穩定的亂數產生器"""
+    return np.random.default_rng([seed] + [zlib.crc32(str(key).encode('utf-8')) for key in keys])
+
+
+class SyntheticUniverse:
+    """可重現的合成台股資料集"""
+
+    def __init__(self, n_etfs=250, n_stocks=2000, start_date='2020-01-02', end_date='2024-12-31',
+                 constituents=(30, 100), statement_quarters=20, seed=0):
+        """
+        初始化合成資料集
+
+        Args:
+            n_etfs (int): ETF數量
+            n_stocks (int): 上市櫃股票數量
+            start_date (str): 資料起始日
+            end_date (str): 資料結束日
+            constituents (tuple): 每檔ETF成份股數量範圍
+            statement_quarters (int): 財務報表涵蓋的季數 (截至資料結束日)
+            seed (int): 亂數種子
+        """
+        self.n_etfs = n_etfs
+        self.n_stocks = n_stocks
+        self.constituents = constituents
+        self.statement_quarters = statement_quarters
+        self.seed = seed
+        # 以週一至週五為交易日 (不含台股國定假日)
+        self.trading_days = pd.bdate_range(start_date, end_date)
+        if len(self.trading_days) == 0:
+            raise ValueError("資料期間內沒有交易日")
+
+        self.stocks = self._build_stocks()
+        self.stock_codes = self.stocks['stock_code'].tolist()
+        self.etfs = self._build_etfs()
+        self.etf_codes = self.etfs['code'].tolist()
+        self.rebalance_dates = self._build_rebalance_dates()
+
+        self._pools = None
+        self._compositions = {}
+        self._log_prices = None
+        self._statements = None
+
+    # ------------------------------------------------------------------
+    # 個股與ETF基本資料
+    # ------------------------------------------------------------------
+
+    def _build_stocks(self):
+        rng = _rng(self.seed, 'stocks')
+        n = self.n_stocks
+        # 4碼代號不足時以6碼補足
+        four_digit = np.arange(1101, 10000)
+        if n <= len(four_digit):
+            codes = np.sort(rng.choice(four_digit, size=n, replace=False))
+        else:
+            codes = np.concatenate([four_digit, 100000 + np.arange(n - len(four_digit))])
+
+        sectors = rng.choice(list(SECTOR_SHARES), size=n, p=list(SECTOR_SHARES.values()))
+        # 市值呈重尾分布，少數大型股佔大部分市值
+        market_cap = np.exp(rng.normal(23.0, 1.6, size=n))
+        price = np.exp(rng.normal(4.0, 0.9, size=n))
+
+        return pd.DataFrame({
+            'stock_code': codes.astype(str),
+            'stock_name': [f"合成{code}" for code in codes],
+            'sector': sectors,
+            'market_cap': market_cap,
+            'initial_price': price,
+            'shares_outstanding': np.round(market_cap / price),
+            'beta': np.clip(rng.normal(1.0, 0.25, size=n), 0.2, 2.0),
+            'volatility': rng.uniform(0.008, 0.03, size=n),
+        })
+
+    def _build_etfs(self):
+        rng = _rng(self.seed, 'etfs')
+        n = self.n_etfs
+        issuers = rng.choice(len(ISSUERS), size=n)
+        themes = rng.choice(len(THEMES), size=n)
+        low, high = self.constituents
+        sizes = rng.integers(low, high + 1, size=n)
+        sizes[themes == 0] = 50
+        sizes = np.minimum(sizes, self.n_stocks)
+
+        return pd.DataFrame({
+            'code': [f"{700 + i:05d}" for i in range(n)],
+            'name': [f"{ISSUERS[issuer]}{THEMES[theme][0]}{i:04d}" for i, (issuer, theme) in enumerate(zip(issuers, themes))],
+            'theme': themes,
+            'size': sizes,
+            'total_weight': rng.uniform(96.0, 99.8, size=n),
+            'aum': np.exp(rng.normal(23.5, 1.2, size=n)),
+        })
+
+    def _build_rebalance_dates(self):
+        days = self.trading_days
+        first_of_month = days.to_series().groupby([days.year, days.month]).first()
+        dates = [days[0]] + [date for date in first_of_month if date.month in REBALANCE_MONTHS and date != days[0]]
+        return pd.DatetimeIndex(sorted(dates))
+
+    def etf_list(self):
+        """
+        ETF清單 (TaiwanETFScraper.etf_list 格式)
+
+        Returns:
+            list: 每檔ETF的 code、name、full_code、type
+        """
+        return [
+            {'code': code, 'name': name, 'full_code': f"{code}.TW", 'type': '股票型ETF'}
+            for code, name in zip(self.etfs['code'], self.etfs['name'])
+        ]
+
+    # ------------------------------------------------------------------
+    # 成份股與每日持股快照
+    # ------------------------------------------------------------------
+
+    def _candidate_pools(self):
+        """每檔ETF的候選股票池，每季調整時只在池內替換，前後季成份股大部分重疊"""
+        if self._pools is not None:
+            return self._pools
+
+        caps = self.stocks['market_cap'].to_numpy()
+        sectors = self.stocks['sector'].to_numpy()
+        pools = []
+        for code, theme, size in zip(self.etfs['code'], self.etfs['theme'], self.etfs['size']):
+            rng = _rng(self.seed, 'pool', code)
+            _, preferred_sector, concentration = THEMES[theme]
+            preference = caps ** (0.3 + 0.6 * concentration)
+            if preferred_sector is not None:
+                preference = preference * np.where(sectors == preferred_sector, 8.0, 1.0)
+            preference /= preference.sum()
+            pool_size = min(self.n_stocks, int(size * 1.3) + 5)
+            pools.append(rng.choice(self.n_stocks, size=pool_size, replace=False, p=preference))
+        self._pools = pools
+        return pools
+
+    def _composition(self, rebalance_index):
+        """
+        某次調整後的成份股與權重 (CSR 形式)
+
+        Returns:
+            tuple: (indptr, 股票索引, 權重百分比)
+        """
+        if rebalance_index in self._compositions:
+            return self._compositions[rebalance_index]
+
+        caps = self.stocks['market_cap'].to_numpy()
+        pools = self._candidate_pools()
+        indptr = [0]
+        stock_idx = []
+        weights = []
+        for i, (code, theme, size, total) in enumerate(zip(
+                self.etfs['code'], self.etfs['theme'], self.etfs['size'], self.etfs['total_weight'])):
+            rng = _rng(self.seed, 'composition', code, rebalance_index)
+            pool = pools[i]
+            concentration = THEMES[theme][2]
+            preference = np.sqrt(caps[pool]) * rng.lognormal(0.0, 0.3, size=len(pool))
+            members = np.sort(rng.choice(pool, size=size, replace=False, p=preference / preference.sum()))
+            raw = caps[members] ** concentration * rng.lognormal(0.0, 0.15, size=size)
+            stock_idx.append(members)
+            weights.append(raw / raw.sum() * total)
+            indptr.append(indptr[-1] + size)
+
+        composition = (np.asarray(indptr), np.concatenate(stock_idx), np.concatenate(weights))
+        self._compositions[rebalance_index] = composition
+        return composition
+
+    def _resolve_date(self, date):
+        """將日期對齊到不晚於該日的最近交易日"""
+        if date is None:
+            return len(self.trading_days) - 1
+        position = self.trading_days.searchsorted(pd.Timestamp(date), side='right') - 1
+        if position < 0:
+            raise ValueError(f"{date} 早於資料起始日 {self.trading_days[0].date()}")
+        return int(position)
+
+    def _weights_on(self, day_index):
+        """某交易日的成份股與權重 (自上次調整起隨股價漂移)"""
+        date = self.trading_days[day_index]
+        rebalance_index = int(self.rebalance_dates.searchsorted(date, side='right') - 1)
+        indptr, stock_idx, base = self._composition(rebalance_index)
+
+        rebalance_day = self.trading_days.get_loc(self.rebalance_dates[rebalance_index])
+        log_prices = self._price_matrix()
+        drift = np.exp(log_prices[day_index, stock_idx] - log_prices[rebalance_day, stock_idx])
+        drifted = base * drift
+
+        rows = np.repeat(np.arange(self.n_etfs), np.diff(indptr))
+        original_totals = np.bincount(rows, weights=base, minlength=self.n_etfs)
+        drifted_totals = np.bincount(rows, weights=drifted, minlength=self.n_etfs)
+        weights = drifted * (original_totals / drifted_totals)[rows]
+        return indptr, rows, stock_idx, weights
+
+    def etf_constituents(self, date=None):
+        """
+        某日的ETF成份股 (TaiwanETFScraper.etf_constituents 格式)
+
+        Args:
+            date (str | datetime): 日期，None表示最後一個交易日
+
+        Returns:
+            dict: ETF代碼對應 name、type、constituents、total_constituents、last_update
+        """
+        day_index = self._resolve_date(date)
+        indptr, rows, stock_idx, weights = self._weights_on(day_index)
+        shares = self._holding_shares(day_index, rows, stock_idx, weights)
+        codes = self.stocks['stock_code'].to_numpy()
+        names = self.stocks['stock_name'].to_numpy()
+        last_update = self.trading_days[day_index].strftime('%Y-%m-%d %H:%M:%S')
+
+        result = {}
+        for i, (code, name) in enumerate(zip(self.etfs['code'], self.etfs['name'])):
+            start, end = indptr[i], indptr[i + 1]
+            constituents = [
+                {
+                    'stock_code': codes[j],
+                    'stock_name': names[j],
+                    'weight': round(float(weight), 2),
+                    'shares': int(share),
+                }
+                for j, weight, share in zip(stock_idx[start:end], weights[start:end], shares[start:end])
+            ]
+            constituents.sort(key=lambda item: item['weight'], reverse=True)
+            result[code] = {
+                'name': name,
+                'type': '股票型ETF',
+                'constituents': constituents,
+                'total_constituents': len(constituents),
+                'last_update': last_update,
+            }
+        return result
+
+    def holdings_matrix(self, date=None):
+        """
+        某日的持股稀疏矩陣，直接由陣列建立 (不經過成份股字典)，適合大規模快照
+
+        Args:
+            date (str | datetime): 日期，None表示最後一個交易日
+
+        Returns:
+            ETFHoldingsMatrix: 持股矩陣，欄位只包含當日有被持有的股票
+        """
+        from scipy import sparse
+
+        _, rows, stock_idx, weights = self._weights_on(self._resolve_date(date))
+        held, columns = np.unique(stock_idx, return_inverse=True)
+        matrix = sparse.csr_matrix((weights / 100.0, (rows, columns)), shape=(self.n_etfs, len(held)))
+        stock_codes = self.stocks['stock_code'].to_numpy()[held]
+        stock_names = self.stocks['stock_name'].to_numpy()[held]
+        return ETFHoldingsMatrix(
+            matrix, self.etf_codes, list(stock_codes),
+            stock_names=dict(zip(stock_codes, stock_names)),
+            etf_names=dict(zip(self.etfs['code'], self.etfs['name'])),
+        )
+
+    def iter_holdings_snapshots(self, start_date=None, end_date=None):
+        """
+        逐日產生持股快照
+
+        Args:
+            start_date (str): 起始日，None表示資料起始日
+            end_date (str): 結束日，None表示資料結束日
+
+        Yields:
+            tuple: (日期, ETFHoldingsMatrix)
+        """
+        for date in self.trading_days[self._date_slice(start_date, end_date)]:
+            yield date, self.holdings_matrix(date)
+
+    def holdings_frame(self, date=None):
+        """
+        某日持股的長表格式 (與 all_etf_constituents.csv 欄位相同)
+
+        Returns:
+            pd.DataFrame: etf_code、etf_name、etf_type、stock_code、stock_name、weight、shares、last_update
+        """
+        day_index = self._resolve_date(date)
+        _, rows, stock_idx, weights = self._weights_on(day_index)
+        return pd.DataFrame({
+            'etf_code': self.etfs['code'].to_numpy()[rows],
+            'etf_name': self.etfs['name'].to_numpy()[rows],
+            'etf_type': '股票型ETF',
+            'stock_code': self.stocks['stock_code'].to_numpy()[stock_idx],
+            'stock_name': self.stocks['stock_name'].to_numpy()[stock_idx],
+            'weight': np.round(weights, 2),
+            'shares': self._holding_shares(day_index, rows, stock_idx, weights),
+            'last_update': self.trading_days[day_index].strftime('%Y-%m-%d %H:%M:%S'),
+        })
+
+    def _holding_shares(self, day_index, rows, stock_idx, weights):
+        """由ETF規模與當日股價換算持股股數"""
+        prices = np.exp(self._price_matrix()[day_index, stock_idx])
+        aum = self.etfs['aum'].to_numpy()[rows]
+        return np.round(weights / 100.0 * aum / prices).astype(np.int64)
+
+    def _date_slice(self, start_date, end_date):
+        start = 0 if start_date is None else int(self.trading_days.searchsorted(pd.Timestamp(start_date)))
+        end = len(self.trading_days) if end_date is None else int(self.trading_days.searchsorted(pd.Timestamp(end_date), side='right'))
+        return slice(start, end)
+
+    # ------------------------------------------------------------------
+    # 股價
+    # ------------------------------------------------------------------
+
+    def _price_matrix(self):
+        """交易日 × 股票 的對數股價 (市場因子 + 產業因子 + 個股雜訊)"""
+        if self._log_prices is not None:
+            return self._log_prices
+
+        rng = _rng(self.seed, 'prices')
+        n_days = len(self.trading_days)
+        sector_names = list(SECTOR_SHARES)
+        sector_index = pd.Categorical(self.stocks['sector'], categories=sector_names).codes
+
+        market = rng.normal(0.0003, 0.011, size=n_days)
+        sector_factor = rng.normal(0.0, 0.007, size=(n_days, len(sector_names)))
+        noise = rng.standard_normal((n_days, self.n_stocks))
+        noise *= self.stocks['volatility'].to_numpy()
+        noise += market[:, None] * self.stocks['beta'].to_numpy()
+        noise += sector_factor[:, sector_index]
+        noise[0] = 0.0
+        np.cumsum(noise, axis=0, out=noise)
+        noise += np.log(self.stocks['initial_price'].to_numpy())
+
+        self._log_prices = noise
+        return noise
+
+    def price_panel(self, start_date=None, end_date=None):
+        """
+        日收盤價
+
+        Returns:
+            pd.DataFrame: 日期 × 股票代碼 的收盤價
+        """
+        window = self._date_slice(start_date, end_date)
+        return pd.DataFrame(
+            np.round(np.exp(self._price_matrix()[window]), 2),
+            index=self.trading_days[window], columns=self.stock_codes,
+        )
+
+    def return_panel(self, start_date=None, end_date=None):
+        """
+        日報酬 (與 etf_replication.build_return_matrix 相同格式)
+
+        Returns:
+            pd.DataFrame: 日期 × 股票代碼 的日報酬
+        """
+        return self.price_panel(start_date, end_date).pct_change(fill_method=None).iloc[1:]
+
+    def ohlcv(self, stock_code, start_date=None, end_date=None):
+        """
+        單一股票的日K資料 (欄位與 yfinance history 相同)
+
+        Returns:
+            pd.DataFrame: Open、High、Low、Close、Volume
+        """
+        j = self.stock_codes.index(str(stock_code).split('.')[0])
+        window = self._date_slice(start_date, end_date)
+        close = np.exp(self._price_matrix()[window, j])
+        rng = _rng(self.seed, 'ohlcv', self.stock_codes[j])
+        n = len(close)
+        previous = np.r_[close[0], close[:-1]]
+        open_ = previous * np.exp(rng.normal(0.0, 0.004, size=n))
+        high = np.maximum(open_, close) * np.exp(np.abs(rng.normal(0.0, 0.006, size=n)))
+        low = np.minimum(open_, close) * np.exp(-np.abs(rng.normal(0.0, 0.006, size=n)))
+        turnover = rng.lognormal(np.log(0.003), 0.5, size=n)
+        volume = np.round(self.stocks['shares_outstanding'].iat[j] * turnover)
+        return pd.DataFrame({
+            'Open': np.round(open_, 2),
+            'High': np.round(high, 2),
+            'Low': np.round(low, 2),
+            'Close': np.round(close, 2),
+            'Volume': volume.astype(np.int64),
+        }, index=self.trading_days[window])
+
+    # ------------------------------------------------------------------
+    # 財務報表
+    # ------------------------------------------------------------------
+
+    def _statement_arrays(self):
+        """所有股票的季度財務報表 (項目對應 股票 × 季度 陣列，季度由舊到新)"""
+        if self._statements is not None:
+            return self._statements
+
+        quarters = self.statement_quarters
+        rng = _rng(self.seed, 'statements', quarters)
+        n = self.n_stocks
+        stocks = self.stocks
+        is_financial = (stocks['sector'] == 'Financial Services').to_numpy()[:, None]
+        shares = stocks['shares_outstanding'].to_numpy()[:, None]
+
+        # 營收: 股價營收比約 2 倍，季成長率為個股趨勢加上季節雜訊
+        annual_revenue = stocks['market_cap'].to_numpy() / rng.lognormal(np.log(2.0), 0.5, size=n)
+        trend = rng.normal(0.015, 0.03, size=(n, 1))
+        growth = trend + rng.normal(0.0, 0.06, size=(n, quarters))
+        growth[:, 0] = 0.0
+        revenue = annual_revenue[:, None] / 4 * np.exp(np.cumsum(growth, axis=1) - trend * (quarters - 1))
+
+        gross_margin = np.clip(rng.normal(0.28, 0.12, size=(n, 1)) + rng.normal(0.0, 0.02, size=(n, quarters)), 0.02, 0.9)
+        operating_ratio = np.clip(rng.normal(0.45, 0.2, size=(n, 1)) + rng.normal(0.0, 0.08, size=(n, quarters)), -0.5, 0.9)
+        gross_profit = revenue * gross_margin
+        operating_income = gross_profit * operating_ratio
+        pretax = operating_income + revenue * rng.normal(0.005, 0.01, size=(n, quarters))
+        tax = np.where(pretax > 0, pretax * 0.2, 0.0)
+        net_income = pretax - tax
+        eps = net_income / shares
+
+        assets = annual_revenue[:, None] * np.where(is_financial, 12.0, 1.0) * rng.lognormal(np.log(1.4), 0.3, size=(n, 1))
+        assets = assets * np.exp(np.cumsum(np.c_[np.zeros(n), growth[:, 1:] * 0.5], axis=1))
+        equity_ratio = np.where(is_financial, rng.uniform(0.06, 0.12, size=(n, 1)), rng.uniform(0.3, 0.75, size=(n, 1)))
+        equity = assets * equity_ratio
+        liabilities = assets - equity
+        current_assets = assets * rng.uniform(0.3, 0.6, size=(n, 1))
+        operating_cf = net_income * rng.normal(1.2, 0.3, size=(n, quarters)) + revenue * 0.03
+        capex = -revenue * rng.uniform(0.02, 0.3, size=(n, 1))
+        dividends = -np.maximum(net_income, 0.0) * rng.uniform(0.3, 0.9, size=(n, 1))
+
+        arrays = {
+            'Total Revenue': revenue,
+            'Cost Of Revenue': revenue - gross_profit,
+            'Gross Profit': gross_profit,
+            'Operating Expense': gross_profit - operating_income,
+            'Operating Income': operating_income,
+            'Pretax Income': pretax,
+            'Tax Provision': tax,
+            'Net Income': net_income,
+            'Net Income Common Stockholders': net_income,
+            'Basic EPS': eps,
+            'Diluted EPS': eps * 0.99,
+            'Basic Average Shares': np.broadcast_to(shares, (n, quarters)),
+            'EBITDA': operating_income + revenue * 0.05,
+            'Total Assets': assets,
+            'Current Assets': current_assets,
+            'Cash And Cash Equivalents': current_assets * rng.uniform(0.2, 0.5, size=(n, 1)),
+            'Accounts Receivable': current_assets * rng.uniform(0.1, 0.3, size=(n, 1)),
+            'Inventory': current_assets * rng.uniform(0.1, 0.4, size=(n, 1)),
+            'Total Liabilities Net Minority Interest': liabilities,
+            'Current Liabilities': liabilities * rng.uniform(0.4, 0.8, size=(n, 1)),
+            'Total Debt': liabilities * rng.uniform(0.2, 0.6, size=(n, 1)),
+            'Stockholders Equity': equity,
+            'Ordinary Shares Number': np.broadcast_to(shares, (n, quarters)),
+            'Operating Cash Flow': operating_cf,
+            'Investing Cash Flow': capex * rng.uniform(1.0, 1.3, size=(n, 1)),
+            'Financing Cash Flow': dividends + revenue * rng.normal(0.0, 0.02, size=(n, quarters)),
+            'Free Cash Flow': operating_cf + capex,
+            'Capital Expenditure': np.broadcast_to(capex, (n, quarters)),
+            'Cash Dividends Paid': dividends,
+        }
+        for item in FINANCIAL_MISSING_ITEMS:
+            arrays[item] = np.where(is_financial, np.nan, arrays[item])
+
+        self._statements = arrays
+        return arrays
+
+    def _quarter_ends(self):
+        """財務報表各季的季末日，最後一季為資料結束日前已結束的季度"""
+        last = (self.trading_days[-1] + pd.offsets.QuarterEnd(0)).normalize()
+        if last > self.trading_days[-1]:
+            last = last - pd.offsets.QuarterEnd(1)
+        return pd.date_range(end=last, periods=self.statement_quarters, freq='QE')
+
+    def statement_panel(self, statement='income_stmt', quarterly=False, years=4, quarters=5):
+        """
+        所有股票的財務報表面板
+
+        Args:
+            statement (str): 'income_stmt'、'balance_sheet' 或 'cashflow'
+            quarterly (bool): True為季報，False為年報
+            years (int): 年報期數
+            quarters (int): 季報期數
+
+        Returns:
+            pd.DataFrame: (stock_code, 項目) × 期間 (由新到舊)，列名與 yfinance 相同
+        """
+        if statement not in STATEMENT_ITEMS:
+            raise ValueError(f"不支援的報表: {statement}")
+        items = STATEMENT_ITEMS[statement]
+        if max(quarters, years * 4) > self.statement_quarters:
+            raise ValueError(f"財務報表只涵蓋 {self.statement_quarters} 季")
+        arrays = self._statement_arrays()
+        ends = self._quarter_ends()
+
+        if quarterly:
+            periods = ends[-quarters:]
+            values = [arrays[item][:, -quarters:] for item in items]
+        else:
+            # 年報: 流量項目為四季加總，存量項目取第四季 (季末日以第四季為準，不強制對齊12月)
+            periods = ends[-years * 4:][3::4]
+            values = []
+            for item in items:
+                data = arrays[item][:, -years * 4:]
+                if statement == 'balance_sheet' or item == 'Basic Average Shares':
+                    values.append(data[:, 3::4])
+                else:
+                    values.append(data.reshape(self.n_stocks, years, 4).sum(axis=2))
+
+        # (項目, 股票, 期間) → (股票, 項目) 列，期間由新到舊
+        stacked = np.stack(values, axis=1)[:, :, ::-1].reshape(self.n_stocks * len(items), len(periods))
+        index = pd.MultiIndex.from_product([self.stock_codes, items], names=['stock_code', 'item'])
+        return pd.DataFrame(stacked, index=index, columns=periods[::-1])
+
+    def statements(self, stock_code, years=4, quarters=5):
+        """
+        單一股票的財務報表，屬性名稱與 yf.Ticker 相同
+
+        Args:
+            stock_code (str): 股票代碼 (可含 .TW)
+
+        Returns:
+            dict: income_stmt、balance_sheet、cashflow 與對應的 quarterly_* DataFrame
+        """
+        code = str(stock_code).split('.')[0]
+        frames = {}
+        for statement in STATEMENT_ITEMS:
+            for quarterly in (False, True):
+                panel = self.statement_panel(statement, quarterly, years, quarters)
+                frame = panel.xs(code, level='stock_code').dropna(how='all')
+                frames[f"quarterly_{statement}" if quarterly else statement] = frame
+        return frames
+
+    def info(self, stock_code):
+        """
+        單一股票的基本資料，欄位與 yf.Ticker.info 相同
+
+        Returns:
+            dict: longName、sector、marketCap、currentPrice、trailingEps 等
+        """
+        code = str(stock_code).split('.')[0]
+        j = self.stock_codes.index(code)
+        row = self.stocks.iloc[j]
+        arrays = self._statement_arrays()
+        revenue = arrays['Total Revenue'][j]
+        net_income = arrays['Net Income'][j]
+        trailing_revenue = revenue[-4:].sum()
+        price = float(np.exp(self._price_matrix()[-1, j]))
+        return {
+            'symbol': f"{code}.TW",
+            'longName': row['stock_name'],
+            'sector': row['sector'],
+            'industry': row['sector'],
+            'marketCap': int(price * row['shares_outstanding']),
+            'currentPrice': round(price, 2),
+            'sharesOutstanding': int(row['shares_outstanding']),
+            'trailingEps': float(arrays['Basic EPS'][j][-4:].sum()),
+            'totalRevenue': float(trailing_revenue),
+            'revenueGrowth': float(revenue[-1] / revenue[-5] - 1) if len(revenue) >= 5 else None,
+            'profitMargins': float(net_income[-4:].sum() / trailing_revenue),
+            'grossMargins': float(np.nan_to_num(arrays['Gross Profit'][j][-4:]).sum() / trailing_revenue),
+            'operatingMargins': float(arrays['Operating Income'][j][-4:].sum() / trailing_revenue),
+            'returnOnAssets': float(net_income[-4:].sum() / arrays['Total Assets'][j][-1]),
+            'returnOnEquity': float(net_income[-4:].sum() / arrays['Stockholders Equity'][j][-1]),
+            'debtToEquity': float(arrays['Total Debt'][j][-1] / arrays['Stockholders Equity'][j][-1] * 100),
+            'currency': 'TWD',
+        }
+
+    # ------------------------------------------------------------------
+    # T86 三大法人買賣超
+    # ------------------------------------------------------------------
+
+    def t86_table(self, date):
+        """
+        某日的三大法人買賣超表 (欄位與證交所T86相同，數值為整數股數)
+
+        三大法人買賣超與當日報酬正相關，供法人籌碼訊號回測使用
+
+        Args:
+            date (str | datetime): 日期
+
+        Returns:
+            pd.DataFrame: T86 欄位的表格，非交易日回傳空表格
+        """
+        timestamp = pd.Timestamp(date).normalize()
+        if timestamp not in self.trading_days:
+            return pd.DataFrame(columns=T86_FIELDS)
+
+        day_index = self.trading_days.get_loc(timestamp)
+        rng = _rng(self.seed, 't86', timestamp.strftime('%Y%m%d'))
+        n = self.n_stocks
+        log_prices = self._price_matrix()
+        daily_return = log_prices[day_index] - log_prices[max(day_index - 1, 0)]
+
+        # 大型股每日都有法人進出，小型股只有部分日期
+        cap_rank = self.stocks['market_cap'].rank(pct=True).to_numpy()
+        active = rng.random(n) < 0.25 + 0.75 * cap_rank
+        volume = self.stocks['shares_outstanding'].to_numpy() * rng.lognormal(np.log(0.003), 0.5, size=n)
+
+        def flow(share, sensitivity):
+            gross = volume * share * rng.uniform(0.5, 1.5, size=n)
+            bias = np.clip(rng.normal(0.0, 0.3, size=n) + sensitivity * daily_return, -0.95, 0.95)
+            buy = np.round(gross * (1 + bias) / 2).astype(np.int64)
+            sell = np.round(gross * (1 - bias) / 2).astype(np.int64)
+            return buy, sell, buy - sell
+
+        foreign = flow(0.25, 25.0)
+        foreign_dealer = flow(0.002, 0.0)
+        trust = flow(0.04, 10.0)
+        dealer_own = flow(0.03, 5.0)
+        dealer_hedge = flow(0.03, 0.0)
+        dealer_net = dealer_own[2] + dealer_hedge[2]
+        total = foreign[2] + foreign_dealer[2] + trust[2] + dealer_net
+
+        columns = [
+            self.stocks['stock_code'].to_numpy(), self.stocks['stock_name'].to_numpy(),
+            *foreign, *foreign_dealer, *trust, dealer_net, *dealer_own, *dealer_hedge, total,
+        ]
+        table = pd.DataFrame(dict(zip(T86_FIELDS, columns)))
+        return table[active].reset_index(drop=True)
+
+    def t86_response(self, date):
+        """
+        某日T86 API 的 JSON 回應 (數值為含千分位逗號的字串，與證交所相同)
+
+        Returns:
+            dict: 包含 stat、date、title、fields、data
+        """
+        timestamp = pd.Timestamp(date)
+        table = self.t86_table(timestamp)
+        if table.empty:
+            return {'stat': '很抱歉，沒有符合條件的資料!'}
+
+        numeric = table.columns[2:]
+        formatted = table[numeric].apply(lambda column: column.map('{:,}'.format))
+        rows = np.column_stack([table['證券代號'], table['證券名稱'], formatted.to_numpy()]).tolist()
+        return {
+            'stat': 'OK',
+            'date': timestamp.strftime('%Y%m%d'),
+            'title': f"{timestamp.year - 1911}年{timestamp.month:02d}月{timestamp.day:02d}日 三大法人買賣超日報",
+            'fields': T86_FIELDS,
+            'data': rows,
+            'notes': [],
+        }
+
+    # ------------------------------------------------------------------
+    # MI_INDEX 每日收盤行情
+    # ------------------------------------------------------------------
+
+    def quote_table(self, date):
+        """
+        某日全部股票的開高低收量 (收盤價與 price_panel 相同)
+
+        Args:
+            date (str | datetime): 日期
+
+        Returns:
+            pd.DataFrame: stock_code、stock_name、open、high、low、close、volume、trades、value，非交易日為空表格
+        """
+        timestamp = pd.Timestamp(date).normalize()
+        columns = ['stock_code', 'stock_name', 'open', 'high', 'low', 'close', 'volume', 'trades', 'value']
+        if timestamp not in self.trading_days:
+            return pd.DataFrame(columns=columns)
+
+        day_index = self.trading_days.get_loc(timestamp)
+        rng = _rng(self.seed, 'quotes', timestamp.strftime('%Y%m%d'))
+        n = self.n_stocks
+        log_prices = self._price_matrix()
+        close = np.round(np.exp(log_prices[day_index]), 2)
+        previous = np.exp(log_prices[max(day_index - 1, 0)])
+        open_ = np.round(previous * np.exp(rng.normal(0.0, 0.004, size=n)), 2)
+        high = np.round(np.maximum(open_, close) * np.exp(np.abs(rng.normal(0.0, 0.006, size=n))), 2)
+        low = np.round(np.minimum(open_, close) * np.exp(-np.abs(rng.normal(0.0, 0.006, size=n))), 2)
+        volume = np.round(self.stocks['shares_outstanding'].to_numpy() * rng.lognormal(np.log(0.003), 0.5, size=n))
+        trades = np.maximum(np.round(volume / rng.uniform(2000, 8000, size=n)), 1)
+        return pd.DataFrame({
+            'stock_code': self.stock_codes,
+            'stock_name': self.stocks['stock_name'].to_numpy(),
+            'open': open_, 'high': high, 'low': low, 'close': close,
+            'volume': volume.astype(np.int64),
+            'trades': trades.astype(np.int64),
+            'value': np.round(volume * close).astype(np.int64),
+        })
+
+    def mi_index_response(self, date):
+        """
+        某日 MI_INDEX (type=ALL) 的 JSON 回應 (新版 tables 格式，數值為含千分位逗號的字串)
+
+        Returns:
+            dict: 包含 stat、date、tables，非交易日只有 stat
+        """
+        timestamp = pd.Timestamp(date)
+        table = self.quote_table(timestamp)
+        if table.empty:
+            return {'stat': '很抱歉，沒有符合條件的資料!'}
+
+        change = table['close'] - np.round(np.exp(self._price_matrix()[max(
+            self.trading_days.get_loc(timestamp.normalize()) - 1, 0)]), 2)
+        rows = [
+            [code, name, f"{volume:,}", f"{trades:,}", f"{value:,}", f"{open_:,.2f}", f"{high:,.2f}", f"{low:,.2f}",
+             f"{close:,.2f}", '+' if delta >= 0 else '-', f"{abs(delta):.2f}", f"{close:,.2f}", '10',
+             f"{close:,.2f}", '10', '0.00']
+            for code, name, volume, trades, value, open_, high, low, close, delta in zip(
+                table['stock_code'], table['stock_name'], table['volume'], table['trades'], table['value'],
+                table['open'], table['high'], table['low'], table['close'], change)
+        ]
+        roc_date = f"{timestamp.year - 1911}年{timestamp.month:02d}月{timestamp.day:02d}日"
+        return {
+            'stat': 'OK',
+            'date': timestamp.strftime('%Y%m%d'),
+            'tables': [
+                {'title': f"{roc_date} 價格指數(臺灣證券交易所)", 'fields': ['指數', '收盤指數'], 'data': []},
+                {'title': f"{roc_date}每日收盤行情(全部)", 'fields': MI_INDEX_FIELDS, 'data': rows},
+            ],
+        }
+
+    # ------------------------------------------------------------------
+    # 匯出給重播環境使用
+    # ------------------------------------------------------------------
+
+    def write_http_store(self, record_dir, start_date=None, end_date=None, quotes=False):
+        """
+        將每日T86回應寫入 HTTPClient 錄製格式，可由 replay_harness.ReplayServer 重播
+
+        Args:
+            record_dir (str): 錄製目錄
+            start_date (str): 起始日
+            end_date (str): 結束日
+            quotes (bool): 是否一併寫入 MI_INDEX 每日收盤行情
+
+        Returns:
+            int: 寫入的回應數
+        """
+        from http_client import ResponseCache, request_key
+
+        store = ResponseCache(record_dir)
+        count = 0
+        endpoints = [(T86_URL, self.t86_response)]
+        if quotes:
+            endpoints.append((MI_INDEX_URL, self.mi_index_response))
+        for date in pd.date_range(start_date or self.trading_days[0], end_date or self.trading_days[-1]):
+            for url_template, response in endpoints:
+                url = url_template.format(date=date.strftime('%Y%m%d'))
+                body = json.dumps(response(date), ensure_ascii=False).encode('utf-8')
+                store.put(request_key(url), {
+                    'url': url,
+                    'status': 200,
+                    'headers': {'Content-Type': 'application/json; charset=utf-8'},
+                    'stored_at': datetime.now().isoformat(timespec='seconds'),
+                }, body)
+                count += 1
+        return count
+
+    def write_yfinance_store(self, store_dir, stock_codes=None, history=False):
+        """
+        將個股 info 與財務報表寫入 replay_harness.ReplayTicker 錄製格式
+
+        Args:
+            store_dir (str): 錄製目錄
+            stock_codes (list): 股票代碼，None表示全部
+            history (bool): 是否一併寫入日K資料
+
+        Returns:
+            list: 寫入的股票代碼 (含 .TW)
+        """
+        symbols = []
+        for code in stock_codes or self.stock_codes:
+            symbol = f"{str(code).split('.')[0]}.TW"
+            symbol_dir = os.path.join(store_dir, symbol)
+            os.makedirs(symbol_dir, exist_ok=True)
+            with open(os.path.join(symbol_dir, 'info.json'), 'w', encoding='utf-8') as f:
+                json.dump(self.info(code), f, ensure_ascii=False, indent=2)
+            for name, frame in self.statements(code).items():
+                frame.to_csv(os.path.join(symbol_dir, f"{name}.csv"))
+            if history:
+                self.ohlcv(code).to_csv(os.path.join(symbol_dir, 'history.csv'))
+            symbols.append(symbol)
+        return symbols
+
+
+def main():
+    """產生示範資料並列出規模"""
+    import time
+
+    start = time.perf_counter()
+    universe = SyntheticUniverse(n_etfs=2000, n_stocks=2500)
+    holdings = universe.holdings_matrix()
+    print(f"合成資料集: {universe.n_etfs} 檔ETF、{universe.n_stocks} 檔股票、{len(universe.trading_days)} 個交易日")
+    print(f"最新持股矩陣: {holdings.shape}，非零權重 {holdings.matrix.nnz:,} 筆")
+    print(f"成份股調整日: {len(universe.rebalance_dates)} 次")
+
+    t86 = universe.t86_table(universe.trading_days[-1])
+    print(f"最後交易日T86: {len(t86)} 檔股票")
+
+    income = universe.statement_panel('income_stmt', quarterly=True)
+    print(f"季度損益表面板: {income.shape}")
+    print(f"耗時 {time.perf_counter() - start:.2f} 秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+三大法人買賣超資料更新
+T86 Major Investors Flow Updater
+
+用途: 由 major_investors_movements.ipynb 移出的 T86 日報抓取邏輯，
+      依股票代號將每日三大法人買賣超附加到 data/mi_movements_csv/{代號}_mi_movement.csv，
+      只抓取各檔 CSV 最後日期之後的交易日，供 `tw-stock flows update` 與排程使用
+"""
+
+import csv
+import os
+import time
+from datetime import datetime, timedelta
+
+from instrumentation import count, span
+
+T86_URL = 'https://www.twse.com.tw/rwd/zh/fund/T86?response=json&date={date}&selectType=ALL'
+
+DEFAULT_FLOW_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'mi_movements_csv')
+
+# 讀取最後日期時每次往前讀取的位元組數
+TAIL_BYTES = 4096
+
+# TWSE 2018-01-02 之後的欄位格式才一致，與研究筆記本相同以此為最早日期
+EARLIEST_DATE = '2018-01-02'
+
+DATE_COLUMN = '日期'
+CODE_COLUMN = '證券代號'
+
+
+def flow_csv_path(stock_code, data_dir=DEFAULT_FLOW_DIR):
+    """單一股票的買賣超CSV路徑"""
+    return os.path.join(data_dir, f"{stock_code}_mi_movement.csv")
+
+
+def last_saved_date(path):
+    """
+    讀取CSV最後一筆資料的日期
+
+    只讀取標題列與檔案尾端，不需載入整個檔案
+
+    Returns:
+        str: 'YYYY-MM-DD'，檔案不存在或沒有資料時為 None
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        header = next(csv.reader([f.readline().decode('utf-8-sig')]), None)
+        if not header or DATE_COLUMN not in header:
+            return None
+        header_end = f.tell()
+        # 由檔案尾端往前讀，直到包含最後一行完整的資料列
+        end = f.seek(0, os.SEEK_END)
+        block = b''
+        position = end
+        while position > header_end:
+            step = min(TAIL_BYTES, position - header_end)
+            position -= step
+            f.seek(position)
+            block = f.read(step) + block
+            lines = [line for line in block.splitlines() if line.strip()]
+            if len(lines) > 1 or (lines and position == header_end):
+                row = next(csv.reader([lines[-1].decode('utf-8')]))
+                return row[header.index(DATE_COLUMN)]
+    return None
+
+
+def fetch_t86_day(date, http=None):
+    """
+    取得單日T86三大法人買賣超
+
+    Args:
+        date (datetime): 交易日期
+        http (HTTPClient): HTTP客戶端，None表示使用共用客戶端
+
+    Returns:
+        pd.DataFrame: 當日全部股票的買賣超 (欄位與證交所相同，數值保留原始字串)，非交易日為 None
+    """
+    import pandas as pd
+
+    if http is None:
+        from http_client import get_default_client
+
+        http = get_default_client()
+
+    with span('t86.day_fetch'):
+        data = http.get_json(T86_URL.format(date=date.strftime('%Y%m%d')))
+
+    if not data or 'data' not in data:
+        return None
+    df = pd.DataFrame(data['data'], columns=data['fields'])
+    df[CODE_COLUMN] = df[CODE_COLUMN].astype(str).str.strip()
+    return df
+
+
+def update_flow_csvs(stock_codes, end_date=None, start_date=EARLIEST_DATE, data_dir=DEFAULT_FLOW_DIR,
+                     http=None, delay=0.0):
+    """
+    增量更新多檔股票的買賣超CSV
+
+    每個交易日只抓取一次T86日報，再分配給最後日期早於該日的股票；某日請求失敗時停止，
+    不附加之後的交易日 (CSV 以最後日期判斷續跑位置，跳過的日期不會再補)，下次更新由該日重試
+
+    Args:
+        stock_codes (list): 股票代號 (如 ['2330', '2317'])，可帶 .TW 後綴
+        end_date (str): 結束日期 'YYYY-MM-DD'，None表示今天
+        start_date (str): 沒有既有CSV時的起始日期
+        data_dir (str): CSV目錄
+        http (HTTPClient): HTTP客戶端
+        delay (float): 每日請求間隔 (秒)
+
+    Returns:
+        dict: 股票代號對應新增的資料筆數
+    """
+    import pandas as pd
+
+    stock_codes = [code.split('.')[0] for code in stock_codes]
+    end = datetime.strptime(end_date, '%Y-%m-%d') if end_date else datetime.now()
+    os.makedirs(data_dir, exist_ok=True)
+
+    # 各檔股票需要的第一個日期
+    next_dates = {}
+    for code in stock_codes:
+        saved = last_saved_date(flow_csv_path(code, data_dir))
+        if saved:
+            next_dates[code] = datetime.strptime(saved, '%Y-%m-%d') + timedelta(days=1)
+        else:
+            next_dates[code] = datetime.strptime(start_date, '%Y-%m-%d')
+
+    added = {code: 0 for code in stock_codes}
+    if not next_dates:
+        return added
+    current = min(next_dates.values())
+    if current > end:
+        print("三大法人買賣超資料已是最新")
+        return added
+
+    print(f"更新 {len(stock_codes)} 檔股票的三大法人買賣超: {current:%Y-%m-%d} ~ {end:%Y-%m-%d}")
+    while current <= end:
+        # 週末沒有交易，不必發出請求
+        if current.weekday() < 5:
+            pending = [code for code in stock_codes if next_dates[code] <= current]
+            try:
+                day_df = fetch_t86_day(current, http)
+            except Exception as e:
+                count('t86.day_failed')
+                print(f"⚠️ {current:%Y-%m-%d} 請求失敗，停止於此日之前，下次更新會重試 ({e})")
+                break
+
+            if day_df is not None:
+                day_df = day_df[day_df[CODE_COLUMN].isin(pending)]
+                for code, rows in day_df.groupby(CODE_COLUMN, sort=False):
+                    rows = rows.copy()
+                    rows[DATE_COLUMN] = current.strftime('%Y-%m-%d')
+                    _append_rows(flow_csv_path(code, data_dir), rows, pd)
+                    added[code] += len(rows)
+
+            if delay > 0:
+                time.sleep(delay)
+        current += timedelta(days=1)
+
+    for code, rows in added.items():
+        if rows:
+            print(f"  ✓ {code}: 新增 {rows} 筆 → {flow_csv_path(code, data_dir)}")
+    return added
+
+
+def _append_rows(path, rows, pd):
+    """附加資料到CSV，既有檔案時依原本的欄位順序寫入"""
+    if os.path.exists(path):
+        header = pd.read_csv(path, nrows=0).columns
+        rows.reindex(columns=header).to_csv(path, mode='a', header=False, index=False, encoding='utf-8')
+    else:
+        rows.to_csv(path, index=False, encoding='utf-8')
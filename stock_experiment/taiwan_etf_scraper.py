@@ -8,37 +8,52 @@ Taiwan Stock ETF Constituents and Weights Scraper
 用途: 自動收集台灣股市ETF的成份股和權重資料
 """
 
-import pandas as pd
-import numpy as np
-import requests
 import json
+import random
 import time
-from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
+import zlib
+from datetime import datetime
 import os
-import sys
+
+from instrumentation import count, get_instrumentation, timed
+
+# pandas 與 requests 只在實際需要時載入，讓 CLI 的簡單指令不必負擔匯入時間
 
 class TaiwanETFScraper:
     """台股ETF數據爬蟲類別"""
     
-    def __init__(self, data_dir="../data/etf_data/"):
+    def __init__(self, data_dir="../data/etf_data/", pcf_dir=None):
         """
         初始化ETF爬蟲
         
         Args:
             data_dir (str): 資料儲存目錄
+            pcf_dir (str): 投信PCF檔案目錄 ({etf_code}.html/.csv/.xlsx)，None表示使用模擬資料
         """
         self.data_dir = data_dir
+        self.pcf_dir = pcf_dir
         self.etf_list = []
         self.etf_constituents = {}
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self._http = None
         
         # 確保資料目錄存在
         os.makedirs(data_dir, exist_ok=True)
     
+    @property
+    def http(self):
+        """共用HTTP客戶端，第一次使用時才建立"""
+        if self._http is None:
+            from http_client import get_default_client
+            
+            self._http = get_default_client()
+        return self._http
+    
+    @property
+    def session(self):
+        """共用HTTP客戶端的 requests.Session"""
+        return self.http.session
+    
+    @timed('etf.list_fetch')
     def get_taiwan_etf_list(self):
         """
         取得台灣ETF清單
@@ -75,7 +90,7 @@ class TaiwanETFScraper:
         try:
             # 嘗試從TWSE API取得更完整的ETF清單
             url = "https://www.twse.com.tw/rwd/zh/afterTrading/MI_INDEX?response=json&type=ETF"
-            response = self.session.get(url, timeout=10)
+            response = self.http.get(url, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -116,10 +131,33 @@ class TaiwanETFScraper:
         print(f"成功收集到 {len(self.etf_list)} 檔ETF")
         return self.etf_list
     
+    @timed('etf.constituents_fetch')
+    def get_etf_constituents(self, etf_code, etf_name=None):
+        """
+        取得ETF成份股資料
+        
+        有設定PCF目錄且找到對應檔案時解析投信PCF檔案，否則使用模擬資料
+        
+        Args:
+            etf_code (str): ETF代碼
+            etf_name (str): ETF名稱，用於判斷投信解析器
+            
+        Returns:
+            list: 成份股清單
+        """
+        if self.pcf_dir:
+            from etf_pcf_parsers import find_pcf_file, parse_pcf_file
+            
+            pcf_path = find_pcf_file(self.pcf_dir, etf_code)
+            if pcf_path:
+                return parse_pcf_file(pcf_path, etf_name=etf_name)
+        
+        return self.get_etf_constituents_mock(etf_code)
+    
     def get_etf_constituents_mock(self, etf_code):
         """
         取得ETF成份股資料 (模擬版本)
-        實際使用時需要替換為真實的API或爬蟲邏輯
+        實際使用時需要替換為真實的API或爬蟲邏輯，大規模測試資料請使用 synthetic_universe.SyntheticUniverse
         
         Args:
             etf_code (str): ETF代碼
@@ -189,23 +227,23 @@ class TaiwanETFScraper:
             ]
             
             # 隨機選取10-15檔股票
-            import random
-            random.seed(hash(etf_code) % 1000)  # 確保每次運行結果一致
+            # 以 crc32 取代 hash() 當種子: hash() 受 PYTHONHASHSEED 影響，每次執行結果不同
+            rng = random.Random(zlib.crc32(etf_code.encode('utf-8')))
             
-            num_stocks = random.randint(10, 15)
-            selected_stocks = random.sample(common_stocks, min(num_stocks, len(common_stocks)))
+            num_stocks = rng.randint(10, 15)
+            selected_stocks = rng.sample(common_stocks, min(num_stocks, len(common_stocks)))
             
             # 生成權重分配
             weights = []
             for i in range(len(selected_stocks)):
                 if i == 0:  # 第一大持股
-                    weight = random.uniform(15, 25)
+                    weight = rng.uniform(15, 25)
                 elif i < 3:  # 前三大
-                    weight = random.uniform(5, 12)
+                    weight = rng.uniform(5, 12)
                 elif i < 5:  # 前五大
-                    weight = random.uniform(3, 8)
+                    weight = rng.uniform(3, 8)
                 else:  # 其他
-                    weight = random.uniform(1, 5)
+                    weight = rng.uniform(1, 5)
                 weights.append(weight)
             
             # 正規化權重
@@ -218,20 +256,23 @@ class TaiwanETFScraper:
                     'stock_code': stock['code'],
                     'stock_name': stock['name'],
                     'weight': round(normalized_weights[i], 2),
-                    'shares': random.randint(50000, 500000)
+                    'shares': rng.randint(50000, 500000)
                 })
             
             mock_data[etf_code] = constituents
         
         return mock_data.get(etf_code, [])
     
-    def collect_all_etf_data(self, max_etfs=None, delay=1.0):
+    def collect_all_etf_data(self, max_etfs=None, delay=1.0, journal_path=None, max_attempts=3, shard=None):
         """
         收集所有ETF的成份股資料
         
         Args:
             max_etfs (int): 最大收集數量，None表示全部
             delay (float): 請求間隔時間(秒)
+            journal_path (str): 檢查點紀錄檔，設定時每完成一檔即寫入，重新執行會略過已完成的ETF
+            max_attempts (int): 使用檢查點時每檔ETF最多嘗試次數 (含先前執行)
+            shard (sharding.Shard): 只收集此分片負責的ETF (先套用 max_etfs 再分片)
             
         Returns:
             dict: ETF成份股資料字典
@@ -240,15 +281,36 @@ class TaiwanETFScraper:
             self.get_taiwan_etf_list()
         
         etfs_to_process = self.etf_list[:max_etfs] if max_etfs else self.etf_list
+        if shard is not None:
+            etfs_to_process = shard.select(etfs_to_process, key=lambda etf: etf['code'])
+            print(f"分片 {shard}: 負責 {len(etfs_to_process)} 檔ETF")
+        
+        journal = None
+        if journal_path:
+            from checkpoint_journal import CheckpointJournal
+            
+            journal = CheckpointJournal(journal_path, max_attempts=max_attempts)
+            codes = {etf['code'] for etf in etfs_to_process}
+            restored = {code: data for code, data in journal.completed().items() if code in codes}
+            self.etf_constituents.update(restored)
+            if restored:
+                print(f"從檢查點恢復 {len(restored)} 檔ETF的成份股資料")
         
         print(f"開始收集 {len(etfs_to_process)} 檔ETF的成份股資料...")
         
         success_count = 0
         for i, etf in enumerate(etfs_to_process):
+            if journal is not None and not journal.should_attempt(etf['code']):
+                if journal.is_done(etf['code']):
+                    success_count += 1
+                else:
+                    print(f"略過 {etf['code']}: 已達嘗試上限 {max_attempts} 次")
+                continue
+            
             print(f"正在處理 {i+1}/{len(etfs_to_process)}: {etf['code']} - {etf['name']}")
             
             try:
-                constituents = self.get_etf_constituents_mock(etf['code'])
+                constituents = self.get_etf_constituents(etf['code'], etf['name'])
                 
                 if constituents:
                     self.etf_constituents[etf['code']] = {
@@ -260,8 +322,14 @@ class TaiwanETFScraper:
                         'last_update': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                     }
                     success_count += 1
+                    count('etf.constituents_collected')
+                    if journal is not None:
+                        journal.record_success(etf['code'], self.etf_constituents[etf['code']])
                     print(f"  ✓ 成功收集 {len(constituents)} 檔成份股")
                 else:
+                    count('etf.constituents_empty')
+                    if journal is not None:
+                        journal.record_failure(etf['code'], '沒有成份股資料')
                     print(f"  ✗ 無法取得成份股資料")
                 
                 # 避免過度請求
@@ -269,12 +337,16 @@ class TaiwanETFScraper:
                     time.sleep(delay)
                     
             except Exception as e:
+                count('etf.constituents_failed')
+                if journal is not None:
+                    journal.record_failure(etf['code'], e)
                 print(f"  ✗ 處理 {etf['code']} 時發生錯誤: {str(e)}")
                 continue
         
         print(f"\n資料收集完成！成功收集 {success_count}/{len(etfs_to_process)} 檔ETF的成份股資料")
         return self.etf_constituents
     
+    @timed('etf.save_csv')
     def save_to_csv(self):
         """
         儲存ETF資料到CSV檔案
@@ -282,6 +354,8 @@ class TaiwanETFScraper:
         Returns:
             tuple: (ETF清單DataFrame, 所有成份股DataFrame)
         """
+        import pandas as pd
+        
         print("正在儲存資料到CSV檔案...")
         
         # 儲存ETF清單
@@ -324,6 +398,7 @@ class TaiwanETFScraper:
         print(f"所有資料已儲存至目錄: {self.data_dir}")
         return etf_df, all_df
     
+    @timed('etf.load_csv')
     def load_from_csv(self):
         """
         從CSV檔案載入ETF資料
@@ -331,6 +406,8 @@ class TaiwanETFScraper:
         Returns:
             bool: 載入是否成功
         """
+        import pandas as pd
+        
         try:
             # 載入ETF清單
             etf_csv_path = os.path.join(self.data_dir, "taiwan_etf_list.csv")
@@ -385,6 +462,8 @@ class TaiwanETFScraper:
         if not self.etf_constituents:
             return {}
         
+        import pandas as pd
+        
         # 建立分析用DataFrame
         all_data = []
         for etf_code, data in self.etf_constituents.items():
@@ -481,6 +560,11 @@ def main():
     # 列印摘要報告
     scraper.print_summary_report()
     
+    # 有設定 TW_STOCK_INSTRUMENT=1 時列印各階段耗時
+    instrumentation = get_instrumentation()
+    if instrumentation.enabled:
+        instrumentation.print_report()
+    
     print(f"\n✅ 程式執行完成！")
     print(f"資料已儲存至: {scraper.data_dir}")
 
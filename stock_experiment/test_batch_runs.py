@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+批次作業續跑的行為檢查
+用於驗證中斷後續跑不遺失已完成的單位，以及分片執行與合併的結果與單機相同 (不需連網)
+
+    python test_batch_runs.py
+"""
+
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from checkpoint_journal import CheckpointJournal
+from data_availability_audit import AvailabilityAudit, scoreable_symbols
+from sharding import Shard, merge_etf_shards, merge_json_shards, parse_shard, shard_dir, shard_path
+
+
+def test_journal_resume_after_crash():
+    """寫到一半的最後一行被截掉，之後的紀錄不會接在同一行"""
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'journal.jsonl')
+        CheckpointJournal(path).record_success('A', 1)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('{"unit": "B", "sta')
+
+        journal = CheckpointJournal(path)
+        assert journal.completed() == {'A': 1}
+        journal.record_success('C', 3)
+        assert CheckpointJournal(path).completed() == {'A': 1, 'C': 3}
+
+        # 完整但缺少換行的最後一筆保留
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'unit': 'D', 'status': 'done', 'attempt': 1, 'payload': 4}))
+        journal = CheckpointJournal(path)
+        journal.record_success('E', 5)
+        assert CheckpointJournal(path).completed() == {'A': 1, 'C': 3, 'D': 4, 'E': 5}
+
+
+def test_journal_retries_until_limit():
+    """失敗的單位在嘗試上限內重試，續跑時略過已完成的單位"""
+    calls = []
+
+    def flaky(unit):
+        calls.append(unit)
+        if unit == 'bad' or (unit == 'slow' and calls.count(unit) == 1):
+            raise ConnectionError('timeout')
+        return unit.upper()
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'journal.jsonl')
+        journal = CheckpointJournal(path, max_attempts=2)
+        assert journal.run(['ok', 'slow', 'bad'], flaky) == {'ok': 'OK'}
+        journal = CheckpointJournal(path, max_attempts=2)
+        assert journal.run(['ok', 'slow', 'bad'], flaky) == {'ok': 'OK', 'slow': 'SLOW'}
+        assert calls == ['ok', 'slow', 'bad', 'slow', 'bad']
+        assert list(CheckpointJournal(path, max_attempts=2).exhausted()) == ['bad']
+
+
+def test_shards_partition_items():
+    """每個項目恰好屬於一個分片，與項目順序及程序無關"""
+    items = [f'{code}.TW' for code in range(1000, 3000)]
+    shards = [parse_shard(f'{index}/4') for index in range(1, 5)]
+    parts = [shard.select(items) for shard in shards]
+    assert sorted(sum(parts, [])) == items
+    assert all(parts) and parts[1] == shards[1].select(reversed(items))[::-1]
+    assert parse_shard('') is None
+    for text in ('0/4', '5/4', '2-4'):
+        try:
+            parse_shard(text)
+        except ValueError:
+            continue
+        raise AssertionError(f"{text} 應為無效的分片設定")
+
+
+def test_merge_json_shards():
+    """各分片的評分結果合併後與單機輸出相同，缺少分片時拋出例外"""
+    scores = {f'{code}.TW': {'total_score': code % 100} for code in range(1000, 1200)}
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'scores.json')
+        for index in (1, 2):
+            shard = Shard(index, 3)
+            with open(shard_path(path, shard), 'w', encoding='utf-8') as f:
+                json.dump({symbol: value for symbol, value in scores.items() if shard.owns(symbol)}, f)
+        try:
+            merge_json_shards(path, 3)
+        except FileNotFoundError:
+            pass
+        else:
+            raise AssertionError("缺少第 3 片時應拋出 FileNotFoundError")
+
+        shard = Shard(3, 3)
+        with open(shard_path(path, shard), 'w', encoding='utf-8') as f:
+            json.dump({symbol: value for symbol, value in scores.items() if shard.owns(symbol)}, f)
+        assert merge_json_shards(path, 3) == scores
+        with open(path, 'r', encoding='utf-8') as f:
+            assert json.load(f) == scores
+
+
+def test_merge_etf_shards():
+    """ETF成份股分片合併為依代碼排序的標準輸出"""
+    etfs = ['0050', '0056', '00878', '00881', '00692', '006208']
+    with tempfile.TemporaryDirectory() as root:
+        for index in (1, 2):
+            shard = Shard(index, 2)
+            owned = shard.select(etfs)
+            directory = shard_dir(root, shard)
+            os.makedirs(directory)
+            pd.DataFrame({'code': owned, 'name': owned}).to_csv(
+                os.path.join(directory, 'taiwan_etf_list.csv'), index=False, encoding='utf-8-sig')
+            rows = pd.DataFrame([{'etf_code': etf, 'stock_code': stock, 'weight': 1.0}
+                                 for etf in owned for stock in ('2330', '2317')])
+            rows.to_csv(os.path.join(directory, 'all_etf_constituents.csv'), index=False, encoding='utf-8-sig')
+            for etf in owned:
+                rows[rows['etf_code'] == etf].to_csv(os.path.join(directory, f'{etf}_constituents.csv'), index=False)
+
+        etf_df, all_df = merge_etf_shards(root, 2)
+        assert etf_df['code'].tolist() == sorted(etfs)
+        assert all_df['etf_code'].tolist() == [etf for etf in sorted(etfs) for _ in range(2)]
+        assert all(os.path.exists(os.path.join(root, f'{etf}_constituents.csv')) for etf in etfs)
+
+
+class ProbeTicker:
+    """探測用的 Ticker: 基本資料與兩期財報，failing 時讀取 info 拋出例外"""
+
+    def __init__(self, failing=False):
+        self.failing = failing
+
+    @property
+    def info(self):
+        if self.failing:
+            raise ConnectionError('timeout')
+        return {f'field_{i}': i for i in range(20)}
+
+    def __getattr__(self, name):
+        return pd.DataFrame({pd.Timestamp('2023-12-31'): [1.0], pd.Timestamp('2022-12-31'): [1.0]})
+
+
+def test_audit_keeps_last_good_probe():
+    """過期結果重新探測失敗時保留上次成功的結果；達嘗試上限的失敗過期後重新探測"""
+    failing = set()
+
+    def make_audit(root, max_age_days):
+        return AvailabilityAudit(root, max_age_days=max_age_days, max_attempts=1,
+                                 ticker_factory=lambda symbol: ProbeTicker(symbol in failing))
+
+    with tempfile.TemporaryDirectory() as root:
+        assert scoreable_symbols(make_audit(root, 0).run(['2330.TW', '2317.TW'])) == ['2317.TW', '2330.TW']
+        failing.update({'2330.TW', '2454.TW'})
+        audit = make_audit(root, 0)
+        assert scoreable_symbols(audit.run(['2330.TW', '2317.TW', '2454.TW'])) == ['2317.TW', '2330.TW']
+        assert audit.pending(['2330.TW']) == ['2330.TW']
+
+        audit = make_audit(root, 1)
+        assert audit.pending(['2454.TW']) == []
+        audit.journal.entries['2454.TW']['time'] = (datetime.now() - timedelta(days=2)).isoformat(timespec='seconds')
+        audit.journal.compact()
+        failing.clear()
+        audit = make_audit(root, 1)
+        assert audit.pending(['2317.TW', '2454.TW']) == ['2454.TW']
+        assert '2454.TW' in scoreable_symbols(audit.run(['2454.TW']))
+
+
+def main():
+    tests = [
+        test_journal_resume_after_crash,
+        test_journal_retries_until_limit,
+        test_audit_keeps_last_good_probe,
+        test_shards_partition_items,
+        test_merge_json_shards,
+        test_merge_etf_shards,
+    ]
+    for test in tests:
+        test()
+        print(f"  ✓ {test.__name__}")
+    print(f"\n✅ {len(tests)} 項檢查通過")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+評分相關向量化計算的正確性檢查
+用於驗證向量化實作與逐筆計算的結果一致 (不需連網)
+
+    python test_health_scoring.py
+"""
+
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from company_health_analysis.scoring_whatif import ScenarioGrid, ScoringWhatIf
+from company_health_analysis.taiwan_industry_scorer import TaiwanIndustryScorer
+from company_health_analysis.threshold_calibration import TDigest
+from company_health_analysis.ttm_metrics import BALANCE_ITEMS, FLOW_ITEMS, TTMPanel
+
+SECTORS = ('Technology', 'Financial Services', 'Basic Materials', 'Industrials', 'Consumer Cyclical',
+           'Healthcare', 'Real Estate', 'Unknown Sector')
+
+
+def make_companies(n_companies, seed=0):
+    """評分器輸入 [(metrics, yfinance_sector), ...]，部分指標為 None 或缺少鍵"""
+    rng = np.random.default_rng(seed)
+    companies = []
+    for i in range(n_companies):
+        metrics = {
+            'revenue_growth_rate': rng.normal(8, 15),
+            'gross_margin': rng.normal(25, 12),
+            'net_margin': rng.normal(8, 8),
+            'operating_margin': rng.normal(10, 9),
+            'roa': rng.normal(5, 4),
+            'roe': rng.normal(11, 8),
+            'eps_growth': rng.normal(6, 25),
+            'eps': rng.gamma(2.0, 2.0),
+            'ocf_to_net_income': rng.normal(1.1, 0.5),
+            'debt_ratio': rng.uniform(15, 85),
+            'current_ratio': rng.uniform(0.6, 3.5),
+        }
+        metrics = {name: float(value) for name, value in metrics.items()}
+        if i % 7 == 0:
+            metrics['roe'] = None
+        if i % 11 == 0:
+            del metrics['current_ratio']
+        companies.append((metrics, SECTORS[i % len(SECTORS)]))
+    return companies
+
+
+def test_whatif_matches_scorer():
+    """基準與調整後情境的向量化總分與逐家 calculate_industry_score 相同"""
+    scorer = TaiwanIndustryScorer()
+    companies = make_companies(300)
+    engine = ScoringWhatIf(scorer, companies)
+    assert engine.verify_baseline(companies) < 1e-9
+
+    grid = ScenarioGrid()
+    grid.shift_thresholds(None, 'gross_margin', [-5, 5])
+    grid.set_weight('科技業', 'profitability', [0.3, 0.6])
+    result = engine.evaluate(grid)
+    with tempfile.TemporaryDirectory() as directory:
+        for scenario in range(1, len(result)):
+            path = os.path.join(directory, f'standards_{scenario}.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(result.to_standards(scenario), f, ensure_ascii=False)
+            candidate = TaiwanIndustryScorer(path)
+            reference = [candidate.calculate_industry_score(metrics, sector)['total_score']
+                         for metrics, sector in companies]
+            assert np.allclose(result.total_scores[scenario], reference), f"情境 {scenario} 總分不同"
+
+
+def test_tdigest_quantiles():
+    """分批加入與合併後的分位數接近 np.quantile (以排名誤差判斷)"""
+    rng = np.random.default_rng(1)
+    for values in (rng.normal(10, 5, 50000), rng.lognormal(0, 1.5, 50000)):
+        digest = TDigest(compression=200)
+        for part in np.array_split(values[:40000], 17):
+            digest.update(part)
+        digest.merge(TDigest(compression=200).update(values[40000:]))
+        assert digest.count == len(values)
+        ordered = np.sort(values)
+        for q in (0.01, 0.2, 0.5, 0.8, 0.99):
+            estimate = digest.quantile(q)
+            rank = np.searchsorted(ordered, estimate) / len(values)
+            assert abs(rank - q) < 0.005, f"q={q}: 排名 {rank:.4f}"
+        assert digest.quantile(0) == values.min() and digest.quantile(1) == values.max()
+
+
+def test_ttm_toy_frame():
+    """單一股票 9 季的近四季加總、成長率與存量比率"""
+    quarters = pd.period_range('2022Q1', periods=9, freq='Q')
+    items = list(FLOW_ITEMS + BALANCE_ITEMS)
+    values = np.full((1, len(items), len(quarters)), np.nan)
+    revenue = np.arange(1, 10) * 100.0
+    values[0, items.index('Total Revenue')] = revenue
+    values[0, items.index('Gross Profit')] = revenue * 0.4
+    values[0, items.index('Net Income')] = revenue * 0.1
+    values[0, items.index('Total Assets')] = 5000.0
+    values[0, items.index('Total Debt')] = 2000.0
+    values[0, items.index('Net Income'), 2] = np.nan
+    panel = TTMPanel(['TEST'], quarters, items, values)
+    metrics = panel.metrics()
+
+    ttm_revenue = revenue[5:9].sum()
+    assert np.isclose(metrics['revenue_growth_rate'][0, 8], (ttm_revenue / revenue[1:5].sum() - 1) * 100)
+    assert np.isclose(metrics['gross_margin'][0, 8], 40.0)
+    assert np.isclose(metrics['net_margin'][0, 8], 10.0)
+    assert np.isclose(metrics['roa'][0, 8], revenue[5:9].sum() * 0.1 / 5000 * 100)
+    assert np.isclose(metrics['debt_ratio'][0, 8], 40.0)
+    # 前三季不足四季，缺漏的第三季使其後四季的淨利 TTM 為 NaN
+    assert np.isnan(metrics['gross_margin'][0, :3]).all()
+    assert np.isnan(metrics['net_margin'][0, 2:6]).all() and np.isfinite(metrics['net_margin'][0, 6])
+
+    latest = panel.latest_metrics()['TEST']
+    assert latest['ttm_quarter'] == '2024Q1'
+    assert latest['current_ratio'] is None
+
+
+def test_ttm_gapped_quarters():
+    """缺漏的季度 (如 yfinance 缺第四季) 不會被當成相鄰季度加總"""
+    dates = [f'{year}-{month}' for year in (2022, 2023, 2024) for month in ('03-31', '06-30', '09-30', '12-31')]
+    dates.remove('2023-09-30')
+    revenue = pd.DataFrame([np.arange(1, len(dates) + 1) * 100.0], columns=pd.to_datetime(dates),
+                           index=pd.MultiIndex.from_tuples([('TEST', 'Total Revenue')]))
+    panel = TTMPanel.from_statement_panels(revenue)
+    assert list(panel.quarters.astype(str)) == [str(q) for q in pd.period_range('2022Q1', '2024Q4', freq='Q')]
+    ttm = panel.ttm('Total Revenue')[0]
+    # 2023Q3 缺漏: 2023Q3 ~ 2024Q2 的近四季都不完整
+    assert np.isnan(ttm[6:10]).all() and np.isfinite(ttm[[5, 10, 11]]).all()
+    assert ttm[10] == (7 + 8 + 9 + 10) * 100.0
+
+
+def main():
+    tests = [test_whatif_matches_scorer, test_tdigest_quantiles, test_ttm_toy_frame, test_ttm_gapped_quarters]
+    for test in tests:
+        test()
+        print(f"  ✓ {test.__name__}")
+    print(f"\n✅ {len(tests)} 項檢查通過")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+共用HTTP客戶端的行為檢查
+以本機HTTP伺服器驗證條件式請求、重試與統計 (不需連網)
+
+    python test_http_client.py
+"""
+
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from http_client import MAX_LATENCY_SAMPLES, HTTPClient, HTTPMetrics
+
+BODY = '{"stat": "OK", "data": [1, 2, 3]}'.encode('utf-8')
+
+
+class Handler(BaseHTTPRequestHandler):
+    """/etag 支援 If-None-Match；/flaky 前兩次回應 503"""
+
+    hits = {}
+
+    def do_GET(self):
+        self.hits[self.path] = self.hits.get(self.path, 0) + 1
+        if self.path == '/flaky' and self.hits[self.path] <= 2:
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.path == '/etag' and self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def make_client(cache_dir):
+    client = HTTPClient(cache_dir=cache_dir, rate_limits={}, backoff_factor=0.001)
+    client.session.trust_env = False
+    return client
+
+
+def test_not_modified_uses_cache():
+    """第二次請求帶 If-None-Match，304 時回傳快取內容並計為 not_modified"""
+    server, base = serve()
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            client = make_client(cache_dir)
+            first = client.get(f'{base}/etag')
+            assert first.status_code == 200 and not first.from_cache
+            second = client.get(f'{base}/etag')
+            assert second.status_code == 200 and second.from_cache
+            assert second.json() == first.json()
+
+            stats = client.metrics_summary()['127.0.0.1']
+            assert stats['requests'] == 2 and stats['not_modified'] == 1
+
+            assert client.get(f'{base}/etag', use_cache=False).from_cache is False
+    finally:
+        server.shutdown()
+
+
+def test_retries_server_errors():
+    """503 重試至成功，重試次數用盡時回傳最後的錯誤回應"""
+    server, base = serve()
+    try:
+        client = make_client(None)
+        Handler.hits.pop('/flaky', None)
+        response = client.get(f'{base}/flaky')
+        assert response.status_code == 200 and Handler.hits['/flaky'] == 3
+        assert client.metrics_summary()['127.0.0.1']['retries'] == 2
+
+        Handler.hits.pop('/flaky', None)
+        client = make_client(None)
+        client.max_retries = 1
+        response = client.get(f'{base}/flaky')
+        assert response.status_code == 503 and Handler.hits['/flaky'] == 2
+        assert client.metrics_summary()['127.0.0.1']['errors'] == 1
+    finally:
+        server.shutdown()
+
+
+def test_latency_samples_bounded():
+    """延遲樣本數有上限，平均值仍以全部請求計算"""
+    metrics = HTTPMetrics()
+    n_requests = MAX_LATENCY_SAMPLES * 3
+    for i in range(n_requests):
+        metrics.record('example.com', 200, i / n_requests)
+    assert len(metrics._hosts['example.com']['latencies']) == MAX_LATENCY_SAMPLES
+    summary = metrics.summary()['example.com']
+    assert summary['requests'] == n_requests
+    assert abs(summary['avg_latency'] - 0.5) < 1e-3
+    assert abs(summary['p95_latency'] - 0.95) < 0.01
+
+
+def main():
+    tests = [test_not_modified_uses_cache, test_retries_server_errors, test_latency_samples_bounded]
+    for test in tests:
+        test()
+        print(f"  ✓ {test.__name__}")
+    print(f"\n✅ {len(tests)} 項檢查通過")
+
+
+if __name__ == "__main__":
+    main()
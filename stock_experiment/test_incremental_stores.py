@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+增量更新與磁碟索引的正確性檢查
+用於驗證增量更新的結果與整份重算相同，以及中斷、請求失敗後的資料一致性 (不需連網)
+
+    python test_incremental_stores.py
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from indicator_engine import IndicatorEngine
+from market_matrix import update_matrix
+from news_sentiment import SentimentIndex, record_labels, trading_rows
+from news_vector_index import NewsVectorIndex
+from statement_warehouse import StatementWarehouse
+from twse_daily_quotes import QuoteStore
+
+
+TEMPLATES = [
+    "公司{code}今日公佈{m}月營收報告，合併營收約為新台幣{a}億元，較上月增加了{p}%。",
+    "公司{code}董事會決議通過資本支出預算，擴建新廠產能，預計投資新台幣{a}億元。",
+    "公司{code}董事會決議配發現金股利每股{p}元，除息交易日另行公告。",
+    "公司{code}受邀參加法人說明會，說明公司營運概況及未來展望，簡報內容請詳公開資訊觀測站。",
+]
+
+
+def make_statements(symbols, scale=1.0):
+    """各股票 4 季損益表 (yf.Ticker 屬性名稱對應寬表)"""
+    quarters = pd.to_datetime(['2024-03-31', '2024-06-30', '2024-09-30', '2024-12-31'])
+    frames = {}
+    for i, symbol in enumerate(symbols):
+        revenue = (np.arange(1, 5) + i) * 1000.0 * scale
+        frames[symbol] = {'quarterly_income_stmt': pd.DataFrame(
+            [revenue, revenue * 0.4], index=['Total Revenue', 'Gross Profit'], columns=quarters)}
+    return frames
+
+
+def make_close(n_days, n_codes, seed=0):
+    """隨機漫步收盤價，約 5% 缺值 (停牌)"""
+    rng = np.random.default_rng(seed)
+    close = np.cumprod(1 + rng.normal(0, 0.02, (n_days, n_codes)), axis=0) * 100
+    close[rng.random(close.shape) < 0.05] = np.nan
+    dates = list(pd.bdate_range('2023-01-02', periods=n_days).strftime('%Y-%m-%d'))
+    codes = [str(1000 + i) for i in range(n_codes)]
+    return dates, codes, close
+
+
+def assert_same_matrix(left, right, fields):
+    """兩個矩陣的日期、證券與各欄位數值相同 (證券軸順序依附加順序，可能不同)"""
+    assert left.dates == right.dates and sorted(left.codes) == sorted(right.codes)
+    for field in fields:
+        a = left.frame(field).to_numpy(np.float64)
+        b = right.frame(field, codes=left.codes).to_numpy(np.float64)
+        assert np.allclose(a, b, equal_nan=True, rtol=1e-6), f"{field} 與重算結果不同"
+
+
+def test_warehouse_query_and_restatement():
+    """重複寫入的財報以最新批次為準，合併前後查詢結果相同，暫存檔不影響查詢"""
+    symbols = ['2330.TW', '2317.TW', '2454.TW']
+    infos = {symbol: {'longName': symbol, 'sector': 'Technology' if symbol != '2317.TW' else 'Industrials',
+                      'industry': 'Semiconductors'} for symbol in symbols}
+    with tempfile.TemporaryDirectory() as root:
+        warehouse = StatementWarehouse(root)
+        warehouse.ingest_ticker_frames(make_statements(symbols), infos)
+        # 重編的財報再寫入一次
+        warehouse.ingest_ticker_frames(make_statements(['2330.TW'], scale=2.0))
+        directory = warehouse.partition_dir('income_stmt', 'quarterly')
+        with open(os.path.join(directory, '.part-0.parquet.tmp'), 'wb') as f:
+            f.write(b'PAR1 partial')
+
+        frame = warehouse.query('Total Revenue')
+        assert len(frame) == 12 and set(frame['symbol']) == set(symbols)
+        latest = frame[frame['symbol'] == '2330.TW'].set_index('period_end')['value']
+        assert latest[pd.Timestamp('2024-12-31')] == 8000.0
+
+        recent = warehouse.query(['Total Revenue', 'Gross Profit'], sector='technology', periods=2)
+        assert set(recent['symbol']) == {'2330.TW', '2454.TW'} and len(recent) == 8
+        assert recent['period_end'].min() == pd.Timestamp('2024-09-30')
+
+        warehouse.compact()
+        assert len([name for name in os.listdir(directory) if name.startswith('part-')]) == 1
+        assert warehouse.query('Total Revenue').equals(frame)
+
+
+def test_update_matrix_stops_at_failed_day():
+    """某日請求失敗時不寫入之後的交易日，下次更新補回"""
+    failing = {'2024-03-05'}
+
+    def fetch_day(date, http):
+        key = date.strftime('%Y-%m-%d')
+        if key in failing:
+            raise ConnectionError('timeout')
+        return pd.DataFrame({'close': [100.0 + date.day]}, index=pd.Index(['2330'], name='code'))
+
+    with tempfile.TemporaryDirectory() as root:
+        quotes = QuoteStore(root)
+        update_matrix(quotes, fetch_day, '2024-03-01', '2024-03-08')
+        assert quotes.dates == ['2024-03-01', '2024-03-04']
+        failing.clear()
+        update_matrix(QuoteStore(root), fetch_day, None, '2024-03-08')
+        quotes = QuoteStore(root)
+        assert quotes.dates == ['2024-03-01', '2024-03-04', '2024-03-05', '2024-03-06', '2024-03-07', '2024-03-08']
+        assert np.isclose(quotes.open('returns')[3, 0], 106 / 105 - 1)
+
+
+def test_indicators_incremental_equals_rebuild():
+    """分批附加、新上市證券與覆寫近期列後，增量指標與重算相同"""
+    dates, codes, close = make_close(700, 30)
+    with tempfile.TemporaryDirectory() as root:
+        quotes = QuoteStore(os.path.join(root, 'quotes'))
+        quotes.write_arrays(dates[:400], codes[:20], {'close': close[:400, :20]})
+        IndicatorEngine(quotes).update()
+        quotes.write_arrays(dates[400:650], codes, {'close': close[400:650]})
+        IndicatorEngine(quotes).update()
+        quotes.write_arrays(dates[650:], codes, {'close': close[650:]})
+        IndicatorEngine(quotes).update()
+        quotes.write_arrays(dates[680:], codes, {'close': close[680:] * 1.5})
+        engine = IndicatorEngine(quotes)
+        assert engine.update() == 20
+
+        rebuilt = IndicatorEngine(quotes, root=os.path.join(root, 'rebuilt'))
+        rebuilt.update()
+        assert_same_matrix(engine.matrix, rebuilt.matrix, engine.matrix.fields)
+        for series in ('close', 'cum_growth'):
+            assert np.allclose(engine.state.maximum[series], rebuilt.state.maximum[series], equal_nan=True)
+        assert IndicatorEngine(quotes).update() == 0
+
+
+def test_sentiment_incremental_equals_rebuild():
+    """分批標註 (含重新標註與盤後新聞) 的增量情緒矩陣與重算相同"""
+    dates, codes, close = make_close(120, 10, seed=1)
+    rng = np.random.default_rng(2)
+    calendar = list(pd.date_range(dates[0], dates[-1]).strftime('%Y-%m-%d'))
+    with tempfile.TemporaryDirectory() as root:
+        quotes = QuoteStore(os.path.join(root, 'quotes'))
+        quotes.write_arrays(dates, codes, {'close': close})
+        labels_path = os.path.join(root, 'labels.jsonl')
+        index = SentimentIndex(os.path.join(root, 'index'), labels_path, half_life=3)
+        for batch in range(4):
+            for i in range(40):
+                # 第二批之後部分文章重新標註
+                article = f'news-{rng.integers(60) if batch else i}'
+                time = f" {rng.integers(8, 18):02d}:{rng.integers(60):02d}" if i % 2 else ''
+                n_chunks = int(rng.integers(1, 4))
+                record_labels(codes[rng.integers(len(codes))], calendar[rng.integers(len(calendar))] + time, article,
+                              [{'label': rng.choice(['Positive', 'Negative', 'Neutral']), 'score': rng.uniform(0.5, 1)}
+                               for _ in range(n_chunks)], lengths=rng.integers(50, 500, n_chunks), path=labels_path)
+            index.update(quotes)
+
+        rebuilt = SentimentIndex(os.path.join(root, 'rebuilt'), labels_path, half_life=3)
+        rebuilt.update(quotes)
+        assert_same_matrix(index, rebuilt, SentimentIndex.FIELDS)
+        assert index.update(quotes) == 0
+
+
+def test_post_close_news_next_trading_day():
+    """收盤後與非交易日的新聞歸入下一個交易日，只有日期時歸入當天"""
+    trading_dates = ['2024-03-07', '2024-03-08', '2024-03-11']
+    dates = ['2024-03-08', '2024-03-08 09:00', '2024-03-08 13:30', '2024-03-09', '2024-03-11 18:00']
+    assert trading_rows(trading_dates, dates).tolist() == [1, 1, 2, 2, 3]
+
+
+def test_vector_index_ivf_matches_exact():
+    """nprobe 涵蓋全部群時 IVF 與精確搜尋結果相同；中斷多寫的部分在下次附加前截掉"""
+    rng = np.random.default_rng(3)
+    articles = []
+    for i in range(3000):
+        code = str(1000 + rng.integers(20))
+        content = TEMPLATES[rng.integers(len(TEMPLATES))].format(
+            code=code, m=rng.integers(1, 13), a=rng.integers(1, 5000), p=rng.integers(1, 50))
+        date = f'2024-{rng.integers(1, 13):02d}-{rng.integers(1, 29):02d}'
+        articles.append({'link': f'news-{i}', 'date': date, 'content': content, 'code': code})
+    articles.append({'link': 'undated', 'date': None, 'content': TEMPLATES[0]})
+
+    with tempfile.TemporaryDirectory() as root:
+        index = NewsVectorIndex(root)
+        assert index.add_articles(articles[:2000]) == 2000
+        index.build_ivf(nlist=20)
+        with open(os.path.join(root, 'vectors.f16'), 'ab') as f:
+            f.write(b'\0' * 1000)
+        index = NewsVectorIndex(root)
+        assert index.add_articles(articles) == 1000
+        assert os.path.getsize(os.path.join(root, 'vectors.f16')) == index.n_chunks * index.dim * 2
+
+        queries = index.embedder([TEMPLATES[0].format(code='1003', m=11, a=2000, p=5), '擴建新廠 資本支出'])
+        for query in queries:
+            for options in ({}, {'codes': ['1003', '1004']}, {'start': '2024-06-01', 'end': '2024-09-30'}):
+                exact_rows, exact_scores = index.search_vector(query, 10, exact=True, **options)
+                ivf_rows, ivf_scores = index.search_vector(query, 10, exact=False, nprobe=20, **options)
+                assert np.allclose(exact_scores, ivf_scores, atol=1e-5)
+                assert set(exact_rows[exact_scores > exact_scores[-1] + 1e-5]) <= set(ivf_rows)
+
+
+def main():
+    tests = [
+        test_warehouse_query_and_restatement,
+        test_update_matrix_stops_at_failed_day,
+        test_indicators_incremental_equals_rebuild,
+        test_sentiment_incremental_equals_rebuild,
+        test_post_close_news_next_trading_day,
+        test_vector_index_ivf_matches_exact,
+    ]
+    for test in tests:
+        test()
+        print(f"  ✓ {test.__name__}")
+    print(f"\n✅ {len(tests)} 項檢查通過")
+
+
+if __name__ == "__main__":
+    main()
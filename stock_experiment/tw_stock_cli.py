@@ -0,0 +1,749 @@
+#!/usr/bin/env python3
+"""
+tw-stock 命令列工具
+tw-stock Command Line Interface
+
+用途: 統一的命令列入口，供排程與告警腳本呼叫；各子指令在執行時才匯入 pandas、requests、yfinance 等套件，
+      讓 `tw-stock --help` 或只讀取評分標準的指令不必負擔數百毫秒的匯入時間
+
+使用方式:
+    tw-stock etf refresh --max-etfs 10      # 重新收集ETF成份股並儲存CSV
+    tw-stock etf summary                    # 讀取已儲存的CSV並列印摘要
+    tw-stock score 2330.TW 2317.TW          # 以台灣產業評分系統計算財務健康度
+    tw-stock industries                     # 列出支援的產業
+    tw-stock audit run --workers 16         # 探測全部上市股票的 yfinance 資料可用性 (只探測新增或過期的股票)
+    tw-stock score --from-audit --journal scores.jsonl
+    tw-stock calibrate --output new.json    # 以錄製財報的指標分布校準評分門檻
+    tw-stock warehouse query "Gross Profit" --industry Semiconductors --periods 8
+    tw-stock flows update 2330 2317         # 增量更新三大法人買賣超CSV
+    tw-stock quotes update --start 2024-01-01  # 全市場每日行情 (一個交易日一次請求)
+    tw-stock flows matrix && tw-stock flows correlate --processes 4
+    tw-stock flows backtest --thresholds 1.5 2 --streaks 3 5 --output data/flow_event_study
+    tw-stock news sentiment && tw-stock news correlate  # 新聞情緒指數與全市場相關係數
+    tw-stock news index 2024_news.json --code 2330 && tw-stock news search "每月營收報告" --codes 2330
+    tw-stock nightly --dry-run              # 列出每日管線中需要重跑的階段
+    tw-stock etf refresh --shard 2/4        # 多主機分片執行，之後以 shard merge 合併
+    tw-stock shard run 4 -- etf refresh     # 單機以4個程序分片執行並合併
+    tw-stock --metrics run.prom etf refresh # 執行後輸出各階段耗時
+
+本模組頂層只允許匯入標準函式庫與 instrumentation，新增子指令時請在 handler 內匯入依賴
+"""
+
+import argparse
+import json
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ETF_DATA_DIR = os.path.join(REPO_ROOT, 'data', 'etf_data')
+DEFAULT_SCORES_PATH = os.path.join(REPO_ROOT, 'data', 'health_scores.json')
+
+
+def _shard(args):
+    """解析 --shard，未指定時為 None"""
+    from sharding import parse_shard
+
+    return parse_shard(getattr(args, 'shard', None))
+
+
+# ----------------------------------------------------------------------
+# etf
+# ----------------------------------------------------------------------
+
+def cmd_etf_refresh(args):
+    """重新收集ETF成份股並儲存"""
+    from taiwan_etf_scraper import TaiwanETFScraper
+
+    shard = _shard(args)
+    data_dir = args.data_dir
+    if shard is not None:
+        from sharding import shard_dir
+
+        data_dir = shard_dir(args.data_dir, shard)
+
+    scraper = TaiwanETFScraper(data_dir=data_dir, pcf_dir=args.pcf_dir)
+    journal_path = os.path.join(data_dir, 'collect_journal.jsonl') if args.resume else None
+    scraper.get_taiwan_etf_list()
+    scraper.collect_all_etf_data(max_etfs=args.max_etfs, delay=args.delay,
+                                 journal_path=journal_path, max_attempts=args.max_attempts, shard=shard)
+    if not scraper.etf_constituents:
+        print("❌ 沒有收集到任何ETF成份股")
+        return 1
+    scraper.save_to_csv()
+    if journal_path and os.path.exists(journal_path):
+        # 已完整輸出，下次重新收集
+        os.remove(journal_path)
+    print(f"資料已儲存至: {scraper.data_dir}")
+    return 0
+
+
+def cmd_etf_summary(args):
+    """列印已儲存資料的摘要"""
+    from taiwan_etf_scraper import TaiwanETFScraper
+
+    scraper = TaiwanETFScraper(data_dir=args.data_dir)
+    if not scraper.load_from_csv():
+        print(f"❌ {args.data_dir} 中沒有可用的ETF成份股資料，請先執行 tw-stock etf refresh")
+        return 1
+    scraper.print_summary_report()
+    return 0
+
+
+# ----------------------------------------------------------------------
+# score / industries
+# ----------------------------------------------------------------------
+
+def cmd_score(args):
+    """計算財務健康度評分"""
+    from company_health_analysis import TaiwanIndustryScorer, calculate_health_metrics, get_company_financial_data
+
+    symbols = list(args.symbols)
+    if args.from_audit:
+        from data_availability_audit import AUDIT_DIR, load_matrix, scoreable_symbols
+
+        audited = scoreable_symbols(load_matrix(args.audit_dir or AUDIT_DIR))
+        print(f"資料可用性稽核: {len(audited)} 檔股票資料足以評分")
+        symbols += [symbol for symbol in audited if symbol not in symbols]
+    if not symbols:
+        print("❌ 請指定股票代碼或使用 --from-audit")
+        return 2
+
+    scorer = TaiwanIndustryScorer(args.standards) if args.standards else TaiwanIndustryScorer()
+    output = args.output
+    shard = _shard(args)
+    if shard is not None:
+        from sharding import shard_path
+
+        total = len(symbols)
+        symbols = shard.select(symbols)
+        output = shard_path(output or DEFAULT_SCORES_PATH, shard)
+        print(f"分片 {shard}: 負責 {len(symbols)}/{total} 檔股票")
+
+    def score_symbol(symbol):
+        financial_data = get_company_financial_data(symbol)
+        metrics = calculate_health_metrics(financial_data, ttm=args.ttm) if financial_data else {}
+        if not metrics:
+            raise ValueError(f"無法取得 {symbol} 的財務指標")
+        scores = scorer.calculate_industry_score(metrics, metrics.get('sector', 'Unknown'))
+        scores['company_name'] = metrics.get('company_name', symbol)
+        if args.ttm:
+            scores['ttm_quarter'] = metrics.get('ttm_quarter')
+        return scores
+
+    if args.journal:
+        from checkpoint_journal import CheckpointJournal
+
+        journal = CheckpointJournal(args.journal, max_attempts=args.max_attempts)
+        results = journal.run(symbols, score_symbol)
+        results = {symbol: results[symbol] for symbol in symbols if symbol in results}
+    else:
+        results = {}
+        for symbol in symbols:
+            try:
+                results[symbol] = score_symbol(symbol)
+            except Exception as e:
+                # 單檔失敗 (網路、資料格式) 不中斷整批評分
+                print(f"❌ {symbol} 評分失敗: {e}")
+
+    if output:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2, default=str)
+        print(f"評分結果已儲存至: {output}")
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2, default=str))
+    else:
+        for symbol, scores in results.items():
+            print(f"{symbol:10s} {scores['company_name'][:30]:30s} "
+                  f"{scores['taiwan_industry']:8s} 總分: {scores['total_score']:5.1f} ({scores['health_grade']})")
+    return 0 if len(results) == len(symbols) else 1
+
+
+def cmd_industries(args):
+    """列出支援的產業與權重"""
+    from company_health_analysis import TaiwanIndustryScorer
+
+    scorer = TaiwanIndustryScorer(args.standards) if args.standards else TaiwanIndustryScorer()
+    for industry in scorer.get_supported_industries():
+        weights = scorer.get_industry_weights(industry) or {}
+        weight_text = ', '.join(f"{name} {value:.0%}" for name, value in weights.items())
+        print(f"{industry:10s} {weight_text}")
+    return 0
+
+
+def cmd_calibrate(args):
+    """以股票池指標分布校準評分門檻"""
+    from company_health_analysis import TaiwanIndustryScorer
+    from company_health_analysis.threshold_calibration import ThresholdCalibrator
+
+    scorer = TaiwanIndustryScorer(args.standards) if args.standards else TaiwanIndustryScorer()
+    calibrator = ThresholdCalibrator(scorer, compression=args.compression, min_samples=args.min_samples)
+    if args.state and os.path.exists(args.state):
+        calibrator.load_state(args.state)
+        print(f"已載入先前的分布摘要: {args.state} ({calibrator.companies_seen} 家公司)")
+
+    statements_dir = args.statements_dir or os.path.join(REPO_ROOT, 'data', 'statements')
+    if os.path.isdir(statements_dir):
+        added = calibrator.add_statements_dir(statements_dir, args.symbols)
+        print(f"已加入 {added} 家公司的指標: {statements_dir}")
+    elif not calibrator.companies_seen:
+        print(f"❌ 找不到錄製的財報目錄: {statements_dir}")
+        return 1
+
+    if args.state:
+        calibrator.save_state(args.state)
+    standards = calibrator.save_standards(args.output) if args.output else calibrator.calibrate()
+    calibrator.print_report(standards)
+    return 0
+
+
+# ----------------------------------------------------------------------
+# audit
+# ----------------------------------------------------------------------
+
+def cmd_audit_run(args):
+    """探測全市場股票的 yfinance 資料可用性"""
+    from data_availability_audit import AUDIT_DIR, AvailabilityAudit, coverage_summary, listed_symbols, print_coverage
+
+    symbols = args.symbols or listed_symbols()
+    audit = AvailabilityAudit(args.audit_dir or AUDIT_DIR, max_age_days=args.max_age_days,
+                              max_attempts=args.max_attempts)
+    matrix = audit.run(symbols, max_workers=args.workers)
+    print_coverage(coverage_summary(matrix))
+    return 0
+
+
+def cmd_audit_summary(args):
+    """列印已儲存的資料可用性摘要"""
+    from data_availability_audit import AUDIT_DIR, coverage_summary, load_matrix, print_coverage
+
+    try:
+        matrix = load_matrix(args.audit_dir or AUDIT_DIR)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return 1
+    print_coverage(coverage_summary(matrix))
+    return 0
+
+
+# ----------------------------------------------------------------------
+# warehouse
+# ----------------------------------------------------------------------
+
+def _warehouse(args):
+    from statement_warehouse import WAREHOUSE_DIR, StatementWarehouse
+
+    return StatementWarehouse(args.root or WAREHOUSE_DIR)
+
+
+def cmd_warehouse_ingest(args):
+    """將錄製的財報寫入倉儲"""
+    statements_dir = args.statements_dir or os.path.join(REPO_ROOT, 'data', 'statements')
+    if not os.path.isdir(statements_dir):
+        print(f"❌ 找不到錄製的財報目錄: {statements_dir}")
+        return 1
+    warehouse = _warehouse(args)
+    warehouse.ingest_statements_dir(statements_dir, args.symbols)
+    if args.compact:
+        warehouse.compact()
+    return 0
+
+
+def cmd_warehouse_query(args):
+    """查詢倉儲中的財報項目"""
+    frame = _warehouse(args).query(
+        args.items, symbols=args.symbols, sector=args.sector, industry=args.industry,
+        frequency=None if args.frequency == 'all' else args.frequency, periods=args.periods,
+        start=args.start, end=args.end, pivot=not args.long,
+    )
+    if args.output:
+        frame.to_csv(args.output, encoding='utf-8-sig')
+        print(f"查詢結果已儲存至: {args.output} ({len(frame)} 列)")
+    else:
+        print(frame.to_string())
+    return 0
+
+
+def cmd_warehouse_compact(args):
+    """合併倉儲中重複寫入的批次"""
+    warehouse = _warehouse(args)
+    rows = warehouse.compact()
+    summary = warehouse.summary()
+    print(f"✓ 合併完成: {summary['files']} 個檔案、{rows} 筆、{summary['companies']} 家公司")
+    return 0
+
+
+# ----------------------------------------------------------------------
+# flows
+# ----------------------------------------------------------------------
+
+def cmd_flows_update(args):
+    """增量更新三大法人買賣超"""
+    from t86_flows import DEFAULT_FLOW_DIR, EARLIEST_DATE, update_flow_csvs
+
+    update_flow_csvs(
+        args.codes,
+        end_date=args.end,
+        start_date=args.start or EARLIEST_DATE,
+        data_dir=args.data_dir or DEFAULT_FLOW_DIR,
+        delay=args.delay,
+    )
+    return 0
+
+
+# ----------------------------------------------------------------------
+# quotes
+# ----------------------------------------------------------------------
+
+def cmd_quotes_update(args):
+    """回補並增量更新全市場每日行情"""
+    from indicator_engine import update_indicators
+    from twse_daily_quotes import QUOTES_DIR, QuoteStore, update_quote_store
+
+    store = QuoteStore(args.root or QUOTES_DIR)
+    update_quote_store(store, start_date=args.start, end_date=args.end, max_workers=args.workers)
+    if not args.no_indicators:
+        update_indicators(store)
+    return 0
+
+
+def cmd_quotes_indicators(args):
+    """更新或重算行情的增量指標"""
+    from indicator_engine import update_indicators
+    from twse_daily_quotes import QUOTES_DIR, QuoteStore
+
+    update_indicators(QuoteStore(args.root or QUOTES_DIR), windows=args.windows, rebuild=args.rebuild)
+    return 0
+
+
+def cmd_quotes_show(args):
+    """列印單一證券的日K資料"""
+    from twse_daily_quotes import QUOTES_DIR, QuoteStore
+
+    store = QuoteStore(args.root or QUOTES_DIR)
+    history = store.history(args.code, start=args.start, end=args.end)
+    if history.empty:
+        print(f"❌ 沒有 {args.code} 的行情資料")
+        return 1
+    print(history.tail(args.last).to_string())
+    return 0
+
+
+def cmd_flows_matrix(args):
+    """回補並增量更新全市場三大法人買賣超矩陣"""
+    from market_matrix import FLOWS_DIR, FlowMatrix, update_flow_matrix
+
+    update_flow_matrix(FlowMatrix(args.root or FLOWS_DIR), start_date=args.start, end_date=args.end,
+                       max_workers=args.workers)
+    return 0
+
+
+def cmd_flows_correlate(args):
+    """全市場股價累計報酬與三大法人累計買賣超的相關係數"""
+    from market_matrix import FLOWS_DIR, parallel_flow_correlations
+    from twse_daily_quotes import QUOTES_DIR
+
+    result = parallel_flow_correlations(args.quotes_root or QUOTES_DIR, args.root or FLOWS_DIR, codes=args.codes,
+                                        start=args.start, end=args.end, processes=args.processes)
+    if args.output:
+        result.to_csv(args.output, encoding='utf-8-sig')
+        print(f"相關係數已儲存至: {args.output} ({len(result)} 檔證券)")
+    else:
+        print(result.sort_values('weighted', ascending=False).round(3).to_string())
+    return 0
+
+
+def cmd_flows_backtest(args):
+    """全市場法人籌碼訊號的事件研究"""
+    from flow_event_study import run_flow_event_study
+    from market_matrix import FLOWS_DIR, FlowMatrix
+    from twse_daily_quotes import QUOTES_DIR, QuoteStore
+
+    result = run_flow_event_study(
+        QuoteStore(args.quotes_root or QUOTES_DIR), FlowMatrix(args.root or FLOWS_DIR), codes=args.codes,
+        start=args.start, end=args.end, field=args.field, z_windows=args.z_windows, z_thresholds=args.thresholds,
+        streak_lengths=args.streaks, directions=(1, -1) if args.both_sides else (1,), horizons=args.horizons,
+        lag=args.lag,
+    )
+    print(result.summary.round(4).to_string())
+    if args.output:
+        result.save(args.output)
+        print(f"事件研究結果已儲存至: {args.output}")
+    return 0
+
+
+# ----------------------------------------------------------------------
+# news
+# ----------------------------------------------------------------------
+
+def _sentiment_index(args):
+    from news_sentiment import LABELS_PATH, SENTIMENT_DIR, SentimentIndex
+
+    return SentimentIndex(args.root or SENTIMENT_DIR, labels_path=args.labels or LABELS_PATH,
+                          half_life=args.half_life)
+
+
+def cmd_news_sentiment(args):
+    """讀取新的 chunk 標註並更新每日情緒矩陣"""
+    from news_sentiment import update_sentiment_index
+    from twse_daily_quotes import QUOTES_DIR, QuoteStore
+
+    update_sentiment_index(_sentiment_index(args), QuoteStore(args.quotes_root or QUOTES_DIR))
+    return 0
+
+
+def cmd_news_correlate(args):
+    """全市場新聞情緒與報酬、法人買賣超的相關係數"""
+    from market_matrix import FLOWS_DIR, FlowMatrix
+    from news_sentiment import sentiment_correlations
+    from twse_daily_quotes import QUOTES_DIR, QuoteStore
+
+    flows_root = args.flows_root or FLOWS_DIR
+    flows = FlowMatrix(flows_root) if os.path.exists(os.path.join(flows_root, 'meta.json')) else None
+    result = sentiment_correlations(_sentiment_index(args), QuoteStore(args.quotes_root or QUOTES_DIR), flows,
+                                    field=args.field, horizons=args.horizons, start=args.start, end=args.end)
+    if args.output:
+        result.to_csv(args.output, encoding='utf-8-sig')
+        print(f"相關係數已儲存至: {args.output} ({len(result)} 檔證券)")
+    else:
+        print(result.dropna(how='all').round(3).to_string())
+    return 0
+
+
+def cmd_news_index(args):
+    """將新聞 JSONL 加入向量索引"""
+    from news_vector_index import INDEX_DIR, NewsVectorIndex, index_news_files
+
+    index = index_news_files(args.paths, code=args.code, index=NewsVectorIndex(args.index_dir or INDEX_DIR))
+    if args.rebuild_ivf:
+        index.build_ivf(nlist=args.nlist)
+    return 0
+
+
+def cmd_news_search(args):
+    """以文字或已索引的文章搜尋相似的新聞 chunk"""
+    from news_vector_index import INDEX_DIR, NewsVectorIndex
+
+    if not args.query and not args.article:
+        print("❌ 請指定查詢文字或 --article")
+        return 2
+    index = NewsVectorIndex(args.index_dir or INDEX_DIR)
+    options = dict(k=args.k, codes=args.codes, start=args.start, end=args.end, nprobe=args.nprobe,
+                   exact=True if args.exact else None)
+    try:
+        result = index.similar(args.article, **options) if args.article else index.search(args.query, **options)
+    except KeyError as e:
+        print(f"❌ {e.args[0]}")
+        return 1
+    result['text'] = result['text'].str.slice(0, 60)
+    print(result.round(3).to_string(index=False))
+    return 0
+
+
+# ----------------------------------------------------------------------
+# nightly
+# ----------------------------------------------------------------------
+
+def cmd_nightly(args):
+    """執行每日管線"""
+    from pipeline_scheduler import DATA_DIR, DEFAULT_SYMBOLS, build_nightly_pipeline
+
+    pipeline = build_nightly_pipeline(
+        data_dir=args.data_dir or DATA_DIR,
+        symbols=args.symbols or DEFAULT_SYMBOLS,
+        max_etfs=args.max_etfs,
+        delay=args.delay,
+        pcf_dir=args.pcf_dir,
+    )
+    # --force 不帶階段名稱時表示全部重跑
+    force = True if args.force == [] else (args.force or False)
+    report = pipeline.run(targets=args.only, force=force, max_workers=args.workers, dry_run=args.dry_run)
+    report.print_report()
+    if args.report:
+        report.save(args.report)
+    return 0 if report.ok else 1
+
+
+# ----------------------------------------------------------------------
+# shard
+# ----------------------------------------------------------------------
+
+def cmd_shard_merge(args):
+    """合併分片輸出"""
+    import sharding
+
+    if args.target == 'etf':
+        sharding.merge_etf_shards(args.data_dir or DEFAULT_ETF_DATA_DIR, args.shards, args.allow_partial)
+    else:
+        sharding.merge_json_shards(args.output or DEFAULT_SCORES_PATH, args.shards, args.allow_partial)
+    return 0
+
+
+def cmd_shard_run(args):
+    """單機以多個程序分片執行後合併"""
+    import sharding
+
+    command = args.shard_command[1:] if args.shard_command[:1] == ['--'] else args.shard_command
+    # 以分片 1 解析子指令參數，取得輸出位置並確認子指令支援分片
+    sub_args, unknown = build_parser().parse_known_args(command + ['--shard', f"1/{args.count}"])
+    target = {cmd_etf_refresh: 'etf', cmd_score: 'score'}.get(getattr(sub_args, 'handler', None))
+    if target is None or unknown:
+        print(f"❌ 不支援分片的指令: {' '.join(command)}")
+        return 2
+
+    codes = sharding.run_local_shards(args.count, command, max_parallel=args.parallel)
+    if any(codes):
+        print("❌ 部分分片失敗，未合併輸出 (修正後可重跑失敗的分片再執行 shard merge)")
+        return 1
+    if target == 'etf':
+        sharding.merge_etf_shards(sub_args.data_dir, args.count)
+    else:
+        sharding.merge_json_shards(sub_args.output or DEFAULT_SCORES_PATH, args.count)
+    return 0
+
+
+# ----------------------------------------------------------------------
+# 參數解析
+# ----------------------------------------------------------------------
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='tw-stock', description='台股研究工具')
+    parser.add_argument('--metrics', metavar='PATH', help='結束時輸出各階段耗時 (.prom 為 Prometheus，其餘為 JSON)')
+    parser.add_argument('--profile', metavar='PATH', help='以 cProfile 剖析本次執行並儲存結果')
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+
+    etf = commands.add_parser('etf', help='ETF成份股資料')
+    etf_commands = etf.add_subparsers(dest='etf_command', metavar='ACTION')
+    refresh = etf_commands.add_parser('refresh', help='重新收集ETF成份股並儲存CSV')
+    refresh.add_argument('--max-etfs', type=int, help='最大收集數量')
+    refresh.add_argument('--delay', type=float, default=1.0, help='請求間隔時間(秒)')
+    refresh.add_argument('--data-dir', default=DEFAULT_ETF_DATA_DIR, help='資料目錄')
+    refresh.add_argument('--pcf-dir', help='投信PCF檔案目錄')
+    refresh.add_argument('--resume', action='store_true', help='使用檢查點紀錄，中斷後重新執行時略過已完成的ETF')
+    refresh.add_argument('--max-attempts', type=int, default=3, help='使用檢查點時每檔ETF最多嘗試次數')
+    refresh.add_argument('--shard', metavar='i/N', help='只收集第 i 片 (共 N 片) 的ETF，輸出到 {data-dir}/shards/')
+    refresh.set_defaults(handler=cmd_etf_refresh)
+    summary = etf_commands.add_parser('summary', help='列印已儲存資料的摘要')
+    summary.add_argument('--data-dir', default=DEFAULT_ETF_DATA_DIR, help='資料目錄')
+    summary.set_defaults(handler=cmd_etf_summary)
+
+    score = commands.add_parser('score', help='計算公司財務健康度評分')
+    score.add_argument('symbols', nargs='*', metavar='SYMBOL', help='yfinance 股票代碼 (如 2330.TW)')
+    score.add_argument('--from-audit', action='store_true', help='加入資料可用性稽核中資料足以評分的股票')
+    score.add_argument('--audit-dir', help='稽核輸出目錄，預設為 data/availability_audit')
+    score.add_argument('--standards', help='評分標準JSON檔案')
+    score.add_argument('--json', action='store_true', help='以 JSON 輸出完整評分')
+    score.add_argument('--ttm', action='store_true', help='以近四季季報 (TTM) 計算指標，取代年報')
+    score.add_argument('--journal', metavar='PATH', help='檢查點紀錄檔，重新執行時略過已評分的股票')
+    score.add_argument('--max-attempts', type=int, default=3, help='使用檢查點時每檔股票最多嘗試次數')
+    score.add_argument('--output', metavar='PATH', help='將評分結果儲存為 JSON')
+    score.add_argument('--shard', metavar='i/N', help='只評分第 i 片 (共 N 片) 的股票，輸出到分片檔')
+    score.set_defaults(handler=cmd_score)
+
+    industries = commands.add_parser('industries', help='列出支援的產業與權重')
+    industries.add_argument('--standards', help='評分標準JSON檔案')
+    industries.set_defaults(handler=cmd_industries)
+
+    calibrate = commands.add_parser('calibrate', help='以股票池指標分布校準評分門檻')
+    calibrate.add_argument('--statements-dir', help='replay_harness 錄製的財報目錄，預設為 data/statements')
+    calibrate.add_argument('--symbols', nargs='+', metavar='SYMBOL', help='只使用這些股票，預設為目錄中全部')
+    calibrate.add_argument('--standards', help='原評分標準JSON檔案')
+    calibrate.add_argument('--output', metavar='PATH', help='校準後評分標準的輸出路徑')
+    calibrate.add_argument('--state', metavar='PATH', help='分布摘要檔，存在時先載入再加入新資料，結束後更新')
+    calibrate.add_argument('--min-samples', type=int, default=30, help='樣本數少於此值的行業指標保留原門檻')
+    calibrate.add_argument('--compression', type=float, default=200, help='t-digest 壓縮參數')
+    calibrate.set_defaults(handler=cmd_calibrate)
+
+    audit = commands.add_parser('audit', help='全市場 yfinance 資料可用性稽核')
+    audit.add_argument('--audit-dir', help='輸出目錄，預設為 data/availability_audit')
+    audit_commands = audit.add_subparsers(dest='audit_command', metavar='ACTION')
+    audit_run = audit_commands.add_parser('run', help='探測新增、過期或失敗的股票並更新可用性矩陣')
+    audit_run.add_argument('--symbols', nargs='+', metavar='SYMBOL', help='股票代碼，預設為最近交易日的全部上市普通股')
+    audit_run.add_argument('--max-age-days', type=float, default=7, help='探測結果的有效天數 (0 表示全部重新探測)')
+    audit_run.add_argument('--workers', type=int, default=16, help='同時探測的股票數')
+    audit_run.add_argument('--max-attempts', type=int, default=3, help='失敗股票最多嘗試次數')
+    audit_run.set_defaults(handler=cmd_audit_run)
+    audit_summary = audit_commands.add_parser('summary', help='列印已儲存的涵蓋率摘要')
+    audit_summary.set_defaults(handler=cmd_audit_summary)
+
+    warehouse = commands.add_parser('warehouse', help='Parquet 財務報表倉儲')
+    warehouse.add_argument('--root', help='倉儲目錄，預設為 data/statement_warehouse')
+    warehouse_commands = warehouse.add_subparsers(dest='warehouse_command', metavar='ACTION')
+    ingest = warehouse_commands.add_parser('ingest', help='寫入 replay_harness 錄製的財報')
+    ingest.add_argument('--statements-dir', help='錄製目錄，預設為 data/statements')
+    ingest.add_argument('--symbols', nargs='+', metavar='SYMBOL', help='只寫入這些股票')
+    ingest.add_argument('--compact', action='store_true', help='寫入後合併批次')
+    ingest.set_defaults(handler=cmd_warehouse_ingest)
+    query = warehouse_commands.add_parser('query', help='查詢財報項目')
+    query.add_argument('items', nargs='+', metavar='ITEM', help='報表項目 (如 "Gross Profit")')
+    query.add_argument('--symbols', nargs='+', metavar='SYMBOL', help='股票代碼')
+    query.add_argument('--sector', help='yfinance sector (如 Technology)')
+    query.add_argument('--industry', help='yfinance industry (如 Semiconductors)')
+    query.add_argument('--frequency', choices=['quarterly', 'annual', 'all'], default='quarterly', help='報表頻率')
+    query.add_argument('--periods', type=int, help='每檔股票最近幾期')
+    query.add_argument('--start', help='期末日下限 (YYYY-MM-DD)')
+    query.add_argument('--end', help='期末日上限 (YYYY-MM-DD)')
+    query.add_argument('--long', action='store_true', help='輸出長表 (預設為股票 × 期間寬表)')
+    query.add_argument('--output', metavar='PATH', help='儲存為 CSV')
+    query.set_defaults(handler=cmd_warehouse_query)
+    compact = warehouse_commands.add_parser('compact', help='合併重複寫入的批次')
+    compact.set_defaults(handler=cmd_warehouse_compact)
+
+    flows = commands.add_parser('flows', help='三大法人買賣超')
+    flows_commands = flows.add_subparsers(dest='flows_command', metavar='ACTION')
+    update = flows_commands.add_parser('update', help='增量更新買賣超CSV')
+    update.add_argument('codes', nargs='+', metavar='CODE', help='股票代號 (如 2330)')
+    update.add_argument('--start', help='沒有既有資料時的起始日期 (YYYY-MM-DD)')
+    update.add_argument('--end', help='結束日期 (YYYY-MM-DD)，預設為今天')
+    update.add_argument('--data-dir', help='CSV目錄')
+    update.add_argument('--delay', type=float, default=0.0, help='每日請求間隔(秒)')
+    update.set_defaults(handler=cmd_flows_update)
+    flows_matrix = flows_commands.add_parser('matrix', help='增量更新全市場買賣超矩陣 (每個交易日一次請求)')
+    flows_matrix.add_argument('--root', help='矩陣目錄，預設為 data/market_flows')
+    flows_matrix.add_argument('--start', help='起始日期 (YYYY-MM-DD)，預設為最後儲存日的隔天')
+    flows_matrix.add_argument('--end', help='結束日期 (YYYY-MM-DD)，預設為今天')
+    flows_matrix.add_argument('--workers', type=int, default=4, help='同時請求數 (實際頻率受主機限速控制)')
+    flows_matrix.set_defaults(handler=cmd_flows_matrix)
+    correlate = flows_commands.add_parser('correlate', help='全市場股價與法人累計買賣超相關係數')
+    correlate.add_argument('--codes', nargs='+', metavar='CODE', help='證券代號，預設為全部')
+    correlate.add_argument('--root', help='買賣超矩陣目錄，預設為 data/market_flows')
+    correlate.add_argument('--quotes-root', help='行情矩陣目錄，預設為 data/market_quotes')
+    correlate.add_argument('--start', help='起始日期 (YYYY-MM-DD)')
+    correlate.add_argument('--end', help='結束日期 (YYYY-MM-DD)')
+    correlate.add_argument('--processes', type=int, default=4, help='分析程序數 (共用記憶體映射矩陣)')
+    correlate.add_argument('--output', metavar='PATH', help='儲存為 CSV')
+    correlate.set_defaults(handler=cmd_flows_correlate)
+    backtest = flows_commands.add_parser('backtest', help='法人籌碼訊號事件研究 (z 分數穿越、連續買賣超)')
+    backtest.add_argument('--codes', nargs='+', metavar='CODE', help='證券代號，預設為全部')
+    backtest.add_argument('--root', help='買賣超矩陣目錄，預設為 data/market_flows')
+    backtest.add_argument('--quotes-root', help='行情矩陣目錄，預設為 data/market_quotes')
+    backtest.add_argument('--start', help='起始日期 (YYYY-MM-DD)')
+    backtest.add_argument('--end', help='結束日期 (YYYY-MM-DD)')
+    backtest.add_argument('--field', default='foreign', choices=['foreign', 'foreign_dealer', 'trust', 'dealer', 'total'],
+                          help='z 分數訊號的買賣超欄位 (預設: foreign)')
+    backtest.add_argument('--z-windows', nargs='+', type=int, default=[20, 60], help='z 分數視窗 (交易日)')
+    backtest.add_argument('--thresholds', nargs='+', type=float, default=[2.0], help='z 分數門檻')
+    backtest.add_argument('--streaks', nargs='+', type=int, default=[3, 5], help='三大法人連續買超天數')
+    backtest.add_argument('--both-sides', action='store_true', help='同時回測賣超訊號')
+    backtest.add_argument('--horizons', nargs='+', type=int, default=[1, 5, 10, 20], help='前瞻報酬天期 (交易日)')
+    backtest.add_argument('--lag', type=int, default=1, help='事件日到進場日的交易日數 (T86 收盤後公布)')
+    backtest.add_argument('--output', metavar='DIR', help='將結果表格存為 CSV')
+    backtest.set_defaults(handler=cmd_flows_backtest)
+
+    quotes = commands.add_parser('quotes', help='證交所全市場每日行情 (MI_INDEX)')
+    quotes.add_argument('--root', help='儲存目錄，預設為 data/market_quotes')
+    quotes_commands = quotes.add_subparsers(dest='quotes_command', metavar='ACTION')
+    quotes_update = quotes_commands.add_parser('update', help='回補並增量更新 (每個交易日一次請求)')
+    quotes_update.add_argument('--start', help='起始日期 (YYYY-MM-DD)，預設為最後儲存日的隔天')
+    quotes_update.add_argument('--end', help='結束日期 (YYYY-MM-DD)，預設為今天')
+    quotes_update.add_argument('--workers', type=int, default=4, help='同時請求數 (實際頻率受主機限速控制)')
+    quotes_update.add_argument('--no-indicators', action='store_true', help='不更新增量指標')
+    quotes_update.set_defaults(handler=cmd_quotes_update)
+    quotes_indicators = quotes_commands.add_parser('indicators', help='更新累計成長率與移動平均 (只處理新交易日)')
+    quotes_indicators.add_argument('--windows', nargs='+', type=int, default=[20, 60], help='移動平均視窗 (交易日)')
+    quotes_indicators.add_argument('--rebuild', action='store_true', help='清除狀態後由第一個交易日重算')
+    quotes_indicators.set_defaults(handler=cmd_quotes_indicators)
+    quotes_show = quotes_commands.add_parser('show', help='列印單一證券的日K資料')
+    quotes_show.add_argument('code', help='證券代號 (如 2330)')
+    quotes_show.add_argument('--start', help='起始日期 (YYYY-MM-DD)')
+    quotes_show.add_argument('--end', help='結束日期 (YYYY-MM-DD)')
+    quotes_show.add_argument('--last', type=int, default=20, help='列印最近幾個交易日')
+    quotes_show.set_defaults(handler=cmd_quotes_show)
+
+    news = commands.add_parser('news', help='新聞情緒指數')
+    news.add_argument('--root', help='情緒矩陣目錄，預設為 data/news_sentiment')
+    news.add_argument('--labels', help='chunk 標註檔，預設為 data/news_labels.jsonl')
+    news.add_argument('--quotes-root', help='行情矩陣目錄 (交易日軸)，預設為 data/market_quotes')
+    news.add_argument('--half-life', type=float, default=5, help='衰減情緒的半衰期 (交易日)')
+    news_commands = news.add_subparsers(dest='news_command', metavar='ACTION')
+    news_sentiment = news_commands.add_parser('sentiment', help='彙總新的 chunk 標註為每日情緒 (只重算受影響的交易日)')
+    news_sentiment.set_defaults(handler=cmd_news_sentiment)
+    news_correlate = news_commands.add_parser('correlate', help='全市場情緒與報酬、法人買賣超相關係數')
+    news_correlate.add_argument('--field', choices=['decayed', 'score'], default='decayed', help='情緒欄位')
+    news_correlate.add_argument('--horizons', nargs='+', type=int, default=[1, 5], help='未來報酬天期 (交易日)')
+    news_correlate.add_argument('--flows-root', help='買賣超矩陣目錄，預設為 data/market_flows')
+    news_correlate.add_argument('--start', help='起始日期 (YYYY-MM-DD)')
+    news_correlate.add_argument('--end', help='結束日期 (YYYY-MM-DD)')
+    news_correlate.add_argument('--output', metavar='PATH', help='儲存為 CSV')
+    news_correlate.set_defaults(handler=cmd_news_correlate)
+    news_index = news_commands.add_parser('index', help='將新聞 JSONL 切成 chunk 加入向量索引 (已索引的文章略過)')
+    news_index.add_argument('paths', nargs='+', metavar='PATH', help='finance_news.ipynb 輸出的 JSONL')
+    news_index.add_argument('--code', help='檔案沒有 code 欄位時的證券代號')
+    news_index.add_argument('--index-dir', help='索引目錄，預設為 data/news_index')
+    news_index.add_argument('--rebuild-ivf', action='store_true', help='重新訓練 IVF 群心')
+    news_index.add_argument('--nlist', type=int, help='IVF 群數，預設約為 sqrt(chunk 數)')
+    news_index.set_defaults(handler=cmd_news_index)
+    news_search = news_commands.add_parser('search', help='搜尋相似的新聞與公告')
+    news_search.add_argument('query', nargs='?', help='查詢文字')
+    news_search.add_argument('--article', metavar='LINK', help='以已索引的文章查詢相似文章')
+    news_search.add_argument('-k', type=int, default=10, help='回傳數量')
+    news_search.add_argument('--codes', nargs='+', metavar='CODE', help='只搜尋這些證券的新聞')
+    news_search.add_argument('--start', help='起始日期 (YYYY-MM-DD)')
+    news_search.add_argument('--end', help='結束日期 (YYYY-MM-DD)')
+    news_search.add_argument('--nprobe', type=int, default=8, help='IVF 搜尋的群數')
+    news_search.add_argument('--exact', action='store_true', help='精確搜尋全部 chunk')
+    news_search.add_argument('--index-dir', help='索引目錄，預設為 data/news_index')
+    news_search.set_defaults(handler=cmd_news_search)
+
+    nightly = commands.add_parser('nightly', help='執行每日管線 (略過輸入未變更的階段)')
+    nightly.add_argument('--only', nargs='+', metavar='STAGE', help='只執行這些階段與其上游')
+    nightly.add_argument('--force', nargs='*', metavar='STAGE', help='強制重跑指定階段，不指定表示全部')
+    nightly.add_argument('--dry-run', action='store_true', help='只列出需要執行的階段')
+    nightly.add_argument('--workers', type=int, default=4, help='同時執行的階段數')
+    nightly.add_argument('--symbols', nargs='+', metavar='SYMBOL', help='財報與評分的股票代碼')
+    nightly.add_argument('--max-etfs', type=int, help='ETF最大收集數量')
+    nightly.add_argument('--delay', type=float, default=1.0, help='ETF請求間隔時間(秒)')
+    nightly.add_argument('--pcf-dir', help='投信PCF檔案目錄')
+    nightly.add_argument('--data-dir', help='資料根目錄')
+    nightly.add_argument('--report', metavar='PATH', help='將執行報告儲存為 JSON')
+    nightly.set_defaults(handler=cmd_nightly)
+
+    shard = commands.add_parser('shard', help='分片輸出合併與單機多程序執行')
+    shard_commands = shard.add_subparsers(dest='shard_action', metavar='ACTION')
+    merge = shard_commands.add_parser('merge', help='合併分片輸出到標準位置')
+    merge.add_argument('target', choices=['etf', 'score'], help='要合併的輸出')
+    merge.add_argument('--shards', type=int, required=True, help='分片數 N')
+    merge.add_argument('--data-dir', help='ETF資料目錄 (etf)')
+    merge.add_argument('--output', help='評分結果路徑 (score)')
+    merge.add_argument('--allow-partial', action='store_true', help='允許缺少分片')
+    merge.set_defaults(handler=cmd_shard_merge)
+    run = shard_commands.add_parser('run', help='單機以 N 個程序分片執行並合併')
+    run.add_argument('count', type=int, help='分片數 N')
+    run.add_argument('--parallel', type=int, help='同時執行的程序數')
+    run.add_argument('shard_command', nargs=argparse.REMAINDER, metavar='-- COMMAND', help='要分片執行的子指令')
+    run.set_defaults(handler=cmd_shard_run)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    handler = getattr(args, 'handler', None)
+    if handler is None:
+        # 只輸入群組名稱 (如 `tw-stock etf`) 時列印該群組的說明
+        subparsers = [action for action in parser._actions if isinstance(action, argparse._SubParsersAction)]
+        group = subparsers[0].choices.get(args.command) if args.command else None
+        (group or parser).print_help()
+        return 2
+
+    from instrumentation import get_instrumentation, profiling
+
+    instrumentation = get_instrumentation()
+    if args.metrics:
+        instrumentation.enabled = True
+
+    try:
+        if args.profile:
+            with profiling(args.profile):
+                return handler(args)
+        return handler(args)
+    finally:
+        if args.metrics:
+            instrumentation.export(args.metrics)
+            print(f"耗時統計已輸出至: {args.metrics}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
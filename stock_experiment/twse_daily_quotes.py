@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+證交所全市場每日行情
+TWSE Full-Market Daily Quotes
+
+用途: 以證交所 MI_INDEX (type=ALL) 每日收盤行情取代逐檔 yf.download，一次請求取得當日全部上市證券的
+      開高低收量，寫入 日期 × 證券 的記憶體映射陣列；一年約 250 次請求即可取得全市場價格歷史
+
+儲存格式 (data/market_quotes/) 為 market_matrix.MarketMatrix: meta.json 記錄日期與證券軸，
+各欄位 (open、high、low、close、volume、value、trades 與衍生的 returns) 為 row-major 原始陣列，缺值為 NaN
+
+使用方式:
+    tw-stock quotes update --start 2024-01-01   # 回補並增量更新
+    store = QuoteStore()
+    store.frame('close', codes=['2330', '2317'], start='2024-06-01')
+    store.history('2330')                      # 與 yfinance history 相同欄位
+"""
+
+import os
+import re
+
+import numpy as np
+
+from instrumentation import span
+from market_matrix import MarketMatrix, update_matrix
+
+MI_INDEX_URL = 'https://www.twse.com.tw/rwd/zh/afterTrading/MI_INDEX?response=json&date={date}&type=ALL'
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUOTES_DIR = os.path.join(REPO_ROOT, 'data', 'market_quotes')
+
+# 儲存欄位 → (MI_INDEX 欄位名稱, dtype)；成交股數與金額超過 float32 的精確範圍
+QUOTE_FIELDS = {
+    'open': ('開盤價', np.float32),
+    'high': ('最高價', np.float32),
+    'low': ('最低價', np.float32),
+    'close': ('收盤價', np.float32),
+    'volume': ('成交股數', np.float64),
+    'value': ('成交金額', np.float64),
+    'trades': ('成交筆數', np.float64),
+}
+
+# history() 的 yfinance 欄位名稱
+HISTORY_COLUMNS = {'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume'}
+
+CODE_FIELD = '證券代號'
+NAME_FIELD = '證券名稱'
+
+_NUMBER = re.compile(r'[^0-9.\-]')
+
+
+def _to_number(text):
+    """'1,234.50' → 1234.5；'--'、'' 等無成交為 NaN"""
+    cleaned = _NUMBER.sub('', str(text))
+    if cleaned in ('', '-', '.'):
+        return np.nan
+    try:
+        return float(cleaned)
+    except ValueError:
+        return np.nan
+
+
+def _quote_table(data):
+    """
+    找出每日收盤行情表
+
+    新版回應為 tables 清單，舊版為 fields9/data9 等編號欄位；以同時含證券代號與收盤價的表為準
+
+    Returns:
+        tuple: (fields, rows)，找不到時為 (None, None)
+    """
+    for table in data.get('tables') or []:
+        fields = table.get('fields') or []
+        if CODE_FIELD in fields and '收盤價' in fields:
+            return fields, table.get('data') or []
+    for key, fields in data.items():
+        if key.startswith('fields') and isinstance(fields, list) and CODE_FIELD in fields and '收盤價' in fields:
+            return fields, data.get('data' + key[len('fields'):]) or []
+    return None, None
+
+
+def parse_mi_index(data):
+    """
+    解析 MI_INDEX 回應
+
+    Args:
+        data (dict): MI_INDEX JSON
+
+    Returns:
+        pd.DataFrame: 證券代號為索引，欄位為 name 與 QUOTE_FIELDS；非交易日或格式不符時為 None
+    """
+    import pandas as pd
+
+    if not data or data.get('stat') != 'OK':
+        return None
+    fields, rows = _quote_table(data)
+    if not fields or not rows:
+        return None
+
+    positions = {name: fields.index(source) for name, (source, _) in QUOTE_FIELDS.items()}
+    code_position, name_position = fields.index(CODE_FIELD), fields.index(NAME_FIELD)
+    quotes = pd.DataFrame({
+        'name': [str(row[name_position]).strip() for row in rows],
+        **{name: [_to_number(row[position]) for row in rows] for name, position in positions.items()},
+    }, index=pd.Index([str(row[code_position]).strip() for row in rows], name='code'))
+    return quotes[~quotes.index.duplicated(keep='first')]
+
+
+def fetch_quotes_day(date, http=None):
+    """
+    取得單日全市場收盤行情
+
+    Args:
+        date (datetime): 交易日期
+        http (HTTPClient): HTTP客戶端，None表示使用共用客戶端
+
+    Returns:
+        pd.DataFrame: parse_mi_index 的結果，非交易日為 None
+    """
+    if http is None:
+        from http_client import get_default_client
+
+        http = get_default_client()
+
+    with span('quotes.day_fetch'):
+        data = http.get_json(MI_INDEX_URL.format(date=date.strftime('%Y%m%d')))
+    return parse_mi_index(data)
+
+
+class QuoteStore(MarketMatrix):
+    """日期 × 證券 的每日行情矩陣 (另含由收盤價衍生的日報酬)"""
+
+    FIELDS = {
+        **{field: (dtype, np.nan) for field, (_, dtype) in QUOTE_FIELDS.items()},
+        'returns': (np.float32, np.nan),
+    }
+
+    def __init__(self, root=QUOTES_DIR):
+        """
+        Args:
+            root (str): 儲存目錄
+        """
+        super().__init__(root)
+
+    def _after_write(self, first_row):
+        """重新計算 first_row 之後的日報酬 (前一日或當日沒有收盤價時為 NaN)"""
+        if not self.dates:
+            return
+        close = self.open('close')
+        returns = self.open('returns', mode='r+')
+        start = max(first_row, 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns[start:] = close[start:] / close[start - 1:-1] - 1
+        if first_row == 0:
+            returns[0] = np.nan
+        returns.flush()
+
+    def history(self, code, start=None, end=None):
+        """
+        單一證券的日K資料 (欄位與 yfinance history 相同)
+
+        Returns:
+            pd.DataFrame: Open、High、Low、Close、Volume，只保留有成交的日期
+        """
+        import pandas as pd
+
+        code = str(code).split('.')[0]
+        if code not in self.code_index:
+            return pd.DataFrame(columns=list(HISTORY_COLUMNS.values()))
+        columns = {label: self.frame(field, [code], start, end)[code] for field, label in HISTORY_COLUMNS.items()}
+        return pd.DataFrame(columns).dropna(subset=['Close'])
+
+
+def update_quote_store(store=None, start_date=None, end_date=None, http=None, max_workers=4):
+    """
+    回補並增量更新全市場每日行情
+
+    Args:
+        store (QuoteStore): 行情儲存，None表示預設目錄
+        start_date (str): 起始日 'YYYY-MM-DD'，None表示最後儲存日的隔天
+        end_date (str): 結束日 'YYYY-MM-DD'，None表示今天
+        http (HTTPClient): HTTP客戶端
+        max_workers (int): 同時請求數 (實際頻率由 HTTPClient 的主機限速控制)
+
+    Returns:
+        int: 新增的交易日數
+    """
+    return update_matrix(store or QuoteStore(), fetch_quotes_day, start_date, end_date, http, max_workers,
+                         label='全市場每日行情')
+
+
+def main():
+    """增量更新預設目錄的行情"""
+    update_quote_store()
+
+
+if __name__ == "__main__":
+    main()